@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Benchmark da compressão de corpos grandes: RSS em memória e bytes lidos do PostgreSQL
+
+Cada configuração roda em um processo próprio (RSS limpo), com BODY_COMPRESSION=off e zlib.
+Conjunto: N mocks com corpo pequeno e, a cada --large-every, um catálogo grande.
+
+- memória: RSS depois de criar os mocks (como chegam pela API) e tempo para servir um corpo grande;
+- banco: bytes armazenados e bytes dos corpos lidos ao carregar todos os mocks (warm start do
+  write-behind), e o tempo de get_all_mocks com e sem corpos (listagem). Precisa do PostgreSQL
+  configurado no .env / DB_* (tabelas migradas); os mocks criados são removidos no final.
+
+Uso:
+    python benchmarks/bench_body_compression.py
+    python benchmarks/bench_body_compression.py --mocks 10000 --large-every 20 --large-items 1000 --skip-db
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+logging.disable(logging.INFO)
+
+
+def _body(i: int, large_every: int, large_items: int) -> bytes:
+    if i % large_every == 0:
+        body = {"catalogo": i, "itens": [{"id": n, "sku": f"SKU-{i}-{n:05}", "nome": f"Produto {n} da loja {i}",
+                                          "preco": round(n * 1.37, 2), "ativo": n % 3 != 0, "tags": ["promo", "estoque"]}
+                                         for n in range(large_items)]}
+    else:
+        body = {"id": i, "status": "ok", "cliente": {"nome": f"Cliente {i}", "email": f"c{i}@exemplo.com"},
+                "itens": [i, i + 1, i + 2]}
+    # Como chega pela API: bytes JSON desserializados (objetos novos, sem compartilhamento)
+    return json.dumps(body).encode()
+
+
+def _rss_kb() -> int:
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+def _child_memory(args) -> dict:
+    os.environ["USE_DATABASE"] = "false"
+    from src import json_codec
+    from src.mocks_manager import MocksManager
+    from src.template_engine import RenderContext
+
+    manager = MocksManager()
+    gc.collect()
+    before = _rss_kb()
+    for i in range(args.mocks):
+        manager.create_mock(f"/bench-corpos/{i}", "GET", 200, json_codec.loads(_body(i, args.large_every, args.large_items)))
+    gc.collect()
+    rss = _rss_kb() - before
+
+    match = manager.find_matching_mock("/bench-corpos/0", "GET")
+    started = time.perf_counter()
+    for _ in range(20):
+        json_codec.dumps_bytes(match["template"].render(RenderContext()))
+    serve = (time.perf_counter() - started) / 20
+    return {'rss_mb': rss / 1024, 'serve_ms': serve * 1e3}
+
+
+def _child_database(args) -> dict:
+    os.environ["USE_DATABASE"] = "true"
+    os.environ["PERSISTENCE_MODE"] = "sync"
+    from sqlalchemy import text
+    from src import json_codec
+    from src.mocks_manager import MocksManager
+
+    db = MocksManager().db_manager
+    if not db.is_connected():
+        return {'error': "Banco não conectado (verifique DB_* no .env)"}
+    ids = [f"z{i:07}" for i in range(args.mocks)]
+    mocks = [{'id': ids[i], 'uri': f"/bench-corpos/{i}", 'http_method': "GET", 'status_code': 200,
+              'response': json_codec.loads(_body(i, args.large_every, args.large_items)),
+              'uri_pattern': f"/bench-corpos/{i}"} for i in range(args.mocks)]
+    try:
+        for start in range(0, len(mocks), 1000):
+            db.apply_batch(mocks[start:start + 1000], [])
+        del mocks
+        with db.engine.connect() as conn:
+            stored, wire = conn.execute(text(
+                "SELECT sum(pg_column_size(response_body) + coalesce(pg_column_size(response_compressed), 0)),"
+                " sum(octet_length(response_body) + coalesce(octet_length(response_compressed), 0))"
+                " FROM qa_api WHERE id LIKE 'z%'"
+            )).one()
+        started = time.perf_counter()
+        db.get_all_mocks()
+        load = time.perf_counter() - started
+        started = time.perf_counter()
+        db.get_all_mocks(include_body=False)
+        listing = time.perf_counter() - started
+        return {'stored_mb': stored / 2**20, 'wire_mb': wire / 2**20, 'load_ms': load * 1e3, 'list_ms': listing * 1e3}
+    finally:
+        db.apply_batch([], ids)
+
+
+def _run_child(kind: str, codec: str, argv) -> dict:
+    env = dict(os.environ, BODY_COMPRESSION=codec)
+    output = subprocess.run([sys.executable, __file__, "--child", kind] + argv, env=env, cwd=ROOT,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compressão de corpos grandes: RSS e I/O do banco")
+    parser.add_argument("--mocks", type=int, default=10000)
+    parser.add_argument("--large-every", type=int, default=20)
+    parser.add_argument("--large-items", type=int, default=1000)
+    parser.add_argument("--skip-db", action="store_true")
+    parser.add_argument("--child", choices=("memory", "database"))
+    args = parser.parse_args()
+
+    if args.child:
+        result = _child_memory(args) if args.child == "memory" else _child_database(args)
+        print(json.dumps(result))
+        return 0
+
+    argv = ["--mocks", str(args.mocks), "--large-every", str(args.large_every), "--large-items", str(args.large_items)]
+    large = len(_body(0, args.large_every, args.large_items))
+    print(f"{args.mocks} mocks, {args.mocks // args.large_every} com corpo grande (~{large / 1024:.0f} KB)")
+
+    off, on = (_run_child("memory", codec, argv) for codec in ("off", "zlib"))
+    print("\nmemória              off        zlib")
+    print(f"  RSS (MB)     {off['rss_mb']:>10.1f} {on['rss_mb']:>11.1f}   ({1 - on['rss_mb'] / off['rss_mb']:.0%} menos)")
+    print(f"  servir (ms)  {off['serve_ms']:>10.2f} {on['serve_ms']:>11.2f}   (corpo grande: render + serialização)")
+
+    if not args.skip_db:
+        off, on = (_run_child("database", codec, argv) for codec in ("off", "zlib"))
+        if 'error' in off:
+            print(f"\n❌ {off['error']}")
+            return 1
+        print("\nbanco                off        zlib")
+        print(f"  armazenado   {off['stored_mb']:>10.1f} {on['stored_mb']:>11.1f}   MB (após TOAST)")
+        print(f"  lido (MB)    {off['wire_mb']:>10.1f} {on['wire_mb']:>11.1f}   ({1 - on['wire_mb'] / off['wire_mb']:.0%} menos)")
+        print(f"  carga (ms)   {off['load_ms']:>10.0f} {on['load_ms']:>11.0f}   (get_all_mocks com corpos)")
+        print(f"  listar (ms)  {off['list_ms']:>10.0f} {on['list_ms']:>11.0f}   (sem corpos)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark de latência por operação no PostgreSQL sob carga concorrente, variando o pool
+
+Requer um PostgreSQL local configurado no .env / variáveis DB_* (USE_DATABASE é forçado para true).
+Os mocks de teste usam o prefixo /bench-pool/ e são removidos ao final.
+
+Uso:
+    python benchmarks/bench_db_pool.py [--mocks 1000] [--ops 2000] [--threads 1,8,32]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["USE_DATABASE"] = "true"
+os.environ["FALLBACK_TO_MEMORY"] = "false"
+os.environ["DB_RECONNECT_ENABLED"] = "false"
+
+from src.database_manager import DatabaseManager
+
+# (rótulo, variáveis de ambiente aplicadas antes de criar o DatabaseManager)
+CONFIGS = [
+    ("pool 1, sem overflow, sem preparo", {"DB_POOL_SIZE": "1", "DB_MAX_OVERFLOW": "0", "DB_PREPARED_STATEMENTS": "false"}),
+    ("pool 5+10, sem preparo", {"DB_POOL_SIZE": "5", "DB_MAX_OVERFLOW": "10", "DB_PREPARED_STATEMENTS": "false"}),
+    ("pool 5+10, preparado", {"DB_POOL_SIZE": "5", "DB_MAX_OVERFLOW": "10", "DB_PREPARED_STATEMENTS": "true"}),
+    ("pool 20+20, preparado", {"DB_POOL_SIZE": "20", "DB_MAX_OVERFLOW": "20", "DB_PREPARED_STATEMENTS": "true"}),
+]
+
+
+def _seed(manager: DatabaseManager, count: int):
+    rows = [
+        {
+            'id': f"bp{i:06}",
+            'uri': f"/bench-pool/{i}",
+            'http_method': "GET",
+            'status_code': 200,
+            'response': {"i": i, "name": f"mock {i}"},
+            'uri_pattern': f"/bench-pool/{i}",
+            'headers': {}
+        }
+        for i in range(count)
+    ]
+    manager.apply_batch(rows, [])
+
+
+def _cleanup(manager: DatabaseManager, count: int):
+    manager.apply_batch([], [f"bp{i:06}" for i in range(count)])
+
+
+def _run(manager: DatabaseManager, op: str, mocks: int, ops: int, threads: int):
+    def one(_):
+        i = random.randrange(mocks)
+        start = time.perf_counter()
+        if op == "by_id":
+            manager.get_mock(f"bp{i:06}")
+        elif op == "by_route":
+            manager.get_mock_by_route(f"/bench-pool/{i}", "GET")
+        else:
+            manager.mock_exists(f"bp{i:06}")
+        return time.perf_counter() - start
+
+    wall = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        latencies = sorted(pool.map(one, range(ops)))
+    wall = time.perf_counter() - wall
+    pct = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+    return statistics.median(latencies) * 1000, pct(0.95), pct(0.99), ops / wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--mocks", type=int, default=1000)
+    parser.add_argument("--ops", type=int, default=2000)
+    parser.add_argument("--threads", default="1,8,32")
+    args = parser.parse_args()
+    thread_counts = [int(t) for t in args.threads.split(",")]
+
+    seeder = DatabaseManager()
+    _seed(seeder, args.mocks)
+    try:
+        print(f"{'configuração':<36} {'op':<9} {'threads':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'ops/s':>9}")
+        for label, env in CONFIGS:
+            os.environ.update(env)
+            manager = DatabaseManager()
+            for op in ("by_id", "by_route", "exists"):
+                for threads in thread_counts:
+                    p50, p95, p99, throughput = _run(manager, op, args.mocks, args.ops, threads)
+                    print(f"{label:<36} {op:<9} {threads:>7} {p50:>8.3f} {p95:>8.3f} {p99:>8.3f} {throughput:>9.0f}")
+            manager.engine.dispose()
+    finally:
+        _cleanup(seeder, args.mocks)
+
+
+if __name__ == "__main__":
+    main()
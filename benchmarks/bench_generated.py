@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Benchmark de respostas geradas ($generate): throughput e pico de memória do streaming
+
+Compara iter_json (itens renderizados sob demanda) com montar a lista inteira e serializar
+de uma vez, como seria com um array literal no response.
+
+Uso:
+    python benchmarks/bench_generated.py
+    python benchmarks/bench_generated.py --items 5000000
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.json_codec import dumps_bytes, iter_json
+from src.template_engine import RenderContext, compile_template
+
+
+def _run(label: str, produce):
+    tracemalloc.start()
+    started = time.perf_counter()
+    total = produce()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<14} {total / 1e6:>9.1f} MB {elapsed:>8.2f} s {total / 1e6 / elapsed:>8.1f} MB/s  pico {peak / 1e6:>8.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming de respostas geradas")
+    parser.add_argument("--items", type=int, default=1000000)
+    args = parser.parse_args()
+
+    template = compile_template({"total": args.items, "items": {"$generate": {
+        "count": args.items, "seed": 1,
+        "item": {"id": "{{item.seq}}", "name": "cliente-{{item.index}}", "score": "{{item.random}}", "ativo": True}
+    }}}, legacy=False)
+    ctx = RenderContext()
+
+    def streamed():
+        return sum(len(chunk) for chunk in iter_json(template.render(ctx)))
+
+    def materialized():
+        rendered = template.render(ctx)
+        return len(dumps_bytes(dict(rendered, items=list(rendered["items"]))))
+
+    _run("streaming", streamed)
+    _run("lista inteira", materialized)
+
+
+if __name__ == "__main__":
+    main()
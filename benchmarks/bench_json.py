@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark da serialização JSON (antes: stdlib + jsonable_encoder / depois: json_codec)
+
+Uso:
+    python benchmarks/bench_json.py
+    JSON_BACKEND=json python benchmarks/bench_json.py   # força o fallback da stdlib
+"""
+
+import os
+import sys
+import json
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from src import json_codec
+
+SMALL = {"id": "123", "name": "Usuario Teste", "email": "user@test.com", "active": True}
+LARGE = {
+    "items": [
+        {"id": i, "name": f"item-{i}", "price": i * 1.5, "tags": ["a", "b", "c"], "meta": {"ok": True}}
+        for i in range(1000)
+    ],
+    "total": 1000,
+}
+
+
+def _starlette_render(content):
+    # Caminho anterior: jsonable_encoder (rotas admin) + JSONResponse.render da Starlette
+    return json.dumps(
+        jsonable_encoder(content), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def _bench(label, func, number):
+    seconds = min(timeit.repeat(func, number=number, repeat=5))
+    print(f"  {label:<40} {seconds / number * 1e6:10.2f} µs/op")
+
+
+def main():
+    print(f"Backend json_codec: {json_codec.BACKEND}")
+    for name, payload, number in (("payload pequeno", SMALL, 20000), ("payload grande (1000 itens)", LARGE, 50)):
+        encoded = json.dumps(payload)
+        print(f"\n{name}:")
+        _bench("resposta antes (jsonable_encoder+json)", lambda: _starlette_render(payload), number)
+        _bench("resposta depois (json_codec)", lambda: json_codec.dumps_bytes(payload), number)
+        _bench("armazenamento antes (json.dumps)", lambda: json.dumps(payload), number)
+        _bench("armazenamento depois (json_codec.dumps)", lambda: json_codec.dumps(payload), number)
+        _bench("leitura antes (json.loads)", lambda: json.loads(encoded), number)
+        _bench("leitura depois (json_codec.loads)", lambda: json_codec.loads(encoded), number)
+
+
+if __name__ == "__main__":
+    main()
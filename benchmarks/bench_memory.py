@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark de memória dos mocks em memória: bytes por mock (tracemalloc)
+
+Compara o layout antigo (dict por mock com regex própria) com o MockRecord
+(__slots__, padrões compartilhados, URIs literais sem regex).
+
+Uso:
+    python benchmarks/bench_memory.py
+    python benchmarks/bench_memory.py --sizes 10000,100000
+"""
+
+import argparse
+import gc
+import os
+import re
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.mock_record import MockRecord, uri_regex
+from src.template_engine import compile_template
+
+METHODS = ("GET", "POST", "PUT", "DELETE")
+
+
+def _mock_data(i: int):
+    # 1 em cada 5 mocks tem parâmetro; os 4 métodos da mesma URI compartilham o padrão
+    if i % 5 == 0:
+        uri = f"/api/v1/recurso{i // 20}/:id"
+    else:
+        uri = f"/api/v1/clientes/{i}/pedidos"
+    # Strings vindas do JSON da requisição não são internadas: copia o método
+    method = "".join(METHODS[i % 4])
+    return uri, method, 200 + i % 3, {"id": i, "status": "ok", "itens": [i, i + 1]}
+
+
+def _legacy_record(uri, method, status_code, response):
+    return {
+        'uri': uri,
+        'http_method': method,
+        'status_code': status_code,
+        'response': response,
+        'headers': {},
+        'variants': [],
+        'uri_pattern': re.compile(f"^{uri_regex(uri)}$"),
+        'template': compile_template(response),
+        'variant_set': None
+    }
+
+
+def _measure(count: int, build) -> float:
+    gc.collect()
+    re.purge()
+    tracemalloc.start()
+    store = {}
+    for i in range(count):
+        store[f"{i:06}"] = build(*_mock_data(i))
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del store
+    return current / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytes por mock em memória")
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    args = parser.parse_args()
+
+    print(f"{'mocks':>9} {'dict B/mock':>12} {'MockRecord B/mock':>18} {'redução':>8}")
+    for count in (int(s) for s in args.sizes.split(",")):
+        legacy = _measure(count, _legacy_record)
+        compact = _measure(count, MockRecord)
+        print(f"{count:>9} {legacy:>12.0f} {compact:>18.0f} {1 - compact / legacy:>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
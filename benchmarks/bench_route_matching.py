@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark do match de rota no banco: DB_ROUTE_MATCHING=sql (prefixo indexado + regex no
+PostgreSQL) contra scan (todos os mocks lidos e casados no Python)
+
+Precisa do PostgreSQL configurado no .env / DB_* (as tabelas já migradas). Os mocks criados
+aqui são removidos no final.
+
+Uso:
+    python benchmarks/bench_route_matching.py
+    python benchmarks/bench_route_matching.py --mocks 50000 --requests 200
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["USE_DATABASE"] = "true"
+os.environ["PERSISTENCE_MODE"] = "sync"
+logging.disable(logging.INFO)
+
+from sqlalchemy import text
+
+from src.mocks_manager import MocksManager
+
+
+def _mocks(count: int):
+    for i in range(count):
+        uri = f"/bench-rotas/recurso{i}/:id" if i % 2 else f"/bench-rotas/clientes/{i}/pedidos"
+        yield {'id': f"b{i:07}", 'uri': uri, 'http_method': "GET", 'status_code': 200,
+               'response': {"id": i, "itens": list(range(20))}, 'uri_pattern': MocksManager.compile_uri_pattern_static(uri)}
+
+
+def _time(manager: MocksManager, paths, mode: str) -> float:
+    manager.db_manager.route_matching = mode
+    started = time.perf_counter()
+    for path in paths:
+        assert manager.find_matching_mock(path, "GET") is not None
+    return (time.perf_counter() - started) / len(paths)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Match de rota no banco vs scan no Python")
+    parser.add_argument("--mocks", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=100)
+    args = parser.parse_args()
+
+    manager = MocksManager()
+    db = manager.db_manager
+    if not db.is_connected():
+        print("❌ Banco não conectado (verifique DB_* no .env)")
+        return 1
+
+    mocks = list(_mocks(args.mocks))
+    for start in range(0, len(mocks), 5000):
+        db.apply_batch(mocks[start:start + 5000], [])
+    with db.engine.begin() as conn:
+        conn.execute(text("ANALYZE qa_api"))
+    try:
+        step = max(1, args.mocks // args.requests)
+        paths = [f"/bench-rotas/recurso{i}/42" if i % 2 else f"/bench-rotas/clientes/{i}/pedidos"
+                 for i in range(0, args.mocks, step)][:args.requests]
+        sql = _time(manager, paths, "sql")
+        scan = _time(manager, paths[:max(1, len(paths) // 10)], "scan")
+        print(f"{args.mocks} mocks no banco")
+        print(f"  sql   {sql * 1e3:>10.2f} ms/requisição")
+        print(f"  scan  {scan * 1e3:>10.2f} ms/requisição  ({scan / sql:.0f}x)")
+
+        with db.engine.connect() as conn:
+            plan = conn.exec_driver_sql(
+                "EXPLAIN SELECT id FROM qa_api WHERE http_method = 'GET' "
+                "AND static_prefix = ANY(ARRAY['/', '/bench-rotas/', '/bench-rotas/recurso1/', '/bench-rotas/recurso1/42']) "
+                "AND (segment_count = 3 OR segment_count IS NULL)"
+            ).fetchall()
+        print("\n" + "\n".join(row[0] for row in plan))
+    finally:
+        db.apply_batch([], [mock['id'] for mock in mocks])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
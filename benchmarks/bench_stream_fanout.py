@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Benchmark do broadcast dos mocks SSE/WebSocket: N conexões abertas em um processo
+
+Cada conexão é uma corrotina consumindo StreamHub.stream (o mesmo gerador usado pelo catch_all) e
+"enviando" o frame para lugar nenhum; mede só o custo do hub no event loop. Para cada mensagem
+publicada mede o tempo até todas as conexões a receberem, e compara com o jeito ingênuo: uma
+asyncio.Queue por conexão e a mensagem serializada conexão a conexão.
+
+Também mostra a memória alocada por conexão aberta (tracemalloc).
+
+Uso:
+    python benchmarks/bench_stream_fanout.py
+    python benchmarks/bench_stream_fanout.py --subscribers 10000 --messages 200 --kind websocket
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+logging.disable(logging.INFO)
+
+from src.stream_mocks import StreamHub, encode_frame  # noqa: E402
+from src.template_engine import RenderContext, compile_template  # noqa: E402
+
+MESSAGE = {"data": {"ativo": "PETR4", "preco": 38.71, "variacao": -0.42, "volume": 1250300,
+                    "book": [{"lado": "compra", "preco": 38.7, "qtd": 500}, {"lado": "venda", "preco": 38.72, "qtd": 300}]},
+           "event": "preco"}
+
+
+async def _measure(publish, counter: dict, subscribers: int, messages: int) -> list:
+    """Latência (s) de cada publicação até a última conexão recebê-la."""
+    latencies = []
+    for _ in range(messages):
+        received = {'n': 0}
+        done = asyncio.get_running_loop().create_future()
+
+        def on_frame(received=received, done=done):
+            received['n'] += 1
+            if received['n'] == subscribers:
+                done.set_result(time.perf_counter())
+        counter['on_frame'] = on_frame
+        started = time.perf_counter()
+        publish()
+        latencies.append(await done - started)
+    return latencies
+
+
+async def _open(connections: list) -> tuple:
+    """Inicia as conexões; retorna (tasks, bytes alocados por conexão)."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tasks = [asyncio.ensure_future(c) for c in connections]
+    await asyncio.sleep(0)
+    per_connection = (tracemalloc.get_traced_memory()[0] - before) / len(tasks)
+    tracemalloc.stop()
+    return tasks, per_connection
+
+
+async def _close(tasks: list):
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def run_hub(kind: str, subscribers: int, messages: int) -> dict:
+    hub = StreamHub(max_connections=subscribers)
+    template = compile_template({"$stream": {"type": kind, "messages": []}})
+    payload = MESSAGE if kind == "sse" else {"data": MESSAGE["data"]}
+    counter = {'on_frame': None}
+
+    async def connection():
+        async for _frame in hub.stream("bench", kind, template.render(RenderContext()), True):
+            counter['on_frame']()
+
+    tasks, per_connection = await _open([connection() for _ in range(subscribers)])
+    latencies = await _measure(lambda: hub.publish("bench", kind, payload), counter, subscribers, messages)
+    await _close(tasks)
+    return {'latencies': latencies, 'per_connection': per_connection, 'stats': hub.get_stats()}
+
+
+async def run_naive(kind: str, subscribers: int, messages: int) -> dict:
+    """Uma fila por conexão; cada conexão serializa a mensagem que recebe."""
+    queues = []
+    counter = {'on_frame': None}
+
+    async def connection():
+        queue = asyncio.Queue(maxsize=256)
+        queues.append(queue)
+        while True:
+            message = await queue.get()
+            encode_frame(kind, message["data"], message.get("event"))
+            counter['on_frame']()
+
+    def publish():
+        for queue in queues:
+            queue.put_nowait(MESSAGE)
+
+    tasks, per_connection = await _open([connection() for _ in range(subscribers)])
+    latencies = await _measure(publish, counter, subscribers, messages)
+    await _close(tasks)
+    return {'latencies': latencies, 'per_connection': per_connection}
+
+
+def _summary(latencies: list) -> str:
+    ordered = sorted(latencies)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    return f"mediana {statistics.median(ordered) * 1e3:>7.2f} ms   p99 {p99 * 1e3:>7.2f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Broadcast dos mocks SSE/WebSocket para N conexões")
+    parser.add_argument("--subscribers", type=int, default=10000)
+    parser.add_argument("--messages", type=int, default=100)
+    parser.add_argument("--kind", choices=("sse", "websocket"), default="sse")
+    args = parser.parse_args()
+
+    print(f"{args.subscribers} conexões {args.kind}, {args.messages} mensagens publicadas")
+    hub = asyncio.run(run_hub(args.kind, args.subscribers, args.messages))
+    naive = asyncio.run(run_naive(args.kind, args.subscribers, args.messages))
+
+    hub_median, naive_median = statistics.median(hub['latencies']), statistics.median(naive['latencies'])
+    print(f"  StreamHub (codifica 1x)      {_summary(hub['latencies'])}   {hub['per_connection'] / 1024:.1f} KB/conexão")
+    print(f"  fila por conexão (ingênuo)   {_summary(naive['latencies'])}   {naive['per_connection'] / 1024:.1f} KB/conexão")
+    print(f"  {naive_median / hub_median:.1f}x mais rápido; {args.subscribers / hub_median:,.0f} entregas/s")
+    stats = hub['stats']
+    print(f"  hub: publicadas {stats['published']}, entregues {stats['delivered']}, perdidas {stats['dropped']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
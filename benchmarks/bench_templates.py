@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark da renderização de respostas: varredura recursiva antiga x template pré-compilado
+
+Uso:
+    python benchmarks/bench_templates.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.template_engine import RenderContext, compile_template
+
+RESPONSE = {
+    "id": "{{path.id|int}}",
+    "label": "user-{{path.id}}",
+    "page": "{{query.page|int|default:1}}",
+    "items": [{"sku": f"SKU-{i}", "qty": i, "tags": ["a", "b"]} for i in range(200)],
+}
+LEGACY_RESPONSE = dict(RESPONSE, id="id", label="id", page="page")
+
+
+def replace_vars_recursive(obj, variables):
+    # Implementação anterior do catch_all (percorre a árvore inteira a cada requisição)
+    if isinstance(obj, str) and obj in variables:
+        return variables[obj]
+    if isinstance(obj, dict):
+        return {k: replace_vars_recursive(v, variables) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [replace_vars_recursive(v, variables) for v in obj]
+    return obj
+
+
+def _bench(label, func, number=2000):
+    seconds = min(timeit.repeat(func, number=number, repeat=5))
+    print(f"  {label:<45} {seconds / number * 1e6:10.2f} µs/op")
+
+
+def main():
+    path, query = {"id": "42"}, {"page": "3"}
+    variables = dict(path, **query)
+    compiled = compile_template(RESPONSE, legacy=False)
+    compiled_legacy = compile_template(LEGACY_RESPONSE, legacy=True)
+
+    print("Renderização por requisição (200 itens estáticos + 3 campos dinâmicos):")
+    _bench("antes: varredura recursiva", lambda: replace_vars_recursive(LEGACY_RESPONSE, variables))
+    _bench("depois: template compilado ({{...}})", lambda: compiled.render(RenderContext(path=path, query=query)))
+    _bench("depois: template compilado (modo legado)",
+           lambda: compiled_legacy.render(RenderContext(path=path, query=query)))
+    _bench("compilação (uma vez por create/update)", lambda: compile_template(RESPONSE, legacy=False), 200)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark da escolha de variantes: índice hash x varredura linear
+
+Uso:
+    python benchmarks/bench_variants.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.template_engine import RenderContext
+from src.variants import compile_variants
+
+
+def _linear_select(variant_set, ctx):
+    # Sem índice: testa todas as variantes em ordem
+    for variant in variant_set.variants:
+        if variant.matches(ctx):
+            return variant
+    return None
+
+
+def main():
+    print(f"{'variantes':>10} {'linear µs':>11} {'indexado µs':>12}")
+    for count in (10, 100, 500, 2000):
+        variant_set = compile_variants([
+            {"when": {"path.id": i, "query.tipo": "a"}, "status_code_response": 200} for i in range(count)
+        ])
+        # Pior caso da varredura: a variante que casa é a última
+        ctx = RenderContext(path={"id": str(count - 1)}, query={"tipo": "a"})
+        assert _linear_select(variant_set, ctx) is variant_set.select(ctx)
+        number = 2000
+        linear = min(timeit.repeat(lambda: _linear_select(variant_set, ctx), number=number, repeat=3)) / number
+        indexed = min(timeit.repeat(lambda: variant_set.select(ctx), number=number, repeat=3)) / number
+        print(f"{count:>10} {linear * 1e6:>11.2f} {indexed * 1e6:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Suíte de micro-benchmarks em processo (sem servidor) com baseline em JSON e gate de regressão
+
+Uso:
+    python benchmarks/suite.py                          # roda tudo e imprime ns/op
+    python benchmarks/suite.py -k find_matching         # só os que contêm o texto
+    python benchmarks/suite.py --save benchmarks/baseline.json
+    python benchmarks/suite.py --compare benchmarks/baseline.json --threshold 0.25
+
+Com --compare o processo termina com código 1 se algum benchmark ficar mais de `threshold`
+(fração, 0.25 = 25%) mais lento que o baseline. O baseline depende da máquina: gere o seu
+com --save antes de usar o gate.
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import os
+import platform
+import sys
+import time
+import timeit
+from typing import Any, Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Sempre em memória: o .env pode apontar para um banco
+os.environ["USE_DATABASE"] = "false"
+os.environ.setdefault("PERSISTENCE_MODE", "sync")
+logging.disable(logging.INFO)
+
+from src import json_codec
+from src.mocks_manager import MocksManager
+from src.namespaces import DEFAULT_NAMESPACE
+from src.response_cache import CachedResponse, ResponseCache
+from src.template_engine import RenderContext, compile_template
+from src.variants import compile_variants
+
+# nome -> função de preparo que devolve (operação, quantidade de ops por chamada)
+BENCHMARKS: Dict[str, Callable[[], Tuple[Callable[[], Any], int]]] = {}
+
+
+def benchmark(name: str):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def _populated_manager(count: int, namespaces: int = 0) -> MocksManager:
+    """namespaces > 0 distribui os mocks entre namespaces time-0, time-1, ... (i % namespaces)."""
+    manager = MocksManager()
+    for i in range(count):
+        uri = f"/api/v1/recurso{i}/:id" if i % 5 == 0 else f"/api/v1/clientes/{i}/pedidos"
+        namespace = f"time-{i % namespaces}" if namespaces else DEFAULT_NAMESPACE
+        manager.create_mock(uri, ("GET", "POST")[i % 2], 200, {"id": i, "status": "ok"}, namespace=namespace)
+    return manager
+
+
+# --- Padrões de URI -------------------------------------------------------------------------
+
+@benchmark("compile_uri_pattern_static[literal]")
+def _():
+    return (lambda: MocksManager.compile_uri_pattern_static("/api/v1/clientes/123/pedidos")), 1
+
+
+@benchmark("compile_uri_pattern_static[params]")
+def _():
+    return (lambda: MocksManager.compile_uri_pattern_static("/api/v1/:tenant/clientes/:id/pedidos/:pedido")), 1
+
+
+# --- Busca de mock por rota -----------------------------------------------------------------
+
+def _find_setup(count: int, hit: bool):
+    manager = _populated_manager(count)
+    last = count - 1
+    if hit:
+        path = f"/api/v1/clientes/{last}/pedidos" if last % 5 else f"/api/v1/recurso{last}/7"
+        method = ("GET", "POST")[last % 2]
+    else:
+        path, method = "/nao/existe", "GET"
+    return (lambda: manager.find_matching_mock(path, method)), 1
+
+
+for _count in (10, 1000, 10000):
+    benchmark(f"find_matching_mock[{_count},last]")(lambda count=_count: _find_setup(count, True))
+    benchmark(f"find_matching_mock[{_count},miss]")(lambda count=_count: _find_setup(count, False))
+
+
+@benchmark("find_matching_mock[ns 10/10000,last]")
+def _():
+    # 1000 namespaces com 10 mocks cada: o custo deve ser o de find_matching_mock[10,last]
+    manager = _populated_manager(10000, namespaces=1000)
+    last = 9999
+    path = f"/api/v1/clientes/{last}/pedidos"
+    return (lambda: manager.find_matching_mock(path, "POST", namespace="time-999")), 1
+
+
+# --- Renderização da resposta ---------------------------------------------------------------
+
+_RESPONSE = {
+    "id": "{{path.id|int}}",
+    "label": "user-{{path.id}}",
+    "page": "{{query.page|int|default:1}}",
+    "items": [{"sku": f"SKU-{i}", "qty": i} for i in range(50)],
+}
+
+
+@benchmark("render[static]")
+def _():
+    template = compile_template({"items": _RESPONSE["items"]}, legacy=False)
+    return (lambda: template.render(RenderContext(path={"id": "42"}))), 1
+
+
+@benchmark("render[placeholders]")
+def _():
+    template = compile_template(_RESPONSE, legacy=False)
+    return (lambda: template.render(RenderContext(path={"id": "42"}, query={"page": "3"}))), 1
+
+
+@benchmark("render[legacy]")
+def _():
+    template = compile_template(dict(_RESPONSE, id="id"), legacy=True)
+    return (lambda: template.render(RenderContext(path={"id": "42"}, query={"page": "3"}))), 1
+
+
+@benchmark("render[variants,200]")
+def _():
+    variants = compile_variants([{"when": {"path.id": i}, "status_code_response": 404} for i in range(200)])
+    ctx = RenderContext(path={"id": "199"})
+    return (lambda: variants.select(ctx)), 1
+
+
+@benchmark("serialize[response]")
+def _():
+    payload = compile_template(_RESPONSE, legacy=False).render(RenderContext(path={"id": "42"}))
+    return (lambda: json_codec.dumps_bytes(payload)), 1
+
+
+@benchmark("serve[render+serialize]")
+def _():
+    template = compile_template(_RESPONSE, legacy=False)
+    return (lambda: json_codec.dumps_bytes(template.render(RenderContext(path={"id": "42"}, query={"page": "3"})))), 1
+
+
+@benchmark("serve[response_cache_hit]")
+def _():
+    template = compile_template(_RESPONSE, legacy=False)
+    cache = ResponseCache(enabled=True)
+    match = {'mock_id': "000001", 'template': template, 'variant_set': None, 'status_code': 200,
+             'headers': {}, 'variables': {"id": "42"}}
+    query = {"page": "3"}
+    body = json_codec.dumps_bytes(template.render(RenderContext(path={"id": "42"}, query=query)))
+    cache.put(ResponseCache.key(match, query, None), CachedResponse("000001", 200, {}, body))
+    return (lambda: cache.get(ResponseCache.key(match, query, None))), 1
+
+
+# --- Criação em massa e operações do armazenamento em memória -------------------------------
+
+@benchmark("create_mock[bulk,1000]")
+def _():
+    return (lambda: _populated_manager(1000)), 1000
+
+
+def _store_setup(operation: str):
+    manager = _populated_manager(1000)
+    mock_id = next(iter(manager.memory_mocks))
+    operations = {
+        "get_mock": lambda: manager.get_mock(mock_id),
+        "update_mock": lambda: manager.update_mock(mock_id, status_code=201, response={"id": 1}),
+        "get_all_mocks": lambda: manager.get_all_mocks(),
+        "mock_exists": lambda: manager.mock_exists(mock_id),
+    }
+    return operations[operation], 1
+
+
+for _operation in ("get_mock", "update_mock", "get_all_mocks", "mock_exists"):
+    benchmark(f"store[{_operation},1000]")(lambda operation=_operation: _store_setup(operation))
+
+
+@benchmark("activate_mock_set[1000]")
+def _():
+    # Alterna entre dois cenários de 1000 mocks (a alternativa é remover e recriar: create_mock[bulk,1000])
+    manager = _populated_manager(1000)
+    manager.save_mock_set("a")
+    manager.update_mocks(status_code=503)
+    manager.save_mock_set("b")
+    names = itertools.cycle(("a", "b"))
+    return (lambda: manager.activate_mock_set(next(names))), 1
+
+
+# --- Execução, baseline e comparação --------------------------------------------------------
+
+def measure(setup, min_time: float = 0.1, repeat: int = 7) -> Dict[str, float]:
+    """ns por operação: mínimo e mediana de `repeat` rodadas de pelo menos min_time segundos."""
+    operation, ops_per_call = setup()
+    number = 1
+    while True:
+        elapsed = timeit.timeit(operation, number=number)
+        if elapsed >= min_time or number >= 1 << 20:
+            break
+        number *= 2 if elapsed <= 0 else max(2, min(10, int(min_time / elapsed) + 1))
+    rounds = sorted(timeit.repeat(operation, number=number, repeat=repeat))
+    per_op = 1e9 / (number * ops_per_call)
+    return {'ns_per_op': round(rounds[0] * per_op, 1), 'median_ns': round(rounds[len(rounds) // 2] * per_op, 1)}
+
+
+def run(selected: List[str]) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for name in selected:
+        results[name] = measure(BENCHMARKS[name])
+        print(f"  {name:<40} {results[name]['ns_per_op']:>14,.0f} ns/op")
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            threshold: float) -> List[str]:
+    """Nomes dos benchmarks mais lentos que baseline * (1 + threshold)."""
+    regressions = []
+    print(f"\n  {'benchmark':<40} {'baseline':>12} {'atual':>12} {'variação':>9}")
+    for name, result in results.items():
+        if name not in baseline:
+            print(f"  {name:<40} {'-':>12} {result['ns_per_op']:>12,.0f}      novo")
+            continue
+        before, now = baseline[name]['ns_per_op'], result['ns_per_op']
+        change = now / before - 1
+        regressed = change > threshold
+        if regressed:
+            regressions.append(name)
+        print(f"  {name:<40} {before:>12,.0f} {now:>12,.0f} {change:>+8.0%}{'  ❌' if regressed else ''}")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Micro-benchmarks em processo")
+    parser.add_argument("-k", dest="filter", default="", help="roda só os benchmarks cujo nome contém o texto")
+    parser.add_argument("--save", help="grava os resultados como baseline neste arquivo JSON")
+    parser.add_argument("--compare", help="baseline JSON para comparar; falha se houver regressão")
+    parser.add_argument("--threshold", type=float, default=0.25, help="regressão tolerada (fração, padrão 0.25)")
+    parser.add_argument("--list", action="store_true", help="lista os benchmarks e sai")
+    args = parser.parse_args()
+
+    selected = [name for name in BENCHMARKS if args.filter in name]
+    if args.list:
+        print("\n".join(selected))
+        return 0
+
+    print(f"Rodando {len(selected)} benchmarks (JSON: {json_codec.BACKEND}, Python {platform.python_version()})")
+    results = run(selected)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({
+                'meta': {
+                    'created_at': time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    'python': platform.python_version(),
+                    'machine': platform.machine(),
+                    'json_backend': json_codec.BACKEND
+                },
+                'results': results
+            }, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nBaseline gravado em {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} benchmark(s) acima do limite de {args.threshold:.0%}: {', '.join(regressions)}")
+            return 1
+        print(f"\n✅ Nenhuma regressão acima de {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
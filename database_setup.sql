@@ -15,18 +15,53 @@ END$$;
 -- Criar a tabela de mocks
 CREATE TABLE IF NOT EXISTS qa_api (
     id VARCHAR(10) PRIMARY KEY,
+    -- Namespace (time/projeto): primeira coluna dos índices de rota
+    namespace VARCHAR(64) NOT NULL DEFAULT 'default',
     uri VARCHAR(500) NOT NULL,
     http_method VARCHAR(10) NOT NULL,
     status_code INT NOT NULL,
     response_body TEXT NOT NULL,
+    -- Corpo grande comprimido (zlib/zstd); nesse caso response_body fica vazio
+    response_compressed BYTEA,
     uri_pattern VARCHAR(500) NOT NULL,
     headers JSONB,
+    variants JSONB,
+    static_prefix VARCHAR(500) NOT NULL DEFAULT '',
+    segment_count INT,
+    expires_at TIMESTAMPTZ,
+    max_hits INT,
+    hits INT NOT NULL DEFAULT 0,
     created_at TIMESTAMPTZ DEFAULT NOW(),
     updated_at TIMESTAMPTZ DEFAULT NOW()
 );
 
--- Criar índice para melhor performance nas consultas
-CREATE INDEX IF NOT EXISTS IX_qa_api_method_uri ON qa_api(http_method, uri);
+-- Criar índice para melhor performance nas consultas (mock existente por rota, dentro do namespace)
+CREATE INDEX IF NOT EXISTS IX_qa_api_method_uri ON qa_api(namespace, http_method, uri);
+
+-- Match de rota no banco: namespace, prefixo estático da URI e nº de segmentos (NULL = regex que pode casar barras)
+CREATE INDEX IF NOT EXISTS ix_qa_api_route ON qa_api(namespace, http_method, static_prefix, segment_count);
+
+-- Mocks efêmeros (validade/limite de chamadas): índice parcial usado pela varredura de expiração
+CREATE INDEX IF NOT EXISTS ix_qa_api_ephemeral ON qa_api(expires_at) WHERE expires_at IS NOT NULL OR max_hits IS NOT NULL;
+
+-- Feed de mudanças entre instâncias (seq monotônica; op: U = upsert, D = delete, C = remoção de todos)
+CREATE TABLE IF NOT EXISTS qa_api_changes (
+    seq BIGSERIAL PRIMARY KEY,
+    mock_id VARCHAR(10),
+    op VARCHAR(1) NOT NULL,
+    origin VARCHAR(64) NOT NULL,
+    changed_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+-- Conjuntos de mocks salvos (cenários por namespace): uma linha por versão, mocks em JSONB na ordem do match
+CREATE TABLE IF NOT EXISTS qa_mock_sets (
+    namespace VARCHAR(64) NOT NULL,
+    name VARCHAR(64) NOT NULL,
+    version INT NOT NULL,
+    mocks JSONB NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (namespace, name, version)
+);
 
 -- Trigger para atualizar updated_at automaticamente
 CREATE OR REPLACE FUNCTION update_updated_at_column()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Importa coleções do Postman (v2.1) como mocks, numa única operação
+
+Converte os exemplos de resposta salvos e as requisições de configuração (/mocks/configurar/endpoint)
+de cada coleção em mocks (regras em src/postman_import.py) e grava tudo numa única transação.
+Com --dry-run mostra o diff contra os mocks existentes (novos, alterados e iguais) sem gravar.
+
+Sem --url grava direto no banco (DB_* do .env, USE_DATABASE=true); com --url envia para uma API em
+execução (POST /mocks/importar/postman), o caminho para APIs rodando só em memória.
+
+Uso:
+    python import_postman.py QA_MOCK_DINAMICO.postman_collection.json --dry-run
+    python import_postman.py colecao.json --namespace time-pagamentos
+    python import_postman.py colecao.json --url http://localhost:8090
+"""
+
+import sys
+import json
+import argparse
+import logging
+import urllib.error
+import urllib.parse
+import urllib.request
+from typing import Any, Dict, List, Optional
+
+from src.namespaces import DEFAULT_NAMESPACE
+from src.postman_import import parse_collection
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Importa uma coleção do Postman (v2.1) como mocks")
+    parser.add_argument("colecao", help="arquivo .postman_collection.json")
+    parser.add_argument("--namespace", default=DEFAULT_NAMESPACE, help="namespace dos mocks (padrão default)")
+    parser.add_argument("--dry-run", action="store_true", help="mostra o diff contra os mocks existentes sem gravar")
+    parser.add_argument("--url", help="URL de uma API em execução (ex.: http://localhost:8090) em vez do banco")
+    return parser.parse_args(argv)
+
+
+def _import_via_api(collection: Dict[str, Any], options: argparse.Namespace) -> Dict[str, Any]:
+    query = urllib.parse.urlencode({"namespace": options.namespace, "dry_run": str(options.dry_run).lower()})
+    request = urllib.request.Request(
+        f"{options.url.rstrip('/')}/mocks/importar/postman?{query}",
+        data=json.dumps(collection).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST"
+    )
+    try:
+        with urllib.request.urlopen(request) as response:
+            return json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        raise RuntimeError(f"API respondeu {e.code}: {e.read().decode('utf-8', 'replace')}")
+
+
+def _import_into_database(collection: Dict[str, Any], options: argparse.Namespace) -> Dict[str, Any]:
+    from src.mocks_manager import MocksManager
+
+    manager = MocksManager()
+    try:
+        if not manager.db_manager.is_connected():
+            raise RuntimeError("banco indisponível (configure DB_* e USE_DATABASE=true, ou use --url)")
+        plan = parse_collection(collection, options.namespace)
+        diff = manager.import_mocks(plan["mocks"], dry_run=options.dry_run)
+        if diff is None:
+            raise RuntimeError("erro do banco ao gravar os mocks (nada foi importado)")
+        return {"dry_run": options.dry_run, **diff, "ignorados": plan["ignorados"]}
+    finally:
+        manager.shutdown()
+
+
+def _report(result: Dict[str, Any]):
+    labels = (("novos", "➕", "novo"), ("alterados", "✏️ ", "alterado"), ("iguais", "=", "igual"))
+    for key, icon, label in labels:
+        for mock in result[key]:
+            campos = f"  ({', '.join(mock['campos'])})" if mock.get("campos") else ""
+            ident = f" [{mock['id']}]" if mock.get("id") else ""
+            print(f"  {icon} {label:<9}{mock['namespace']}  {mock['http_method']:<6} {mock['uri']}{ident}{campos}")
+    for item in result["ignorados"]:
+        print(f"  ⏭️  ignorado  {item['item']}: {item['motivo']}")
+    print(f"\n📊 {len(result['novos'])} novos, {len(result['alterados'])} alterados, {len(result['iguais'])} iguais, "
+          f"{len(result['ignorados'])} ignorados")
+
+
+def main(argv: Optional[List[str]] = None):
+    options = parse_args(argv)
+    print(f"📥 IMPORTAÇÃO DO POSTMAN - {options.colecao}")
+    print("=" * 40)
+    try:
+        with open(options.colecao, encoding="utf-8") as f:
+            collection = json.load(f)
+        result = _import_via_api(collection, options) if options.url else _import_into_database(collection, options)
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"\n❌ Falha na importação: {e}")
+        return 1
+    _report(result)
+    if options.dry_run:
+        print("\n🔎 Dry run: nada foi gravado")
+    else:
+        print("\n🎉 Importação concluída")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
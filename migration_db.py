@@ -2,19 +2,56 @@
 """
 Script de migração completo para QA API (PostgreSQL)
 - Cria a tabela qa_api se não existir
-- Adiciona as colunas headers, created_at, updated_at se não existirem
+- Adiciona as colunas headers, variants, created_at, updated_at se não existirem
 - Cria índice e trigger para updated_at
+- Cria a tabela qa_api_changes (feed de mudanças entre instâncias)
+- Adiciona static_prefix/segment_count (match de rota no banco), preenche e cria o índice ix_qa_api_route
+- Adiciona expires_at/max_hits/hits (mocks efêmeros) e o índice parcial ix_qa_api_ephemeral
+- Adiciona response_compressed (corpos grandes comprimidos)
+- Adiciona namespace e recria ix_qa_api_method_uri/ix_qa_api_route com o namespace como primeira coluna
+- Cria a tabela qa_mock_sets (conjuntos de mocks salvos, por versão)
+
+A migração é online (a API continua servindo enquanto ela roda):
+- cada alteração de esquema roda em uma transação curta com lock_timeout, repetida se a tabela estiver
+  ocupada (ADD COLUMN com DEFAULT constante só altera metadados no PostgreSQL 11+);
+- preenchimentos (valores nulos e colunas derivadas da uri: uri_pattern, static_prefix, segment_count)
+  andam em lotes pela chave primária, um lote por transação, com progresso. A posição de cada um fica
+  na tabela qa_api_migrations: uma migração interrompida continua de onde parou;
+- índices são criados com CREATE INDEX CONCURRENTLY; um índice cujas colunas mudaram é construído com
+  outro nome e trocado no final.
+
+Uso:
+    python migration_db.py
+    python migration_db.py --dry-run                  # estima linhas e duração sem alterar nada
+    python migration_db.py --batch-size 5000 --pause-ms 20
+    python migration_db.py --recompute-derived        # recalcula uri_pattern/static_prefix/segment_count
 """
 
 import os
 import sys
+import time
+import argparse
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from dotenv import load_dotenv
 from sqlalchemy import create_engine, text, inspect
+from sqlalchemy.exc import OperationalError
 import logging
 
+from src.mock_record import route_key, uri_regex
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# SQLSTATE do PostgreSQL quando o lock_timeout estoura
+_LOCK_NOT_AVAILABLE = "55P03"
+
+# Índices de qa_api: nome -> (colunas, predicado do índice parcial)
+INDEXES = {
+    'ix_qa_api_method_uri': (("namespace", "http_method", "uri"), None),
+    'ix_qa_api_route': (("namespace", "http_method", "static_prefix", "segment_count"), None),
+    'ix_qa_api_ephemeral': (("expires_at",), "expires_at IS NOT NULL OR max_hits IS NOT NULL"),
+}
+
 def get_connection_string():
     server = os.getenv("DB_SERVER", "localhost")
     port = os.getenv("DB_PORT", "5432")
@@ -25,75 +62,375 @@ def get_connection_string():
         raise ValueError("DB_PASSWORD não foi configurada")
     return f"postgresql+psycopg2://{username}:{password}@{server}:{port}/{database}"
 
-def migrate_all():
+def _start_backfill(name: str) -> str:
+    """Registra (ou reinicia) um preenchimento; roda na mesma transação da coluna que o exige."""
+    return (f"INSERT INTO qa_api_migrations (name) VALUES ('{name}') ON CONFLICT (name) DO UPDATE "
+            "SET last_id = '', rows_done = 0, started_at = NOW(), finished_at = NULL")
+
+def _schema_steps(conn) -> List[Tuple[str, List[str]]]:
+    """Alterações de esquema pendentes: (descrição, comandos), cada uma aplicada em uma transação curta."""
+    inspector = inspect(conn)
+    steps = []
+    if not inspector.has_table('qa_api_migrations'):
+        steps.append(("Criando tabela qa_api_migrations (progresso dos preenchimentos)", ['''
+            CREATE TABLE qa_api_migrations (
+                name VARCHAR(64) PRIMARY KEY,
+                last_id VARCHAR(10) NOT NULL DEFAULT '',
+                rows_done BIGINT NOT NULL DEFAULT 0,
+                started_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                finished_at TIMESTAMPTZ
+            )''']))
+    if inspector.has_table('qa_api'):
+        columns = {col['name'] for col in inspector.get_columns('qa_api')}
+        triggers = {row[0] for row in conn.execute(text(
+            "SELECT tgname FROM pg_trigger WHERE NOT tgisinternal AND tgrelid = 'qa_api'::regclass"))}
+    else:
+        columns, triggers = set(), set()
+        steps.append(("Criando tabela qa_api", ['''
+            CREATE TABLE qa_api (
+                id VARCHAR(10) PRIMARY KEY,
+                uri VARCHAR(500) NOT NULL,
+                http_method VARCHAR(10) NOT NULL,
+                status_code INT NOT NULL,
+                response_body TEXT NOT NULL,
+                uri_pattern VARCHAR(500) NOT NULL
+            )''']))
+    if 'headers' not in columns:
+        steps.append(("Adicionando coluna headers", ["ALTER TABLE qa_api ADD COLUMN headers JSONB DEFAULT '{}'::jsonb"]))
+    if 'variants' not in columns:
+        steps.append(("Adicionando coluna variants", ["ALTER TABLE qa_api ADD COLUMN variants JSONB"]))
+    if 'created_at' not in columns:
+        steps.append(("Adicionando coluna created_at", ["ALTER TABLE qa_api ADD COLUMN created_at TIMESTAMPTZ DEFAULT NOW()"]))
+    if 'updated_at' not in columns:
+        steps.append(("Adicionando coluna updated_at", ["ALTER TABLE qa_api ADD COLUMN updated_at TIMESTAMPTZ DEFAULT NOW()"]))
+    if 'static_prefix' not in columns:
+        steps.append(("Adicionando colunas static_prefix e segment_count (preenchidas em lotes)", [
+            "ALTER TABLE qa_api ADD COLUMN static_prefix VARCHAR(500) NOT NULL DEFAULT ''",
+            "ALTER TABLE qa_api ADD COLUMN segment_count INT",
+            _start_backfill('derivadas')
+        ]))
+    if 'expires_at' not in columns:
+        steps.append(("Adicionando colunas expires_at, max_hits e hits", [
+            "ALTER TABLE qa_api ADD COLUMN expires_at TIMESTAMPTZ",
+            "ALTER TABLE qa_api ADD COLUMN max_hits INT",
+            "ALTER TABLE qa_api ADD COLUMN hits INT NOT NULL DEFAULT 0"
+        ]))
+    if 'response_compressed' not in columns:
+        steps.append(("Adicionando coluna response_compressed", ["ALTER TABLE qa_api ADD COLUMN response_compressed BYTEA"]))
+    if 'namespace' not in columns:
+        # Os índices de rota antigos (sem namespace) são reconstruídos na etapa de índices
+        steps.append(("Adicionando coluna namespace (mocks existentes ficam no namespace default)",
+                      ["ALTER TABLE qa_api ADD COLUMN namespace VARCHAR(64) NOT NULL DEFAULT 'default'"]))
+    if not inspector.has_table('qa_api_changes'):
+        steps.append(("Criando tabela qa_api_changes", ['''
+            CREATE TABLE qa_api_changes (
+                seq BIGSERIAL PRIMARY KEY,
+                mock_id VARCHAR(10),
+                op VARCHAR(1) NOT NULL,
+                origin VARCHAR(64) NOT NULL,
+                changed_at TIMESTAMP NOT NULL DEFAULT NOW()
+            )''']))
+    if not inspector.has_table('qa_mock_sets'):
+        steps.append(("Criando tabela qa_mock_sets", ['''
+            CREATE TABLE qa_mock_sets (
+                namespace VARCHAR(64) NOT NULL,
+                name VARCHAR(64) NOT NULL,
+                version INT NOT NULL,
+                mocks JSONB NOT NULL,
+                created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                PRIMARY KEY (namespace, name, version)
+            )''']))
+    if 'trg_qa_api_updated_at' not in triggers:
+        steps.append(("Criando trigger trg_qa_api_updated_at", ['''
+            CREATE OR REPLACE FUNCTION update_updated_at_column()
+            RETURNS TRIGGER AS $$
+            BEGIN
+               NEW.updated_at = NOW();
+               RETURN NEW;
+            END;
+            $$ LANGUAGE plpgsql;
+            CREATE TRIGGER trg_qa_api_updated_at
+            BEFORE UPDATE ON qa_api
+            FOR EACH ROW
+            EXECUTE FUNCTION update_updated_at_column();
+            ''']))
+    return steps
+
+def _run_ddl(engine, description: str, statements: List[str], lock_timeout_ms: int, retries: int):
+    """Aplica uma alteração em transação curta; se não conseguir o lock a tempo, espera e tenta de novo."""
+    for attempt in range(1, retries + 1):
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(f"SET LOCAL lock_timeout = {int(lock_timeout_ms)}"))
+                for statement in statements:
+                    conn.execute(text(statement))
+            return
+        except OperationalError as e:
+            if getattr(e.orig, 'pgcode', None) != _LOCK_NOT_AVAILABLE or attempt == retries:
+                raise
+            wait = min(0.5 * 2 ** attempt, 10)
+            print(f"   ⏳ {description}: tabela ocupada (tentativa {attempt}/{retries}), nova tentativa em {wait:.0f}s...")
+            time.sleep(wait)
+
+# Preenchimentos em lotes: cada função processa as linhas com id > last_id (até batch_size) e retorna
+# (último id do lote ou None se acabou, linhas lidas, linhas alteradas)
+
+def _backfill_nulos(conn, last_id: str, batch_size: int) -> Tuple[Optional[str], int, int]:
+    upper, scanned = conn.execute(text(
+        "SELECT max(id), count(*) FROM (SELECT id FROM qa_api WHERE id > :last ORDER BY id LIMIT :n) lote"
+    ), {'last': last_id, 'n': batch_size}).one()
+    if not scanned:
+        return None, 0, 0
+    changed = conn.execute(text('''
+        UPDATE qa_api SET headers = COALESCE(headers, '{}'::jsonb),
+                          created_at = COALESCE(created_at, NOW()),
+                          updated_at = COALESCE(updated_at, NOW())
+        WHERE id > :last AND id <= :upper AND (headers IS NULL OR created_at IS NULL OR updated_at IS NULL)
+    '''), {'last': last_id, 'upper': upper}).rowcount
+    return upper, scanned, changed
+
+def _backfill_derivadas(conn, last_id: str, batch_size: int) -> Tuple[Optional[str], int, int]:
+    rows = conn.execute(text(
+        "SELECT id, uri, uri_pattern, static_prefix, segment_count FROM qa_api WHERE id > :last ORDER BY id LIMIT :n"
+    ), {'last': last_id, 'n': batch_size}).fetchall()
+    if not rows:
+        return None, 0, 0
+    # Mesmas regras usadas pela API ao gravar; só linhas com valor diferente são atualizadas
+    changes = []
+    for row in rows:
+        static_prefix, segment_count = route_key(row.uri)
+        derived = (uri_regex(row.uri), static_prefix, segment_count)
+        if derived != (row.uri_pattern, row.static_prefix, row.segment_count):
+            changes.append((row.id,) + derived)
+    if changes:
+        # Um único UPDATE por lote (arrays com os valores novos), em vez de um comando por linha
+        ids, patterns, prefixes, counts = (list(values) for values in zip(*changes))
+        conn.execute(text('''
+            UPDATE qa_api SET uri_pattern = novo.uri_pattern, static_prefix = novo.static_prefix,
+                              segment_count = novo.segment_count
+            FROM unnest(CAST(:ids AS varchar[]), CAST(:patterns AS varchar[]),
+                        CAST(:prefixes AS varchar[]), CAST(:counts AS int[])) AS novo(id, uri_pattern, static_prefix, segment_count)
+            WHERE qa_api.id = novo.id
+        '''), {'ids': ids, 'patterns': patterns, 'prefixes': prefixes, 'counts': counts})
+    return rows[-1].id, len(rows), len(changes)
+
+def _needs_nulos(conn) -> bool:
+    return conn.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM qa_api WHERE headers IS NULL OR created_at IS NULL OR updated_at IS NULL)"
+    )).scalar()
+
+# nome -> (descrição, lote, precisa rodar?); "derivadas" também é registrado ao criar static_prefix
+BACKFILLS: Dict[str, Tuple[str, Callable, Callable[[Any, argparse.Namespace], bool]]] = {
+    'nulos': ("valores nulos de headers/created_at/updated_at", _backfill_nulos,
+              lambda conn, options: _needs_nulos(conn)),
+    'derivadas': ("uri_pattern, static_prefix e segment_count a partir da uri", _backfill_derivadas,
+                  lambda conn, options: options.recompute_derived),
+}
+
+def _pending_backfills(conn, options) -> List[Tuple[str, str, int]]:
+    """(nome, last_id, linhas já feitas) dos preenchimentos a rodar: interrompidos continuam, os demais começam do zero."""
+    states = {}
+    if inspect(conn).has_table('qa_api_migrations'):
+        states = {row.name: row for row in conn.execute(text("SELECT name, last_id, rows_done, finished_at FROM qa_api_migrations"))}
+    pending = []
+    for name, (_, _, needed) in BACKFILLS.items():
+        state = states.get(name)
+        if state is not None and state.finished_at is None:
+            pending.append((name, state.last_id, state.rows_done))
+        elif needed(conn, options):
+            pending.append((name, '', 0))
+    return pending
+
+def _estimate_rows(conn) -> int:
+    """Linhas de qa_api pela estatística do planner (count(*) só se a tabela nunca foi analisada)."""
+    estimate = conn.execute(text("SELECT reltuples::bigint FROM pg_class WHERE oid = 'qa_api'::regclass")).scalar()
+    if estimate is None or estimate < 0:
+        estimate = conn.execute(text("SELECT count(*) FROM qa_api")).scalar()
+    return int(estimate)
+
+def _duration(seconds: float) -> str:
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+def _report(name: str, done: int, total: int, rate: float):
+    percent = f" ({min(done / total, 1):.0%})" if total else ""
+    remaining = f" · restante ~{_duration(max(total - done, 0) / rate)}" if rate and total > done else ""
+    print(f"   ⏳ {name}: {done:,}/~{total:,} linhas{percent} · {rate:,.0f} linhas/s{remaining}")
+
+def _run_backfill(engine, name: str, last_id: str, done: int, total: int, options):
+    description, batch, _ = BACKFILLS[name]
+    with engine.begin() as conn:
+        if not done:
+            conn.execute(text(_start_backfill(name)))
+    print(f"🔁 Preenchendo {description} em lotes de {options.batch_size}...")
+    if done:
+        print(f"   ↪️  Retomando depois do id {last_id!r} ({done:,} linhas já processadas)")
+    started = last_report = time.monotonic()
+    processed = changed_total = 0
+    while True:
+        # Lote e posição na mesma transação: interrompido, recomeça exatamente do último lote gravado
+        with engine.begin() as conn:
+            upper, scanned, changed = batch(conn, last_id, options.batch_size)
+            if upper is None:
+                conn.execute(text("UPDATE qa_api_migrations SET finished_at = NOW() WHERE name = :name"), {'name': name})
+                break
+            conn.execute(text("UPDATE qa_api_migrations SET last_id = :last, rows_done = rows_done + :n WHERE name = :name"),
+                         {'last': upper, 'n': scanned, 'name': name})
+        last_id = upper
+        processed += scanned
+        changed_total += changed
+        now = time.monotonic()
+        if now - last_report >= options.progress_every:
+            _report(name, done + processed, total, processed / (now - started))
+            last_report = now
+        if options.pause_ms:
+            time.sleep(options.pause_ms / 1000)
+    elapsed = time.monotonic() - started
+    print(f"   ✅ {name}: {processed:,} linhas lidas, {changed_total:,} alteradas em {_duration(elapsed)}")
+
+def _existing_indexes(conn) -> Dict[str, Tuple[bool, Tuple[str, ...]]]:
+    """Índices de qa_api: nome -> (válido, colunas na ordem do índice)."""
+    rows = conn.execute(text('''
+        SELECT c.relname AS name, i.indisvalid AS valid,
+               array(SELECT a.attname FROM unnest(i.indkey) WITH ORDINALITY AS k(attnum, ord)
+                     JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = k.attnum
+                     ORDER BY k.ord) AS columns
+        FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE i.indrelid = 'qa_api'::regclass
+    ''')).fetchall()
+    return {row.name: (row.valid, tuple(row.columns)) for row in rows}
+
+def _index_steps(existing: Dict[str, Tuple[bool, Tuple[str, ...]]]) -> List[Tuple[str, List[str]]]:
+    """Índices a criar ou reconstruir, sem bloquear escritas (CONCURRENTLY, fora de transação)."""
+    steps = []
+    for name, (columns, where) in INDEXES.items():
+        current = existing.get(name)
+        if current == (True, columns):
+            continue
+        create = f"CREATE INDEX CONCURRENTLY {{}} ON qa_api({', '.join(columns)})" + (f" WHERE {where}" if where else "")
+        new = name + "_new"
+        if current is None and existing.get(new) == (True, columns):
+            # Troca interrompida depois de remover o índice antigo
+            steps.append((f"Concluindo a troca do índice {name}", [f"ALTER INDEX {new} RENAME TO {name}"]))
+        elif current is None:
+            steps.append((f"Criando índice {name}", [create.format(name)]))
+        elif not current[0]:
+            # Sobra de um CREATE INDEX CONCURRENTLY interrompido
+            steps.append((f"Recriando índice inválido {name}", [f"DROP INDEX CONCURRENTLY IF EXISTS {name}", create.format(name)]))
+        else:
+            steps.append((f"Reconstruindo índice {name} com ({', '.join(columns)})", [
+                f"DROP INDEX CONCURRENTLY IF EXISTS {new}",
+                create.format(new),
+                f"DROP INDEX CONCURRENTLY {name}",
+                f"ALTER INDEX {new} RENAME TO {name}"
+            ]))
+    return steps
+
+def _dry_run(engine, options) -> bool:
+    """Mostra o que a migração faria e estima a duração dos preenchimentos por um lote de amostra.
+
+    As alterações de esquema e o lote de amostra rodam em uma única transação desfeita no final (ROLLBACK).
+    """
+    print("🔎 Simulação (--dry-run): nada será alterado")
+    with engine.connect() as conn:
+        exists = inspect(conn).has_table('qa_api')
+        rows = _estimate_rows(conn) if exists else 0
+        size = conn.execute(text("SELECT pg_size_pretty(pg_table_size('qa_api'))")).scalar() if exists else "0 bytes"
+        print(f"   Tabela qa_api: ~{rows:,} linhas, {size}")
+        indexes = _index_steps(_existing_indexes(conn)) if exists else _index_steps({})
+        steps = _schema_steps(conn)
+        conn.execute(text(f"SET LOCAL lock_timeout = {int(options.lock_timeout_ms)}"))
+        for description, statements in steps:
+            print(f"   ➕ {description}")
+            for statement in statements:
+                conn.execute(text(statement))
+
+        total, pending = 0.0, False
+        for name, last_id, done in _pending_backfills(conn, options):
+            description, batch, _ = BACKFILLS[name]
+            started = time.perf_counter()
+            _, scanned, changed = batch(conn, last_id, options.batch_size)
+            elapsed = time.perf_counter() - started
+            remaining = max(rows - done, 0)
+            # Tempo por linha da amostra, mais a pausa entre lotes
+            estimate = remaining / scanned * elapsed + remaining / options.batch_size * options.pause_ms / 1000 if scanned else 0.0
+            total += estimate
+            pending = True
+            resumed = f", retomando depois de {done:,}" if done else ""
+            print(f"   🔁 {description}: ~{remaining:,} linhas{resumed}; amostra de {scanned} linhas "
+                  f"({changed} alteradas) em {elapsed * 1000:.0f} ms → ~{_duration(estimate)}")
+        for description, _ in indexes:
+            print(f"   ➕ {description} (CONCURRENTLY: lê a tabela inteira, ~{size}, sem bloquear escritas)")
+        conn.rollback()
+    if not steps and not pending and not indexes:
+        print("✅ Nada a migrar")
+    else:
+        print(f"⏱️  Preenchimentos: ~{_duration(total)} estimados (fora a criação dos índices)")
+    return True
+
+def migrate_all(options: Optional[argparse.Namespace] = None):
+    options = options or parse_args([])
     load_dotenv()
-    print("🔄 Iniciando migração completa QA API...")
+    engine = None
     try:
         connection_string = get_connection_string()
         engine = create_engine(connection_string, echo=False)
-        inspector = inspect(engine)
-        with engine.begin() as conn:
-            # Cria tabela se não existir
-            if not inspector.has_table('qa_api'):
-                print("➕ Criando tabela qa_api...")
-                conn.execute(text('''
-                CREATE TABLE qa_api (
-                    id VARCHAR(10) PRIMARY KEY,
-                    uri VARCHAR(500) NOT NULL,
-                    http_method VARCHAR(10) NOT NULL,
-                    status_code INT NOT NULL,
-                    response_body TEXT NOT NULL,
-                    uri_pattern VARCHAR(500) NOT NULL
-                )'''))
-                print("✅ Tabela criada!")
-            # Adiciona colunas se não existirem
-            columns = [col['name'] for col in inspector.get_columns('qa_api')]
-            if 'headers' not in columns:
-                print("➕ Adicionando coluna headers...")
-                conn.execute(text("ALTER TABLE qa_api ADD COLUMN headers JSONB DEFAULT '{}'::jsonb"))
-            if 'created_at' not in columns:
-                print("➕ Adicionando coluna created_at...")
-                conn.execute(text("ALTER TABLE qa_api ADD COLUMN created_at TIMESTAMPTZ DEFAULT NOW()"))
-            if 'updated_at' not in columns:
-                print("➕ Adicionando coluna updated_at...")
-                conn.execute(text("ALTER TABLE qa_api ADD COLUMN updated_at TIMESTAMPTZ DEFAULT NOW()"))
-            # Atualiza valores nulos
-            conn.execute(text("UPDATE qa_api SET headers = '{}'::jsonb WHERE headers IS NULL"))
-            conn.execute(text("UPDATE qa_api SET created_at = NOW() WHERE created_at IS NULL"))
-            conn.execute(text("UPDATE qa_api SET updated_at = NOW() WHERE updated_at IS NULL"))
-            # Cria índice
-            idx = [i['name'] for i in inspector.get_indexes('qa_api')]
-            if 'ix_qa_api_method_uri' not in idx:
-                print("➕ Criando índice ix_qa_api_method_uri...")
-                conn.execute(text("CREATE INDEX ix_qa_api_method_uri ON qa_api(http_method, uri)"))
-            # Cria trigger para updated_at
-            triggers = conn.execute(text("SELECT tgname FROM pg_trigger WHERE NOT tgisinternal AND tgrelid = 'qa_api'::regclass")).fetchall()
-            if not any('trg_qa_api_updated_at' in t[0] for t in triggers):
-                print("➕ Criando trigger trg_qa_api_updated_at...")
-                conn.execute(text('''
-                CREATE OR REPLACE FUNCTION update_updated_at_column()
-                RETURNS TRIGGER AS $$
-                BEGIN
-                   NEW.updated_at = NOW();
-                   RETURN NEW;
-                END;
-                $$ LANGUAGE plpgsql;
-                CREATE TRIGGER trg_qa_api_updated_at
-                BEFORE UPDATE ON qa_api
-                FOR EACH ROW
-                EXECUTE FUNCTION update_updated_at_column();
-                '''))
+        if options.dry_run:
+            return _dry_run(engine, options)
+
+        print("🔄 Iniciando migração completa QA API...")
+        with engine.connect() as conn:
+            steps = _schema_steps(conn)
+        for description, statements in steps:
+            print(f"➕ {description}...")
+            _run_ddl(engine, description, statements, options.lock_timeout_ms, options.retries)
+
+        with engine.connect() as conn:
+            pending = _pending_backfills(conn, options)
+            total = _estimate_rows(conn) if pending else 0
+        for name, last_id, done in pending:
+            _run_backfill(engine, name, last_id, done, total, options)
+
+        # CREATE/DROP INDEX CONCURRENTLY não podem rodar dentro de uma transação
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            for description, statements in _index_steps(_existing_indexes(conn)):
+                print(f"➕ {description} (CONCURRENTLY)...")
+                for statement in statements:
+                    conn.execute(text(statement))
         print("✅ Migração completa!")
         return True
     except Exception as e:
         print(f"❌ Erro durante a migração: {e}")
         return False
+    finally:
+        if engine is not None:
+            engine.dispose()
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Migração online do banco da QA API (PostgreSQL)")
+    parser.add_argument("--dry-run", action="store_true", help="estima linhas e duração sem alterar nada")
+    parser.add_argument("--batch-size", type=int, default=int(os.getenv("MIGRATION_BATCH_SIZE", "1000")),
+                        help="linhas por lote dos preenchimentos (padrão 1000)")
+    parser.add_argument("--pause-ms", type=int, default=int(os.getenv("MIGRATION_PAUSE_MS", "0")),
+                        help="pausa entre lotes, para aliviar o banco (padrão 0)")
+    parser.add_argument("--lock-timeout-ms", type=int, default=int(os.getenv("MIGRATION_LOCK_TIMEOUT_MS", "3000")),
+                        help="espera máxima por lock em cada alteração de esquema (padrão 3000)")
+    parser.add_argument("--retries", type=int, default=5, help="tentativas por alteração de esquema (padrão 5)")
+    parser.add_argument("--progress-every", type=float, default=5.0, help="segundos entre relatórios de progresso")
+    parser.add_argument("--recompute-derived", action="store_true",
+                        help="recalcula uri_pattern, static_prefix e segment_count de todos os mocks")
+    return parser.parse_args(argv)
 
 def main():
+    options = parse_args()
     print("🗃️  MIGRAÇÃO COMPLETA - QA API (PostgreSQL)")
     print("=" * 40)
     try:
-        success = migrate_all()
+        success = migrate_all(options)
         if success:
             print("\n🎉 Migração concluída com sucesso!")
             return 0
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Controle de admissão por cliente: limite de requisições simultâneas, token bucket e fila de espera limitada
+"""
+
+import os
+import math
+import time
+import heapq
+import asyncio
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+from src import json_codec
+
+logger = logging.getLogger(__name__)
+
+# Rotas administrativas não passam pelo controle (só o tráfego dos mocks): sob sobrecarga ainda dá para
+# gerenciar mocks, namespaces e conjuntos (as mesmas rotas que a importação do Postman não aceita como mock)
+DEFAULT_EXEMPT_PREFIXES = "/mocks,/namespaces,/conjuntos,/status,/docs,/redoc,/openapi.json"
+
+
+class _ClientState:
+    __slots__ = ("tokens", "updated", "inflight", "waiting", "semaphore", "admitted", "shed_429", "shed_503")
+
+    def __init__(self, burst: float, max_inflight: int):
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.inflight = 0
+        self.waiting = 0
+        self.semaphore = asyncio.Semaphore(max_inflight) if max_inflight > 0 else None
+        self.admitted = 0
+        self.shed_429 = 0
+        self.shed_503 = 0
+
+
+class AdmissionController:
+    """Decide, por cliente, se a requisição entra, espera na fila ou é rejeitada (429/503)."""
+
+    def __init__(self, enabled: bool = False, max_inflight: int = 0, rate: float = 0.0, burst: float = 0.0,
+                 queue_size: int = 0, queue_timeout: float = 1.0, client_header: Optional[str] = None,
+                 exempt_prefixes: str = DEFAULT_EXEMPT_PREFIXES, max_clients: int = 10000):
+        self.enabled = enabled
+        self.max_inflight = max_inflight
+        self.rate = rate
+        self.burst = burst or max(rate, 1.0)
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.client_header = client_header.lower().encode("latin-1") if client_header else None
+        self.exempt_prefixes = tuple(p.strip() for p in exempt_prefixes.split(",") if p.strip())
+        self.max_clients = max_clients
+        self._clients: Dict[str, _ClientState] = {}
+
+    @classmethod
+    def from_env(cls) -> "AdmissionController":
+        return cls(
+            enabled=os.getenv("ADMISSION_ENABLED", "false").lower() == "true",
+            max_inflight=int(os.getenv("ADMISSION_MAX_INFLIGHT", "0")),
+            rate=float(os.getenv("ADMISSION_RATE", "0")),
+            burst=float(os.getenv("ADMISSION_BURST", "0")),
+            queue_size=int(os.getenv("ADMISSION_QUEUE_SIZE", "0")),
+            queue_timeout=float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "1.0")),
+            client_header=os.getenv("ADMISSION_CLIENT_HEADER") or None,
+            exempt_prefixes=os.getenv("ADMISSION_EXEMPT_PATHS", DEFAULT_EXEMPT_PREFIXES),
+            max_clients=int(os.getenv("ADMISSION_MAX_CLIENTS", "10000"))
+        )
+
+    def is_exempt(self, path: str) -> bool:
+        return any(path == p or path.startswith(p + "/") for p in self.exempt_prefixes)
+
+    def client_key(self, scope: Dict[str, Any]) -> str:
+        """Cliente identificado pelo header configurado ou, na falta dele, pelo IP."""
+        if self.client_header:
+            for name, value in scope.get("headers", ()):
+                if name == self.client_header:
+                    return value.decode("latin-1")
+        client = scope.get("client")
+        return client[0] if client else "desconhecido"
+
+    def _state(self, key: str) -> _ClientState:
+        state = self._clients.get(key)
+        if state is None:
+            if len(self._clients) >= self.max_clients:
+                self._prune()
+            state = self._clients[key] = _ClientState(self.burst, self.max_inflight)
+        return state
+
+    def _prune(self):
+        """Remove clientes ociosos para limitar a memória usada pelo controle.
+
+        Só saem clientes cujo bucket já teria voltado ao burst: recriá-los depois dá o mesmo resultado,
+        então um cliente limitado não escapa do 429 por causa da poda. Se todos os ociosos ainda estão
+        limitados, saem os atualizados há mais tempo (até 10% do limite).
+        """
+        now = time.monotonic()
+        idle = [(s.updated, k) for k, s in self._clients.items() if s.inflight == 0 and s.waiting == 0]
+        refilled = [k for updated, k in idle
+                    if self.rate <= 0 or self._clients[k].tokens + (now - updated) * self.rate >= self.burst]
+        if not refilled:
+            refilled = [k for _, k in heapq.nsmallest(max(1, self.max_clients // 10), idle)]
+        for key in refilled:
+            del self._clients[key]
+
+    async def admit(self, key: str) -> Optional[Tuple[int, float]]:
+        """None se admitido (o chamador deve chamar release); senão (status HTTP, Retry-After em segundos)."""
+        state = self._state(key)
+
+        if self.rate > 0:
+            now = time.monotonic()
+            state.tokens = min(self.burst, state.tokens + (now - state.updated) * self.rate)
+            state.updated = now
+            if state.tokens < 1.0:
+                state.shed_429 += 1
+                return 429, (1.0 - state.tokens) / self.rate
+            state.tokens -= 1.0
+
+        semaphore = state.semaphore
+        if semaphore is not None:
+            if semaphore.locked():
+                if state.waiting >= self.queue_size:
+                    state.shed_503 += 1
+                    return 503, self.queue_timeout
+                state.waiting += 1
+                try:
+                    await asyncio.wait_for(semaphore.acquire(), timeout=self.queue_timeout)
+                except asyncio.TimeoutError:
+                    state.shed_503 += 1
+                    return 503, self.queue_timeout
+                finally:
+                    state.waiting -= 1
+            else:
+                await semaphore.acquire()
+
+        state.inflight += 1
+        state.admitted += 1
+        return None
+
+    def release(self, key: str):
+        state = self._clients.get(key)
+        if state is None:
+            return
+        state.inflight -= 1
+        if state.semaphore is not None:
+            state.semaphore.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Requisições em andamento e rejeitadas por cliente."""
+        clients = {
+            key: {
+                'inflight': s.inflight,
+                'waiting': s.waiting,
+                'admitted': s.admitted,
+                'shed_429': s.shed_429,
+                'shed_503': s.shed_503
+            }
+            for key, s in self._clients.items()
+        }
+        return {
+            'enabled': self.enabled,
+            'max_inflight': self.max_inflight,
+            'rate': self.rate,
+            'burst': self.burst,
+            'queue_size': self.queue_size,
+            'inflight_total': sum(c['inflight'] for c in clients.values()),
+            'shed_total': sum(c['shed_429'] + c['shed_503'] for c in clients.values()),
+            'clients': clients
+        }
+
+
+class AdmissionMiddleware:
+    """Middleware ASGI que aplica o AdmissionController antes de qualquer processamento da requisição."""
+
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.controller.is_exempt(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        key = self.controller.client_key(scope)
+        rejected = await self.controller.admit(key)
+        if rejected is not None:
+            status, retry_after = rejected
+            await self._reject(send, key, status, retry_after)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(key)
+
+    @staticmethod
+    async def _reject(send, key: str, status: int, retry_after: float):
+        reason = "Limite de taxa excedido" if status == 429 else "Servidor saturado para este cliente"
+        body = json_codec.dumps_bytes({"erro": f"{reason} ({key})"})
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Compressão dos corpos de resposta grandes, em memória e no banco
+
+Corpos cujo JSON serializado tem pelo menos BODY_COMPRESSION_MIN_BYTES ficam guardados comprimidos:
+- no banco, na coluna response_compressed (BYTEA) em vez de response_body, então listar e carregar
+  mocks trafega bem menos bytes;
+- em memória, se o corpo não tem placeholders nem arrays gerados, o template compilado é trocado
+  por um CompressedTemplate, que só descomprime ao servir e entrega o JSON já serializado.
+
+Com TEMPLATE_LEGACY_VARS toda string do corpo pode ser substituída por uma variável de mesmo nome.
+Ao servir, o CompressedTemplate procura no JSON serializado as variáveis da requisição como valor
+string ("id" seguido de , ] ou }; uma chave de objeto é sempre seguida de :). Só se alguma aparecer o
+corpo é desserializado e renderizado pelo template legado.
+
+zlib (stdlib) por padrão; BODY_COMPRESSION=zstd usa o pacote zstandard se estiver instalado.
+O formato é identificado pelos bytes iniciais, então dados gravados com um codec continuam legíveis
+depois de trocar o outro.
+"""
+
+import os
+import re
+import zlib
+import logging
+from typing import Any, Dict, Optional
+
+from src import json_codec
+from src.template_engine import RenderContext, compile_template
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - depende do ambiente
+    zstandard = None
+
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+# BODY_COMPRESSION: "zlib", "zstd" ou "off"
+CODEC = os.getenv("BODY_COMPRESSION", "zlib").lower()
+if CODEC == "zstd" and zstandard is None:
+    logger.warning("⚠️  BODY_COMPRESSION=zstd mas zstandard não está instalado - usando zlib")
+    CODEC = "zlib"
+MIN_BYTES = int(os.getenv("BODY_COMPRESSION_MIN_BYTES", "65536"))
+LEVEL = int(os.getenv("BODY_COMPRESSION_LEVEL", "6"))
+
+
+def compress(data: bytes) -> Optional[bytes]:
+    """Corpo comprimido, ou None se está abaixo do limite, a compressão está desligada ou não compensa."""
+    if CODEC == "off" or len(data) < MIN_BYTES:
+        return None
+    if CODEC == "zstd":
+        compressed = zstandard.ZstdCompressor(level=LEVEL).compress(data)
+    else:
+        compressed = zlib.compress(data, LEVEL)
+    return compressed if len(compressed) < len(data) else None
+
+
+def decompress(data: bytes) -> bytes:
+    if data[:4] == _ZSTD_MAGIC:
+        if zstandard is None:
+            raise RuntimeError("Corpo comprimido com zstd, mas o pacote zstandard não está instalado")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+def _legacy_hit(data: bytes, variables: Dict[str, Any]) -> bool:
+    """True se alguma variável aparece como valor string no JSON (e seria substituída pelo modo legado)."""
+    return any(re.search(re.escape(json_codec.dumps_bytes(name)) + rb"(?=[,\]}]|$)", data) for name in variables)
+
+
+class CompressedTemplate:
+    """Corpo grande guardado comprimido, no lugar do CompiledTemplate; render devolve o JSON já serializado."""
+
+    __slots__ = ("data", "uses_legacy", "dynamic", "sources")
+
+    streaming = False
+    stream = None
+    sequence = None
+    pipe = None
+
+    def __init__(self, data: bytes, legacy: Any = None):
+        self.data = data
+        # legacy: template original, quando só as variáveis legadas o tornam dinâmico
+        self.uses_legacy = self.dynamic = legacy is not None
+        self.sources = legacy.sources if legacy is not None else frozenset()
+
+    @property
+    def source(self) -> Any:
+        """A resposta como objeto (descomprime e desserializa a cada leitura; usado só pela API de consulta)."""
+        return json_codec.loads(decompress(self.data))
+
+    def render(self, ctx: RenderContext) -> Any:
+        data = decompress(self.data)
+        if self.uses_legacy and ctx.legacy and _legacy_hit(data, ctx.legacy):
+            return compile_template(json_codec.loads(data), legacy=True).render(ctx)
+        return json_codec.RawJSON(data)
+
+
+def compact_template(template: Any, compressed: Optional[bytes] = None) -> Any:
+    """Troca um template grande sem placeholders por CompressedTemplate (compressed: já comprimido, ex.: lido do banco)."""
+    if template.streaming or isinstance(template, CompressedTemplate):
+        return template
+    if template.dynamic and not template.uses_legacy:
+        return template
+    if compressed is None:
+        compressed = compress(json_codec.dumps_bytes(template.source))
+        if compressed is None:
+            return template
+    if not template.dynamic:
+        return CompressedTemplate(compressed)
+    # Dinâmico: só vale comprimir se a única coisa dinâmica são as variáveis legadas (sem placeholders)
+    if compile_template(template.source, legacy=False).dynamic:
+        return template
+    return CompressedTemplate(compressed, legacy=template)
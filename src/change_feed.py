@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Feed de mudanças entre instâncias: LISTEN/NOTIFY do PostgreSQL com polling como fallback
+
+Cada mutação grava (seq, mock_id, op, origin) na tabela qa_api_changes na mesma transação
+e faz NOTIFY. Cada instância acompanha a seq e repassa só as mudanças das outras instâncias
+para `apply`, que atualiza os caches locais de forma incremental.
+"""
+
+import os
+import time
+import select
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (seq, mock_id, op) com op U = upsert, D = delete, C = remoção de todos (mock_id None)
+Change = Tuple[int, Optional[str], str]
+
+
+class ChangeFeed:
+    """Thread que acompanha qa_api_changes e aplica as mudanças feitas por outras instâncias.
+
+    A seq avança só de forma contígua: uma seq que falta (transação ainda não confirmada)
+    segura o avanço por até `gap_timeout` segundos; depois disso é considerada abortada.
+    """
+
+    def __init__(self, db_manager, apply: Callable[[List[Change]], None], poll_interval: float = 1.0,
+                 use_listen: bool = True, gap_timeout: float = 5.0, retention: float = 3600.0,
+                 batch_size: int = 5000):
+        self.db_manager = db_manager
+        self.apply = apply
+        self.poll_interval = poll_interval
+        self.use_listen = use_listen
+        self.gap_timeout = gap_timeout
+        self.retention = retention
+        self.batch_size = batch_size
+
+        self.last_seq = 0
+        self._seen: Set[int] = set()
+        self._gap_since: Optional[float] = None
+        self._listen_conn = None
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_prune = 0.0
+
+        self.applied_total = 0
+        self.last_applied_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    @classmethod
+    def from_env(cls, db_manager, apply: Callable[[List[Change]], None]) -> "ChangeFeed":
+        return cls(
+            db_manager,
+            apply,
+            poll_interval=float(os.getenv("CHANGE_FEED_POLL_INTERVAL", "1.0")),
+            use_listen=os.getenv("CHANGE_FEED_LISTEN", "true").lower() == "true",
+            gap_timeout=float(os.getenv("CHANGE_FEED_GAP_TIMEOUT", "5.0")),
+            retention=float(os.getenv("CHANGE_FEED_RETENTION", "3600"))
+        )
+
+    @property
+    def mode(self) -> str:
+        return "listen" if self._listen_conn is not None else "poll"
+
+    def start(self, after_seq: int):
+        """Começa a acompanhar o feed a partir de after_seq (exclusive)."""
+        if self._thread and self._thread.is_alive():
+            return
+        self.last_seq = after_seq
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="change-feed", daemon=True)
+        self._thread.start()
+        logger.info(f"Feed de mudanças ativo a partir da seq {after_seq} (instância {self.db_manager.instance_id})")
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=self.poll_interval * 2 + 1)
+            self._thread = None
+        self._close_listen()
+
+    def poll(self) -> int:
+        """Lê as mudanças novas e aplica as de outras instâncias. Retorna quantas foram aplicadas."""
+        rows = self.db_manager.get_changes(self.last_seq, self.batch_size)
+        if rows is None:
+            self.last_error = "Falha ao ler o feed de mudanças"
+            return 0
+        fresh = [row for row in rows if row.seq not in self._seen]
+        remote = [(row.seq, row.mock_id, row.op) for row in fresh if row.origin != self.db_manager.instance_id]
+        if remote:
+            try:
+                self.apply(remote)
+            except Exception as e:
+                # Não avança a seq: as mesmas mudanças são tentadas de novo no próximo ciclo
+                self.last_error = str(e)
+                logger.error(f"Erro ao aplicar {len(remote)} mudanças do feed: {e}")
+                return 0
+            self.applied_total += len(remote)
+            self.last_applied_at = time.time()
+        self.last_error = None
+        self._seen.update(row.seq for row in fresh)
+        self._advance()
+        return len(remote)
+
+    def _advance(self):
+        while self.last_seq + 1 in self._seen:
+            self.last_seq += 1
+            self._seen.discard(self.last_seq)
+        if not self._seen:
+            self._gap_since = None
+            return
+        now = time.monotonic()
+        if self._gap_since is None:
+            self._gap_since = now
+        elif now - self._gap_since >= self.gap_timeout:
+            logger.warning(f"⚠️  Feed de mudanças: seq {self.last_seq + 1} não apareceu em {self.gap_timeout}s - ignorando")
+            self.last_seq = min(self._seen) - 1
+            self._gap_since = None
+            self._advance()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            if not self.db_manager.connected:
+                # Banco fora: a reconexão recarrega o estado; aqui só aguardamos
+                self._close_listen()
+                self._stop_event.wait(self.poll_interval)
+                continue
+            if self._wait_for_changes():
+                self.poll()
+            if time.monotonic() - self._last_prune > 60:
+                self._last_prune = time.monotonic()
+                self.db_manager.prune_changes(self.retention)
+
+    def _wait_for_changes(self) -> bool:
+        """Espera NOTIFY de outra instância ou o intervalo de polling. False se a thread deve parar."""
+        if self.use_listen and self._listen_conn is None:
+            try:
+                self._listen_conn = self.db_manager.open_listen_connection()
+            except Exception as e:
+                logger.warning(f"⚠️  LISTEN indisponível, usando polling a cada {self.poll_interval}s: {e}")
+                self.use_listen = False
+        if self._listen_conn is None:
+            return not self._stop_event.wait(self.poll_interval)
+
+        deadline = time.monotonic() + self.poll_interval
+        while not self._stop_event.is_set():
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                return True
+            try:
+                readable, _, _ = select.select([self._listen_conn], [], [], min(timeout, 0.5))
+                if not readable:
+                    continue
+                self._listen_conn.poll()
+                notifies = list(self._listen_conn.notifies)
+                del self._listen_conn.notifies[:]
+            except Exception as e:
+                logger.warning(f"⚠️  Conexão do LISTEN caiu: {e}")
+                self._close_listen()
+                return True
+            # NOTIFY só desta instância não antecipa o polling
+            if any(n.payload != self.db_manager.instance_id for n in notifies):
+                return True
+        return False
+
+    def _close_listen(self):
+        if self._listen_conn is not None:
+            try:
+                self._listen_conn.close()
+            except Exception:
+                pass
+            self._listen_conn = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'mode': self.mode,
+            'instance_id': self.db_manager.instance_id,
+            'last_seq': self.last_seq,
+            'waiting_gaps': len(self._seen),
+            'applied_total': self.applied_total,
+            'last_applied_at': self.last_applied_at,
+            'last_error': self.last_error
+        }
@@ -4,14 +4,21 @@ Database Manager com suporte a headers customizados
 """
 
 import os
-import json
+import time
+import random
 import logging
-from typing import Dict, Any, List, Optional
-from sqlalchemy import create_engine, Column, String, Integer, Text, MetaData, Table, text
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Callable, Dict, Any, List, Optional, Tuple
+from sqlalchemy import create_engine, event, Column, String, Integer, BigInteger, DateTime, Text, LargeBinary, MetaData, Table, Index, text, or_, select, bindparam, func, any_, tuple_
 from sqlalchemy.engine import Engine
 from sqlalchemy.exc import SQLAlchemyError, OperationalError
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, insert as pg_insert
 from dotenv import load_dotenv
+from src import body_compression, json_codec
+from src.mock_record import path_prefixes, route_key
+from src.namespaces import DEFAULT_NAMESPACE
 
 # Carrega variáveis de ambiente
 load_dotenv()
@@ -19,6 +26,55 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+_MOCK_COLUMNS = ("id, namespace, uri, http_method, status_code, response_body, response_compressed, uri_pattern, headers, "
+                 "variants, expires_at, max_hits, hits")
+
+# uri_pattern usa grupos nomeados do Python (?P<nome>...); o regex do PostgreSQL só aceita grupos simples
+_PG_URI_PATTERN = r"'^' || regexp_replace(uri_pattern, '\(\?P<\w+>', '(', 'g') || '$'"
+
+# Consultas quentes: nome -> (SQL do PREPARE, parâmetros na ordem de $1, $2, ...)
+PREPARED_STATEMENTS = {
+    'qa_mock_by_id': (f"SELECT {_MOCK_COLUMNS} FROM qa_api WHERE id = $1", ('mock_id',)),
+    'qa_mock_exists': ("SELECT 1 FROM qa_api WHERE id = $1", ('mock_id',)),
+    'qa_mock_by_route': (f"SELECT {_MOCK_COLUMNS} FROM qa_api WHERE namespace = $1 AND http_method = $2 AND uri = $3",
+                         ('namespace', 'http_method', 'uri')),
+    # Match de rota no banco: o índice ix_qa_api_route (namespace primeiro) reduz aos candidatos e o regex roda só neles
+    'qa_mock_match': (f"SELECT {_MOCK_COLUMNS} FROM qa_api WHERE namespace = $1 AND http_method = $2 "
+                      f"AND static_prefix = ANY($3) AND (segment_count = $4 OR segment_count IS NULL) "
+                      f"AND $5 ~ ({_PG_URI_PATTERN}) "
+                      f"AND (expires_at IS NULL OR expires_at > now()) AND (max_hits IS NULL OR hits < max_hits) "
+                      f"ORDER BY length(static_prefix) DESC, segment_count IS NULL, id LIMIT 1",
+                      ('namespace', 'http_method', 'prefixes', 'segments', 'path')),
+    # Contador de chamadas dos mocks $sequence: incremento atômico, compartilhado entre workers e instâncias
+    'qa_mock_next_call': ("UPDATE qa_api SET hits = hits + 1 WHERE id = $1 RETURNING hits", ('mock_id',)),
+}
+# SQL de execução já montado (formato de parâmetros do psycopg2), sem passar pelo compilador do SQLAlchemy
+_EXECUTE_SQL = {
+    name: f"EXECUTE {name}({', '.join(f'%({param})s' for param in params)})"
+    for name, (_, params) in PREPARED_STATEMENTS.items()
+}
+
+# Canal do LISTEN/NOTIFY do feed de mudanças entre instâncias
+CHANGE_CHANNEL = "qa_api_changes"
+
+
+class _MockRow(dict):
+    """Mock lido do banco: 'response' só é desserializada (e descomprimida) quando lida."""
+
+    def __missing__(self, key: str) -> Any:
+        if key != 'response' or 'response_body' not in self:
+            raise KeyError(key)
+        compressed = self['response_compressed']
+        response = json_codec.loads(body_compression.decompress(compressed) if compressed is not None
+                                    else self['response_body'])
+        self['response'] = response
+        return response
+
+
+def _to_datetime(epoch: Optional[float]) -> Optional[datetime]:
+    return datetime.fromtimestamp(epoch, timezone.utc) if epoch else None
+
+
 class DatabaseManager:
     def __init__(self):
         self.engine: Optional[Engine] = None
@@ -28,6 +84,39 @@ class DatabaseManager:
         self.fallback_to_memory = os.getenv("FALLBACK_TO_MEMORY", "true").lower() == "true"
         self.connected = False
         
+        # Pool de conexões e consultas preparadas
+        self.pool_size = int(os.getenv("DB_POOL_SIZE", "5"))
+        self.max_overflow = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+        self.pool_timeout = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+        self.pool_recycle = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+        self.pool_pre_ping = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+        self.statement_timeout_ms = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+        self.use_prepared_statements = os.getenv("DB_PREPARED_STATEMENTS", "true").lower() == "true"
+        # sql: match de rota no PostgreSQL (prefixo estático indexado + regex); scan: lê todos e casa no Python
+        self.route_matching = os.getenv("DB_ROUTE_MATCHING", "sql").lower()
+        # Com pre-ping o pool já valida cada conexão; o SELECT 1 explícito fica limitado a este intervalo
+        self.healthcheck_interval = float(os.getenv("DB_HEALTHCHECK_INTERVAL", "5" if self.pool_pre_ping else "0"))
+        self._last_healthcheck = 0.0
+        self._hot_statements: Dict[str, Any] = {}
+        
+        # Reconexão em segundo plano após fallback para memória
+        self.reconnect_enabled = os.getenv("DB_RECONNECT_ENABLED", "true").lower() == "true"
+        self.reconnect_initial_delay = float(os.getenv("DB_RECONNECT_INITIAL_DELAY", "1.0"))
+        self.reconnect_max_delay = float(os.getenv("DB_RECONNECT_MAX_DELAY", "60.0"))
+        # Chamado pela thread de reconexão; deve chamar mark_connected() quando puder trocar de modo
+        self.reconnect_handler: Optional[Callable[[], bool]] = None
+        self.reconnect_attempts = 0
+        self.reconnect_last_error: Optional[str] = None
+        self._reconnect_thread: Optional[threading.Thread] = None
+        self._reconnect_stop = threading.Event()
+        
+        # Feed de mudanças: cada mutação grava (seq, mock_id, op) em qa_api_changes e faz NOTIFY
+        self.change_feed_enabled = os.getenv("CHANGE_FEED_ENABLED", "true").lower() == "true"
+        self.instance_id = os.getenv("INSTANCE_ID") or uuid.uuid4().hex[:12]
+        self.changes_table = None
+        # Conjuntos de mocks salvos (mock_sets.py): uma linha por versão, com os mocks em JSONB
+        self.mock_sets_table = None
+        
         if self.use_database:
             self._setup_database()
     
@@ -45,76 +134,246 @@ class DatabaseManager:
     def _setup_database(self):
         """Configura a conexão com o banco de dados."""
         try:
-            connection_string = self._get_connection_string()
-            self.engine = create_engine(connection_string, echo=False)
+            self._connect()
+            self.connected = True
             
+        except Exception as e:
+            logger.error(f"Erro ao conectar com banco de dados: {e}")
+            if self.fallback_to_memory:
+                logger.warning("⚠️  FALLBACK ATIVADO: Usando armazenamento em memória devido à falha na conexão com o banco")
+                self.connected = False
+                self.start_reconnect()
+            else:
+                raise
+    
+    def _connect(self):
+        """Cria engine e tabela (se necessário) e testa a conexão. Lança exceção em caso de falha."""
+        if self.engine is None:
+            connection_string = self._get_connection_string()
+            connect_args = {}
+            if self.statement_timeout_ms > 0:
+                connect_args['options'] = f"-c statement_timeout={self.statement_timeout_ms}"
+            self.engine = create_engine(
+                connection_string,
+                echo=False,
+                pool_size=self.pool_size,
+                max_overflow=self.max_overflow,
+                pool_timeout=self.pool_timeout,
+                pool_recycle=self.pool_recycle,
+                pool_pre_ping=self.pool_pre_ping,
+                connect_args=connect_args
+            )
+            event.listen(self.engine, "handle_error", self._handle_engine_error)
+        
+        if self.mocks_table is None:
             # Define a tabela de mocks
             self.mocks_table = Table(
                 'qa_api',
                 self.metadata,
                 Column('id', String(10), primary_key=True),
+                # Namespace (namespaces.py): primeira coluna dos índices de rota, então cada consulta só lê o do namespace
+                Column('namespace', String(64), nullable=False, server_default=DEFAULT_NAMESPACE),
                 Column('uri', String(500), nullable=False),
                 Column('http_method', String(10), nullable=False),
                 Column('status_code', Integer, nullable=False),
                 Column('response_body', Text, nullable=False),
+                # Corpo grande comprimido (body_compression); response_body fica vazio
+                Column('response_compressed', LargeBinary, nullable=True),
                 Column('uri_pattern', String(500), nullable=False),
-                Column('headers', JSONB, nullable=True, default={})
+                Column('headers', JSONB, nullable=True, default={}),
+                Column('variants', JSONB, nullable=True),
+                # Pré-filtro do match de rota (ver mock_record.route_key); segment_count NULL = qualquer
+                Column('static_prefix', String(500), nullable=False, server_default=''),
+                Column('segment_count', Integer, nullable=True),
+                # Mocks efêmeros: validade e limite de chamadas (NULL = sem limite)
+                Column('expires_at', DateTime(timezone=True), nullable=True),
+                Column('max_hits', Integer, nullable=True),
+                Column('hits', Integer, nullable=False, server_default='0'),
+                Index('ix_qa_api_method_uri', 'namespace', 'http_method', 'uri'),
+                Index('ix_qa_api_route', 'namespace', 'http_method', 'static_prefix', 'segment_count'),
+                # Parcial: só os mocks efêmeros, que é o que a varredura de expiração lê
+                Index('ix_qa_api_ephemeral', 'expires_at',
+                      postgresql_where=text("expires_at IS NOT NULL OR max_hits IS NOT NULL"))
+            )
+            # Mesmos objetos de statement reutilizados: o SQLAlchemy compila cada um uma única vez
+            table = self.mocks_table
+            self._hot_statements = {
+                'qa_mock_by_id': select(table).where(table.c.id == bindparam('mock_id')),
+                'qa_mock_exists': select(table.c.id).where(table.c.id == bindparam('mock_id')),
+                'qa_mock_by_route': select(table).where(
+                    table.c.namespace == bindparam('namespace'), table.c.http_method == bindparam('http_method'),
+                    table.c.uri == bindparam('uri')
+                ),
+                'qa_mock_match': select(table).where(
+                    table.c.namespace == bindparam('namespace'),
+                    table.c.http_method == bindparam('http_method'),
+                    table.c.static_prefix == any_(bindparam('prefixes', type_=ARRAY(String))),
+                    or_(table.c.segment_count == bindparam('segments'), table.c.segment_count.is_(None)),
+                    bindparam('path', type_=String).op('~')(
+                        func.concat('^', func.regexp_replace(table.c.uri_pattern, r'\(\?P<\w+>', '(', 'g'), '$')
+                    ),
+                    or_(table.c.expires_at.is_(None), table.c.expires_at > func.now()),
+                    or_(table.c.max_hits.is_(None), table.c.hits < table.c.max_hits)
+                ).order_by(
+                    func.length(table.c.static_prefix).desc(), table.c.segment_count.is_(None), table.c.id
+                ).limit(1),
+                'qa_mock_next_call': table.update().where(table.c.id == bindparam('mock_id')).values(
+                    hits=table.c.hits + 1
+                ).returning(table.c.hits),
+            }
+            # Log de mutações (seq monotônica); op: U = upsert, D = delete, C = remoção de todos
+            self.changes_table = Table(
+                'qa_api_changes',
+                self.metadata,
+                Column('seq', BigInteger, primary_key=True, autoincrement=True),
+                Column('mock_id', String(10), nullable=True),
+                Column('op', String(1), nullable=False),
+                Column('origin', String(64), nullable=False),
+                Column('changed_at', DateTime, nullable=False, server_default=func.now())
+            )
+            self.mock_sets_table = Table(
+                'qa_mock_sets',
+                self.metadata,
+                Column('namespace', String(64), primary_key=True),
+                Column('name', String(64), primary_key=True),
+                Column('version', Integer, primary_key=True),
+                # Mocks na ordem do match (campos de mock_sets.SET_FIELDS)
+                Column('mocks', JSONB, nullable=False),
+                Column('created_at', DateTime(timezone=True), nullable=False, server_default=func.now())
             )
             
-            # Testa a conexão
-            with self.engine.connect():
-                logger.info("Conexão com banco de dados estabelecida com sucesso")
-            
-            # Cria a tabela se não existir
-            self.metadata.create_all(self.engine)
-            self.connected = True
-            
-        except Exception as e:
-            logger.error(f"Erro ao conectar com banco de dados: {e}")
-            if self.fallback_to_memory:
-                logger.warning("⚠️  FALLBACK ATIVADO: Usando armazenamento em memória devido à falha na conexão com o banco")
-                self.connected = False
-            else:
-                raise
+        # Testa a conexão
+        with self.engine.connect():
+            logger.info("Conexão com banco de dados estabelecida com sucesso")
+        
+        # Cria a tabela se não existir
+        self.metadata.create_all(self.engine)
     
     def is_connected(self) -> bool:
         """Verifica se está conectado ao banco."""
         if not self.use_database:
             return False
         
-        if not self.engine:
+        # Desconectado: a thread de reconexão é quem testa o banco, não cada operação
+        if not self.engine or not self.connected:
             return False
+        
+        now = time.monotonic()
+        if self.healthcheck_interval and now - self._last_healthcheck < self.healthcheck_interval:
+            return True
             
         try:
             with self.engine.connect() as conn:
                 conn.execute(text("SELECT 1"))
+            self._last_healthcheck = now
             return True
         except Exception as e:
             logger.error(f"Erro ao verificar conexão: {e}")
             self.connected = False
+            if self.fallback_to_memory:
+                self.start_reconnect()
             return False
     
+    def _handle_engine_error(self, context):
+        """Queda detectada em qualquer operação: volta ao fallback sem esperar o próximo health check."""
+        if context.is_disconnect and self.connected:
+            logger.error("Conexão com o banco perdida durante operação")
+            self.connected = False
+            if self.fallback_to_memory:
+                self.start_reconnect()
+    
+    def mark_connected(self):
+        """Volta a usar o banco (chamado pelo handler de reconexão após reconciliar)."""
+        self.connected = True
+    
+    def start_reconnect(self):
+        """Inicia a thread de reconexão com backoff exponencial (se ainda não estiver rodando)."""
+        if not self.reconnect_enabled:
+            return
+        if self._reconnect_thread and self._reconnect_thread.is_alive():
+            return
+        self._reconnect_stop.clear()
+        self._reconnect_thread = threading.Thread(target=self._reconnect_loop, name="db-reconnect", daemon=True)
+        self._reconnect_thread.start()
+    
+    def stop_reconnect(self):
+        """Interrompe a thread de reconexão."""
+        self._reconnect_stop.set()
+        if self._reconnect_thread:
+            self._reconnect_thread.join(timeout=5)
+            self._reconnect_thread = None
+    
+    def _reconnect_loop(self):
+        delay = self.reconnect_initial_delay
+        while not self._reconnect_stop.wait(delay * random.uniform(0.8, 1.2)):
+            self.reconnect_attempts += 1
+            try:
+                self._connect()
+                handler = self.reconnect_handler
+                if handler is None or handler():
+                    self.connected = True
+                    self.reconnect_last_error = None
+                    logger.info(f"✅ Reconectado ao banco após {self.reconnect_attempts} tentativa(s)")
+                    self.reconnect_attempts = 0
+                    return
+                self.reconnect_last_error = "Falha ao reconciliar mocks da memória com o banco"
+            except Exception as e:
+                self.reconnect_last_error = str(e)
+                logger.warning(f"Reconexão com o banco falhou (tentativa {self.reconnect_attempts}, próxima em ~{min(delay * 2, self.reconnect_max_delay):.0f}s): {e}")
+            delay = min(delay * 2, self.reconnect_max_delay)
+    
+    def get_pool_status(self) -> Dict[str, Any]:
+        """Configuração e uso atual do pool de conexões."""
+        status = {
+            'pool_size': self.pool_size,
+            'max_overflow': self.max_overflow,
+            'pool_recycle': self.pool_recycle,
+            'pool_pre_ping': self.pool_pre_ping,
+            'statement_timeout_ms': self.statement_timeout_ms,
+            'prepared_statements': self.use_prepared_statements
+        }
+        if self.engine is not None and hasattr(self.engine.pool, 'checkedout'):
+            status['checked_out'] = self.engine.pool.checkedout()
+        return status
+    
+    def get_reconnect_status(self) -> Dict[str, Any]:
+        """Estado da reconexão em segundo plano."""
+        return {
+            'running': bool(self._reconnect_thread and self._reconnect_thread.is_alive()),
+            'attempts': self.reconnect_attempts,
+            'last_error': self.reconnect_last_error
+        }
+    
     def create_mock(self, mock_id: str, uri: str, http_method: str, 
                    status_code: int, response: Dict[str, Any], uri_pattern: str, 
-                   headers: Optional[Dict[str, str]] = None) -> bool:
+                   headers: Optional[Dict[str, str]] = None,
+                   variants: Optional[List[Dict[str, Any]]] = None,
+                   expires_at: Optional[float] = None, max_hits: Optional[int] = None,
+                   namespace: str = DEFAULT_NAMESPACE) -> bool:
         """Cria um mock no banco de dados."""
         if not self.is_connected():
             return False
             
         try:
-            with self.engine.connect() as conn:
+            with self.engine.begin() as conn:
                 conn.execute(
                     self.mocks_table.insert(),
                     {
                         'id': mock_id,
+                        'namespace': namespace,
                         'uri': uri,
                         'http_method': http_method,
                         'status_code': status_code,
-                        'response_body': json.dumps(response),
+                        **self.body_columns(response),
                         'uri_pattern': uri_pattern,
-                        'headers': headers or {}
+                        'headers': headers or {},
+                        'variants': variants or None,
+                        'expires_at': _to_datetime(expires_at),
+                        'max_hits': max_hits or None,
+                        **self._route_columns(uri)
                     }
                 )
+                self._record_changes(conn, 'U', [mock_id])
             return True
         except SQLAlchemyError as e:
             logger.error(f"Erro ao criar mock no banco: {e}")
@@ -127,79 +386,271 @@ class DatabaseManager:
             
         try:
             with self.engine.connect() as conn:
-                result = conn.execute(
-                    self.mocks_table.select().where(self.mocks_table.c.id == mock_id)
-                ).fetchone()
-                
+                result = self._execute_hot(conn, 'qa_mock_by_id', mock_id=mock_id).fetchone()
                 if result:
-                    # Tenta carregar headers se existir a coluna, senão usa dict vazio
-                    try:
-                        headers = result.headers if hasattr(result, 'headers') and result.headers else {}
-                    except Exception:
-                        headers = {}
-                    
-                    return {
-                        'id': result.id,
-                        'uri': result.uri,
-                        'http_method': result.http_method,
-                        'status_code': result.status_code,
-                        'response': json.loads(result.response_body),
-                        'uri_pattern': result.uri_pattern,
-                        'headers': headers
-                    }
+                    return self._row_to_mock(result)
         except SQLAlchemyError as e:
             logger.error(f"Erro ao recuperar mock do banco: {e}")
         return None
     
-    def get_all_mocks(self) -> List[Dict[str, Any]]:
-        """Recupera todos os mocks do banco de dados."""
+    def get_mock_by_route(self, uri: str, http_method: str, namespace: str = DEFAULT_NAMESPACE) -> Optional[Dict[str, Any]]:
+        """Recupera o mock de um uri + http_method no namespace (usa o índice ix_qa_api_method_uri)."""
+        if not self.is_connected():
+            return None
+            
+        try:
+            with self.engine.connect() as conn:
+                result = self._execute_hot(conn, 'qa_mock_by_route', namespace=namespace, http_method=http_method,
+                                           uri=uri).fetchone()
+                if result:
+                    return self._row_to_mock(result)
+        except SQLAlchemyError as e:
+            logger.error(f"Erro ao recuperar mock do banco por rota: {e}")
+        return None
+    
+    def match_route(self, path: str, http_method: str, namespace: str = DEFAULT_NAMESPACE) -> Optional[List[Dict[str, Any]]]:
+        """Mock do namespace que casa com o path, resolvido no banco: lista com 0 ou 1 mock, None em caso de erro.
+
+        Só a linha vencedora é lida; entre vários candidatos vence o de prefixo estático mais longo.
+        """
+        if not self.is_connected():
+            return None
+            
+        try:
+            with self.engine.connect() as conn:
+                result = self._execute_hot(
+                    conn, 'qa_mock_match', namespace=namespace, http_method=http_method, prefixes=path_prefixes(path),
+                    segments=path.count("/"), path=path
+                ).fetchone()
+                return [self._row_to_mock(result)] if result else []
+        except SQLAlchemyError as e:
+            logger.error(f"Erro ao casar rota no banco: {e}")
+        return None
+    
+    def explain_route(self, path: str, http_method: str,
+                      namespace: str = DEFAULT_NAMESPACE) -> Optional[Tuple[List[Dict[str, Any]], int]]:
+        """Candidatos do qa_mock_match com o resultado de cada condição, na mesma ordem de desempate.
+
+        Retorna (candidatos, quantos mocks do namespace e método o índice descartou); None em caso de erro.
+        """
+        if not self.is_connected():
+            return None
+            
+        params = {'namespace': namespace, 'http_method': http_method, 'prefixes': path_prefixes(path), 'segments': path.count("/"), 'path': path}
+        try:
+            with self.engine.connect() as conn:
+                rows = conn.execute(text(
+                    f"SELECT id, uri, :path ~ ({_PG_URI_PATTERN}) AS path_ok,"
+                    " (expires_at IS NULL OR expires_at > now()) AS valid,"
+                    " (max_hits IS NULL OR hits < max_hits) AS has_hits"
+                    " FROM qa_api WHERE namespace = :namespace AND http_method = :http_method"
+                    " AND static_prefix = ANY(:prefixes)"
+                    " AND (segment_count = :segments OR segment_count IS NULL)"
+                    " ORDER BY length(static_prefix) DESC, segment_count IS NULL, id"
+                ), params).fetchall()
+                total = conn.execute(
+                    text("SELECT count(*) FROM qa_api WHERE namespace = :namespace AND http_method = :http_method"), params
+                ).scalar()
+                return [dict(row._mapping) for row in rows], total - len(rows)
+        except SQLAlchemyError as e:
+            logger.error(f"Erro ao explicar rota no banco: {e}")
+        return None
+    
+    def consume_hit(self, mock_id: str) -> Optional[int]:
+        """Conta uma chamada de mock com max_hits: chamadas contadas até esta, ou None se o limite já tinha sido atingido."""
+        if not self.is_connected():
+            return None
+            
+        try:
+            with self.engine.begin() as conn:
+                table = self.mocks_table
+                result = conn.execute(
+                    table.update().where(
+                        table.c.id == mock_id,
+                        or_(table.c.max_hits.is_(None), table.c.hits < table.c.max_hits)
+                    ).values(hits=table.c.hits + 1).returning(table.c.hits)
+                ).fetchone()
+                return result[0] if result is not None else None
+        except SQLAlchemyError as e:
+            logger.error(f"Erro ao contar chamada do mock: {e}")
+        return None
+    
+    def next_call(self, mock_id: str) -> Optional[int]:
+        """Incrementa o contador de chamadas (UPDATE ... RETURNING, atômico entre conexões); None se o mock não está no banco ou em erro."""
+        if not self.is_connected():
+            return None
+            
+        try:
+            with self.engine.begin() as conn:
+                result = self._execute_hot(conn, 'qa_mock_next_call', mock_id=mock_id).fetchone()
+                return result[0] if result is not None else None
+        except SQLAlchemyError as e:
+            logger.error(f"Erro ao contar chamada do mock: {e}")
+        return None
+    
+    def reset_calls(self, mock_ids: List[str]) -> bool:
+        """Zera o contador de chamadas dos mocks (posição do $sequence e contagem do max_hits)."""
+        if not self.is_connected():
+            return False
+            
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(self.mocks_table.update().where(self.mocks_table.c.id.in_(mock_ids)).values(hits=0))
+            return True
+        except SQLAlchemyError as e:
+            logger.error(f"Erro ao zerar contador de chamadas do mock: {e}")
+        return False
+    
+    def expire_mocks(self, batch_size: int = 1000) -> Optional[List[str]]:
+        """Remove em lotes os mocks vencidos ou sem chamadas restantes. Retorna os IDs (None em erro).
+
+        SKIP LOCKED deixa várias instâncias varrerem ao mesmo tempo sem se bloquearem.
+        """
+        if not self.is_connected():
+            return None
+            
+        expired = []
+        try:
+            while True:
+                with self.engine.begin() as conn:
+                    rows = conn.execute(text(
+                        "DELETE FROM qa_api WHERE id IN ("
+                        " SELECT id FROM qa_api"
+                        " WHERE (expires_at IS NOT NULL OR max_hits IS NOT NULL)"
+                        " AND (expires_at <= now() OR hits >= max_hits)"
+                        " LIMIT :batch FOR UPDATE SKIP LOCKED"
+                        ") RETURNING id"
+                    ), {'batch': batch_size}).fetchall()
+                    ids = [row.id for row in rows]
+                    self._record_changes(conn, 'D', ids)
+                expired.extend(ids)
+                if len(ids) < batch_size:
+                    return expired
+        except SQLAlchemyError as e:
+            logger.error(f"Erro ao expirar mocks no banco: {e}")
+        return None
+    
+    @staticmethod
+    def _route_columns(uri: str) -> Dict[str, Any]:
+        static_prefix, segment_count = route_key(uri)
+        return {'static_prefix': static_prefix, 'segment_count': segment_count}
+    
+    def _execute_hot(self, conn, name: str, **params):
+        """Executa uma consulta quente: EXECUTE de statement preparado na conexão ou statement em cache."""
+        if not self.use_prepared_statements:
+            return conn.execute(self._hot_statements[name], params)
+        
+        # PREPARE é por conexão física; guardamos os já preparados no info da conexão do pool
+        prepared = conn.connection.info.setdefault('qa_prepared', set())
+        if name not in prepared:
+            conn.exec_driver_sql(f"PREPARE {name} AS {PREPARED_STATEMENTS[name][0]}")
+            prepared.add(name)
+        return conn.exec_driver_sql(_EXECUTE_SQL[name], params)
+    
+    @staticmethod
+    def _row_to_mock(row) -> Dict[str, Any]:
+        mock = _MockRow(
+            id=row.id,
+            namespace=row.namespace,
+            uri=row.uri,
+            http_method=row.http_method,
+            status_code=row.status_code,
+            uri_pattern=row.uri_pattern,
+            headers=row.headers if hasattr(row, 'headers') and row.headers else {},
+            variants=row.variants if hasattr(row, 'variants') and row.variants else [],
+            expires_at=row.expires_at.timestamp() if row.expires_at is not None else None,
+            max_hits=row.max_hits,
+            hits=row.hits or 0
+        )
+        # Sem as colunas do corpo (get_all_mocks(include_body=False)) não há 'response'
+        if hasattr(row, 'response_body'):
+            mock['response_body'] = row.response_body
+            mock['response_compressed'] = bytes(row.response_compressed) if row.response_compressed is not None else None
+        return mock
+    
+    @staticmethod
+    def body_columns(response: Any, compressed: Optional[bytes] = None) -> Dict[str, Any]:
+        """Colunas do corpo: JSON em response_body ou, a partir do limite, comprimido em response_compressed.
+
+        O MocksManager usa as mesmas colunas na chave do cache de templates, sem reler a linha gravada.
+        """
+        if compressed is None:
+            data = json_codec.dumps_bytes(response)
+            compressed = body_compression.compress(data)
+            if compressed is None:
+                return {'response_body': data.decode("utf-8"), 'response_compressed': None}
+        return {'response_body': '', 'response_compressed': compressed}
+    
+    def get_all_mocks(self, include_body: bool = True, namespace: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Recupera todos os mocks do banco de dados, ou só os do namespace (include_body=False não lê os corpos)."""
         if not self.is_connected():
             return []
             
         try:
             with self.engine.connect() as conn:
-                results = conn.execute(self.mocks_table.select()).fetchall()
-                mocks = []
-                for row in results:
-                    mocks.append({
-                        'id': row.id,
-                        'uri': row.uri,
-                        'http_method': row.http_method,
-                        'status_code': row.status_code,
-                        'response': json.loads(row.response_body),
-                        'uri_pattern': row.uri_pattern,
-                        'headers': row.headers if hasattr(row, 'headers') and row.headers else {}
-                    })
-                return mocks
+                table = self.mocks_table
+                stmt = table.select()
+                if not include_body:
+                    stmt = stmt.with_only_columns(*(c for c in table.c if c.name not in ('response_body', 'response_compressed')))
+                if namespace is not None:
+                    stmt = stmt.where(table.c.namespace == namespace)
+                results = conn.execute(stmt).fetchall()
+                return [self._row_to_mock(row) for row in results]
         except SQLAlchemyError as e:
             logger.error(f"Erro ao recuperar mocks do banco: {e}")
         return []
     
+    def count_mocks(self) -> int:
+        """Número de mocks no banco (0 se desconectado)."""
+        if not self.is_connected():
+            return 0
+            
+        try:
+            with self.engine.connect() as conn:
+                return conn.execute(select(func.count()).select_from(self.mocks_table)).scalar()
+        except SQLAlchemyError as e:
+            logger.error(f"Erro ao contar mocks no banco: {e}")
+        return 0
+    
+    def count_by_namespace(self) -> Dict[str, int]:
+        """Número de mocks por namespace (vazio se desconectado)."""
+        if not self.is_connected():
+            return {}
+            
+        try:
+            with self.engine.connect() as conn:
+                table = self.mocks_table
+                rows = conn.execute(select(table.c.namespace, func.count()).group_by(table.c.namespace)).fetchall()
+                return {namespace: count for namespace, count in rows}
+        except SQLAlchemyError as e:
+            logger.error(f"Erro ao contar mocks por namespace no banco: {e}")
+        return {}
+    
     def update_mock(self, mock_id: str, status_code: Optional[int] = None, 
                    response: Optional[Dict[str, Any]] = None,
                    uri: Optional[str] = None,
                    http_method: Optional[str] = None,
-                   headers: Optional[Dict[str, str]] = None) -> bool:
-        """Atualiza um mock no banco de dados, incluindo uri e método."""
+                   headers: Optional[Dict[str, str]] = None,
+                   variants: Optional[List[Dict[str, Any]]] = None,
+                   expires_at: Optional[float] = None, max_hits: Optional[int] = None) -> bool:
+        """Atualiza um mock no banco de dados, incluindo uri e método.
+
+        expires_at/max_hits: None mantém, 0 remove o limite; um novo max_hits zera a contagem.
+        """
         if not self.is_connected():
             return False
             
         try:
-            with self.engine.connect() as conn:
-                update_data = {}
-                if status_code is not None:
-                    update_data['status_code'] = status_code
-                if response is not None:
-                    update_data['response_body'] = json.dumps(response)
+            with self.engine.begin() as conn:
+                update_data = self._update_values(status_code, response, headers, variants, expires_at, max_hits)
                 if uri is not None:
                     update_data['uri'] = uri
                     # Atualiza uri_pattern também
                     from src.mocks_manager import MocksManager
                     update_data['uri_pattern'] = MocksManager.compile_uri_pattern_static(uri)
+                    update_data.update(self._route_columns(uri))
                 if http_method is not None:
                     update_data['http_method'] = http_method
-                if headers is not None:
-                    update_data['headers'] = headers
                     
                 if update_data:
                     conn.execute(
@@ -207,21 +658,107 @@ class DatabaseManager:
                             self.mocks_table.c.id == mock_id
                         ).values(**update_data)
                     )
+                    self._record_changes(conn, 'U', [mock_id])
                 return True
         except SQLAlchemyError as e:
             logger.error(f"Erro ao atualizar mock no banco: {e}")
         return False
     
+    @staticmethod
+    def _update_values(status_code: Optional[int], response: Optional[Dict[str, Any]], headers: Optional[Dict[str, str]],
+                       variants: Optional[List[Dict[str, Any]]], expires_at: Optional[float],
+                       max_hits: Optional[int]) -> Dict[str, Any]:
+        """Colunas alteradas por uma edição (None = mantém)."""
+        update_data = {}
+        if status_code is not None:
+            update_data['status_code'] = status_code
+        if response is not None:
+            update_data.update(DatabaseManager.body_columns(response))
+        if headers is not None:
+            update_data['headers'] = headers
+        if variants is not None:
+            update_data['variants'] = variants or None
+        if expires_at is not None:
+            update_data['expires_at'] = _to_datetime(expires_at)
+        if max_hits is not None:
+            update_data['max_hits'] = max_hits or None
+            update_data['hits'] = 0
+        return update_data
+    
+    def _mock_filter(self, ids: Optional[List[str]], uri_prefix: Optional[str], http_method: Optional[str],
+                     namespace: Optional[str] = None) -> List[Any]:
+        """Condições (combinadas com E) do filtro das operações em lote."""
+        table = self.mocks_table
+        conditions = []
+        if namespace is not None:
+            conditions.append(table.c.namespace == namespace)
+        if ids is not None:
+            conditions.append(table.c.id.in_(ids))
+        if uri_prefix:
+            conditions.append(table.c.uri.startswith(uri_prefix, autoescape=True))
+        if http_method:
+            conditions.append(table.c.http_method == http_method)
+        return conditions
+    
+    def update_mocks(self, ids: Optional[List[str]] = None, uri_prefix: Optional[str] = None,
+                     http_method: Optional[str] = None, status_code: Optional[int] = None,
+                     response: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None,
+                     variants: Optional[List[Dict[str, Any]]] = None, expires_at: Optional[float] = None,
+                     max_hits: Optional[int] = None, namespace: Optional[str] = None) -> Optional[List[str]]:
+        """Atualiza em lote, com um único UPDATE, os mocks do filtro. Retorna os IDs atualizados (None em erro)."""
+        if not self.is_connected():
+            return None
+            
+        try:
+            with self.engine.begin() as conn:
+                table = self.mocks_table
+                conditions = self._mock_filter(ids, uri_prefix, http_method, namespace)
+                update_data = self._update_values(status_code, response, headers, variants, expires_at, max_hits)
+                if update_data:
+                    rows = conn.execute(table.update().where(*conditions).values(**update_data).returning(table.c.id))
+                else:
+                    rows = conn.execute(select(table.c.id).where(*conditions))
+                updated = [row.id for row in rows]
+                if update_data:
+                    self._record_changes(conn, 'U', updated)
+                return updated
+        except SQLAlchemyError as e:
+            logger.error(f"Erro ao atualizar mocks em lote no banco: {e}")
+        return None
+    
+    def delete_mocks(self, ids: Optional[List[str]] = None, uri_prefix: Optional[str] = None,
+                     http_method: Optional[str] = None, namespace: Optional[str] = None) -> Optional[List[str]]:
+        """Remove em lote, com um único DELETE, os mocks do filtro. Retorna os IDs removidos (None em erro).
+
+        Só com namespace, limpa o namespace inteiro (índice ix_qa_api_route).
+        """
+        if not self.is_connected():
+            return None
+            
+        try:
+            with self.engine.begin() as conn:
+                table = self.mocks_table
+                rows = conn.execute(
+                    table.delete().where(*self._mock_filter(ids, uri_prefix, http_method, namespace)).returning(table.c.id)
+                )
+                deleted = [row.id for row in rows]
+                self._record_changes(conn, 'D', deleted)
+                return deleted
+        except SQLAlchemyError as e:
+            logger.error(f"Erro ao remover mocks em lote no banco: {e}")
+        return None
+    
     def delete_mock(self, mock_id: str) -> bool:
         """Remove um mock do banco de dados."""
         if not self.is_connected():
             return False
             
         try:
-            with self.engine.connect() as conn:
+            with self.engine.begin() as conn:
                 conn.execute(
                     self.mocks_table.delete().where(self.mocks_table.c.id == mock_id)
                 )
+                self._record_changes(conn, 'D', [mock_id])
             return True
         except SQLAlchemyError as e:
             logger.error(f"Erro ao remover mock do banco: {e}")
@@ -233,8 +770,9 @@ class DatabaseManager:
             return False
             
         try:
-            with self.engine.connect() as conn:
+            with self.engine.begin() as conn:
                 conn.execute(self.mocks_table.delete())
+                self._record_changes(conn, 'C', [None])
             return True
         except SQLAlchemyError as e:
             logger.error(f"Erro ao limpar mocks do banco: {e}")
@@ -247,10 +785,340 @@ class DatabaseManager:
             
         try:
             with self.engine.connect() as conn:
-                result = conn.execute(
-                    self.mocks_table.select().where(self.mocks_table.c.id == mock_id)
-                ).fetchone()
+                result = self._execute_hot(conn, 'qa_mock_exists', mock_id=mock_id).fetchone()
                 return result is not None
         except SQLAlchemyError as e:
             logger.error(f"Erro ao verificar existência do mock: {e}")
         return False
+    
+    def apply_batch(self, upserts: List[Dict[str, Any]], deletes: List[str], clear: bool = False) -> bool:
+        """Aplica um lote de mutações em uma única transação (usado pelo write-behind).
+
+        upserts: dicts com id, namespace, uri, http_method, status_code, response, uri_pattern e headers.
+        """
+        if not self.is_connected():
+            return False
+            
+        try:
+            with self.engine.begin() as conn:
+                if clear:
+                    conn.execute(self.mocks_table.delete())
+                    self._record_changes(conn, 'C', [None])
+                if deletes:
+                    conn.execute(
+                        self.mocks_table.delete().where(self.mocks_table.c.id.in_(deletes))
+                    )
+                    self._record_changes(conn, 'D', deletes)
+                if upserts:
+                    self._upsert_rows(conn, upserts)
+                    self._record_changes(conn, 'U', [mock['id'] for mock in upserts])
+            return True
+        except SQLAlchemyError as e:
+            logger.error(f"Erro ao aplicar lote de mutações no banco: {e}")
+        return False
+    
+    def _upsert_rows(self, conn, mocks: List[Dict[str, Any]]):
+        """INSERT ... ON CONFLICT (id) DO UPDATE para uma lista de mocks.
+
+        hits de um mock que já existe só avança: o contador do banco é incrementado por next_call e
+        consume_hit entre um flush e outro, e zerar o contador é sempre explícito (reset_calls).
+        """
+        rows = [
+            {
+                'id': mock['id'],
+                'namespace': mock.get('namespace') or DEFAULT_NAMESPACE,
+                'uri': mock['uri'],
+                'http_method': mock['http_method'],
+                'status_code': mock['status_code'],
+                # Mocks da memória já comprimidos chegam com response_compressed (sem recomprimir)
+                **self.body_columns(mock.get('response'), mock.get('response_compressed')),
+                'uri_pattern': mock['uri_pattern'],
+                'headers': mock.get('headers') or {},
+                'variants': mock.get('variants') or None,
+                'expires_at': _to_datetime(mock.get('expires_at')),
+                'max_hits': mock.get('max_hits'),
+                'hits': mock.get('hits') or 0,
+                **self._route_columns(mock['uri'])
+            }
+            for mock in mocks
+        ]
+        stmt = pg_insert(self.mocks_table)
+        columns = {col: stmt.excluded[col] for col in rows[0] if col != 'id'}
+        columns['hits'] = func.greatest(self.mocks_table.c.hits, stmt.excluded.hits)
+        stmt = stmt.on_conflict_do_update(index_elements=[self.mocks_table.c.id], set_=columns)
+        conn.execute(stmt, rows)
+    
+    def reconcile_mocks(self, mocks: List[Dict[str, Any]], deletes: List[str], policy: str = "memory_wins",
+                        owned_ids=()) -> Optional[Dict[str, int]]:
+        """Grava em lote os mocks criados na memória durante uma queda do banco.
+
+        Conflitos (mesmo id ou mesmo uri + http_method no mesmo namespace já no banco):
+        - memory_wins: a versão da memória substitui a do banco
+        - database_wins: a versão do banco é mantida e o mock da memória é descartado
+        IDs em owned_ids já foram gravados por esta instância e não contam como conflito.
+        Retorna contadores ou None em caso de erro.
+        """
+        if not self.engine or self.mocks_table is None:
+            return None
+        
+        stats = {'written': 0, 'replaced': 0, 'skipped': 0, 'deleted': 0}
+        try:
+            with self.engine.begin() as conn:
+                table = self.mocks_table
+                existing = []
+                if mocks:
+                    existing = conn.execute(
+                        table.select().with_only_columns(table.c.id, table.c.namespace, table.c.uri, table.c.http_method).where(
+                            or_(table.c.id.in_([m['id'] for m in mocks]),
+                                table.c.uri.in_({m['uri'] for m in mocks}))
+                        )
+                    ).fetchall()
+                by_id = {row.id: row for row in existing}
+                by_route = {(row.namespace, row.uri, row.http_method): row.id for row in existing}
+                
+                upserts = []
+                replaced_ids = []
+                for mock in mocks:
+                    route_owner = by_route.get((mock.get('namespace') or DEFAULT_NAMESPACE, mock['uri'], mock['http_method']))
+                    conflict = (mock['id'] in by_id and mock['id'] not in owned_ids) or \
+                        (route_owner is not None and route_owner != mock['id'])
+                    if conflict and policy == "database_wins":
+                        stats['skipped'] += 1
+                        continue
+                    if route_owner is not None and route_owner != mock['id']:
+                        replaced_ids.append(route_owner)
+                    if conflict:
+                        stats['replaced'] += 1
+                    upserts.append(mock)
+                
+                to_delete = list(deletes) + replaced_ids
+                if to_delete:
+                    conn.execute(table.delete().where(table.c.id.in_(to_delete)))
+                    self._record_changes(conn, 'D', to_delete)
+                    stats['deleted'] = len(deletes)
+                if upserts:
+                    self._upsert_rows(conn, upserts)
+                    self._record_changes(conn, 'U', [mock['id'] for mock in upserts])
+                    stats['written'] = len(upserts)
+            return stats
+        except SQLAlchemyError as e:
+            logger.error(f"Erro ao reconciliar mocks com o banco: {e}")
+        return None
+    
+    def _record_changes(self, conn, op: str, mock_ids: List[Optional[str]]):
+        """Registra mutações no feed na mesma transação; o NOTIFY só é entregue no commit."""
+        if not self.change_feed_enabled or not mock_ids:
+            return
+        conn.execute(
+            self.changes_table.insert(),
+            [{'mock_id': mock_id, 'op': op, 'origin': self.instance_id} for mock_id in mock_ids]
+        )
+        conn.execute(text("SELECT pg_notify(:channel, :origin)"), {'channel': CHANGE_CHANNEL, 'origin': self.instance_id})
+    
+    def get_latest_change_seq(self) -> Optional[int]:
+        """Maior seq do feed de mudanças (0 se vazio, None se o banco não respondeu)."""
+        try:
+            with self.engine.connect() as conn:
+                return conn.execute(select(func.coalesce(func.max(self.changes_table.c.seq), 0))).scalar()
+        except SQLAlchemyError as e:
+            logger.error(f"Erro ao consultar o feed de mudanças: {e}")
+        return None
+    
+    def get_changes(self, after_seq: int, limit: int = 5000) -> Optional[List[Any]]:
+        """Mudanças com seq > after_seq, em ordem (None em caso de erro)."""
+        table = self.changes_table
+        try:
+            with self.engine.connect() as conn:
+                return conn.execute(
+                    select(table.c.seq, table.c.mock_id, table.c.op, table.c.origin)
+                    .where(table.c.seq > after_seq).order_by(table.c.seq).limit(limit)
+                ).fetchall()
+        except SQLAlchemyError as e:
+            logger.error(f"Erro ao ler o feed de mudanças: {e}")
+        return None
+    
+    def prune_changes(self, older_than_seconds: float) -> int:
+        """Remove do feed as mudanças mais antigas que o período de retenção."""
+        table = self.changes_table
+        try:
+            with self.engine.begin() as conn:
+                result = conn.execute(table.delete().where(
+                    table.c.changed_at < func.now() - text(f"interval '{int(older_than_seconds)} seconds'")
+                ))
+                return result.rowcount
+        except SQLAlchemyError as e:
+            logger.error(f"Erro ao limpar o feed de mudanças: {e}")
+        return 0
+    
+    def get_mocks_by_ids(self, mock_ids: List[str]) -> Optional[List[Dict[str, Any]]]:
+        """Mocks dos IDs informados em uma única consulta (None em caso de erro)."""
+        if not mock_ids:
+            return []
+        try:
+            with self.engine.connect() as conn:
+                results = conn.execute(
+                    self.mocks_table.select().where(self.mocks_table.c.id.in_(mock_ids))
+                ).fetchall()
+                return [self._row_to_mock(row) for row in results]
+        except SQLAlchemyError as e:
+            logger.error(f"Erro ao recuperar mocks do banco: {e}")
+        return None
+    
+    def get_mocks_by_routes(self, routes: List[Tuple[str, str, str]]) -> Optional[List[Dict[str, Any]]]:
+        """Mocks das rotas (namespace, http_method, uri) informadas em uma única consulta (None em caso de erro)."""
+        if not routes:
+            return []
+        table = self.mocks_table
+        try:
+            with self.engine.connect() as conn:
+                results = conn.execute(
+                    table.select().where(tuple_(table.c.namespace, table.c.http_method, table.c.uri).in_(routes))
+                ).fetchall()
+                return [self._row_to_mock(row) for row in results]
+        except SQLAlchemyError as e:
+            logger.error(f"Erro ao recuperar mocks do banco por rota: {e}")
+        return None
+    
+    def replace_namespace(self, namespace: str, mocks: List[Dict[str, Any]]) -> Optional[List[str]]:
+        """Troca todos os mocks do namespace pelos informados em uma única transação (ativação de conjunto).
+
+        Requisições concorrentes veem o namespace antigo ou o novo inteiro (MVCC). Retorna os IDs que
+        estavam no namespace (None em erro do banco); ValueError se um ID informado pertence a outro namespace.
+        """
+        if not self.is_connected():
+            return None
+            
+        try:
+            with self.engine.begin() as conn:
+                table = self.mocks_table
+                ids = [mock['id'] for mock in mocks]
+                if ids:
+                    taken = conn.execute(
+                        select(table.c.id, table.c.namespace).where(table.c.id.in_(ids), table.c.namespace != namespace)
+                    ).fetchone()
+                    if taken is not None:
+                        raise ValueError(f"ID {taken.id} já é usado por um mock do namespace {taken.namespace}")
+                removed = [row.id for row in conn.execute(
+                    table.delete().where(table.c.namespace == namespace).returning(table.c.id)
+                )]
+                kept = set(ids)
+                self._record_changes(conn, 'D', [mock_id for mock_id in removed if mock_id not in kept])
+                if mocks:
+                    self._upsert_rows(conn, mocks)
+                    self._record_changes(conn, 'U', ids)
+                return removed
+        except SQLAlchemyError as e:
+            logger.error(f"Erro ao trocar os mocks do namespace {namespace} no banco: {e}")
+        return None
+    
+    @staticmethod
+    def _row_to_mock_set(row) -> Dict[str, Any]:
+        mock_set = {'namespace': row.namespace, 'name': row.name, 'version': row.version,
+                    'created_at': row.created_at.timestamp()}
+        if hasattr(row, 'mocks'):
+            mock_set['mocks'] = row.mocks
+        else:
+            mock_set['count'] = row.count
+        return mock_set
+    
+    def save_mock_set(self, namespace: str, name: str, mocks: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Grava uma nova versão do conjunto (última + 1). Retorna version e created_at (None em erro)."""
+        if not self.is_connected():
+            return None
+            
+        try:
+            with self.engine.begin() as conn:
+                table = self.mock_sets_table
+                version = conn.execute(
+                    select(func.coalesce(func.max(table.c.version), 0) + 1)
+                    .where(table.c.namespace == namespace, table.c.name == name)
+                ).scalar()
+                row = conn.execute(
+                    table.insert().values(namespace=namespace, name=name, version=version, mocks=mocks)
+                    .returning(table.c.version, table.c.created_at)
+                ).fetchone()
+                return {'version': row.version, 'created_at': row.created_at.timestamp()}
+        except SQLAlchemyError as e:
+            logger.error(f"Erro ao salvar conjunto {namespace}/{name} no banco: {e}")
+        return None
+    
+    def get_mock_set(self, namespace: str, name: str, version: Optional[int] = None,
+                     include_mocks: bool = True) -> Optional[Dict[str, Any]]:
+        """A versão do conjunto (a última se version for None); None se não existe ou em erro."""
+        if not self.is_connected():
+            return None
+            
+        table = self.mock_sets_table
+        columns = [table.c.namespace, table.c.name, table.c.version, table.c.created_at]
+        if include_mocks:
+            columns.append(table.c.mocks)
+        else:
+            columns.append(func.jsonb_array_length(table.c.mocks).label('count'))
+        stmt = select(*columns).where(table.c.namespace == namespace, table.c.name == name)
+        stmt = stmt.order_by(table.c.version.desc()).limit(1) if version is None else stmt.where(table.c.version == version)
+        try:
+            with self.engine.connect() as conn:
+                row = conn.execute(stmt).fetchone()
+                return self._row_to_mock_set(row) if row is not None else None
+        except SQLAlchemyError as e:
+            logger.error(f"Erro ao ler conjunto {namespace}/{name} do banco: {e}")
+        return None
+    
+    def list_mock_sets(self, namespace: str) -> Optional[List[Dict[str, Any]]]:
+        """Versões dos conjuntos do namespace (sem os mocks, só a contagem), por nome e versão (None em erro)."""
+        if not self.is_connected():
+            return None
+            
+        table = self.mock_sets_table
+        try:
+            with self.engine.connect() as conn:
+                rows = conn.execute(
+                    select(table.c.namespace, table.c.name, table.c.version, table.c.created_at,
+                           func.jsonb_array_length(table.c.mocks).label('count'))
+                    .where(table.c.namespace == namespace).order_by(table.c.name, table.c.version)
+                ).fetchall()
+                return [self._row_to_mock_set(row) for row in rows]
+        except SQLAlchemyError as e:
+            logger.error(f"Erro ao listar conjuntos do banco: {e}")
+        return None
+    
+    def get_latest_mock_sets(self) -> List[Dict[str, Any]]:
+        """Última versão de cada conjunto, com os mocks (carregada na inicialização)."""
+        if not self.is_connected():
+            return []
+            
+        table = self.mock_sets_table
+        try:
+            with self.engine.connect() as conn:
+                rows = conn.execute(
+                    select(table).distinct(table.c.namespace, table.c.name)
+                    .order_by(table.c.namespace, table.c.name, table.c.version.desc())
+                ).fetchall()
+                return [self._row_to_mock_set(row) for row in rows]
+        except SQLAlchemyError as e:
+            logger.error(f"Erro ao carregar conjuntos do banco: {e}")
+        return []
+    
+    def delete_mock_set(self, namespace: str, name: str) -> Optional[int]:
+        """Remove todas as versões do conjunto; retorna quantas eram (None em erro)."""
+        if not self.is_connected():
+            return None
+            
+        table = self.mock_sets_table
+        try:
+            with self.engine.begin() as conn:
+                result = conn.execute(table.delete().where(table.c.namespace == namespace, table.c.name == name))
+                return result.rowcount
+        except SQLAlchemyError as e:
+            logger.error(f"Erro ao remover conjunto {namespace}/{name} do banco: {e}")
+        return None
+    
+    def open_listen_connection(self):
+        """Conexão psycopg2 dedicada (fora do pool), em autocommit, escutando o canal do feed."""
+        raw = self.engine.raw_connection()
+        raw.detach()
+        connection = raw.dbapi_connection
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute(f"LISTEN {CHANGE_CHANNEL}")
+        return connection
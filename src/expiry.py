@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Mocks efêmeros: validade (ttl_seconds/expires_at) e limite de chamadas (max_hits)
+
+MockLimits fica no registro do mock (None quando não há limite), então o matcher descarta um mock
+vencido com uma comparação, sem varrer nada. A remoção fica com o ExpiryScheduler: um heap de
+(expires_at, mock_id) consumido por uma thread a cada `interval` segundos.
+"""
+
+import time
+import heapq
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Any, Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def parse_lifetime(ttl_seconds: Any = None, expires_at: Any = None, max_hits: Any = None,
+                   now: Optional[float] = None) -> Tuple[Optional[float], Optional[int]]:
+    """Valida os campos do payload e devolve (expires_at em epoch, max_hits).
+
+    ttl_seconds/max_hits iguais a 0 (ou expires_at 0) viram 0, que na edição remove o limite.
+    Lança ValueError para valores inválidos.
+    """
+    if ttl_seconds is not None and expires_at is not None:
+        raise ValueError("Use ttl_seconds ou expires_at, não os dois")
+    deadline = None
+    if ttl_seconds is not None:
+        if isinstance(ttl_seconds, bool) or not isinstance(ttl_seconds, (int, float)) or ttl_seconds < 0:
+            raise ValueError(f"ttl_seconds inválido: {ttl_seconds!r} (use um número de segundos >= 0)")
+        deadline = 0.0 if ttl_seconds == 0 else (now or time.time()) + ttl_seconds
+    elif expires_at is not None:
+        deadline = _parse_timestamp(expires_at)
+    if max_hits is not None and (isinstance(max_hits, bool) or not isinstance(max_hits, int) or max_hits < 0):
+        raise ValueError(f"max_hits inválido: {max_hits!r} (use um inteiro >= 0)")
+    return deadline, max_hits
+
+
+def _parse_timestamp(value: Any) -> float:
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and value >= 0:
+        return float(value)
+    if isinstance(value, str):
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            pass
+        else:
+            # Sem fuso: UTC
+            return (parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)).timestamp()
+    raise ValueError(f"expires_at inválido: {value!r} (use ISO 8601, ex.: 2030-01-31T12:00:00Z, ou epoch)")
+
+
+def format_timestamp(epoch: Optional[float]) -> Optional[str]:
+    if epoch is None:
+        return None
+    return datetime.fromtimestamp(epoch, timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z")
+
+
+class MockLimits:
+    """Validade e limite de chamadas de um mock."""
+
+    __slots__ = ("expires_at", "max_hits", "hits")
+
+    def __init__(self, expires_at: Optional[float] = None, max_hits: Optional[int] = None, hits: int = 0):
+        self.expires_at = expires_at
+        self.max_hits = max_hits
+        self.hits = hits
+
+    @classmethod
+    def create(cls, expires_at: Optional[float], max_hits: Optional[int], hits: int = 0) -> Optional["MockLimits"]:
+        """None quando não há limite (0 também conta como sem limite)."""
+        if not expires_at and not max_hits:
+            return None
+        return cls(expires_at or None, max_hits or None, hits)
+
+    def expired(self, now: float) -> bool:
+        return (self.expires_at is not None and now >= self.expires_at) or \
+            (self.max_hits is not None and self.hits >= self.max_hits)
+
+
+class ExpiryScheduler:
+    """Heap de vencimentos com uma thread que entrega os IDs vencidos e chama `on_tick` a cada intervalo.
+
+    Entradas não são removidas do heap ao editar o mock: quem recebe os IDs confere se o mock
+    ainda está vencido (a entrada pode ser de uma validade antiga).
+    """
+
+    def __init__(self, on_tick: Callable[[List[str]], None], interval: float = 1.0):
+        self.on_tick = on_tick
+        self.interval = interval
+        self._heap: List[Tuple[float, str]] = []
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.expired_total = 0
+
+    def schedule(self, mock_id: str, expires_at: float):
+        with self._lock:
+            heapq.heappush(self._heap, (expires_at, mock_id))
+
+    def pop_due(self, now: float) -> List[str]:
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                due.append(heapq.heappop(self._heap)[1])
+        return due
+
+    def clear(self):
+        with self._lock:
+            self._heap.clear()
+
+    @property
+    def scheduled(self) -> int:
+        return len(self._heap)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="mock-expiry", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.on_tick(self.pop_due(time.time()))
+            except Exception as e:
+                logger.error(f"Erro ao expirar mocks: {e}")
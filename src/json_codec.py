@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Codec JSON com backend rápido opcional (orjson) e fallback para a stdlib
+"""
+
+import os
+import abc
+import json
+import logging
+import itertools
+from typing import Any, Iterator, Union
+
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende do ambiente
+    orjson = None
+
+# JSON_BACKEND: "auto" (orjson se instalado), "orjson" ou "json" (stdlib)
+_requested_backend = os.getenv("JSON_BACKEND", "auto").lower()
+
+if _requested_backend == "json" or orjson is None:
+    if _requested_backend == "orjson":
+        logger.warning("⚠️  JSON_BACKEND=orjson mas orjson não está instalado - usando json da stdlib")
+    BACKEND = "json"
+else:
+    BACKEND = "orjson"
+
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS if orjson is not None else 0
+
+
+def _stdlib_dumps(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+class RawJSON:
+    """JSON já serializado (bytes UTF-8); dumps_bytes o devolve como está."""
+
+    __slots__ = ("data",)
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    """Serializa para bytes UTF-8 compactos (formato usado nas respostas HTTP)."""
+    if obj.__class__ is RawJSON:
+        return obj.data
+    if BACKEND == "orjson":
+        try:
+            return orjson.dumps(obj, option=_ORJSON_OPTIONS)
+        except TypeError:
+            # orjson rejeita alguns valores (ex.: inteiros > 64 bits); a stdlib aceita
+            pass
+    return _stdlib_dumps(obj).encode("utf-8")
+
+
+def dumps(obj: Any) -> str:
+    """Serializa para string JSON compacta (formato usado no armazenamento)."""
+    if BACKEND == "orjson":
+        try:
+            return orjson.dumps(obj, option=_ORJSON_OPTIONS).decode("utf-8")
+        except TypeError:
+            pass
+    return _stdlib_dumps(obj)
+
+
+def loads(data: Union[str, bytes, bytearray]) -> Any:
+    """Desserializa JSON a partir de str ou bytes."""
+    if BACKEND == "orjson":
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class LazyArray(abc.ABC):
+    """Array produzido sob demanda (ex.: respostas geradas); serializado apenas por iter_json.
+
+    Base abstrata: a subclasse produz os itens em __iter__ (ver template_engine.GeneratedArray).
+    """
+
+    __slots__ = ()
+    # True se os itens podem conter outros LazyArray (exige serialização recursiva)
+    nested = False
+
+    @abc.abstractmethod
+    def __iter__(self) -> Iterator[Any]:
+        """Itens do array, um a um (chamado de novo a cada serialização)."""
+
+
+def _contains_lazy(obj: Any) -> bool:
+    if isinstance(obj, LazyArray):
+        return True
+    if isinstance(obj, dict):
+        return any(_contains_lazy(v) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return any(_contains_lazy(v) for v in obj)
+    return False
+
+
+_LAZY_BATCH = 1000
+
+
+def _encode(obj: Any) -> Iterator[bytes]:
+    if isinstance(obj, LazyArray):
+        yield b"["
+        items = iter(obj)
+        if obj.nested:
+            for i, item in enumerate(items):
+                if i:
+                    yield b","
+                yield from _encode(item)
+        else:
+            # Serializa em lotes: uma chamada do encoder a cada _LAZY_BATCH itens
+            separator = b""
+            while True:
+                batch = list(itertools.islice(items, _LAZY_BATCH))
+                if not batch:
+                    break
+                yield separator + dumps_bytes(batch)[1:-1]
+                separator = b","
+        yield b"]"
+    elif isinstance(obj, dict) and _contains_lazy(obj):
+        yield b"{"
+        for i, (key, value) in enumerate(obj.items()):
+            yield (b"," if i else b"") + dumps_bytes(key if isinstance(key, str) else str(key)) + b":"
+            yield from _encode(value)
+        yield b"}"
+    elif isinstance(obj, (list, tuple)) and _contains_lazy(obj):
+        yield b"["
+        for i, value in enumerate(obj):
+            if i:
+                yield b","
+            yield from _encode(value)
+        yield b"]"
+    else:
+        yield dumps_bytes(obj)
+
+
+def iter_json(obj: Any, chunk_size: int = 65536) -> Iterator[bytes]:
+    """Serializa em pedaços de ~chunk_size bytes, expandindo LazyArray item a item (memória constante)."""
+    buffer = bytearray()
+    for piece in _encode(obj):
+        buffer += piece
+        if len(buffer) >= chunk_size:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse que serializa com o backend configurado."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps_bytes(content)
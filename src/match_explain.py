@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Explicação do match de rota: candidatos testados, motivo de cada rejeição e tempo por etapa
+
+O MatchTrace é passado ao mesmo matcher usado pelo tráfego (MocksManager.find_matching_mock). Com
+ele o matcher não consome chamadas de mocks com max_hits e continua testando depois do vencedor,
+para mostrar os mocks que também casariam mas perdem pela ordem.
+"""
+
+import time
+import logging
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from src.expiry import MockLimits
+
+logger = logging.getLogger(__name__)
+
+WINNER = "vencedor"
+SHADOWED = "casaria, mas perde para o vencedor"
+NO_MATCH = "path não casa com a uri"
+
+
+def limit_reason(limits: MockLimits, now: float) -> str:
+    if limits.expires_at is not None and now >= limits.expires_at:
+        return "vencido (expires_at)"
+    return "limite de chamadas atingido (max_hits)"
+
+
+class MatchTrace:
+    """Coleta o que o matcher testou, na ordem em que testou."""
+
+    def __init__(self):
+        self.candidates: List[Dict[str, Any]] = []
+        self.timings: Dict[str, float] = {}
+        self.skipped: Dict[str, int] = {}
+        self.winner: Optional[str] = None
+        self.error: Optional[str] = None
+        # Tempo das etapas internas em andamento, descontado da etapa de fora
+        self._nested: List[float] = []
+
+    def reject(self, mock_id: str, uri: str, reason: str):
+        self.candidates.append({'id': mock_id, 'uri': uri, 'resultado': "rejeitado", 'motivo': reason})
+
+    def matched(self, mock_id: str, uri: str):
+        """Mock que casa com o path: o primeiro vence, os seguintes ficam sombreados por ele."""
+        if self.winner is None:
+            self.winner = mock_id
+            self.candidates.append({'id': mock_id, 'uri': uri, 'resultado': WINNER})
+        else:
+            self.candidates.append({'id': mock_id, 'uri': uri, 'resultado': "sombreado", 'motivo': SHADOWED})
+
+    @contextmanager
+    def stage(self, name: str):
+        """Mede uma etapa em ms; etapas aninhadas não entram no tempo da etapa de fora."""
+        self._nested.append(0.0)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            own = elapsed - self._nested.pop()
+            if self._nested:
+                self._nested[-1] += elapsed
+            self.timings[name] = round(self.timings.get(name, 0.0) + own, 4)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'candidatos': self.candidates,
+            'total_candidatos': len(self.candidates),
+            'ignorados': self.skipped,
+            'tempos_ms': self.timings,
+            **({'erro': self.error} if self.error else {})
+        }
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Registro compacto de mock em memória
+
+MockRecord usa __slots__ (sem __dict__ por instância), guarda a resposta uma única vez
+(no template compilado), interna método/status e compartilha os padrões de URI compilados
+entre mocks com a mesma URI. URIs sem parâmetros nem metacaracteres de regex não guardam
+regex: o match é uma comparação de strings. Corpos estáticos grandes ficam comprimidos
+(body_compression) e só são descomprimidos ao servir.
+
+Também é um Mapping somente leitura com os campos públicos (uri, http_method, status_code,
+response, headers, variants), então as leituras devolvem o próprio registro, sem cópia.
+O namespace do mock (namespaces.py) também é legível, mas fica fora da iteração.
+"""
+
+import re
+import sys
+import weakref
+import functools
+from collections.abc import Mapping
+from typing import Any, Dict, List, Optional, Pattern, Tuple
+
+from src.body_compression import compact_template
+from src.expiry import MockLimits
+from src.namespaces import DEFAULT_NAMESPACE
+from src.template_engine import CompiledTemplate, compile_template
+from src.variants import VariantSet, compile_variants
+
+FIELDS = ("uri", "http_method", "status_code", "response", "headers", "variants")
+# Também legíveis pelo Mapping, mas fora da iteração (só existem em mocks efêmeros)
+LIMIT_FIELDS = ("expires_at", "max_hits", "hits")
+
+_REGEX_META = frozenset(".^$*+?{}[]\\|()")
+
+# Padrões compilados compartilhados: somem sozinhos quando nenhum registro os usa
+_patterns: "weakref.WeakValueDictionary[str, Pattern]" = weakref.WeakValueDictionary()
+_status_codes: Dict[int, int] = {}
+
+
+def uri_regex(uri: str) -> str:
+    """Converte URI com parâmetros dinâmicos (:nome) em regex (string)."""
+    return re.sub(r":(\w+)", r"(?P<\1>[^/]+)", uri)
+
+
+def shared_pattern(uri: str) -> Optional[Pattern]:
+    """Regex compilada da URI, compartilhada entre registros; None se a URI é literal."""
+    regex = uri_regex(uri)
+    if regex == uri and not _REGEX_META.intersection(uri):
+        return None
+    pattern = _patterns.get(regex)
+    if pattern is None:
+        pattern = re.compile(f"^{regex}$")
+        _patterns[regex] = pattern
+    return pattern
+
+
+def route_key(uri: str) -> Tuple[str, Optional[int]]:
+    """(prefixo estático, nº de segmentos) da URI, usados para pré-filtrar candidatos no banco.
+
+    O prefixo vai até a última barra antes do primeiro segmento dinâmico (parâmetro ou regex);
+    URI literal usa a URI inteira. O nº de segmentos é None quando a regex pode casar barras.
+    """
+    if ":" not in uri and not _REGEX_META.intersection(uri):
+        return uri, uri.count("/")
+    prefix = ""
+    for segment in uri.split("/")[:-1]:
+        if ":" in segment or _REGEX_META.intersection(segment):
+            break
+        prefix += segment + "/"
+    return prefix, None if _REGEX_META.intersection(uri) else uri.count("/")
+
+
+@functools.lru_cache(maxsize=65536)
+def match_order(uri: str) -> Tuple[int, bool]:
+    """Precedência quando vários mocks casam com o path (menor primeiro): prefixo estático mais longo,
+    depois nº de segmentos fixo. É o ORDER BY do qa_mock_match no banco; o desempate é pelo id nos dois."""
+    prefix, segments = route_key(uri)
+    return -len(prefix), segments is None
+
+
+def path_prefixes(path: str) -> List[str]:
+    """Prefixos do path que podem ser o prefixo estático de um mock que casa com ele."""
+    prefixes = [path[:i + 1] for i, char in enumerate(path) if char == "/"]
+    prefixes.append(path)
+    return prefixes
+
+
+def intern_status(status_code: Any) -> Any:
+    if isinstance(status_code, int):
+        return _status_codes.setdefault(status_code, status_code)
+    return status_code
+
+
+class MockRecord(Mapping):
+    """Mock em memória com padrão de URI, template e variantes já compilados."""
+
+    __slots__ = ("uri", "http_method", "status_code", "headers", "variants", "uri_pattern", "template", "variant_set",
+                 "limits", "namespace")
+
+    def __init__(self, uri: str, http_method: str, status_code: int, response: Any,
+                 headers: Optional[Dict[str, str]] = None, template: Optional[CompiledTemplate] = None,
+                 variants: Optional[List[Dict[str, Any]]] = None, variant_set: Optional[VariantSet] = None,
+                 namespace: str = DEFAULT_NAMESPACE):
+        self.uri = uri
+        self.http_method = sys.intern(http_method)
+        self.status_code = intern_status(status_code)
+        self.headers = headers or None
+        self.variants = variants or None
+        self.uri_pattern = shared_pattern(uri)
+        # Corpo estático grande fica comprimido (body_compression.CompressedTemplate)
+        self.template = compact_template(template or compile_template(response))
+        self.variant_set = variant_set or compile_variants(variants)
+        # Validade/limite de chamadas (expiry.MockLimits); None na grande maioria dos mocks
+        self.limits: Optional[MockLimits] = None
+        self.namespace = sys.intern(namespace)
+
+    @property
+    def response(self) -> Any:
+        return self.template.source
+
+    @property
+    def match_order(self) -> Tuple[int, bool]:
+        return match_order(self.uri)
+
+    def set_status(self, status_code: int):
+        self.status_code = intern_status(status_code)
+
+    def set_response(self, response: Any, template: Optional[CompiledTemplate] = None):
+        self.template = compact_template(template or compile_template(response))
+
+    def set_variants(self, variants: Optional[List[Dict[str, Any]]], variant_set: Optional[VariantSet] = None):
+        self.variants = variants or None
+        self.variant_set = variant_set or compile_variants(variants)
+
+    def copy(self) -> "MockRecord":
+        """Outro registro com as mesmas partes compiladas (imutáveis, sem recompilar) e o contador de chamadas zerado."""
+        record = MockRecord.__new__(MockRecord)
+        record.uri = self.uri
+        record.http_method = self.http_method
+        record.status_code = self.status_code
+        record.headers = self.headers
+        record.variants = self.variants
+        record.uri_pattern = self.uri_pattern
+        record.template = self.template
+        record.variant_set = self.variant_set
+        record.namespace = self.namespace
+        limits = self.limits
+        record.limits = MockLimits(limits.expires_at, limits.max_hits) if limits is not None else None
+        return record
+
+    def match(self, path: str) -> Optional[Dict[str, str]]:
+        """Variáveis da URI se o path casa com o mock; None caso contrário."""
+        if self.uri_pattern is None:
+            return {} if path == self.uri else None
+        match = self.uri_pattern.match(path)
+        return match.groupdict() if match else None
+
+    # Mapping somente leitura (visão sem cópia para get_mock)
+    def __getitem__(self, key: str) -> Any:
+        if key == "headers":
+            return self.headers or {}
+        if key == "variants":
+            return self.variants or []
+        if key in FIELDS:
+            return getattr(self, key)
+        if key in LIMIT_FIELDS:
+            return getattr(self.limits, key) if self.limits is not None else None
+        if key == "namespace":
+            return self.namespace
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(FIELDS)
+
+    def __len__(self) -> int:
+        return len(FIELDS)
+
+    def __repr__(self) -> str:
+        return f"MockRecord({self.http_method} {self.uri} -> {self.status_code})"
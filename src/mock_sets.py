@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Conjuntos de mocks: cenários nomeados e versionados de um namespace ("feliz", "degradado", "fora")
+
+Salvar copia os mocks atuais do namespace para uma nova versão do conjunto (1, 2, ...). Ativar troca
+todos os mocks do namespace pelos da versão, de uma vez:
+- em memória (e no write-behind) cada versão guarda uma RouteTable já montada, com os templates e
+  variantes compilados; ativar é trocar a referência da tabela do namespace (MockStore.replace_namespace),
+  sem compilar nada e sem janela em que o namespace fica vazio. Depois da troca a próxima tabela é
+  montada com cópias dos registros (os mocks ativos podem ser editados sem alterar o conjunto salvo);
+- no banco a troca é uma transação (remove o namespace e grava o conjunto): requisições em andamento
+  veem o conjunto antigo ou o novo, nunca metade. Os templates já compilados vão para o cache do match.
+
+Com banco os conjuntos ficam em qa_mock_sets (uma linha por versão, com os mocks em JSONB); a última
+versão de cada conjunto é carregada e compilada na inicialização.
+"""
+
+import re
+import time
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.expiry import MockLimits
+from src.mock_record import MockRecord
+from src.namespaces import RouteTable
+
+logger = logging.getLogger(__name__)
+
+_VALID_NAME = re.compile(r"[A-Za-z0-9][A-Za-z0-9_.-]{0,63}")
+
+# Campos de cada mock guardados no conjunto (a mesma forma em memória e no JSONB do banco)
+SET_FIELDS = ("id", "uri", "http_method", "status_code", "response", "headers", "variants", "expires_at", "max_hits")
+
+
+def validate_set_name(name: Any) -> str:
+    """Nome do conjunto validado (letras, dígitos, _ . -, até 64); ValueError se inválido."""
+    if not isinstance(name, str) or not _VALID_NAME.fullmatch(name):
+        raise ValueError(f"Nome de conjunto inválido: {name!r} (use letras, dígitos, _ . - e até 64 caracteres)")
+    return name
+
+
+class MockSet:
+    """Uma versão salva de um conjunto, com a tabela de rotas da próxima ativação já montada."""
+
+    __slots__ = ("namespace", "name", "version", "created_at", "mocks", "records", "_ready")
+
+    def __init__(self, namespace: str, name: str, mocks: List[Dict[str, Any]], version: int = 0,
+                 created_at: Optional[float] = None, records: Optional[List[Tuple[str, MockRecord]]] = None):
+        self.namespace = namespace
+        self.name = name
+        self.version = version
+        self.created_at = created_at or time.time()
+        self.mocks = mocks
+        # Registros mestres, compilados uma vez (ValueError se algum mock for inválido); nunca ficam ativos
+        self.records = records if records is not None else [self._compile(mock) for mock in mocks]
+        self._ready: Optional[RouteTable] = self._build()
+
+    def _compile(self, mock: Dict[str, Any]) -> Tuple[str, MockRecord]:
+        try:
+            record = MockRecord(mock['uri'], mock['http_method'], int(mock['status_code']), mock['response'],
+                                mock.get('headers'), None, mock.get('variants'), None, self.namespace)
+        except ValueError as e:
+            raise ValueError(f"{mock['http_method']} {mock['uri']}: {e}")
+        record.limits = MockLimits.create(mock.get('expires_at'), mock.get('max_hits'))
+        return mock['id'], record
+
+    def _build(self) -> RouteTable:
+        table = RouteTable()
+        for mock_id, record in self.records:
+            table.add(mock_id, record.copy())
+        return table
+
+    def take(self) -> RouteTable:
+        """Tabela pronta para ativar (passa a ser dos mocks ativos); prepare() monta a próxima."""
+        table, self._ready = self._ready or self._build(), None
+        return table
+
+    def prepare(self):
+        if self._ready is None:
+            self._ready = self._build()
+
+    def summary(self) -> Dict[str, Any]:
+        return {'name': self.name, 'version': self.version, 'mocks': len(self.mocks), 'created_at': self.created_at}
+
+
+class MockSetRegistry:
+    """Versões de conjuntos compiladas neste processo, por (namespace, nome), e o último ativado por namespace."""
+
+    def __init__(self):
+        self._sets: Dict[Tuple[str, str], Dict[int, MockSet]] = {}
+        # IDs usados pelos conjuntos (id -> nº de versões): novos mocks não os recebem, então ativar não colide
+        self._reserved: Dict[str, int] = {}
+        # namespace -> (nome, versão, quando)
+        self.active: Dict[str, Tuple[str, int, float]] = {}
+
+    def add(self, mock_set: MockSet):
+        versions = self._sets.setdefault((mock_set.namespace, mock_set.name), {})
+        previous = versions.get(mock_set.version)
+        if previous is not None:
+            self._release(previous)
+        versions[mock_set.version] = mock_set
+        for mock_id, _ in mock_set.records:
+            self._reserved[mock_id] = self._reserved.get(mock_id, 0) + 1
+
+    def _release(self, mock_set: MockSet):
+        for mock_id, _ in mock_set.records:
+            count = self._reserved.get(mock_id, 0) - 1
+            if count > 0:
+                self._reserved[mock_id] = count
+            else:
+                self._reserved.pop(mock_id, None)
+
+    def get(self, namespace: str, name: str, version: Optional[int] = None) -> Optional[MockSet]:
+        """A versão pedida, ou a última se version for None."""
+        versions = self._sets.get((namespace, name))
+        if not versions:
+            return None
+        return versions.get(max(versions) if version is None else version)
+
+    def next_version(self, namespace: str, name: str) -> int:
+        versions = self._sets.get((namespace, name))
+        return max(versions) + 1 if versions else 1
+
+    def remove(self, namespace: str, name: str) -> int:
+        """Remove todas as versões do conjunto; devolve quantas havia."""
+        versions = self._sets.pop((namespace, name), {})
+        for mock_set in versions.values():
+            self._release(mock_set)
+        active = self.active.get(namespace)
+        if active is not None and active[0] == name:
+            del self.active[namespace]
+        return len(versions)
+
+    def list(self, namespace: str) -> List[MockSet]:
+        return [mock_set for (set_namespace, name), versions in sorted(self._sets.items()) if set_namespace == namespace
+                for _, mock_set in sorted(versions.items())]
+
+    def reserved(self, mock_id: str) -> bool:
+        return mock_id in self._reserved
+
+    def mark_active(self, mock_set: MockSet):
+        self.active[mock_set.namespace] = (mock_set.name, mock_set.version, time.time())
+
+    def get_active(self, namespace: str) -> Optional[Dict[str, Any]]:
+        active = self.active.get(namespace)
+        if active is None:
+            return None
+        name, version, activated_at = active
+        return {'name': name, 'version': version, 'activated_at': activated_at}
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'sets': len(self._sets),
+            'versions_loaded': sum(len(versions) for versions in self._sets.values()),
+            'active': {namespace: f"{name}@{version}" for namespace, (name, version, _) in self.active.items()}
+        }
@@ -1,85 +1,394 @@
+import os
 import re
+import time
 import random
 import logging
-from typing import Dict, Any, List, Optional
+import functools
+import threading
+from typing import Dict, Any, List, Optional, Set, Tuple
 from src.database_manager import DatabaseManager
+from src.mock_record import MockRecord, match_order, shared_pattern, uri_regex
+from src.template_engine import CompiledTemplate, compile_template
+from src.variants import VariantSet, compile_variants
+from src.write_behind import WriteBehindQueue
+from src.change_feed import Change, ChangeFeed
+from src.response_cache import ResponseCache
+from src.expiry import ExpiryScheduler, MockLimits
+from src.match_explain import NO_MATCH, MatchTrace, limit_reason
+from src.body_compression import CompressedTemplate, compact_template
+from src.namespaces import DEFAULT_NAMESPACE, MockStore, NamespaceStats
+from src.sequences import CallCounters
+from src.mock_sets import SET_FIELDS, MockSet, MockSetRegistry
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def _comparable(mock) -> Tuple[Any, ...]:
+    """Campos de um mock comparados pela importação (importado e existente no mesmo formato)."""
+    return (int(mock['status_code']), mock['response'], mock.get('headers') or {}, mock.get('variants') or [],
+            mock.get('expires_at') or None, mock.get('max_hits') or None)
+
+_IMPORT_FIELDS = ('status_code', 'response', 'headers', 'variants', 'expires_at', 'max_hits')
+
+def _mutation(method):
+    """Serializa mutações com a troca de modo feita pela reconexão ao banco."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._mode_lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
 class MocksManager:
     def __init__(self):
         self.db_manager = DatabaseManager()
-        # Fallback em memória (usado apenas quando banco não está disponível)
-        self.memory_mocks: Dict[str, Dict[str, Any]] = {}
+        # Fallback em memória (usado apenas quando banco não está disponível); indexado por namespace e método
+        self.memory_mocks: MockStore = MockStore()
+        # Requisições e matches por namespace
+        self.namespace_stats = NamespaceStats()
+        # Compilados dos mocks lidos do banco: id -> ((response_body bruto, variants), (template, variantes))
+        self._db_templates: Dict[str, Any] = {}
+        # Write-behind (PERSISTENCE_MODE=write_behind): serve da memória e grava no banco em lotes
+        self.persistence_mode = os.getenv("PERSISTENCE_MODE", "sync").lower()
+        self.write_behind: Optional[WriteBehindQueue] = None
+        # Reconexão: mocks alterados na memória durante a queda do banco, reconciliados ao reconectar
+        self.reconcile_policy = os.getenv("RECONCILE_CONFLICT_POLICY", "memory_wins").lower()
+        self.last_reconcile: Optional[Dict[str, Any]] = None
+        self._fallback_dirty: Set[str] = set()
+        self._mode_lock = threading.RLock()
+        self.db_manager.reconnect_handler = self._reconcile_after_reconnect
+        # Feed de mudanças: aplica edições feitas por outras instâncias no mesmo banco
+        self.change_feed: Optional[ChangeFeed] = None
+        # Cache de respostas renderizadas (RESPONSE_CACHE_ENABLED=true), invalidado nas mutações
+        self.response_cache = ResponseCache.from_env()
+        # Contadores de chamadas dos mocks $sequence sem banco (com banco, a coluna hits)
+        self.call_counters = CallCounters()
+        # Conjuntos de mocks salvos (cenários por namespace), compilados e prontos para ativar
+        self.mock_sets = MockSetRegistry()
+        # Mocks efêmeros: remove os vencidos da memória e varre o banco a cada intervalo
+        self.expiry = ExpiryScheduler(self._expire_tick, interval=float(os.getenv("EXPIRY_SWEEP_INTERVAL", "1.0")))
         
         # Verifica se deve usar fallback
         if not self.db_manager.is_connected() and self.db_manager.use_database:
             logger.warning("⚠️  USANDO FALLBACK EM MEMÓRIA - Dados não serão persistidos")
+        elif self.db_manager.is_connected():
+            self._start_database_mode()
+        
+        logger.info(f"MocksManager inicializado - Modo: {self._storage_mode()}")
+    
+    def _start_database_mode(self):
+        """Inicia write-behind (se configurado) e o feed de mudanças com o banco conectado."""
+        # A seq é lida antes de carregar os mocks: o que mudar durante a carga é reaplicado pelo feed
+        after_seq = self.db_manager.get_latest_change_seq() if self.db_manager.change_feed_enabled else None
+        if self.persistence_mode == "write_behind":
+            self._start_write_behind()
+        if after_seq is not None and self.change_feed is None:
+            self.change_feed = ChangeFeed.from_env(self.db_manager, self._apply_remote_changes)
+            self.change_feed.start(after_seq)
+        self._load_mock_sets()
+        # Outras instâncias também criam mocks efêmeros: a varredura do banco roda sempre
+        self.expiry.start()
+    
+    def _start_write_behind(self):
+        """Carrega os mocks do banco para a memória e inicia o flush em lotes."""
+        for db_mock in self.db_manager.get_all_mocks():
+            self.memory_mocks[db_mock['id']] = self._record_from_database(db_mock)
+        self.write_behind = WriteBehindQueue(
+            self.db_manager,
+            self._snapshot_for_flush,
+            flush_interval=float(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL", "1.0")),
+            max_pending=int(os.getenv("WRITE_BEHIND_MAX_PENDING", "1000"))
+        )
+        self.write_behind.start()
+        logger.info(f"Write-behind: {len(self.memory_mocks)} mocks carregados do banco para a memória")
+    
+    def _load_mock_sets(self):
+        """Compila a última versão de cada conjunto salvo no banco: ativar depois não compila nada."""
+        loaded = 0
+        for row in self.db_manager.get_latest_mock_sets():
+            try:
+                self.mock_sets.add(MockSet(row['namespace'], row['name'], row['mocks'], row['version'], row['created_at']))
+                loaded += 1
+            except ValueError as e:
+                logger.error(f"Conjunto {row['namespace']}/{row['name']}@{row['version']} inválido, ignorado: {e}")
+        if loaded:
+            logger.info(f"Conjuntos de mocks: {loaded} carregados do banco")
+    
+    def _record_from_database(self, db_mock: Dict[str, Any]) -> MockRecord:
+        template, variant_set = self._compiled_from_database(db_mock)
+        self._db_templates.pop(db_mock['id'], None)
+        record = MockRecord(
+            db_mock['uri'], db_mock['http_method'], db_mock['status_code'],
+            None, db_mock.get('headers'), template,
+            db_mock.get('variants'), variant_set, db_mock.get('namespace') or DEFAULT_NAMESPACE
+        )
+        self._set_limits(db_mock['id'], record, MockLimits.create(
+            db_mock.get('expires_at'), db_mock.get('max_hits'), db_mock.get('hits') or 0
+        ))
+        return record
+    
+    def _set_limits(self, mock_id: str, record: MockRecord, limits: Optional[MockLimits]):
+        record.limits = limits
+        if limits is not None and limits.expires_at is not None:
+            self.expiry.schedule(mock_id, limits.expires_at)
+            self.expiry.start()
+    
+    def _expire_tick(self, due: List[str]):
+        """Chamado pela thread do ExpiryScheduler: remove os vencidos da memória e varre o banco."""
+        if due:
+            self._expire_memory(due)
+        if self._is_using_database():
+            expired = self.db_manager.expire_mocks()
+            if expired:
+                for mock_id in expired:
+                    self._db_templates.pop(mock_id, None)
+                    self.response_cache.invalidate(mock_id)
+                self.expiry.expired_total += len(expired)
+                logger.info(f"Expiração: {len(expired)} mocks vencidos removidos do banco")
+    
+    def _expire_memory(self, mock_ids: List[str]):
+        """Remove da memória os mocks da lista que continuam vencidos (a validade pode ter mudado)."""
+        with self._mode_lock:
+            now = time.time()
+            expired = []
+            for mock_id in mock_ids:
+                record = self.memory_mocks.get(mock_id)
+                if record is not None and record.limits is not None and record.limits.expired(now):
+                    del self.memory_mocks[mock_id]
+                    self.response_cache.invalidate(mock_id)
+                    self._mark_dirty(mock_id)
+                    expired.append(mock_id)
+        if expired:
+            self.expiry.expired_total += len(expired)
+            logger.info(f"Expiração: {len(expired)} mocks vencidos removidos da memória")
+    
+    def _apply_remote_changes(self, changes: List[Change]):
+        """Aplica mudanças de outras instâncias: relê do banco só os mocks afetados.
+
+        O estado atual de cada ID é lido do banco (existe = upsert, não existe = remoção), então
+        a ordem das mudanças não importa. Mocks com mutação local pendente no write-behind são
+        mantidos: a gravação local vem depois e prevalece. Roda na thread do feed: o match em andamento
+        continua na cópia das rotas que já tinha (MockStore.routes).
+        """
+        clear = any(op == 'C' for _, _, op in changes)
+        mock_ids = {mock_id for _, mock_id, op in changes if op != 'C'}
+        with self._mode_lock:
+            if clear:
+                self.response_cache.clear()
+            for mock_id in mock_ids:
+                self.response_cache.invalidate(mock_id)
+            if not self.write_behind:
+                # Modo banco: os caches locais são os templates compilados e as respostas
+                if clear:
+                    self._db_templates.clear()
+                for mock_id in mock_ids:
+                    self._db_templates.pop(mock_id, None)
+                return
+            if clear:
+                mock_ids.update(self.memory_mocks)
+            mock_ids = [mock_id for mock_id in mock_ids if not self.write_behind.is_pending(mock_id)]
+            rows = self.db_manager.get_mocks_by_ids(mock_ids)
+            if rows is None:
+                raise RuntimeError("banco indisponível ao reler mocks alterados")
+            by_id = {row['id']: row for row in rows}
+            for mock_id in mock_ids:
+                row = by_id.get(mock_id)
+                if row is None:
+                    self.memory_mocks.pop(mock_id, None)
+                else:
+                    self.memory_mocks[mock_id] = self._record_from_database(row)
+        logger.info(f"Feed de mudanças: {len(mock_ids)} mocks atualizados a partir de outras instâncias")
+    
+    def _snapshot_for_flush(self, mock_id: str) -> Optional[Dict[str, Any]]:
+        """Estado atual do mock para gravação no banco (None se foi removido)."""
+        record = self.memory_mocks.get(mock_id)
+        if record is None:
+            return None
+        # Corpo já comprimido em memória vai para o banco como está
+        body = ({'response_compressed': record.template.data} if isinstance(record.template, CompressedTemplate)
+                else {'response': record.response})
+        return {
+            'id': mock_id,
+            'namespace': record.namespace,
+            'uri': record.uri,
+            'http_method': record.http_method,
+            'status_code': record.status_code,
+            **body,
+            'uri_pattern': self.compile_uri_pattern(record.uri),
+            'headers': record['headers'],
+            'variants': record['variants'],
+            'expires_at': record['expires_at'],
+            'max_hits': record['max_hits'],
+            # Chamadas contadas no processo antes do mock chegar ao banco continuam no contador do banco
+            'hits': max(record['hits'] or 0, self.call_counters.peek(mock_id))
+        }
+    
+    def _mark_dirty(self, mock_id: str):
+        if self.write_behind:
+            self.write_behind.mark_dirty(mock_id)
+        elif self.db_manager.use_database:
+            # Fallback: guarda para reconciliar quando o banco voltar
+            self._fallback_dirty.add(mock_id)
+    
+    def _reconcile_after_reconnect(self) -> bool:
+        """Grava no banco os mocks criados durante a queda e troca de modo atomicamente.
+
+        1ª passada sem lock (requisições continuam sendo servidas da memória);
+        2ª passada com o lock de mutações, só com o que mudou durante a 1ª, seguida da troca de modo.
+        No write-behind a memória continua sendo a fonte da verdade: só grava a fila pendente.
+        """
+        with self._mode_lock:
+            if self.write_behind:
+                return self._resume_write_behind()
+            dirty, self._fallback_dirty = self._fallback_dirty, set()
+        rows = [row for row in map(self._snapshot_for_flush, dirty) if row]
+        logger.info(f"Reconectado: reconciliando {len(rows)} mocks da memória com o banco (política {self.reconcile_policy})")
+        stats = self.db_manager.reconcile_mocks(rows, [], self.reconcile_policy)
+        if stats is None:
+            with self._mode_lock:
+                self._fallback_dirty |= dirty
+            return False
+        written = {row['id'] for row in rows}
         
-        logger.info(f"MocksManager inicializado - Modo: {'Banco de dados' if self.db_manager.is_connected() else 'Memória (fallback)'}")
+        with self._mode_lock:
+            delta = self._fallback_dirty
+            delta_rows = [row for row in map(self._snapshot_for_flush, delta) if row]
+            delta_deletes = [mock_id for mock_id in delta if mock_id not in self.memory_mocks and mock_id in written]
+            delta_stats = self.db_manager.reconcile_mocks(delta_rows, delta_deletes, self.reconcile_policy, owned_ids=written)
+            if delta_stats is None:
+                self._fallback_dirty |= dirty
+                return False
+            for key, value in delta_stats.items():
+                stats[key] += value
+            self.last_reconcile = dict(stats, at=time.time())
+            
+            # Troca de modo: a partir daqui o banco (ou o write-behind) é a fonte da verdade
+            self._fallback_dirty = set()
+            self.memory_mocks.clear()
+            self.response_cache.clear()
+            self.db_manager.mark_connected()
+            self._start_database_mode()
+        logger.info(f"Reconciliação concluída: {stats}")
+        return True
+    
+    def _resume_write_behind(self) -> bool:
+        """Queda durante o write-behind: grava na mesma fila as mutações feitas durante a queda.
+
+        A memória não é recarregada do banco (perderia o que ainda não foi gravado) e não é criada
+        outra fila: a atual já tem os pendentes e sua thread continua rodando.
+        """
+        pending = self.write_behind.pending
+        self.db_manager.mark_connected()
+        if not self.write_behind.flush():
+            return False
+        self.last_reconcile = {'written': pending, 'at': time.time()}
+        logger.info(f"Reconectado: write-behind gravou {pending} mutações pendentes da queda")
+        return True
+    
+    def shutdown(self):
+        """Grava mutações pendentes do write-behind (chamado no shutdown da API)."""
+        self.db_manager.stop_reconnect()
+        self.expiry.stop()
+        if self.change_feed:
+            self.change_feed.stop()
+        if self.write_behind:
+            logger.info(f"Write-behind: gravando {self.write_behind.pending} mutações pendentes antes de encerrar")
+            self.write_behind.stop(flush=True)
     
     def _is_using_database(self) -> bool:
         """Verifica se está usando banco de dados ativamente."""
+        if self.write_behind:
+            return False
         return self.db_manager.is_connected()
     
+    def _storage_mode(self) -> str:
+        if self.write_behind:
+            return "Hybrid (write-behind)"
+        if self._is_using_database():
+            return "Database"
+        return "Memory (Fallback)" if self.db_manager.use_database else "Memory"
+    
     def generate_id(self) -> str:
         """Gera um ID único de 6 dígitos para cada mock."""
         while True:
             mock_id = f"{random.randint(0, 999999):06}"
-            if not self.mock_exists(mock_id):
+            if not self.mock_sets.reserved(mock_id) and not self.mock_exists(mock_id):
                 return mock_id
     
     @staticmethod
     def compile_uri_pattern_static(uri: str) -> str:
         """Converte URI com parâmetros dinâmicos em regex (string)."""
-        return re.sub(r":(\w+)", r"(?P<\1>[^/]+)", uri)
+        return uri_regex(uri)
 
     def compile_uri_pattern(self, uri: str) -> str:
         return MocksManager.compile_uri_pattern_static(uri)
     
-    def create_mock(self, uri: str, http_method: str, status_code: int, response: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> str:
-        """Cria ou atualiza mock por uri + http_method."""
+    def _compiled_from_database(self, db_mock: Dict[str, Any]):
+        """Template e variantes compilados de um mock do banco, recompilando só se o conteúdo mudou."""
+        key = (db_mock['response_body'], db_mock['response_compressed'], db_mock.get('variants'))
+        cached = self._db_templates.get(db_mock['id'])
+        if cached and cached[0] == key:
+            return cached[1]
+        try:
+            template = compact_template(compile_template(db_mock['response']), db_mock['response_compressed'])
+            compiled = (template, compile_variants(db_mock.get('variants')))
+        except ValueError as e:
+            logger.error(f"Template/variantes inválidos no mock {db_mock['id']}, servindo resposta literal: {e}")
+            compiled = (CompiledTemplate(db_mock['response'], legacy=False), None)
+        self._db_templates[db_mock['id']] = (key, compiled)
+        return compiled
+    
+    @_mutation
+    def create_mock(self, uri: str, http_method: str, status_code: int, response: Dict[str, Any], headers: Optional[Dict[str, str]] = None,
+                    variants: Optional[List[Dict[str, Any]]] = None, expires_at: Optional[float] = None,
+                    max_hits: Optional[int] = None, namespace: str = DEFAULT_NAMESPACE) -> str:
+        """Cria ou atualiza mock por uri + http_method no namespace (expires_at em epoch e max_hits tornam o mock efêmero)."""
+        # Valida template e variantes antes de gravar (lança ValueError se inválidos)
+        template = compile_template(response)
+        variant_set = compile_variants(variants)
         if self._is_using_database():
-            return self._create_mock_in_database(uri, http_method, status_code, response, headers)
+            return self._create_mock_in_database(uri, http_method, status_code, response, headers, variants, expires_at, max_hits,
+                                                 namespace)
         else:
-            return self._create_mock_in_memory(uri, http_method, status_code, response, headers)
+            return self._create_mock_in_memory(uri, http_method, status_code, response, headers, template, variants, variant_set,
+                                               expires_at, max_hits, namespace)
     
-    def _create_mock_in_database(self, uri: str, http_method: str, status_code: int, response: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> str:
+    def _create_mock_in_database(self, uri: str, http_method: str, status_code: int, response: Dict[str, Any], headers: Optional[Dict[str, str]] = None,
+                                 variants: Optional[List[Dict[str, Any]]] = None, expires_at: Optional[float] = None,
+                                 max_hits: Optional[int] = None, namespace: str = DEFAULT_NAMESPACE) -> str:
         """Cria mock no banco de dados."""
-        # Busca mock existente no banco
-        db_mocks = self.db_manager.get_all_mocks()
-        for mock in db_mocks:
-            if mock['uri'] == uri and mock['http_method'] == http_method:
-                self.db_manager.update_mock(mock['id'], status_code, response, headers=headers)
-                return mock['id']
+        # Busca mock existente no banco (consulta indexada por namespace + http_method + uri)
+        existing = self.db_manager.get_mock_by_route(uri, http_method, namespace)
+        if existing:
+            self.response_cache.invalidate(existing['id'])
+            self.db_manager.update_mock(existing['id'], status_code, response, headers=headers, variants=variants or [],
+                                        expires_at=expires_at or 0, max_hits=max_hits or 0)
+            return existing['id']
         
         # Se não existe, cria novo
         mock_id = self.generate_id()
         uri_pattern_str = self.compile_uri_pattern(uri)
-        self.db_manager.create_mock(mock_id, uri, http_method, status_code, response, uri_pattern_str, headers)
+        self.db_manager.create_mock(mock_id, uri, http_method, status_code, response, uri_pattern_str, headers, variants,
+                                    expires_at, max_hits, namespace)
         return mock_id
     
-    def _create_mock_in_memory(self, uri: str, http_method: str, status_code: int, response: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> str:
+    def _create_mock_in_memory(self, uri: str, http_method: str, status_code: int, response: Dict[str, Any], headers: Optional[Dict[str, str]] = None,
+                               template: Optional[CompiledTemplate] = None, variants: Optional[List[Dict[str, Any]]] = None,
+                               variant_set: Optional[VariantSet] = None, expires_at: Optional[float] = None,
+                               max_hits: Optional[int] = None, namespace: str = DEFAULT_NAMESPACE) -> str:
         """Cria mock na memória."""
-        # Busca mock existente na memória
-        for mock_id, mock_data in self.memory_mocks.items():
-            if mock_data['uri'] == uri and mock_data['http_method'] == http_method:
-                self.update_mock(mock_id, status_code, response, headers=headers)
-                return mock_id
+        # Busca mock existente no namespace (tabela de rotas, sem percorrer os mocks)
+        mock_id = self.memory_mocks.find_route(namespace, uri, http_method)
+        if mock_id is not None:
+            self.update_mock(mock_id, status_code, response, headers=headers, variants=variants or [],
+                             expires_at=expires_at or 0, max_hits=max_hits or 0)
+            return mock_id
         
         # Se não existe, cria novo na memória
         mock_id = self.generate_id()
-        uri_pattern_str = self.compile_uri_pattern(uri)
-        uri_pattern_compiled = re.compile(f"^{uri_pattern_str}$")
-        self.memory_mocks[mock_id] = {
-            'uri': uri,
-            'http_method': http_method,
-            'status_code': status_code,
-            'response': response,
-            'headers': headers or {},
-            'uri_pattern': uri_pattern_compiled
-        }
+        record = MockRecord(uri, http_method, status_code, response, headers, template, variants, variant_set, namespace)
+        self._set_limits(mock_id, record, MockLimits.create(expires_at, max_hits))
+        self.memory_mocks[mock_id] = record
+        self._mark_dirty(mock_id)
         return mock_id
     
     def get_mock(self, mock_id: str) -> Optional[Dict[str, Any]]:
@@ -94,28 +403,28 @@ class MocksManager:
         db_mock = self.db_manager.get_mock(mock_id)
         if db_mock:
             return {
+                'namespace': db_mock['namespace'],
                 'uri': db_mock['uri'],
                 'http_method': db_mock['http_method'],
                 'status_code': db_mock['status_code'],
                 'response': db_mock['response'],
-                'headers': db_mock.get('headers', {})
+                'headers': db_mock.get('headers', {}),
+                'variants': db_mock.get('variants') or [],
+                'expires_at': db_mock.get('expires_at'),
+                'max_hits': db_mock.get('max_hits'),
+                'hits': db_mock.get('hits')
             }
         return None
     
-    def _get_mock_from_memory(self, mock_id: str) -> Optional[Dict[str, Any]]:
-        """Recupera mock da memória."""
-        if mock_id in self.memory_mocks:
-            mock_data = self.memory_mocks[mock_id].copy()
-            # Remove o padrão compilado antes de retornar
-            mock_data.pop('uri_pattern', None)
-            return mock_data
-        return None
+    def _get_mock_from_memory(self, mock_id: str) -> Optional[MockRecord]:
+        """Recupera mock da memória (o próprio registro, como Mapping somente leitura, sem cópia)."""
+        return self.memory_mocks.get(mock_id)
     
-    def get_all_mocks(self) -> List[Dict[str, Any]]:
-        """Recupera todos os mocks."""
+    def get_all_mocks(self, namespace: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Recupera todos os mocks, ou só os do namespace."""
         if self._is_using_database():
             try:
-                db_mocks = self.db_manager.get_all_mocks()
+                db_mocks = self.db_manager.get_all_mocks(include_body=False, namespace=namespace)
                 return [
                     {
                         'id': mock['id'],
@@ -132,50 +441,404 @@ class MocksManager:
             return [
                 {
                     'id': mock_id,
-                    'uri': mock_data['uri'],
-                    'http_method': mock_data['http_method'],
-                    'status_code': mock_data['status_code']
+                    'uri': record.uri,
+                    'http_method': record.http_method,
+                    'status_code': record.status_code
                 }
-                for mock_id, mock_data in self.memory_mocks.items()
+                for mock_id, record in (self.memory_mocks.items() if namespace is None
+                                        else self.memory_mocks.namespace_items(namespace))
             ]
     
+    @_mutation
     def update_mock(self, mock_id: str, status_code: Optional[int] = None, 
-                   response: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None) -> bool:
-        """Atualiza um mock existente."""
+                   response: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None,
+                   variants: Optional[List[Dict[str, Any]]] = None, expires_at: Optional[float] = None,
+                   max_hits: Optional[int] = None) -> bool:
+        """Atualiza um mock existente (variants=[] remove as variantes; expires_at/max_hits 0 removem o limite)."""
         if not self.mock_exists(mock_id):
             return False
         
+        # Recompila template/variantes apenas quando mudam (lança ValueError se inválidos)
+        template = compile_template(response) if response is not None else None
+        variant_set = compile_variants(variants) if variants is not None else None
+        self.response_cache.invalidate(mock_id)
+        
         if self._is_using_database():
-            return self.db_manager.update_mock(mock_id, status_code, response, headers=headers)
+            return self.db_manager.update_mock(mock_id, status_code, response, headers=headers, variants=variants,
+                                               expires_at=expires_at, max_hits=max_hits)
         else:
-            if mock_id in self.memory_mocks:
-                if status_code is not None:
-                    self.memory_mocks[mock_id]['status_code'] = status_code
-                if response is not None:
-                    self.memory_mocks[mock_id]['response'] = response
-                if headers is not None:
-                    self.memory_mocks[mock_id]['headers'] = headers
+            record = self.memory_mocks.get(mock_id)
+            if record is not None:
+                self._update_record(mock_id, record, status_code, response, template, headers, variants, variant_set,
+                                    expires_at, max_hits)
+                if max_hits is not None:
+                    self._reset_database_calls([mock_id])
             return True
     
+    def _update_record(self, mock_id: str, record: MockRecord, status_code: Optional[int],
+                       response: Optional[Dict[str, Any]], template: Optional[CompiledTemplate],
+                       headers: Optional[Dict[str, str]], variants: Optional[List[Dict[str, Any]]],
+                       variant_set: Optional[VariantSet], expires_at: Optional[float], max_hits: Optional[int]):
+        if status_code is not None:
+            record.set_status(status_code)
+        if response is not None:
+            record.set_response(response, template)
+        if headers is not None:
+            record.headers = headers or None
+        if variants is not None:
+            record.set_variants(variants, variant_set)
+        if expires_at is not None or max_hits is not None:
+            current = record.limits or MockLimits()
+            self._set_limits(mock_id, record, MockLimits.create(
+                current.expires_at if expires_at is None else expires_at,
+                current.max_hits if max_hits is None else max_hits,
+                current.hits if max_hits is None else 0
+            ))
+        self._mark_dirty(mock_id)
+    
+    def _select_memory(self, ids: Optional[List[str]], uri_prefix: Optional[str], http_method: Optional[str],
+                       namespace: Optional[str] = None) -> List[Tuple[str, MockRecord]]:
+        """Mocks em memória do filtro das operações em lote (ids, prefixo da uri, método e namespace, combinados com E)."""
+        if ids is not None:
+            candidates = [(mock_id, self.memory_mocks[mock_id]) for mock_id in dict.fromkeys(ids)
+                          if mock_id in self.memory_mocks]
+        elif namespace is not None:
+            candidates = self.memory_mocks.namespace_items(namespace)
+        else:
+            candidates = self.memory_mocks.items()
+        return [(mock_id, record) for mock_id, record in candidates
+                if (not uri_prefix or record.uri.startswith(uri_prefix))
+                and (not http_method or record.http_method == http_method)
+                and (namespace is None or record.namespace == namespace)]
+    
+    @_mutation
+    def update_mocks(self, ids: Optional[List[str]] = None, uri_prefix: Optional[str] = None,
+                     http_method: Optional[str] = None, status_code: Optional[int] = None,
+                     response: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None,
+                     variants: Optional[List[Dict[str, Any]]] = None, expires_at: Optional[float] = None,
+                     max_hits: Optional[int] = None, namespace: Optional[str] = None) -> Optional[List[str]]:
+        """Atualiza em lote os mocks do filtro. Retorna os IDs atualizados (None em erro do banco).
+
+        Template e variantes são compilados uma vez e compartilhados pelos mocks do lote.
+        """
+        template = compile_template(response) if response is not None else None
+        variant_set = compile_variants(variants) if variants is not None else None
+        
+        if self._is_using_database():
+            updated = self.db_manager.update_mocks(ids, uri_prefix, http_method, status_code, response, headers,
+                                                   variants, expires_at, max_hits, namespace)
+            for mock_id in updated or ():
+                self._db_templates.pop(mock_id, None)
+                self.response_cache.invalidate(mock_id)
+            return updated
+        
+        selected = self._select_memory(ids, uri_prefix, http_method, namespace)
+        for mock_id, record in selected:
+            self.response_cache.invalidate(mock_id)
+            self._update_record(mock_id, record, status_code, response, template, headers, variants, variant_set,
+                                expires_at, max_hits)
+        if max_hits is not None:
+            self._reset_database_calls([mock_id for mock_id, _ in selected])
+        return [mock_id for mock_id, _ in selected]
+    
+    @_mutation
+    def delete_mocks(self, ids: Optional[List[str]] = None, uri_prefix: Optional[str] = None,
+                     http_method: Optional[str] = None, namespace: Optional[str] = None) -> Optional[List[str]]:
+        """Remove em lote os mocks do filtro. Retorna os IDs removidos (None em erro do banco)."""
+        if self._is_using_database():
+            deleted = self.db_manager.delete_mocks(ids, uri_prefix, http_method, namespace)
+            for mock_id in deleted or ():
+                self._db_templates.pop(mock_id, None)
+                self.response_cache.invalidate(mock_id)
+            return deleted
+        
+        deleted = [mock_id for mock_id, _ in self._select_memory(ids, uri_prefix, http_method, namespace)]
+        for mock_id in deleted:
+            del self.memory_mocks[mock_id]
+            self.response_cache.invalidate(mock_id)
+            self.call_counters.reset(mock_id)
+            self._mark_dirty(mock_id)
+        return deleted
+    
+    def _existing_routes(self, routes: List[Tuple[str, str, str]]) -> Optional[Dict[Tuple[str, str, str], Dict[str, Any]]]:
+        """Mocks existentes das rotas (namespace, http_method, uri), com o id; None em erro do banco."""
+        if self._is_using_database():
+            rows = self.db_manager.get_mocks_by_routes(routes)
+            if rows is None:
+                return None
+            return {(row['namespace'], row['http_method'], row['uri']): row for row in rows}
+        existing = {}
+        for namespace, http_method, uri in routes:
+            mock_id = self.memory_mocks.find_route(namespace, uri, http_method)
+            if mock_id is not None:
+                record = self.memory_mocks[mock_id]
+                existing[(namespace, http_method, uri)] = dict(
+                    {field: record[field] for field in _IMPORT_FIELDS}, id=mock_id)
+        return existing
+    
+    def _generate_ids(self, count: int) -> Optional[List[str]]:
+        """count IDs novos e distintos; no banco, uma consulta por rodada de sorteio (não uma por ID)."""
+        ids: Set[str] = set()
+        while len(ids) < count:
+            candidates = {f"{random.randint(0, 999999):06}" for _ in range(count - len(ids))} - ids
+            candidates = {mock_id for mock_id in candidates if not self.mock_sets.reserved(mock_id)}
+            if self._is_using_database():
+                rows = self.db_manager.get_mocks_by_ids(list(candidates))
+                if rows is None:
+                    return None
+                taken = {row['id'] for row in rows}
+            else:
+                taken = {mock_id for mock_id in candidates if mock_id in self.memory_mocks}
+            ids |= candidates - taken
+        return list(ids)
+    
+    @_mutation
+    def import_mocks(self, mocks: List[Dict[str, Any]], dry_run: bool = False) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+        """Importa mocks de uma vez, criando ou substituindo pela rota (namespace + http_method + uri).
+
+        mocks: dicts com os argumentos de create_mock. Tudo é validado antes de gravar (ValueError se algum
+        mock for inválido ou se uma rota se repetir) e gravado numa única transação no banco.
+        Retorna o diff contra os mocks existentes: {'novos', 'alterados' (com os campos que mudam), 'iguais'};
+        com dry_run nada é gravado e os novos ficam sem id. None em erro do banco.
+        """
+        compiled = []
+        for mock in mocks:
+            try:
+                compiled.append((compile_template(mock['response']), compile_variants(mock.get('variants'))))
+            except ValueError as e:
+                raise ValueError(f"{mock['http_method']} {mock['uri']}: {e}")
+        routes = [(mock.get('namespace') or DEFAULT_NAMESPACE, mock['http_method'], mock['uri']) for mock in mocks]
+        if len(set(routes)) != len(routes):
+            raise ValueError("Rota repetida no lote de importação")
+        existing = self._existing_routes(routes)
+        if existing is None:
+            return None
+        
+        diff = {'novos': [], 'alterados': [], 'iguais': []}
+        plan = []
+        for mock, route, template in zip(mocks, routes, compiled):
+            current = existing.get(route)
+            entry = {'id': current['id'] if current else None, 'namespace': route[0], 'http_method': route[1], 'uri': route[2]}
+            if current is None:
+                diff['novos'].append(entry)
+            else:
+                changed = [field for field, old, new in zip(_IMPORT_FIELDS, _comparable(current), _comparable(mock)) if old != new]
+                if not changed:
+                    diff['iguais'].append(entry)
+                    continue
+                diff['alterados'].append(dict(entry, campos=changed))
+            plan.append((entry, mock, template))
+        if dry_run or not plan:
+            return diff
+        
+        new_ids = self._generate_ids(len(diff['novos']))
+        if new_ids is None:
+            return None
+        for entry, mock_id in zip(diff['novos'], new_ids):
+            entry['id'] = mock_id
+        if self._is_using_database():
+            return diff if self._import_into_database(plan) else None
+        self._import_into_memory(plan)
+        return diff
+    
+    def _import_into_database(self, plan) -> bool:
+        rows = [
+            {
+                'id': entry['id'],
+                'namespace': entry['namespace'],
+                'uri': entry['uri'],
+                'http_method': entry['http_method'],
+                'status_code': int(mock['status_code']),
+                'response': mock['response'],
+                'uri_pattern': self.compile_uri_pattern(entry['uri']),
+                'headers': mock.get('headers'),
+                'variants': mock.get('variants'),
+                'expires_at': mock.get('expires_at'),
+                'max_hits': mock.get('max_hits')
+            }
+            for entry, mock, _ in plan
+        ]
+        if not self.db_manager.apply_batch(rows, []):
+            return False
+        for row in rows:
+            self._db_templates.pop(row['id'], None)
+            self.response_cache.invalidate(row['id'])
+        return True
+    
+    def _import_into_memory(self, plan):
+        for entry, mock, (template, variant_set) in plan:
+            mock_id = entry['id']
+            record = self.memory_mocks.get(mock_id)
+            if record is not None:
+                self.response_cache.invalidate(mock_id)
+                self._update_record(mock_id, record, int(mock['status_code']), mock['response'], template,
+                                    mock.get('headers') or {}, mock.get('variants') or [], variant_set,
+                                    mock.get('expires_at') or 0, mock.get('max_hits') or 0)
+                continue
+            record = MockRecord(entry['uri'], entry['http_method'], int(mock['status_code']), mock['response'],
+                                mock.get('headers'), template, mock.get('variants'), variant_set, entry['namespace'])
+            self._set_limits(mock_id, record, MockLimits.create(mock.get('expires_at'), mock.get('max_hits')))
+            self.memory_mocks[mock_id] = record
+            self._mark_dirty(mock_id)
+    
+    @_mutation
     def delete_mock(self, mock_id: str) -> bool:
         """Remove um mock."""
         if not self.mock_exists(mock_id):
             return False
         
+        self.response_cache.invalidate(mock_id)
+        self.call_counters.reset(mock_id)
         if self._is_using_database():
+            self._db_templates.pop(mock_id, None)
             return self.db_manager.delete_mock(mock_id)
         else:
             self.memory_mocks.pop(mock_id, None)
+            self._mark_dirty(mock_id)
             return True
     
-    def delete_all_mocks(self) -> bool:
-        """Remove todos os mocks."""
+    @_mutation
+    def delete_all_mocks(self, namespace: Optional[str] = None) -> bool:
+        """Remove todos os mocks, ou só os do namespace (zerando também os contadores dele)."""
+        if namespace is not None:
+            self.namespace_stats.reset(namespace)
+            return self.delete_mocks(namespace=namespace) is not None
+        self.response_cache.clear()
+        self.call_counters.reset()
         if self._is_using_database():
+            self._db_templates.clear()
             return self.db_manager.delete_all_mocks()
         else:
             self.memory_mocks.clear()
+            self.expiry.clear()
+            self._fallback_dirty.clear()
+            if self.write_behind:
+                self.write_behind.mark_clear()
             return True
     
+    def _sets_in_database(self) -> bool:
+        """Conjuntos gravados no banco (modo banco e write-behind); sem banco, só neste processo."""
+        return bool(self.write_behind) or self._is_using_database()
+    
+    @_mutation
+    def save_mock_set(self, name: str, namespace: str = DEFAULT_NAMESPACE) -> Optional[Dict[str, Any]]:
+        """Salva os mocks atuais do namespace como nova versão do conjunto. Retorna o resumo (None em erro do banco)."""
+        if self._is_using_database():
+            rows = self.db_manager.get_all_mocks(namespace=namespace)
+            mocks = [{field: row[field] for field in SET_FIELDS} for row in rows]
+            mock_set = MockSet(namespace, name, mocks)
+        else:
+            items = self.memory_mocks.namespace_items(namespace)
+            mocks = [dict({field: record[field] for field in SET_FIELDS[1:]}, id=mock_id) for mock_id, record in items]
+            # Mesmos templates e variantes dos mocks ativos (imutáveis): nada é recompilado
+            mock_set = MockSet(namespace, name, mocks, records=[(mock_id, record.copy()) for mock_id, record in items])
+        if self._sets_in_database():
+            saved = self.db_manager.save_mock_set(namespace, name, mocks)
+            if saved is None:
+                return None
+            mock_set.version, mock_set.created_at = saved['version'], saved['created_at']
+        else:
+            mock_set.version = self.mock_sets.next_version(namespace, name)
+        self.mock_sets.add(mock_set)
+        logger.info(f"Conjunto {namespace}/{name}@{mock_set.version} salvo com {len(mocks)} mocks")
+        return mock_set.summary()
+    
+    def _get_mock_set(self, namespace: str, name: str, version: Optional[int] = None) -> Optional[MockSet]:
+        """Versão do conjunto compilada; com banco, a versão vem do banco (pode ter sido salva por outra instância)."""
+        if not self._sets_in_database():
+            return self.mock_sets.get(namespace, name, version)
+        info = self.db_manager.get_mock_set(namespace, name, version, include_mocks=False)
+        if info is None:
+            return None
+        mock_set = self.mock_sets.get(namespace, name, info['version'])
+        if mock_set is None:
+            row = self.db_manager.get_mock_set(namespace, name, info['version'])
+            if row is None:
+                return None
+            mock_set = MockSet(namespace, name, row['mocks'], row['version'], row['created_at'])
+            self.mock_sets.add(mock_set)
+        return mock_set
+    
+    def mock_set_exists(self, name: str, version: Optional[int] = None, namespace: str = DEFAULT_NAMESPACE) -> bool:
+        return self._get_mock_set(namespace, name, version) is not None
+    
+    @_mutation
+    def activate_mock_set(self, name: str, version: Optional[int] = None,
+                          namespace: str = DEFAULT_NAMESPACE) -> Optional[Dict[str, Any]]:
+        """Troca todos os mocks do namespace pelos da versão do conjunto (a última se version for None).
+
+        Em memória é a troca da tabela de rotas já montada; no banco, uma transação. Contadores de chamadas
+        e o cache de respostas dos mocks envolvidos recomeçam. Retorna o resumo com os IDs removidos
+        (None se o conjunto não existe ou em erro do banco); ValueError se um ID do conjunto está em outro namespace.
+        """
+        mock_set = self._get_mock_set(namespace, name, version)
+        if mock_set is None:
+            return None
+        if self._is_using_database():
+            removed = self._activate_in_database(mock_set)
+            if removed is None:
+                return None
+        else:
+            removed = self._activate_in_memory(mock_set)
+        for mock_id in set(removed).union(mock_id for mock_id, _ in mock_set.records):
+            self.response_cache.invalidate(mock_id)
+            self.call_counters.reset(mock_id)
+        self.mock_sets.mark_active(mock_set)
+        logger.info(f"Conjunto {namespace}/{name}@{mock_set.version} ativado: {len(mock_set.records)} mocks "
+                    f"(saíram {len(removed)})")
+        return dict(mock_set.summary(), removidos=len(removed))
+    
+    def _activate_in_memory(self, mock_set: MockSet) -> List[str]:
+        table = mock_set.take()
+        try:
+            removed = self.memory_mocks.replace_namespace(mock_set.namespace, table)
+        except ValueError:
+            mock_set.prepare()
+            raise
+        # Fora do caminho das requisições: validade dos efêmeros, write-behind e a tabela da próxima ativação
+        for mock_id, record in table.items():
+            if record.limits is not None:
+                self._set_limits(mock_id, record, record.limits)
+            self._mark_dirty(mock_id)
+        for mock_id in removed:
+            self._mark_dirty(mock_id)
+        self._reset_database_calls([mock_id for mock_id, _ in table.items()])
+        mock_set.prepare()
+        return removed
+    
+    def _activate_in_database(self, mock_set: MockSet) -> Optional[List[str]]:
+        rows = [dict(mock, namespace=mock_set.namespace, uri_pattern=self.compile_uri_pattern(mock['uri']))
+                for mock in mock_set.mocks]
+        removed = self.db_manager.replace_namespace(mock_set.namespace, rows)
+        if removed is None:
+            return None
+        for mock_id in removed:
+            self._db_templates.pop(mock_id, None)
+        # Templates já compilados do conjunto entram no cache do match (chave igual à da linha gravada)
+        for mock, (mock_id, record) in zip(mock_set.mocks, mock_set.records):
+            body = self.db_manager.body_columns(mock['response'])
+            key = (body['response_body'], body['response_compressed'], mock.get('variants') or [])
+            self._db_templates[mock_id] = (key, (record.template, record.variant_set))
+        return removed
+    
+    def list_mock_sets(self, namespace: str = DEFAULT_NAMESPACE) -> Optional[List[Dict[str, Any]]]:
+        """Versões dos conjuntos do namespace (None em erro do banco)."""
+        if self._sets_in_database():
+            rows = self.db_manager.list_mock_sets(namespace)
+            if rows is None:
+                return None
+            return [{'name': row['name'], 'version': row['version'], 'mocks': row['count'],
+                     'created_at': row['created_at']} for row in rows]
+        return [mock_set.summary() for mock_set in self.mock_sets.list(namespace)]
+    
+    @_mutation
+    def delete_mock_set(self, name: str, namespace: str = DEFAULT_NAMESPACE) -> Optional[int]:
+        """Remove todas as versões do conjunto (os mocks ativos ficam). Retorna quantas eram (None em erro do banco)."""
+        removed = self.mock_sets.remove(namespace, name)
+        if self._sets_in_database():
+            return self.db_manager.delete_mock_set(namespace, name)
+        return removed
+    
     def mock_exists(self, mock_id: str) -> bool:
         """Verifica se um mock existe."""
         if self._is_using_database():
@@ -183,58 +846,234 @@ class MocksManager:
         else:
             return mock_id in self.memory_mocks
     
-    def find_matching_mock(self, path: str, method: str) -> Optional[Dict[str, Any]]:
-        """Encontra um mock que corresponde ao path e método."""
+    def find_matching_mock(self, path: str, method: str, trace: Optional[MatchTrace] = None,
+                           namespace: str = DEFAULT_NAMESPACE) -> Optional[Dict[str, Any]]:
+        """Encontra um mock do namespace que corresponde ao path e método.
+
+        Só os mocks do namespace são testados. Com trace, registra os candidatos sem consumir chamadas.
+        """
         if self._is_using_database():
-            return self._find_mock_in_database(path, method)
+            match = self._find_mock_in_database(path, method, trace, namespace)
         else:
-            return self._find_mock_in_memory(path, method)
+            match = self._find_mock_in_memory(path, method, trace, namespace)
+        if trace is None:
+            self.namespace_stats.record(namespace, match is not None)
+        return match
     
-    def _find_mock_in_database(self, path: str, method: str) -> Optional[Dict[str, Any]]:
+    def _find_mock_in_database(self, path: str, method: str, trace: Optional[MatchTrace] = None,
+                               namespace: str = DEFAULT_NAMESPACE) -> Optional[Dict[str, Any]]:
         """Busca mock no banco de dados."""
-        db_mocks = self.db_manager.get_all_mocks()
+        if trace is not None:
+            mock = self._database_candidate(path, method.upper(), namespace, trace)
+            return self._count_call(self._database_match(mock, path), mock['hits'], trace) if mock else None
+        # Mock com max_hits só vale se o contador ainda não chegou ao limite (corrida entre requisições)
+        for _ in range(3):
+            mock = self._database_candidate(path, method.upper(), namespace)
+            if mock is None:
+                return None
+            if mock.get('max_hits') is None:
+                return self._count_call(self._database_match(mock, path))
+            hits = self.db_manager.consume_hit(mock['id'])
+            if hits is not None:
+                return self._count_call(self._database_match(mock, path), hits)
+        return None
+    
+    def _database_candidate(self, path: str, method: str, namespace: str,
+                            trace: Optional[MatchTrace] = None) -> Optional[Dict[str, Any]]:
+        if self.db_manager.route_matching == "sql":
+            matched = self.db_manager.match_route(path, method, namespace)
+            # None = erro no banco (ex.: regex que o PostgreSQL não aceita): tenta o scan no Python
+            if matched is not None:
+                if trace is not None:
+                    with trace.stage("candidatos_banco"):
+                        self._trace_database_candidates(path, method, namespace, trace)
+                return matched[0] if matched else None
+        
+        now = time.time()
+        # Sem os corpos: só o do vencedor é lido no final
+        db_mocks = self.db_manager.get_all_mocks(include_body=False, namespace=namespace)
+        # Mesma precedência do match no SQL e em memória
+        db_mocks.sort(key=lambda mock: (match_order(mock['uri']), mock['id']))
+        winner = None
         for mock in db_mocks:
-            if mock['http_method'] == method.upper():
+            if mock['http_method'] == method:
+                limits = MockLimits.create(mock.get('expires_at'), mock.get('max_hits'), mock.get('hits') or 0)
+                if limits is not None and limits.expired(now):
+                    if trace is not None:
+                        trace.reject(mock['id'], mock['uri'], limit_reason(limits, now))
+                    continue
                 pattern = re.compile(f"^{self.compile_uri_pattern(mock['uri'])}$")
-                match = pattern.match(path)
-                if match:
-                    return {
-                        'mock_id': mock['id'],
-                        'status_code': mock['status_code'],
-                        'response': mock['response'],
-                        'headers': mock.get('headers', {}),
-                        'variables': match.groupdict()
-                    }
-        return None
+                if pattern.match(path):
+                    if trace is None:
+                        return self.db_manager.get_mock(mock['id'])
+                    winner = winner or mock
+                    trace.matched(mock['id'], mock['uri'])
+                elif trace is not None:
+                    trace.reject(mock['id'], mock['uri'], NO_MATCH)
+            elif trace is not None:
+                trace.skipped['metodo'] = trace.skipped.get('metodo', 0) + 1
+        return self.db_manager.get_mock(winner['id']) if winner else None
     
-    def _find_mock_in_memory(self, path: str, method: str) -> Optional[Dict[str, Any]]:
-        """Busca mock na memória."""
-        for mock_id, mock_data in self.memory_mocks.items():
-            if mock_data['http_method'] == method.upper():
-                match = mock_data['uri_pattern'].match(path)
-                if match:
-                    return {
-                        'mock_id': mock_id,
-                        'status_code': mock_data['status_code'],
-                        'response': mock_data['response'],
-                        'headers': mock_data.get('headers', {}),
-                        'variables': match.groupdict()
-                    }
-        return None
+    def _trace_database_candidates(self, path: str, method: str, namespace: str, trace: MatchTrace):
+        """Candidatos do match no banco (os que o índice ix_qa_api_route deixa passar), na ordem de desempate."""
+        rows = self.db_manager.explain_route(path, method, namespace)
+        if rows is None:
+            trace.error = "Erro ao listar candidatos no banco"
+            return
+        candidates, skipped = rows
+        trace.skipped['indice'] = skipped
+        for row in candidates:
+            if not row['path_ok']:
+                trace.reject(row['id'], row['uri'], NO_MATCH)
+            elif not row['valid']:
+                trace.reject(row['id'], row['uri'], "vencido (expires_at)")
+            elif not row['has_hits']:
+                trace.reject(row['id'], row['uri'], "limite de chamadas atingido (max_hits)")
+            else:
+                trace.matched(row['id'], row['uri'])
+    
+    def _database_match(self, mock: Dict[str, Any], path: str) -> Dict[str, Any]:
+        pattern = shared_pattern(mock['uri'])
+        match = pattern.match(path) if pattern else None
+        template, variant_set = self._compiled_from_database(mock)
+        return {
+            'mock_id': mock['id'],
+            'status_code': mock['status_code'],
+            'template': template,
+            'variant_set': variant_set,
+            'headers': mock.get('headers', {}),
+            'variables': match.groupdict() if match else {}
+        }
+    
+    def _find_mock_in_memory(self, path: str, method: str, trace: Optional[MatchTrace] = None,
+                             namespace: str = DEFAULT_NAMESPACE) -> Optional[Dict[str, Any]]:
+        """Busca mock na memória (só nos mocks do namespace com o método, na ordem de precedência)."""
+        method = method.upper()
+        now = None
+        winner = None
+        routes = self.memory_mocks.routes(namespace, method)
+        for mock_id, record in routes.items():
+            # Mock efêmero vencido (ainda não removido pelo ExpiryScheduler): uma comparação, sem varredura
+            limits = record.limits
+            if limits is not None:
+                now = now or time.time()
+                if limits.expired(now):
+                    if trace is not None:
+                        trace.reject(mock_id, record.uri, limit_reason(limits, now))
+                    continue
+            variables = record.match(path)
+            if variables is not None:
+                if trace is not None:
+                    # Explicação: não consome chamadas e segue testando para mostrar os sombreados
+                    winner = winner or self._count_call(self._memory_match(mock_id, record, variables), trace=trace)
+                    trace.matched(mock_id, record.uri)
+                    continue
+                if limits is not None:
+                    self._consume_memory_hit(mock_id, limits)
+                match = self._memory_match(mock_id, record, variables)
+                return match if record.template.sequence is None else self._count_call(match)
+            if trace is not None:
+                trace.reject(mock_id, record.uri, NO_MATCH)
+        if trace is not None:
+            trace.skipped['metodo'] = self.memory_mocks.namespace_size(namespace) - len(routes)
+        return winner
+    
+    @staticmethod
+    def _memory_match(mock_id: str, record: MockRecord, variables: Dict[str, str]) -> Dict[str, Any]:
+        return {
+            'mock_id': mock_id,
+            'status_code': record.status_code,
+            'template': record.template,
+            'variant_set': record.variant_set,
+            'headers': record['headers'],
+            'variables': variables
+        }
+    
+    def _count_call(self, match: Dict[str, Any], hits: Optional[int] = None,
+                    trace: Optional[MatchTrace] = None) -> Dict[str, Any]:
+        """Número da chamada (0 = primeira) em match['call'], só nos mocks com $sequence.
+
+        Com banco (modo banco e write-behind) o contador é a coluna hits, incrementada com UPDATE ... RETURNING:
+        compartilhado entre workers e instâncias. Sem banco (ou mock ainda não gravado pelo write-behind),
+        o contador do processo, que o flush do write-behind leva para a coluna hits. hits: valor já incrementado pelo max_hits (com trace, o atual, sem consumir).
+        """
+        if match['template'].sequence is None:
+            return match
+        mock_id = match['mock_id']
+        if trace is not None:
+            if hits is None and self.write_behind:
+                row = self.db_manager.get_mock(mock_id)
+                hits = row['hits'] if row else None
+            match['call'] = self.call_counters.peek(mock_id) if hits is None else hits
+            return match
+        if hits is None and (self.write_behind or self._is_using_database()):
+            hits = self.db_manager.next_call(mock_id)
+        match['call'] = self.call_counters.next(mock_id) if hits is None else hits - 1
+        return match
+    
+    @_mutation
+    def reset_calls(self, mock_id: str) -> bool:
+        """Zera o contador de chamadas do mock: o $sequence volta à primeira resposta e o max_hits recomeça."""
+        if not self.mock_exists(mock_id):
+            return False
+        self.call_counters.reset(mock_id)
+        record = self.memory_mocks.get(mock_id)
+        if record is not None and record.limits is not None:
+            record.limits.hits = 0
+            self._mark_dirty(mock_id)
+        if self.write_behind or self._is_using_database():
+            return self.db_manager.reset_calls([mock_id])
+        return True
+    
+    def _reset_database_calls(self, mock_ids: List[str]):
+        """Write-behind: o flush só avança a coluna hits, então zerar o contador vai direto ao banco."""
+        if self.write_behind and mock_ids and not self.db_manager.reset_calls(mock_ids):
+            logger.warning(f"Write-behind: não foi possível zerar o contador de {len(mock_ids)} mocks no banco")
+    
+    def _consume_memory_hit(self, mock_id: str, limits: MockLimits):
+        limits.hits += 1
+        if limits.max_hits is not None:
+            self._mark_dirty(mock_id)
+            if limits.hits >= limits.max_hits:
+                # Última chamada permitida: esta resposta ainda é servida, o mock sai agora
+                self._expire_memory([mock_id])
+    
+    def get_namespaces(self) -> List[Dict[str, Any]]:
+        """Namespaces com mocks ou tráfego: número de mocks, requisições, matches e 404s."""
+        if self._is_using_database():
+            counts = self.db_manager.count_by_namespace()
+        else:
+            counts = {namespace: table.size for namespace, table in self.memory_mocks.namespaces.items()}
+        return self.namespace_stats.get_stats(counts)
     
     def get_status(self) -> Dict[str, Any]:
         """Retorna status do sistema."""
         if self._is_using_database():
-            total_mocks = len(self.db_manager.get_all_mocks())
-            storage_mode = "Database"
+            total_mocks = self.db_manager.count_mocks()
         else:
             total_mocks = len(self.memory_mocks)
-            storage_mode = "Memory (Fallback)" if self.db_manager.use_database else "Memory"
         
-        return {
+        status = {
             'database_connected': self.db_manager.is_connected(),
-            'storage_mode': storage_mode,
+            'storage_mode': self._storage_mode(),
             'total_mocks': total_mocks,
             'use_database': self.db_manager.use_database,
-            'fallback_to_memory': self.db_manager.fallback_to_memory
+            'fallback_to_memory': self.db_manager.fallback_to_memory,
+            'persistence_mode': self.persistence_mode
         }
+        if self.write_behind:
+            status['write_behind'] = self.write_behind.get_stats()
+        if self.change_feed:
+            status['change_feed'] = self.change_feed.get_stats()
+        if self.response_cache.enabled:
+            status['response_cache'] = self.response_cache.get_stats()
+        status['expiry'] = {'scheduled': self.expiry.scheduled, 'expired_total': self.expiry.expired_total}
+        status['mock_sets'] = self.mock_sets.get_stats()
+        if self.db_manager.use_database:
+            status['database_pool'] = self.db_manager.get_pool_status()
+            status['reconnect'] = dict(
+                self.db_manager.get_reconnect_status(),
+                pending_reconcile=len(self._fallback_dirty),
+                last_reconcile=self.last_reconcile
+            )
+        return status
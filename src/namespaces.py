@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Namespaces: conjuntos de mocks separados por time/projeto
+
+Cada mock pertence a um namespace ("default" se nenhum for informado). Uma requisição escolhe o
+namespace, nesta ordem, pelo prefixo do path (/ns/<nome>/..., removido antes do match), pelo header
+X-Mock-Namespace ou pelo host (<nome><NAMESPACE_HOST_SUFFIX>).
+
+Em memória o MockStore (id -> MockRecord) mantém uma tabela de rotas por namespace e método, então
+o match percorre só os mocks do namespace da requisição. No banco a coluna namespace é a primeira
+dos índices de rota.
+
+O match percorre as rotas sem lock, enquanto a expiração e o feed de mudanças alteram a tabela em
+outras threads: o match recebe uma cópia por método que nunca é alterada (copy-on-write). A cópia é
+feita na primeira leitura depois de uma alteração, então criar milhares de mocks seguidos não copia
+a tabela a cada mock. A cópia já vem na ordem de precedência do match (MockRecord.match_order e o
+id, a mesma do banco): o primeiro mock que casa é o vencedor nos dois modos.
+"""
+
+import os
+import re
+import sys
+import logging
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_NAMESPACE = "default"
+_VALID_NAME = re.compile(r"[A-Za-z0-9][A-Za-z0-9_.-]{0,63}")
+# Contadores de namespaces além deste limite (ex.: headers arbitrários) vão para um só balde
+_OVERFLOW = "(outros)"
+
+
+def validate_namespace(name: Any) -> str:
+    """Nome do namespace validado (letras, dígitos, _ . -, até 64); ValueError se inválido."""
+    if not isinstance(name, str) or not _VALID_NAME.fullmatch(name):
+        raise ValueError(f"Namespace inválido: {name!r} (use letras, dígitos, _ . - e até 64 caracteres)")
+    return sys.intern(name)
+
+
+class NamespaceResolver:
+    """Escolhe o namespace da requisição pelo prefixo do path, header ou host."""
+
+    def __init__(self, path_prefix: str = "/ns/", header: str = "x-mock-namespace", host_suffix: str = ""):
+        self.path_prefix = path_prefix
+        self.header = header.lower()
+        self.host_suffix = host_suffix.lower()
+
+    @classmethod
+    def from_env(cls) -> "NamespaceResolver":
+        return cls(
+            path_prefix=os.getenv("NAMESPACE_PATH_PREFIX", "/ns/"),
+            header=os.getenv("NAMESPACE_HEADER", "X-Mock-Namespace"),
+            host_suffix=os.getenv("NAMESPACE_HOST_SUFFIX", "")
+        )
+
+    def resolve(self, path: str, headers: Mapping[str, str]) -> Tuple[str, str]:
+        """(namespace, path sem o prefixo do namespace); ValueError se o nome for inválido.
+
+        headers: mapeamento com chaves minúsculas (ex.: request.headers do Starlette).
+        """
+        if self.path_prefix and path.startswith(self.path_prefix):
+            name, _, rest = path[len(self.path_prefix):].partition("/")
+            return validate_namespace(name), "/" + rest
+        return self.from_headers(headers), path
+
+    def from_headers(self, headers: Mapping[str, str]) -> str:
+        """Namespace pelo header ou pelo host (usado também pela API de administração)."""
+        name = headers.get(self.header) if self.header else None
+        if name:
+            return validate_namespace(name)
+        if self.host_suffix:
+            host = (headers.get("host") or "").split(":")[0].lower()
+            if host.endswith(self.host_suffix) and len(host) > len(self.host_suffix):
+                return validate_namespace(host[:-len(self.host_suffix)])
+        return DEFAULT_NAMESPACE
+
+
+class RouteTable:
+    """Mocks de um namespace por método, na ordem de criação.
+
+    by_method só é alterado por quem escreve (com o lock de mutações); o match lê view(), uma cópia
+    imutável por método na ordem de precedência, e continua percorrendo a cópia antiga se a tabela
+    mudar no meio.
+    """
+
+    __slots__ = ("by_method", "by_route", "size", "_views")
+
+    def __init__(self):
+        self.by_method: Dict[str, Dict[str, Any]] = {}
+        # (método, uri) -> id: acha o mock existente ao criar, sem percorrer o namespace
+        self.by_route: Dict[Tuple[str, str], str] = {}
+        self.size = 0
+        # método -> cópia servida ao match; trocado por um dict novo (não esvaziado) a cada alteração
+        self._views: Dict[str, Dict[str, Any]] = {}
+
+    def view(self, http_method: str) -> Dict[str, Any]:
+        """Cópia das rotas do método para o match (id -> registro), na ordem de precedência; nunca é
+        alterada depois de entregue."""
+        views = self._views
+        view = views.get(http_method)
+        if view is None:
+            routes = self.by_method.get(http_method)
+            # sorted() lista os itens sem executar código Python (chaves str), então não vê uma alteração
+            # pela metade. Se a tabela mudar durante a cópia, views já foi substituído e a cópia é descartada.
+            view = views[http_method] = dict(sorted(routes.items(), key=_match_key)) if routes else {}
+        return view
+
+    def add(self, mock_id: str, record: Any):
+        routes = self.by_method.get(record.http_method)
+        if routes is None:
+            routes = self.by_method[record.http_method] = {}
+        if mock_id not in routes:
+            self.size += 1
+        routes[mock_id] = record
+        self._views = {}
+        self.by_route.setdefault((record.http_method, record.uri), mock_id)
+
+    def remove(self, mock_id: str, record: Any):
+        routes = self.by_method.get(record.http_method)
+        if routes is None or routes.pop(mock_id, None) is None:
+            return
+        self._views = {}
+        self.size -= 1
+        if not routes:
+            del self.by_method[record.http_method]
+        route = (record.http_method, record.uri)
+        if self.by_route.get(route) == mock_id:
+            del self.by_route[route]
+            # Outro mock com a mesma rota (ex.: vindo do feed de mudanças) passa a ser o encontrado
+            for other_id, other in routes.items():
+                if other.uri == record.uri:
+                    self.by_route[route] = other_id
+                    break
+
+    def items(self) -> List[Tuple[str, Any]]:
+        """(id, registro) por método, na ordem de criação dentro do método."""
+        return [item for routes in self.by_method.values() for item in routes.items()]
+
+
+def _match_key(item: Tuple[str, Any]) -> Tuple[Any, str]:
+    mock_id, record = item
+    return record.match_order, mock_id
+
+
+class MockStore(dict):
+    """Mocks em memória por ID, com as tabelas de rotas por namespace mantidas a cada alteração."""
+
+    _EMPTY: Dict[str, Any] = {}
+
+    def __init__(self):
+        super().__init__()
+        self.namespaces: Dict[str, RouteTable] = {}
+
+    def __setitem__(self, mock_id: str, record: Any):
+        previous = self.get(mock_id)
+        if previous is not None and previous is not record:
+            self._unindex(mock_id, previous)
+        super().__setitem__(mock_id, record)
+        table = self.namespaces.get(record.namespace)
+        if table is None:
+            table = self.namespaces[record.namespace] = RouteTable()
+        table.add(mock_id, record)
+
+    def __delitem__(self, mock_id: str):
+        self._unindex(mock_id, self[mock_id])
+        super().__delitem__(mock_id)
+
+    def pop(self, mock_id: str, *default):
+        if mock_id not in self:
+            return super().pop(mock_id, *default)
+        record = super().pop(mock_id)
+        self._unindex(mock_id, record)
+        return record
+
+    def clear(self):
+        super().clear()
+        self.namespaces.clear()
+
+    def replace_namespace(self, namespace: str, table: RouteTable) -> List[str]:
+        """Troca todos os mocks do namespace pelos da tabela já montada; devolve os IDs que saíram.
+
+        O match lê a tabela do namespace por uma única referência: a troca é uma atribuição, então uma
+        requisição vê a tabela antiga inteira ou a nova inteira. O índice por ID é ajustado depois,
+        fora do caminho das requisições. ValueError se um ID da tabela pertence a outro namespace.
+        """
+        for mock_id, record in table.items():
+            current = self.get(mock_id)
+            if current is not None and current.namespace != namespace:
+                raise ValueError(f"ID {mock_id} já é usado por um mock do namespace {current.namespace}")
+        old = self.namespaces.get(namespace)
+        if table.size:
+            self.namespaces[namespace] = table
+        else:
+            self.namespaces.pop(namespace, None)
+        removed = [mock_id for mock_id, _ in old.items()] if old is not None else []
+        for mock_id in removed:
+            dict.pop(self, mock_id, None)
+        for mock_id, record in table.items():
+            dict.__setitem__(self, mock_id, record)
+        return removed
+
+    def _unindex(self, mock_id: str, record: Any):
+        table = self.namespaces.get(record.namespace)
+        if table is not None:
+            table.remove(mock_id, record)
+            if not table.size:
+                del self.namespaces[record.namespace]
+
+    def routes(self, namespace: str, http_method: str) -> Dict[str, Any]:
+        """Mocks do namespace com o método (id -> registro), na ordem de precedência do match; cópia que não muda durante o match."""
+        table = self.namespaces.get(namespace)
+        if table is None:
+            return self._EMPTY
+        view = table._views.get(http_method)
+        return view if view is not None else table.view(http_method)
+
+    def find_route(self, namespace: str, uri: str, http_method: str) -> Optional[str]:
+        table = self.namespaces.get(namespace)
+        return table.by_route.get((http_method, uri)) if table is not None else None
+
+    def namespace_size(self, namespace: str) -> int:
+        table = self.namespaces.get(namespace)
+        return table.size if table is not None else 0
+
+    def namespace_items(self, namespace: str) -> List[Tuple[str, Any]]:
+        """(id, registro) do namespace, por método e na ordem de criação dentro do método."""
+        table = self.namespaces.get(namespace)
+        return table.items() if table is not None else []
+
+
+class NamespaceStats:
+    """Requisições e matches por namespace (contados pelo tráfego, não pela explicação)."""
+
+    def __init__(self, max_namespaces: int = 1000):
+        self.max_namespaces = max_namespaces
+        # namespace -> [requisições, com mock]
+        self._counters: Dict[str, List[int]] = {}
+
+    def record(self, namespace: str, matched: bool):
+        counters = self._counters.get(namespace)
+        if counters is None:
+            if len(self._counters) >= self.max_namespaces:
+                namespace = _OVERFLOW
+            counters = self._counters.setdefault(namespace, [0, 0])
+        counters[0] += 1
+        if matched:
+            counters[1] += 1
+
+    def reset(self, namespace: str):
+        self._counters.pop(namespace, None)
+
+    def get_stats(self, mock_counts: Dict[str, int]) -> List[Dict[str, Any]]:
+        """Uma entrada por namespace com mocks ou com tráfego registrado."""
+        stats = []
+        for name in sorted(set(mock_counts) | set(self._counters)):
+            requests, matched = self._counters.get(name, (0, 0))
+            stats.append({
+                'namespace': name,
+                'mocks': mock_counts.get(name, 0),
+                'requests': requests,
+                'matched': matched,
+                'not_found': requests - matched
+            })
+        return stats
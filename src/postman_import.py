@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Importação de coleções do Postman (v2.0/v2.1) como mocks
+
+Cada coleção tem duas fontes de mocks:
+- requisições para POST /mocks/configurar/endpoint (como as das coleções QA_MOCK_DINAMICO): o corpo
+  é a própria configuração (objeto ou lista, comentários // permitidos), importada como se a
+  requisição tivesse sido executada (?namespace= da URL e o campo "namespace" de cada item valem);
+- qualquer outra requisição com exemplos de resposta salvos: vira um mock com o método e o path da
+  URL e o primeiro exemplo como resposta (status, corpo e headers). Exemplos seguintes cujo
+  originalRequest difere em parâmetros de path ou de query viram variantes (when path.x / query.x).
+
+Paths: {{var}} e :param viram parâmetros do mock (/users/{{userId}} -> /users/:userId) e o host
+(inclusive {{baseUrl}}) é descartado. Corpo de exemplo que não é JSON vira uma string JSON.
+Requisições sem exemplo, chamadas às rotas de administração da API, rotas repetidas e mocks
+inválidos são listados em "ignorados" com o motivo.
+
+A gravação é feita por MocksManager.import_mocks: tudo numa única transação, com diff contra os
+mocks existentes (e sem gravar nada no dry run).
+"""
+
+import re
+import json
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qsl
+
+from src.expiry import parse_lifetime
+from src.namespaces import DEFAULT_NAMESPACE, validate_namespace
+from src.template_engine import compile_template
+from src.variants import compile_variants
+
+logger = logging.getLogger(__name__)
+
+CONFIG_ROUTE = "/mocks/configurar/endpoint"
+
+# Primeiro segmento das rotas da própria API (um mock nelas nunca seria alcançado)
+_ADMIN_SEGMENTS = frozenset({"mocks", "namespaces", "conjuntos", "status", "docs", "redoc", "openapi.json"})
+
+# Headers do exemplo que descrevem a resposta gravada, não o mock (o servidor gera os seus)
+_SKIP_HEADERS = frozenset({"content-type", "content-length", "content-encoding", "transfer-encoding",
+                           "connection", "keep-alive", "date"})
+
+_VARIABLE = re.compile(r"\{\{\s*([^{}]+?)\s*\}\}")
+_PARAM = re.compile(r":(\w+)")
+
+
+def strip_json_comments(text: str) -> str:
+    """Remove comentários // e /* */ fora de strings (o Postman aceita comentários em corpos JSON)."""
+    out = []
+    i, n = 0, len(text)
+    in_string = False
+    while i < n:
+        char = text[i]
+        if in_string:
+            out.append(char)
+            if char == "\\" and i + 1 < n:
+                out.append(text[i + 1])
+                i += 1
+            elif char == '"':
+                in_string = False
+        elif text.startswith("//", i):
+            end = text.find("\n", i)
+            i = n if end < 0 else end
+            continue
+        elif text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            i = n if end < 0 else end + 2
+            continue
+        else:
+            if char == '"':
+                in_string = True
+            out.append(char)
+        i += 1
+    return "".join(out)
+
+
+def _param_name(variable: str) -> str:
+    return re.sub(r"\W", "_", variable)
+
+
+def mock_segment(segment: str) -> str:
+    """Segmento do path do Postman no formato do mock: {{var}} vira :var (:param fica como está)."""
+    return _VARIABLE.sub(lambda m: ":" + _param_name(m.group(1)), segment)
+
+
+def mock_uri(segments: List[str]) -> str:
+    return "/" + "/".join(mock_segment(s) for s in segments if s)
+
+
+def _entries(values: Any) -> Dict[str, str]:
+    """Lista key/value do Postman (query, variable, header) em dict, sem as desabilitadas."""
+    return {str(entry["key"]): "" if entry.get("value") is None else str(entry["value"])
+            for entry in values or () if isinstance(entry, dict) and entry.get("key") and not entry.get("disabled")}
+
+
+def _split_raw(raw: str) -> Tuple[List[str], Dict[str, str]]:
+    """(segmentos do path, query) da URL raw, sem protocolo e host."""
+    raw, _, query_string = raw.split("#", 1)[0].partition("?")
+    if "://" in raw:
+        raw = raw.split("://", 1)[1].partition("/")[2]
+    elif not raw.startswith("/"):
+        # Host sem protocolo ou variável de base ({{baseUrl}}/users)
+        raw = raw.partition("/")[2]
+    return [s for s in raw.split("/") if s], dict(parse_qsl(query_string, keep_blank_values=True))
+
+
+def url_parts(url: Any) -> Tuple[List[str], Dict[str, str], Dict[str, str]]:
+    """(segmentos do path, query, variáveis de path) de uma URL do Postman (string ou objeto).
+
+    A URL raw prevalece sobre a lista path: é o que aparece no Postman (a lista pode estar desatualizada).
+    """
+    if isinstance(url, str):
+        segments, query = _split_raw(url)
+        return segments, query, {}
+    if not isinstance(url, dict):
+        return [], {}, {}
+    if url.get("raw"):
+        segments, query = _split_raw(url["raw"])
+    else:
+        path = url.get("path") or []
+        path = path.split("/") if isinstance(path, str) else path
+        segments = [s.get("value", "") if isinstance(s, dict) else str(s) for s in path]
+        segments = [s for s in segments if s]
+        query = {}
+    if "query" in url:
+        query = _entries(url["query"])
+    return segments, query, _entries(url.get("variable"))
+
+
+def _iter_requests(items: List[Any], folders: Tuple[str, ...] = ()) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """(nome com as pastas, item) de cada requisição, percorrendo as pastas em ordem."""
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        name = folders + (str(item.get("name", "")),)
+        if isinstance(item.get("item"), list):
+            yield from _iter_requests(item["item"], name)
+        elif item.get("request") is not None:
+            yield " / ".join(name), item
+
+
+def _request(item: Dict[str, Any]) -> Tuple[str, Any]:
+    request = item["request"]
+    if isinstance(request, str):
+        return "GET", request
+    return str(request.get("method") or "GET").upper(), request.get("url")
+
+
+def _body_value(raw: Any) -> Any:
+    if raw is None or raw == "":
+        return {}
+    try:
+        return json.loads(raw)
+    except (TypeError, ValueError):
+        return raw
+
+
+def _response_headers(headers: Any) -> Optional[Dict[str, str]]:
+    if not isinstance(headers, list):
+        return None
+    kept = {key: value for key, value in _entries(headers).items() if key.lower() not in _SKIP_HEADERS}
+    return kept or None
+
+
+def _validated(mock: Dict[str, Any]) -> Dict[str, Any]:
+    """O mock, se template e variantes compilam (ValueError caso contrário)."""
+    compile_template(mock["response"])
+    compile_variants(mock["variants"])
+    return mock
+
+
+def _config_mocks(item: Dict[str, Any], url: Any, namespace: str) -> List[Any]:
+    """Mocks (ou motivos de erro, em string) do corpo de uma requisição a /mocks/configurar/endpoint."""
+    body = (item["request"].get("body") or {}) if isinstance(item["request"], dict) else {}
+    try:
+        config = json.loads(strip_json_comments(body.get("raw") or ""))
+    except ValueError as e:
+        return [f"corpo não é JSON válido: {e}"]
+    _, query, _ = url_parts(url)
+    if query.get("namespace"):
+        namespace = query["namespace"]
+    results = []
+    for idx, entry in enumerate(config if isinstance(config, list) else [config]):
+        if not isinstance(entry, dict) or not entry.get("uri") or entry.get("response") is None:
+            results.append(f"item {idx}: campos obrigatórios faltando")
+            continue
+        try:
+            expires_at, max_hits = parse_lifetime(entry.get("ttl_seconds"), entry.get("expires_at"), entry.get("max_hits"))
+            results.append(_validated({
+                "uri": entry["uri"],
+                "http_method": str(entry.get("http_method", "GET")).upper(),
+                "status_code": int(entry.get("status_code_response", 200)),
+                "response": entry["response"],
+                "headers": entry.get("headers"),
+                "variants": entry.get("variants"),
+                "expires_at": expires_at,
+                "max_hits": max_hits,
+                "namespace": validate_namespace(entry.get("namespace") or namespace),
+            }))
+        except (TypeError, ValueError) as e:
+            results.append(f"item {idx}: {e}")
+    return results
+
+
+def _example_conditions(segments: List[str], query: Dict[str, str], variables: Dict[str, str],
+                        example: Dict[str, Any]) -> Dict[str, str]:
+    """Condições (when) que distinguem o exemplo: valores de path e query do originalRequest diferentes dos da requisição."""
+    original = example.get("originalRequest")
+    if not isinstance(original, dict):
+        return {}
+    example_segments, example_query, example_variables = url_parts(original.get("url"))
+    when = {}
+    if len(example_segments) == len(segments):
+        for segment, example_segment in zip(segments, map(mock_segment, example_segments)):
+            param = _PARAM.fullmatch(segment)
+            if not param:
+                continue
+            name = param.group(1)
+            value = example_variables.get(name) if example_segment == segment else example_segment
+            if value and ":" not in value and "{{" not in value and value != variables.get(name):
+                when[f"path.{name}"] = value
+    for key, value in example_query.items():
+        if value and "{{" not in value and query.get(key) != value:
+            when[f"query.{key}"] = value
+    return when
+
+
+def _example_mock(item: Dict[str, Any], method: str, segments: List[str], query: Dict[str, str],
+                  variables: Dict[str, str], namespace: str) -> Tuple[Optional[Dict[str, Any]], List[str]]:
+    """Mock dos exemplos salvos da requisição e os motivos dos exemplos descartados."""
+    examples = [e for e in item.get("response") or () if isinstance(e, dict)]
+    uri = mock_uri(segments)
+    default = None
+    variants = []
+    skipped = []
+    for example in examples:
+        when = _example_conditions(segments, query, variables, example)
+        response = {
+            "status_code_response": int(example.get("code") or 200),
+            "response": _body_value(example.get("body")),
+            "headers": _response_headers(example.get("header")),
+        }
+        if default is None and not when:
+            default = response
+        elif when:
+            variants.append({"when": when, **response})
+        else:
+            skipped.append(f"exemplo '{example.get('name', '')}' sem diferença de path ou query para o padrão")
+    if default is None:
+        # Todos os exemplos têm condições: o primeiro também é a resposta padrão
+        default = {key: value for key, value in variants[0].items() if key != "when"}
+    return _validated({
+        "uri": uri,
+        "http_method": method,
+        "status_code": default["status_code_response"],
+        "response": default["response"],
+        "headers": default["headers"],
+        "variants": variants or None,
+        "expires_at": None,
+        "max_hits": None,
+        "namespace": namespace,
+    }), skipped
+
+
+def parse_collection(collection: Any, namespace: str = DEFAULT_NAMESPACE) -> Dict[str, List[Dict[str, Any]]]:
+    """Mocks de uma coleção do Postman e os itens ignorados.
+
+    Retorna {'mocks': [...], 'ignorados': [{'item': 'Pasta / Requisição', 'motivo': ...}]}; cada mock
+    tem os argumentos de MocksManager.create_mock. ValueError se não for uma coleção v2.x.
+    """
+    if not isinstance(collection, dict) or not isinstance(collection.get("item"), list):
+        raise ValueError("Coleção inválida: exporte no formato Postman Collection v2.1")
+    schema = str((collection.get("info") or {}).get("schema", ""))
+    if schema and "/v2." not in schema:
+        raise ValueError(f"Formato de coleção não suportado ({schema}): exporte no formato v2.1")
+    namespace = validate_namespace(namespace)
+
+    mocks: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+    ignored = []
+
+    def add(name: str, mock: Dict[str, Any]):
+        route = (mock["namespace"], mock["http_method"], mock["uri"])
+        if route in mocks:
+            ignored.append({"item": name, "motivo": f"rota {mock['http_method']} {mock['uri']} repetida (vale a última)"})
+        mocks[route] = mock
+
+    for name, item in _iter_requests(collection["item"]):
+        method, url = _request(item)
+        segments, query, variables = url_parts(url)
+        uri = mock_uri(segments)
+        if method == "POST" and uri == CONFIG_ROUTE:
+            for result in _config_mocks(item, url, namespace):
+                if isinstance(result, str):
+                    ignored.append({"item": name, "motivo": result})
+                else:
+                    add(name, result)
+        elif segments and segments[0] in _ADMIN_SEGMENTS:
+            ignored.append({"item": name, "motivo": f"rota de administração da API ({method} {uri})"})
+        elif not item.get("response"):
+            ignored.append({"item": name, "motivo": "sem exemplo de resposta salvo"})
+        else:
+            try:
+                mock, skipped = _example_mock(item, method, segments, query, variables, namespace)
+            except (TypeError, ValueError) as e:
+                ignored.append({"item": name, "motivo": str(e)})
+                continue
+            add(name, mock)
+            ignored.extend({"item": name, "motivo": reason} for reason in skipped)
+
+    logger.info(f"Coleção '{(collection.get('info') or {}).get('name', '')}': {len(mocks)} mocks, {len(ignored)} ignorados")
+    return {"mocks": list(mocks.values()), "ignorados": ignored}
@@ -1,27 +1,75 @@
-from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import JSONResponse
-from typing import Union, List, Dict, Any
+from fastapi import FastAPI, Request, HTTPException, WebSocket
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
+from typing import Union, List, Dict, Any, Optional
 import re
+import asyncio
 import logging
+from collections import ChainMap
+from urllib.parse import parse_qsl
 from src.mocks_manager import MocksManager
+from src.json_codec import FastJSONResponse, dumps_bytes, iter_json, loads as json_loads
+from src.template_engine import STREAM_KEY, RenderContext
+from src.response_cache import CachedResponse
+from src.expiry import format_timestamp, parse_lifetime
+from src.match_explain import MatchTrace
+from src.admission import AdmissionController, AdmissionMiddleware
+from src.structured_logging import AccessLogMiddleware, StructuredLogging
+from src.namespaces import NamespaceResolver, validate_namespace
+from src.stream_mocks import StreamHub
+from src.throughput_mocks import ThroughputMeter
+from src.postman_import import parse_collection
+from src.mock_sets import validate_set_name
 
 # Configuração de logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Logs estruturados via fila (LOG_QUEUE_ENABLED=true): formatação e escrita em uma thread separada
+structured_logging = StructuredLogging.from_env()
+structured_logging.install()
+
 app = FastAPI(
     title="QA Mocks API",
     description="Sistema de mocks com persistência híbrida (Banco de Dados + Memória)",
     version="2.0.0",
+    default_response_class=FastJSONResponse,
     swagger_ui_parameters={"deepLinking": False}
 )
 
 # Inicializa o gerenciador de mocks
 mocks_manager = MocksManager()
 
+# Namespace de cada requisição: prefixo do path (/ns/<nome>/...), header X-Mock-Namespace ou host
+namespaces = NamespaceResolver.from_env()
+
+def _namespace_da_requisicao(request: Request) -> str:
+    """Namespace das rotas de administração: ?namespace=, header ou host (400 se inválido)."""
+    try:
+        nome = request.query_params.get("namespace")
+        return validate_namespace(nome) if nome else namespaces.from_headers(request.headers)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+
+# Conexões SSE/WebSocket dos mocks {"$stream": ...} e o broadcast de /mocks/{id}/enviar
+stream_hub = StreamHub.from_env()
+
+# Mocks de vazão {"$echo": ...} e {"$sink": ...}: bytes e tempo acumulados para /status
+throughput = ThroughputMeter()
+
+# Controle de admissão por cliente (ADMISSION_ENABLED=true)
+admission = AdmissionController.from_env()
+if admission.enabled:
+    app.add_middleware(AdmissionMiddleware, controller=admission)
+
+# Log de acesso amostrado por último: fica por fora e registra também as rejeições da admissão
+if structured_logging.enabled:
+    app.add_middleware(AccessLogMiddleware, logging_setup=structured_logging)
+
 @app.post("/mocks/configurar/endpoint")
-async def criar_mocks(config: Union[Dict[str, Any], List[Dict[str, Any]]]):
-    """Cria um ou vários mocks, atribuindo ID automático."""
+async def criar_mocks(config: Union[Dict[str, Any], List[Dict[str, Any]]], request: Request):
+    """Cria um ou vários mocks, atribuindo ID automático (no namespace da requisição ou no campo "namespace")."""
+    namespace = _namespace_da_requisicao(request)
     if isinstance(config, dict):
         configs = [config]
     elif isinstance(config, list):
@@ -38,16 +86,20 @@ async def criar_mocks(config: Union[Dict[str, Any], List[Dict[str, Any]]]):
         status_code = item.get("status_code_response", 200)
         response_body = item.get("response")
         headers = item.get("headers")
+        variants = item.get("variants")
 
         if not uri or response_body is None:
             erros.append({"index": idx, "erro": "Campos obrigatórios faltando"})
             continue
 
         try:
-            mock_id = mocks_manager.create_mock(uri, method, status_code, response_body, headers)
-            criados.append({"id": mock_id, "uri": uri, "http_method": method})
+            expires_at, max_hits = parse_lifetime(item.get("ttl_seconds"), item.get("expires_at"), item.get("max_hits"))
+            item_namespace = validate_namespace(item["namespace"]) if item.get("namespace") else namespace
+            mock_id = mocks_manager.create_mock(uri, method, status_code, response_body, headers, variants,
+                                                expires_at, max_hits, item_namespace)
+            criados.append({"id": mock_id, "uri": uri, "http_method": method, "namespace": item_namespace})
         except ValueError as ve:
-            logger.error(f"Duplicidade ao criar mock {idx}: {ve}")
+            logger.error(f"Mock {idx} inválido ou duplicado: {ve}")
             erros.append({"index": idx, "erro": str(ve)})
         except Exception as e:
             logger.error(f"Erro ao criar mock {idx}: {e}")
@@ -58,11 +110,29 @@ async def criar_mocks(config: Union[Dict[str, Any], List[Dict[str, Any]]]):
         raise HTTPException(status_code=409, detail={"criadas": criados, "erros": erros})
     return {"message": "Mocks criados", "criadas": criados, "erros": erros}
 
+@app.post("/mocks/importar/postman")
+async def importar_postman(colecao: Dict[str, Any], request: Request, dry_run: bool = False):
+    """Importa uma coleção do Postman v2.1 (exemplos salvos e configurações) numa única transação; dry_run só mostra o diff."""
+    namespace = _namespace_da_requisicao(request)
+    try:
+        plano = parse_collection(colecao, namespace)
+        diff = mocks_manager.import_mocks(plano["mocks"], dry_run=dry_run)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+
+    if diff is None:
+        raise HTTPException(status_code=500, detail="Erro interno ao importar mocks")
+
+    acao = "seriam importados" if dry_run else "importados"
+    return {"message": f"{len(diff['novos']) + len(diff['alterados'])} mocks {acao}", "dry_run": dry_run,
+            **diff, "ignorados": plano["ignorados"]}
+
 @app.get("/mocks")
-async def listar_mocks():
-    """Lista todos os mocks (sem response)."""
-    mocks_list = mocks_manager.get_all_mocks()
-    return {"mocks": mocks_list}
+async def listar_mocks(request: Request):
+    """Lista os mocks do namespace da requisição (sem response)."""
+    namespace = _namespace_da_requisicao(request)
+    mocks_list = mocks_manager.get_all_mocks(namespace)
+    return {"namespace": namespace, "mocks": mocks_list}
 
 @app.get("/mocks/{mock_id}")
 async def consultar_mock(mock_id: str):
@@ -71,14 +141,23 @@ async def consultar_mock(mock_id: str):
     if not mock_data:
         raise HTTPException(status_code=404, detail=f"Mock {mock_id} não encontrado")
     
-    return {
+    detalhes = {
         "id": mock_id,
+        "namespace": mock_data["namespace"],
         "uri": mock_data["uri"],
         "http_method": mock_data["http_method"],
         "status_code": mock_data["status_code"],
         "response": mock_data["response"],
-        "headers": mock_data.get("headers", {})
+        "headers": mock_data.get("headers", {}),
+        "variants": mock_data.get("variants", [])
     }
+    # Mocks efêmeros: validade e contador de chamadas
+    if mock_data.get("expires_at") is not None:
+        detalhes["expires_at"] = format_timestamp(mock_data["expires_at"])
+    if mock_data.get("max_hits") is not None:
+        detalhes["max_hits"] = mock_data["max_hits"]
+        detalhes["hits"] = mock_data.get("hits") or 0
+    return detalhes
 
 @app.put("/mocks/{mock_id}")
 async def editar_mock(mock_id: str, config: Dict[str, Any]):
@@ -91,8 +170,14 @@ async def editar_mock(mock_id: str, config: Dict[str, Any]):
     headers = config.get("headers")
     uri = config.get("uri")
     http_method = config.get("http_method")
+    variants = config.get("variants")
 
-    success = mocks_manager.update_mock(mock_id, status_code, response_body, headers)
+    try:
+        expires_at, max_hits = parse_lifetime(config.get("ttl_seconds"), config.get("expires_at"), config.get("max_hits"))
+        success = mocks_manager.update_mock(mock_id, status_code, response_body, headers, variants,
+                                            expires_at, max_hits)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
 
     if not success:
         raise HTTPException(status_code=500, detail="Erro interno ao atualizar mock")
@@ -111,19 +196,341 @@ async def remover_mock(mock_id: str):
     
     return {"message": f"Mock {mock_id} removido com sucesso"}
 
-@app.delete("/mocks")
-async def limpar_mocks():
-    """Remove todos os mocks."""
-    success = mocks_manager.delete_all_mocks()
+def _filtro_lote(payload: Dict[str, Any]):
+    """Valida o filtro das operações em lote: {"filtro": {"ids": [...], "uri_prefix": "...", "http_method": "..."}}."""
+    filtro = payload.get("filtro")
+    if not isinstance(filtro, dict) or not any(filtro.get(k) is not None for k in ("ids", "uri_prefix", "http_method")):
+        raise HTTPException(status_code=400, detail="Informe filtro com ids, uri_prefix e/ou http_method (DELETE /mocks remove todos)")
+    ids = filtro.get("ids")
+    if ids is not None and (not isinstance(ids, list) or not all(isinstance(i, str) for i in ids)):
+        raise HTTPException(status_code=400, detail="filtro.ids deve ser uma lista de IDs")
+    http_method = filtro.get("http_method")
+    return ids, filtro.get("uri_prefix"), http_method.upper() if http_method else None
+
+def _resultados_lote(ids, afetados: List[str], status: str) -> List[Dict[str, str]]:
+    """Resultado por item; com filtro por ids, os que não existiam aparecem como "não encontrado"."""
+    resultados = [{"id": mock_id, "resultado": status} for mock_id in afetados]
+    if ids is not None:
+        encontrados = set(afetados)
+        resultados += [{"id": mock_id, "resultado": "não encontrado"}
+                       for mock_id in dict.fromkeys(ids) if mock_id not in encontrados]
+    return resultados
+
+@app.post("/mocks/lote/editar")
+async def editar_mocks_em_lote(payload: Dict[str, Any], request: Request):
+    """Edita de uma vez (uma transação no banco) os mocks do filtro no namespace; campos de "alteracoes" iguais aos do PUT."""
+    namespace = _namespace_da_requisicao(request)
+    ids, uri_prefix, http_method = _filtro_lote(payload)
+    alteracoes = payload.get("alteracoes") or {}
+    if not isinstance(alteracoes, dict):
+        raise HTTPException(status_code=400, detail="alteracoes deve ser um objeto")
+
+    try:
+        expires_at, max_hits = parse_lifetime(alteracoes.get("ttl_seconds"), alteracoes.get("expires_at"), alteracoes.get("max_hits"))
+        atualizados = mocks_manager.update_mocks(
+            ids, uri_prefix, http_method, alteracoes.get("status_code_response"), alteracoes.get("response"),
+            alteracoes.get("headers"), alteracoes.get("variants"), expires_at, max_hits, namespace
+        )
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+
+    if atualizados is None:
+        raise HTTPException(status_code=500, detail="Erro interno ao atualizar mocks")
+
+    return {"message": f"{len(atualizados)} mocks atualizados", "resultados": _resultados_lote(ids, atualizados, "atualizado")}
+
+@app.post("/mocks/lote/remover")
+async def remover_mocks_em_lote(payload: Dict[str, Any], request: Request):
+    """Remove de uma vez (uma transação no banco) os mocks do filtro no namespace."""
+    namespace = _namespace_da_requisicao(request)
+    ids, uri_prefix, http_method = _filtro_lote(payload)
+    removidos = mocks_manager.delete_mocks(ids, uri_prefix, http_method, namespace)
+    if removidos is None:
+        raise HTTPException(status_code=500, detail="Erro interno ao remover mocks")
+
+    return {"message": f"{len(removidos)} mocks removidos", "resultados": _resultados_lote(ids, removidos, "removido")}
+
+@app.post("/mocks/{mock_id}/enviar")
+async def enviar_mensagem(mock_id: str, payload: Dict[str, Any]):
+    """Broadcast: envia uma mensagem a todas as conexões abertas de um mock SSE/WebSocket (neste processo).
+
+    Payload: {"data": ..., "event": "...", "id": "..."} (event e id só em SSE). A mensagem é codificada uma vez.
+    """
+    mock_data = mocks_manager.get_mock(mock_id)
+    if not mock_data:
+        raise HTTPException(status_code=404, detail=f"Mock {mock_id} não encontrado")
+    response = mock_data["response"]
+    spec = response.get(STREAM_KEY) if isinstance(response, dict) else None
+    if not isinstance(spec, dict):
+        raise HTTPException(status_code=400, detail=f"Mock {mock_id} não é um mock SSE/WebSocket")
+    try:
+        conexoes = stream_hub.publish(mock_id, spec["type"], payload)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+
+    return {"message": f"Mensagem enviada para {conexoes} conexões", "conexoes": conexoes}
+
+@app.post("/mocks/{mock_id}/reiniciar")
+async def reiniciar_contador(mock_id: str):
+    """Zera o contador de chamadas do mock: $sequence volta à primeira resposta e max_hits recomeça a contagem."""
+    if not mocks_manager.mock_exists(mock_id):
+        raise HTTPException(status_code=404, detail=f"Mock {mock_id} não encontrado")
+    if not mocks_manager.reset_calls(mock_id):
+        raise HTTPException(status_code=500, detail="Erro interno ao zerar o contador")
+
+    return {"message": f"Contador de chamadas do mock {mock_id} zerado"}
+
+@app.post("/mocks/explicar")
+async def explicar_match(payload: Dict[str, Any], request: Request):
+    """Explica o match de uma requisição: vencedor, candidatos testados com o motivo da rejeição e tempo por etapa.
+
+    Usa o mesmo matcher do tráfego, sem consumir chamadas de mocks com max_hits ou $sequence. O namespace vem de "namespace"
+    (ou ?namespace=) ou, como no tráfego, do path e dos headers do payload e da própria chamada.
+    Payload: {"http_method": "GET", "path": "/api/users/7?page=2", "namespace": "...", "query": {...}, "headers": {...}, "body": ...}
+    """
+    path = payload.get("path")
+    if not isinstance(path, str) or not path.startswith("/"):
+        raise HTTPException(status_code=400, detail="Informe path começando com /")
+    method = str(payload.get("http_method", "GET")).upper()
+    path, _, query_string = path.partition("?")
+    query = dict(parse_qsl(query_string, keep_blank_values=True))
+    query.update(payload.get("query") or {})
+    request_headers = {k.lower(): v for k, v in (payload.get("headers") or {}).items()}
+    try:
+        explicit = payload.get("namespace") or request.query_params.get("namespace")
+        if explicit:
+            namespace = validate_namespace(explicit)
+        else:
+            namespace, path = namespaces.resolve(path, ChainMap(request_headers, request.headers))
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+
+    trace = MatchTrace()
+    with trace.stage("match"):
+        mock_match = mocks_manager.find_matching_mock(path, method, trace=trace, namespace=namespace)
+    explicacao = {"http_method": method, "path": path, "namespace": namespace, "mock_id": None, "variables": None}
+
+    if mock_match:
+        template, status_code, _ = _resposta_do_mock(mock_match)
+        variant_set = mock_match.get("variant_set")
+        ctx = RenderContext(
+            path=mock_match["variables"],
+            query=query,
+            body=payload.get("body"),
+            headers=request_headers
+        )
+        variant = None
+        if variant_set:
+            with trace.stage("variantes"):
+                variant = variant_set.select(ctx)
+            if variant:
+                if variant.status_code is not None:
+                    status_code = variant.status_code
+                if variant.template is not None:
+                    template = variant.template
+        with trace.stage("render"):
+            final_response = template.render(ctx)
+        # Respostas geradas em streaming podem ser enormes: não são serializadas aqui
+        if not template.streaming:
+            with trace.stage("serializacao"):
+                dumps_bytes(final_response)
+        explicacao.update(
+            mock_id=mock_match["mock_id"],
+            variables=mock_match["variables"],
+            variante=variant.order if variant else None,
+            chamada=mock_match.get("call"),
+            status_code=int(status_code),
+            streaming=template.streaming
+        )
+
+    explicacao.update(trace.to_dict())
+    return explicacao
+
+def _limpar_namespace(namespace: str) -> Dict[str, str]:
+    success = mocks_manager.delete_all_mocks(namespace)
     if not success:
         raise HTTPException(status_code=500, detail="Erro interno ao limpar mocks")
     
-    return {"message": "Todos os mocks foram removidos"}
+    return {"message": f"Todos os mocks do namespace {namespace} foram removidos"}
+
+@app.delete("/mocks")
+async def limpar_mocks(request: Request):
+    """Remove todos os mocks do namespace da requisição (os outros namespaces não são afetados)."""
+    namespace = _namespace_da_requisicao(request)
+    return _limpar_namespace(namespace)
+
+@app.get("/namespaces")
+async def listar_namespaces():
+    """Namespaces com mocks ou tráfego: mocks, requisições, matches e 404s de cada um."""
+    return {"namespaces": mocks_manager.get_namespaces()}
+
+@app.delete("/namespaces/{namespace}")
+async def remover_namespace(namespace: str):
+    """Remove todos os mocks do namespace e zera os contadores dele."""
+    try:
+        namespace = validate_namespace(namespace)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    return _limpar_namespace(namespace)
+
+def _nome_do_conjunto(nome: str) -> str:
+    try:
+        return validate_set_name(nome)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+
+@app.get("/conjuntos")
+async def listar_conjuntos(request: Request):
+    """Versões dos conjuntos de mocks do namespace da requisição e o último conjunto ativado nesta instância."""
+    namespace = _namespace_da_requisicao(request)
+    conjuntos = mocks_manager.list_mock_sets(namespace)
+    if conjuntos is None:
+        raise HTTPException(status_code=500, detail="Erro interno ao listar conjuntos")
+    ativo = mocks_manager.mock_sets.get_active(namespace)
+    if ativo:
+        ativo["activated_at"] = format_timestamp(ativo["activated_at"])
+    return {
+        "namespace": namespace,
+        "ativo": ativo,
+        "conjuntos": [dict(c, created_at=format_timestamp(c["created_at"])) for c in conjuntos]
+    }
+
+@app.post("/conjuntos/{nome}")
+async def salvar_conjunto(nome: str, request: Request):
+    """Salva os mocks atuais do namespace como nova versão do conjunto."""
+    namespace = _namespace_da_requisicao(request)
+    try:
+        resumo = mocks_manager.save_mock_set(_nome_do_conjunto(nome), namespace)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    if resumo is None:
+        raise HTTPException(status_code=500, detail="Erro interno ao salvar conjunto")
+    return {"message": f"Conjunto {nome} salvo (versão {resumo['version']})", "namespace": namespace,
+            **resumo, "created_at": format_timestamp(resumo["created_at"])}
+
+@app.post("/conjuntos/{nome}/ativar")
+async def ativar_conjunto(nome: str, request: Request, version: Optional[int] = None):
+    """Troca, de uma vez, todos os mocks do namespace pelos do conjunto (última versão, ou ?version=)."""
+    namespace = _namespace_da_requisicao(request)
+    nome = _nome_do_conjunto(nome)
+    if not mocks_manager.mock_set_exists(nome, version, namespace):
+        versao = f" versão {version}" if version is not None else ""
+        raise HTTPException(status_code=404, detail=f"Conjunto {nome}{versao} não encontrado no namespace {namespace}")
+    try:
+        resumo = mocks_manager.activate_mock_set(nome, version, namespace)
+    except ValueError as ve:
+        raise HTTPException(status_code=409, detail=str(ve))
+    if resumo is None:
+        raise HTTPException(status_code=500, detail="Erro interno ao ativar conjunto")
+    return {"message": f"Conjunto {nome} (versão {resumo['version']}) ativado", "namespace": namespace,
+            **resumo, "created_at": format_timestamp(resumo["created_at"])}
+
+@app.delete("/conjuntos/{nome}")
+async def remover_conjunto(nome: str, request: Request):
+    """Remove todas as versões do conjunto (os mocks ativos do namespace não mudam)."""
+    namespace = _namespace_da_requisicao(request)
+    removidas = mocks_manager.delete_mock_set(_nome_do_conjunto(nome), namespace)
+    if removidas is None:
+        raise HTTPException(status_code=500, detail="Erro interno ao remover conjunto")
+    if not removidas:
+        raise HTTPException(status_code=404, detail=f"Conjunto {nome} não encontrado no namespace {namespace}")
+    return {"message": f"Conjunto {nome} removido ({removidas} versões)"}
+
+@app.on_event("shutdown")
+def flush_pending_writes():
+    """Grava mutações pendentes do write-behind antes de encerrar."""
+    mocks_manager.shutdown()
 
 @app.get("/status")
 async def get_status():
     """Retorna o status do sistema de mocks."""
-    return mocks_manager.get_status()
+    status = mocks_manager.get_status()
+    if admission.enabled:
+        status['admission'] = admission.get_stats()
+    if structured_logging.enabled:
+        status['logging'] = structured_logging.get_stats()
+    status['streams'] = stream_hub.get_stats()
+    status['throughput'] = throughput.get_stats()
+    return status
+
+def _resposta_do_mock(mock_match: Dict[str, Any]):
+    """(template, status, headers) da resposta padrão; em mocks $sequence, os da chamada contada no match."""
+    template = mock_match["template"]
+    status_code, headers = mock_match["status_code"], mock_match.get("headers", {})
+    if template.sequence:
+        return template.step(mock_match["call"], status_code, headers)
+    return template, status_code, headers
+
+def _resposta_stream(mock_id: str, template, script, status_code: int, headers: Dict[str, str]):
+    """Resposta HTTP de um mock {"$stream": ...}: SSE aberto com o roteiro e o broadcast do mock."""
+    if template.stream != "sse":
+        return FastJSONResponse(status_code=426, headers={"Upgrade": "websocket"},
+                                content={"erro": "Mock WebSocket: conecte via ws://"})
+    slot = stream_hub.admit()
+    if slot is None:
+        return FastJSONResponse(status_code=503, content={"erro": "Limite de conexões de streaming atingido"})
+    return StreamingResponse(
+        stream_hub.stream(mock_id, "sse", script, template.keep_open, slot),
+        status_code=status_code,
+        headers={"Cache-Control": "no-cache", **headers},
+        media_type="text/event-stream",
+        # Cliente que desconecta antes do primeiro frame: o stream nem começa, a vaga volta aqui
+        background=BackgroundTask(slot.release)
+    )
+
+async def _transmitir(websocket: WebSocket, frames):
+    try:
+        async for frame in frames:
+            await websocket.send_text(frame)
+        await websocket.close()
+    finally:
+        # Fecha o gerador já aqui (desconexão cancela esta task): libera a conexão no hub na hora
+        await frames.aclose()
+
+@app.websocket("/{full_path:path}")
+async def catch_all_websocket(websocket: WebSocket, full_path: str):
+    """Mocks WebSocket (cadastrados com GET): reproduz o roteiro e repassa o broadcast; mensagens do cliente são ignoradas."""
+    try:
+        namespace, path = namespaces.resolve("/" + full_path, websocket.headers)
+    except ValueError:
+        await websocket.close(code=1008)
+        return
+
+    mock_match = mocks_manager.find_matching_mock(path, "GET", namespace=namespace)
+    template = mock_match["template"] if mock_match else None
+    if template is not None and mock_match.get("variant_set"):
+        ctx = RenderContext(path=mock_match["variables"], query=dict(websocket.query_params), headers=dict(websocket.headers))
+        variant = mock_match["variant_set"].select(ctx)
+        if variant and variant.template is not None:
+            template = variant.template
+    if template is None or template.stream != "websocket":
+        # 1008: violação de política (não há mock WebSocket para o path)
+        await websocket.close(code=1008)
+        return
+    slot = stream_hub.admit()
+    if slot is None:
+        # 1013: tente novamente mais tarde
+        await websocket.close(code=1013)
+        return
+
+    try:
+        ctx = RenderContext(
+            path=mock_match["variables"],
+            query=dict(websocket.query_params) if "query" in template.sources else None,
+            headers=dict(websocket.headers) if "headers" in template.sources else None
+        )
+        await websocket.accept()
+        frames = stream_hub.stream(mock_match["mock_id"], "websocket", template.render(ctx),
+                                   template.keep_open, slot)
+        envio = asyncio.ensure_future(_transmitir(websocket, frames))
+        try:
+            while (await websocket.receive())["type"] != "websocket.disconnect":
+                pass
+        finally:
+            envio.cancel()
+    finally:
+        # Handshake que falhou ou desconexão antes do primeiro frame: o stream nem começou
+        slot.release()
 
 @app.api_route("/{full_path:path}", methods=["GET", "POST", "PUT", "DELETE"])
 async def catch_all(full_path: str, request: Request):
@@ -131,46 +538,93 @@ async def catch_all(full_path: str, request: Request):
     path = "/" + full_path
     method = request.method.upper()
 
-    # Procura por um mock correspondente
-    mock_match = mocks_manager.find_matching_mock(path, method)
+    try:
+        namespace, path = namespaces.resolve(path, request.headers)
+    except ValueError as ve:
+        return FastJSONResponse(status_code=400, content={"erro": str(ve)})
+
+    # Procura por um mock correspondente, só entre os mocks do namespace
+    mock_match = mocks_manager.find_matching_mock(path, method, namespace=namespace)
     
     if mock_match:
-        # Path variables do padrão da URI
-        variables = mock_match["variables"]
-        
-        # Query params
-        variables.update(dict(request.query_params))
-        
-        # Body variables
-        try:
-            body = await request.json()
-            if isinstance(body, dict):
-                variables.update(body)
-        except:
-            pass
-
-        # Substitui placeholders no response
-        def replace_vars(obj):
-            if isinstance(obj, str) and obj in variables:
-                return variables[obj]
-            if isinstance(obj, dict):
-                return {k: replace_vars(v) for k, v in obj.items()}
-            if isinstance(obj, list):
-                return [replace_vars(v) for v in obj]
-            return obj
-
-        final_response = replace_vars(mock_match["response"])
-        
-        # Prepare response headers
-        response_headers = mock_match.get("headers", {})
-
-        return JSONResponse(
-            status_code=int(mock_match["status_code"]),
-            content=final_response,
-            headers=response_headers
+        template, status_code, response_headers = _resposta_do_mock(mock_match)
+        variant_set = mock_match.get("variant_set")
+        sources = template.sources | variant_set.sources if variant_set else template.sources
+
+        # Só extrai da requisição o que o template e as variantes compilados usam
+        raw_body = await request.body() if "body" in sources else None
+        query = dict(request.query_params) if "query" in sources else None
+
+        # Cache de respostas: headers da requisição variam demais para entrar na chave; $sequence muda a cada chamada
+        response_cache = mocks_manager.response_cache
+        cache_key = None
+        if response_cache.enabled and "headers" not in sources and "call" not in mock_match and template.pipe is None:
+            cache_key = response_cache.key(mock_match, query, raw_body)
+            cached = response_cache.get(cache_key) if cache_key is not None else None
+            if cached:
+                return Response(
+                    content=cached.body,
+                    status_code=cached.status_code,
+                    headers=cached.headers,
+                    media_type="application/json"
+                )
+
+        body = None
+        if raw_body is not None:
+            try:
+                body = json_loads(raw_body)
+            except:
+                pass
+
+        ctx = RenderContext(
+            path=mock_match["variables"],
+            query=query,
+            body=body,
+            headers=dict(request.headers) if "headers" in sources else None
+        )
+
+        # Variante condicional: substitui status, resposta e/ou headers da resposta padrão
+        if variant_set:
+            variant = variant_set.select(ctx)
+            if variant:
+                if variant.status_code is not None:
+                    status_code = variant.status_code
+                if variant.template is not None:
+                    template = variant.template
+                if variant.headers is not None:
+                    response_headers = variant.headers
+
+        # Eco/sumidouro: o corpo passa em pedaços, sem ser montado nem interpretado como JSON
+        if template.pipe:
+            return await throughput.response(mock_match["mock_id"], template, request, int(status_code), response_headers)
+
+        final_response = template.render(ctx)
+
+        # Mocks SSE/WebSocket: a conexão fica aberta com o roteiro e o broadcast
+        if template.stream:
+            return _resposta_stream(mock_match["mock_id"], template, final_response, int(status_code), response_headers)
+
+        # Respostas com arrays gerados: streaming em pedaços, sem montar o payload inteiro
+        if template.streaming:
+            return StreamingResponse(
+                iter_json(final_response),
+                status_code=int(status_code),
+                headers=response_headers,
+                media_type="application/json"
+            )
+
+        content = dumps_bytes(final_response)
+        if cache_key is not None:
+            response_cache.put(cache_key, CachedResponse(mock_match["mock_id"], int(status_code), response_headers, content))
+
+        return Response(
+            content=content,
+            status_code=int(status_code),
+            headers=response_headers,
+            media_type="application/json"
         )
 
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=404,
         content={"erro": f"Nenhuma resposta configurada para {method} {path}"}
     )
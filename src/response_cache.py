@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Cache LRU de respostas renderizadas e já serializadas
+
+A chave é (mock_id, versão do conteúdo, valores usados na renderização): template e variantes
+compilados (objetos novos a cada edição), status e headers do mock, variáveis do path e, se o
+template usar, query e corpo da requisição. Edições e remoções também invalidam as entradas do
+mock explicitamente. Limite em número de entradas e em bytes.
+"""
+
+import os
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class CachedResponse:
+    __slots__ = ("mock_id", "status_code", "headers", "body")
+
+    def __init__(self, mock_id: str, status_code: int, headers: Dict[str, str], body: bytes):
+        self.mock_id = mock_id
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+
+
+class ResponseCache:
+    """LRU de corpos serializados, limitado por entradas e por bytes (soma dos corpos)."""
+
+    def __init__(self, enabled: bool = False, max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024,
+                 max_item_bytes: int = 1024 * 1024):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_item_bytes = min(max_item_bytes, max_bytes)
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._by_mock: Dict[str, Set[Hashable]] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.too_large = 0
+
+    @classmethod
+    def from_env(cls) -> "ResponseCache":
+        return cls(
+            enabled=os.getenv("RESPONSE_CACHE_ENABLED", "false").lower() == "true",
+            max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "10000")),
+            max_bytes=int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+            max_item_bytes=int(os.getenv("RESPONSE_CACHE_MAX_ITEM_BYTES", str(1024 * 1024)))
+        )
+
+    @staticmethod
+    def key(mock_match: Dict[str, Any], query: Optional[Dict[str, Any]], body: Optional[bytes]) -> Optional[Tuple]:
+        """Chave da resposta de um mock casado (None se não há como montá-la); query/body só entram se o template os usa."""
+        headers = mock_match.get("headers")
+        key = (
+            mock_match["mock_id"], mock_match["template"], mock_match.get("variant_set"),
+            mock_match["status_code"], tuple(headers.items()) if headers else (),
+            tuple(mock_match["variables"].items()),
+            tuple(query.items()) if query is not None else None,
+            body
+        )
+        try:
+            hash(key)
+        except TypeError:
+            # Ex.: header configurado com valor lista/dict
+            return None
+        return key
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Hashable, entry: CachedResponse):
+        size = len(entry.body)
+        if size > self.max_item_bytes:
+            self.too_large += 1
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous.body)
+            self._entries[key] = entry
+            self._by_mock.setdefault(entry.mock_id, set()).add(key)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                old_key, old = self._entries.popitem(last=False)
+                self._forget(old_key, old)
+                self.evictions += 1
+
+    def _forget(self, key: Hashable, entry: CachedResponse):
+        self._bytes -= len(entry.body)
+        keys = self._by_mock.get(entry.mock_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_mock[entry.mock_id]
+
+    def invalidate(self, mock_id: str):
+        """Remove as respostas de um mock (chamado ao editar/remover)."""
+        if not self.enabled:
+            return
+        with self._lock:
+            for key in self._by_mock.pop(mock_id, ()):
+                entry = self._entries.pop(key, None)
+                if entry is not None:
+                    self._bytes -= len(entry.body)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._by_mock.clear()
+            self._bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'too_large': self.too_large
+        }
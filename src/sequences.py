@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Respostas sequenciais, em rodízio e ponderadas, escolhidas pelo contador de chamadas do mock
+
+A resposta do mock é {"$sequence": {...}} (única chave):
+    {"$sequence": {
+        "mode": "sequence" | "cycle" | "weighted",
+        "responses": [{"status_code_response": 202, "response": {"status": "pendente"}, "times": 2},
+                      {"response": {"status": "concluido"}, "headers": {...}}]
+    }}
+
+- sequence: cada resposta vale por `times` chamadas (padrão 1) e a última fica valendo
+  (pendente, pendente, concluido, concluido, ...);
+- cycle: o mesmo roteiro em rodízio (volta à primeira depois da última);
+- weighted: distribuição por `weight` (inteiro), intercalada e determinística: pesos 3 e 1 dão
+  A, A, B, A a cada 4 chamadas (weighted round-robin suave), iguais em todos os workers.
+
+status_code_response e headers ausentes ficam os do mock; variantes continuam valendo por cima.
+O roteiro é compilado em uma tabela (chamada -> resposta), então escolher custa uma indexação.
+
+O contador de chamadas (0 = primeira) vem do MocksManager: com banco é a coluna hits, incrementada
+com UPDATE ... RETURNING (atômico e compartilhado entre workers e instâncias); sem banco, CallCounters.
+"""
+
+import logging
+import itertools
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from src.template_engine import ECHO_KEY, SEQUENCE_KEY, SINK_KEY, STREAM_KEY, CompiledTemplate, RenderContext, compile_template
+from src.body_compression import compact_template
+
+logger = logging.getLogger(__name__)
+
+SEQUENCE_MODES = ("sequence", "cycle", "weighted")
+# Tamanho máximo da tabela de chamadas (soma de times ou de weight)
+MAX_SCHEDULE = 10000
+
+
+def _positive_int(value: Any, field: str, index: int) -> int:
+    if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+        raise ValueError(f"'{SEQUENCE_KEY}': {field} da resposta {index} deve ser um inteiro >= 1")
+    return value
+
+
+def weighted_schedule(weights: List[int]) -> List[int]:
+    """Ordem das respostas em sum(weights) chamadas pelo weighted round-robin suave (sem rajadas da mesma)."""
+    total = sum(weights)
+    current = [0] * len(weights)
+    schedule = []
+    for _ in range(total):
+        for i, weight in enumerate(weights):
+            current[i] += weight
+        chosen = max(range(len(weights)), key=current.__getitem__)
+        current[chosen] -= total
+        schedule.append(chosen)
+    return schedule
+
+
+class SequenceStep:
+    """Uma resposta do roteiro: template compilado e, se informados, status e headers próprios."""
+
+    __slots__ = ("status_code", "template", "headers")
+
+    def __init__(self, index: int, spec: Any):
+        if not isinstance(spec, dict) or "response" not in spec:
+            raise ValueError(f"'{SEQUENCE_KEY}': a resposta {index} deve ser um objeto com 'response'")
+        response = spec["response"]
+        if isinstance(response, dict) and any(key in response for key in (SEQUENCE_KEY, STREAM_KEY, ECHO_KEY, SINK_KEY)):
+            raise ValueError(f"'{SEQUENCE_KEY}': a resposta {index} não pode ser outro '{SEQUENCE_KEY}', "
+                             f"'{STREAM_KEY}', '{ECHO_KEY}' ou '{SINK_KEY}'")
+        headers = spec.get("headers")
+        if headers is not None and not isinstance(headers, dict):
+            raise ValueError(f"'{SEQUENCE_KEY}': headers da resposta {index} deve ser um objeto")
+        self.status_code = spec.get("status_code_response")
+        # Corpos grandes sem placeholders ficam comprimidos, como a resposta de um mock comum
+        self.template = compact_template(compile_template(response))
+        self.headers = headers
+
+
+class SequenceTemplate:
+    """Resposta {"$sequence": ...} compilada; step escolhe a resposta de uma chamada."""
+
+    __slots__ = ("source", "sequence", "steps", "schedule", "sources")
+
+    stream = None
+    pipe = None
+    streaming = False
+    dynamic = True
+    uses_legacy = False
+
+    def __init__(self, source: Dict[str, Any]):
+        if len(source) != 1:
+            raise ValueError(f"'{SEQUENCE_KEY}' deve ser a única chave da resposta")
+        spec = source[SEQUENCE_KEY]
+        if not isinstance(spec, dict) or spec.get("mode", "sequence") not in SEQUENCE_MODES:
+            raise ValueError(f"'{SEQUENCE_KEY}' espera um objeto com mode {', '.join(SEQUENCE_MODES)}")
+        responses = spec.get("responses")
+        if not isinstance(responses, list) or not responses:
+            raise ValueError(f"'{SEQUENCE_KEY}': responses deve ser uma lista não vazia")
+        self.source = source
+        self.sequence = spec.get("mode", "sequence")
+        self.steps = tuple(SequenceStep(i, r) for i, r in enumerate(responses))
+        field = "weight" if self.sequence == "weighted" else "times"
+        counts = [_positive_int(r.get(field, 1), field, i) for i, r in enumerate(responses)]
+        if sum(counts) > MAX_SCHEDULE:
+            raise ValueError(f"'{SEQUENCE_KEY}': a soma de {field} passa de {MAX_SCHEDULE}")
+        if self.sequence == "weighted":
+            order = weighted_schedule(counts)
+        else:
+            order = [i for i, count in enumerate(counts) for _ in range(count)]
+        self.schedule = tuple(self.steps[i] for i in order)
+        self.sources = frozenset().union(*(step.template.sources for step in self.steps))
+
+    def select(self, call: int) -> SequenceStep:
+        """Resposta da chamada de número call (0 = primeira)."""
+        if self.sequence == "sequence":
+            return self.schedule[min(call, len(self.schedule) - 1)]
+        return self.schedule[call % len(self.schedule)]
+
+    def step(self, call: int, status_code: Any, headers: Dict[str, str]) -> Tuple[CompiledTemplate, Any, Dict[str, str]]:
+        """(template, status, headers) da chamada; status e headers ausentes no passo ficam os do mock."""
+        step = self.select(call)
+        return (step.template,
+                status_code if step.status_code is None else step.status_code,
+                headers if step.headers is None else step.headers)
+
+    def render(self, ctx: RenderContext) -> Any:
+        """Resposta da primeira chamada (o tráfego usa step com o contador do mock)."""
+        return self.schedule[0].template.render(ctx)
+
+
+class CallCounters:
+    """Contadores de chamadas por mock neste processo (modo memória), sem lock no caminho das requisições.
+
+    next() de itertools.count é atômico no CPython: requisições concorrentes recebem números distintos.
+    """
+
+    def __init__(self):
+        self._counters: Dict[str, Iterator[int]] = {}
+        # Próximo número de cada mock, só para consulta (explicação do match)
+        self._next: Dict[str, int] = {}
+
+    def next(self, mock_id: str) -> int:
+        counter = self._counters.get(mock_id)
+        if counter is None:
+            counter = self._counters.setdefault(mock_id, itertools.count())
+        call = next(counter)
+        self._next[mock_id] = call + 1
+        return call
+
+    def peek(self, mock_id: str) -> int:
+        return self._next.get(mock_id, 0)
+
+    def reset(self, mock_id: Optional[str] = None):
+        """Zera o contador do mock (ou de todos)."""
+        if mock_id is None:
+            self._counters.clear()
+            self._next.clear()
+            return
+        self._counters.pop(mock_id, None)
+        self._next.pop(mock_id, None)
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Mocks de Server-Sent Events e WebSocket: roteiro de mensagens com tempos e broadcast
+
+A resposta do mock é {"$stream": {...}} (única chave):
+    {"$stream": {
+        "type": "sse" | "websocket",
+        "messages": [{"data": {...}, "event": "preco", "id": "1", "delay_ms": 500}, ...],
+        "repeat": 1,          # quantas vezes o roteiro é reproduzido (0 = sem fim)
+        "keep_open": true     # depois do roteiro a conexão fica aberta recebendo o broadcast
+    }}
+
+data aceita placeholders {{path.x}}, {{query.x}} e {{headers.x}} (sem as variáveis legadas); event e
+id só existem em SSE. delay_ms é a espera antes de cada mensagem. Mocks WebSocket são cadastrados
+com http_method GET (o handshake é um GET).
+
+Broadcast: POST /mocks/{id}/enviar publica uma mensagem para todas as conexões abertas do mock.
+A mensagem é codificada uma única vez (frame SSE em bytes ou texto WebSocket) e entra no buffer
+circular do canal; cada conexão lê o buffer pela sua posição, acordada por um asyncio.Event por
+publicação. Publicar custa O(1) além de acordar quem espera, sem fila nem cópia por conexão.
+Conexões que ficam mais de STREAM_BUFFER_SIZE mensagens para trás perdem as mais antigas
+(contadas em dropped). O broadcast alcança só as conexões deste processo.
+"""
+
+import os
+import asyncio
+import logging
+import itertools
+from collections import deque
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple, Union
+
+from src import json_codec
+from src.template_engine import STREAM_KEY, CompiledTemplate, RenderContext
+
+logger = logging.getLogger(__name__)
+
+STREAM_TYPES = ("sse", "websocket")
+
+Frame = Union[bytes, str]
+
+
+def encode_frame(kind: str, data: Any, event: Optional[str] = None, event_id: Optional[str] = None) -> Frame:
+    """Mensagem pronta para enviar: frame SSE (bytes) ou texto WebSocket; data não-string vira JSON."""
+    text = data if isinstance(data, str) else json_codec.dumps(data)
+    if kind == "websocket":
+        return text
+    lines = []
+    if event:
+        lines.append(f"event: {event}")
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    # Cada linha do conteúdo vira um campo data (o cliente junta com \n)
+    lines.extend("data: " + line for line in text.splitlines() or [""])
+    return ("\n".join(lines) + "\n\n").encode()
+
+
+def parse_message(kind: str, message: Any) -> Tuple[Any, Optional[str], Optional[str], float]:
+    """(data, event, id, delay em segundos) de uma mensagem do roteiro ou do broadcast; ValueError se inválida."""
+    if not isinstance(message, dict) or "data" not in message:
+        raise ValueError(f"'{STREAM_KEY}': cada mensagem deve ser um objeto com 'data'")
+    event, event_id = message.get("event"), message.get("id")
+    if kind == "websocket" and (event is not None or event_id is not None):
+        raise ValueError(f"'{STREAM_KEY}': event e id só existem em mensagens SSE")
+    if event is not None and (not isinstance(event, str) or "\n" in event):
+        raise ValueError(f"'{STREAM_KEY}': event deve ser uma string de uma linha")
+    if event_id is not None:
+        if not isinstance(event_id, (str, int)) or "\n" in str(event_id):
+            raise ValueError(f"'{STREAM_KEY}': id deve ser string ou inteiro, de uma linha")
+        event_id = str(event_id)
+    delay = message.get("delay_ms", 0)
+    if isinstance(delay, bool) or not isinstance(delay, (int, float)) or delay < 0:
+        raise ValueError(f"'{STREAM_KEY}': delay_ms deve ser um número não negativo")
+    return message["data"], event, event_id, delay / 1000
+
+
+class _ScriptMessage:
+    """Mensagem do roteiro; frame já codificado quando data não tem placeholders."""
+
+    __slots__ = ("delay", "frame", "template", "event", "event_id")
+
+    def __init__(self, kind: str, message: Any):
+        data, self.event, self.event_id, self.delay = parse_message(kind, message)
+        # Tipo novo: só placeholders explícitos, sem as variáveis legadas
+        template = CompiledTemplate(data, legacy=False)
+        if template.streaming:
+            raise ValueError(f"'{STREAM_KEY}': '$generate' não é suportado em mensagens")
+        self.template = template if template.dynamic else None
+        self.frame = None if template.dynamic else encode_frame(kind, data, self.event, self.event_id)
+
+
+class StreamTemplate:
+    """Resposta {"$stream": ...} compilada; render devolve o roteiro como (espera, frame) para o StreamHub."""
+
+    __slots__ = ("source", "stream", "messages", "repeat", "keep_open", "dynamic", "sources")
+
+    streaming = True
+    uses_legacy = False
+    sequence = None
+    pipe = None
+
+    def __init__(self, source: Dict[str, Any]):
+        if len(source) != 1:
+            raise ValueError(f"'{STREAM_KEY}' deve ser a única chave da resposta")
+        spec = source[STREAM_KEY]
+        if not isinstance(spec, dict) or spec.get("type") not in STREAM_TYPES:
+            raise ValueError(f"'{STREAM_KEY}' espera um objeto com type {' ou '.join(STREAM_TYPES)}")
+        messages = spec.get("messages", [])
+        if not isinstance(messages, list):
+            raise ValueError(f"'{STREAM_KEY}': messages deve ser uma lista")
+        repeat, keep_open = spec.get("repeat", 1), spec.get("keep_open", True)
+        if isinstance(repeat, bool) or not isinstance(repeat, int) or repeat < 0:
+            raise ValueError(f"'{STREAM_KEY}': repeat deve ser um inteiro não negativo (0 = sem fim)")
+        if not isinstance(keep_open, bool):
+            raise ValueError(f"'{STREAM_KEY}': keep_open deve ser booleano")
+        self.source = source
+        self.stream = spec["type"]
+        self.messages = tuple(_ScriptMessage(self.stream, m) for m in messages)
+        if repeat == 0 and not any(m.delay for m in self.messages):
+            raise ValueError(f"'{STREAM_KEY}': repeat 0 (sem fim) exige mensagens com delay_ms")
+        self.repeat = repeat
+        self.keep_open = keep_open
+        templates = [m.template for m in self.messages if m.template is not None]
+        self.dynamic = bool(templates)
+        self.sources = frozenset().union(*(t.sources for t in templates))
+
+    def render(self, ctx: RenderContext) -> Iterator[Tuple[float, Frame]]:
+        """Roteiro da conexão: (segundos de espera, frame); mensagens com placeholders são renderizadas aqui."""
+        rounds = itertools.count() if self.repeat == 0 else range(self.repeat)
+        for _ in rounds:
+            for message in self.messages:
+                frame = message.frame
+                if frame is None:
+                    frame = encode_frame(self.stream, message.template.render(ctx), message.event, message.event_id)
+                yield message.delay, frame
+
+
+class BroadcastChannel:
+    """Mensagens publicadas para as conexões de um mock, num buffer circular compartilhado."""
+
+    __slots__ = ("kind", "frames", "seq", "subscribers", "_event")
+
+    def __init__(self, kind: str, buffer_size: int):
+        self.kind = kind
+        self.frames: deque = deque(maxlen=buffer_size)
+        # Número de mensagens já publicadas (a posição de cada conexão é comparada com ele)
+        self.seq = 0
+        self.subscribers = 0
+        self._event = asyncio.Event()
+
+    def publish(self, frame: Frame):
+        self.frames.append(frame)
+        self.seq += 1
+        # Acorda todas as conexões de uma vez; as próximas esperas usam um Event novo
+        event, self._event = self._event, asyncio.Event()
+        event.set()
+
+    def pending(self, cursor: int) -> Tuple[List[Frame], int]:
+        """(mensagens depois de cursor ainda no buffer, quantas já saíram do buffer)."""
+        missing = self.seq - cursor
+        if not missing:
+            return [], 0
+        available = min(missing, len(self.frames))
+        # Índices negativos: acesso pelo fim do deque, sem percorrer o buffer inteiro
+        return [self.frames[-i] for i in range(available, 0, -1)], missing - available
+
+    async def wait(self, cursor: int, timeout: Optional[float] = None):
+        """Espera uma publicação depois de cursor (ou o timeout, em segundos)."""
+        if cursor != self.seq:
+            return
+        if timeout is None:
+            await self._event.wait()
+            return
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+class StreamSlot:
+    """Vaga de conexão reservada no hub; release() devolve a vaga uma única vez."""
+
+    def __init__(self, hub: "StreamHub"):
+        self.hub = hub
+        self.released = False
+        hub.connections += 1
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self.hub.connections -= 1
+
+
+class StreamHub:
+    """Canais de broadcast por mock e as conexões SSE/WebSocket abertas (todas no event loop da API)."""
+
+    def __init__(self, buffer_size: int = 256, max_connections: int = 20000):
+        self.buffer_size = buffer_size
+        self.max_connections = max_connections
+        # (mock_id, tipo) -> canal; existe enquanto houver conexão aberta
+        self.channels: Dict[Tuple[str, str], BroadcastChannel] = {}
+        self.connections = 0
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.rejected = 0
+
+    @classmethod
+    def from_env(cls) -> "StreamHub":
+        return cls(
+            buffer_size=int(os.getenv("STREAM_BUFFER_SIZE", "256")),
+            max_connections=int(os.getenv("STREAM_MAX_CONNECTIONS", "20000"))
+        )
+
+    def admit(self) -> Optional[StreamSlot]:
+        """Reserva a vaga da conexão já na admissão; None (e conta a rejeição) se o limite foi atingido.
+
+        A vaga é liberada no fim do stream() que a recebe; se a resposta não chegar a começar,
+        quem chamou admit() a libera com slot.release().
+        """
+        if self.connections >= self.max_connections:
+            self.rejected += 1
+            logger.warning(f"⚠️  Limite de conexões de streaming atingido ({self.max_connections})")
+            return None
+        return StreamSlot(self)
+
+    def publish(self, mock_id: str, kind: str, message: Dict[str, Any]) -> int:
+        """Envia a mensagem a todas as conexões abertas do mock; retorna quantas a receberão.
+
+        A mensagem é codificada uma única vez; ValueError se for inválida (mesmo sem conexões).
+        """
+        data, event, event_id, _ = parse_message(kind, message)
+        channel = self.channels.get((mock_id, kind))
+        if channel is None:
+            return 0
+        channel.publish(encode_frame(kind, data, event, event_id))
+        self.published += 1
+        return channel.subscribers
+
+    def _drain(self, channel: BroadcastChannel, cursor: int) -> Tuple[int, List[Frame]]:
+        frames, lost = channel.pending(cursor)
+        if lost:
+            self.dropped += lost
+        self.delivered += len(frames)
+        return channel.seq, frames
+
+    async def stream(self, mock_id: str, kind: str, script: Iterator[Tuple[float, Frame]],
+                     keep_open: bool, slot: Optional[StreamSlot] = None) -> AsyncIterator[Frame]:
+        """Frames de uma conexão: o roteiro com as esperas, intercalado com o broadcast do mock.
+
+        slot é a vaga reservada por admit(); sem ele a conexão ocupa uma vaga sem passar pelo limite.
+        """
+        if slot is None:
+            slot = StreamSlot(self)
+        key = (mock_id, kind)
+        channel = self.channels.get(key)
+        if channel is None:
+            channel = self.channels[key] = BroadcastChannel(kind, self.buffer_size)
+        channel.subscribers += 1
+        cursor = channel.seq
+        loop = asyncio.get_running_loop()
+        try:
+            for delay, frame in script:
+                deadline = loop.time() + delay
+                while True:
+                    cursor, frames = self._drain(channel, cursor)
+                    for pushed in frames:
+                        yield pushed
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    await channel.wait(cursor, remaining)
+                self.delivered += 1
+                yield frame
+            while keep_open:
+                cursor, frames = self._drain(channel, cursor)
+                for pushed in frames:
+                    yield pushed
+                await channel.wait(cursor)
+        finally:
+            channel.subscribers -= 1
+            slot.release()
+            if not channel.subscribers and self.channels.get(key) is channel:
+                del self.channels[key]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'connections': self.connections,
+            'max_connections': self.max_connections,
+            'channels': len(self.channels),
+            'published': self.published,
+            'delivered': self.delivered,
+            'dropped': self.dropped,
+            'rejected': self.rejected
+        }
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Logging estruturado fora do caminho quente: QueueHandler + QueueListener, JSON e log de acesso amostrado
+
+As chamadas de log só montam a mensagem (msg % args, como o QueueHandler) e enfileiram o LogRecord;
+a formatação (texto, ou JSON com LOG_FORMAT=json) e a escrita no stderr acontecem na thread do
+QueueListener. O log de acesso enfileira só uma tupla com os campos, e o
+LogRecord é montado pelo listener. Com a fila cheia o registro é descartado e contado, então
+logar nunca bloqueia o catch_all. O log de acesso do uvicorn é substituído pelo AccessLogMiddleware,
+com amostragem configurável e nível mínimo por rota (que vale também para os logs da aplicação
+emitidos durante a requisição).
+"""
+
+import os
+import sys
+import copy
+import time
+import queue
+import atexit
+import random
+import logging
+import contextvars
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, List, Optional, Tuple
+
+from src import json_codec
+
+logger = logging.getLogger(__name__)
+
+ACCESS_LOGGER = "qa_api.access"
+
+# Nível mínimo da rota da requisição em andamento (definido pelo AccessLogMiddleware)
+_route_level: contextvars.ContextVar[int] = contextvars.ContextVar("qa_api_route_level", default=logging.NOTSET)
+
+# Só para formatar tracebacks na thread de quem loga (prepare)
+_EXC_FORMATTER = logging.Formatter()
+
+# Atributos padrão do LogRecord (e o color_message do uvicorn); o resto veio de extra= e vai como campo no JSON
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "color_message"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Uma linha JSON por registro: ts, level, logger, msg, campos de extra= e exc."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage()
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        try:
+            return json_codec.dumps(entry)
+        except TypeError:
+            return json_codec.dumps({k: v if isinstance(v, (str, int, float, bool, type(None))) else repr(v)
+                                     for k, v in entry.items()})
+
+
+class RouteLevelFilter(logging.Filter):
+    """Descarta registros abaixo do nível mínimo da rota da requisição atual."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= _route_level.get()
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler que só monta a mensagem na thread de quem loga e descarta (contando) com a fila cheia."""
+
+    def __init__(self, log_queue: queue.SimpleQueue, max_size: int):
+        super().__init__(log_queue)
+        self.max_size = max_size
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Como o QueueHandler.prepare: msg % args agora, então alterar um argumento depois de logar não muda
+        # a linha; o traceback vira texto. O formato (JSON/texto) e os campos de extra= ficam para o listener
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or _EXC_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: Any):
+        # SimpleQueue não tem limite próprio; o tamanho checado antes do put é aproximado
+        if self.queue.qsize() >= self.max_size:
+            self.dropped += 1
+            return
+        self.queue.put(record)
+
+
+class _AccessAwareListener(QueueListener):
+    """QueueListener que monta, na própria thread, o LogRecord dos acessos enfileirados como tupla."""
+
+    def prepare(self, record: Any) -> logging.LogRecord:
+        if type(record) is not tuple:
+            return record
+        created, level, method, path, status, duration_ms, client = record
+        access = logging.LogRecord(ACCESS_LOGGER, level, "(access)", 0, '%s "%s %s" %s %.1fms',
+                                   (client, method, path, status, duration_ms), None)
+        access.created = created
+        access.msecs = (created - int(created)) * 1000
+        access.__dict__.update(method=method, path=path, status=status, duration_ms=round(duration_ms, 2), client=client)
+        return access
+
+
+class StructuredLogging:
+    """Configuração do logging do processo da API (root, uvicorn e log de acesso)."""
+
+    def __init__(self, enabled: bool = True, log_format: str = "text", level: str = "INFO",
+                 queue_size: int = 10000, access_log: bool = True, access_sample_rate: float = 1.0,
+                 route_levels: str = ""):
+        self.enabled = enabled
+        self.log_format = log_format
+        level_value = logging.getLevelName(level.upper())
+        self.level = level_value if isinstance(level_value, int) else logging.INFO
+        self.queue_size = queue_size
+        self.access_log = access_log
+        self.access_sample_rate = max(0.0, min(1.0, access_sample_rate))
+        self.route_levels = self._parse_route_levels(route_levels)
+        self.queue: "queue.SimpleQueue[Any]" = queue.SimpleQueue()
+        self.handler = NonBlockingQueueHandler(self.queue, queue_size)
+        self.handler.addFilter(RouteLevelFilter())
+        self.listener: Optional[QueueListener] = None
+        self.access_logger = logging.getLogger(ACCESS_LOGGER)
+
+        self.access_logged = 0
+        self.access_sampled_out = 0
+
+    @classmethod
+    def from_env(cls) -> "StructuredLogging":
+        return cls(
+            enabled=os.getenv("LOG_QUEUE_ENABLED", "true").lower() == "true",
+            log_format=os.getenv("LOG_FORMAT", "text").lower(),
+            level=os.getenv("LOG_LEVEL", "INFO"),
+            queue_size=int(os.getenv("LOG_QUEUE_SIZE", "10000")),
+            access_log=os.getenv("LOG_ACCESS", "true").lower() == "true",
+            access_sample_rate=float(os.getenv("LOG_ACCESS_SAMPLE_RATE", "1.0")),
+            route_levels=os.getenv("LOG_ROUTE_LEVELS", "")
+        )
+
+    @staticmethod
+    def _parse_route_levels(spec: str) -> List[Tuple[str, int]]:
+        """"/status=WARNING,/mocks=INFO" -> [(prefixo, nível)], prefixos mais longos primeiro."""
+        routes = []
+        for item in spec.split(","):
+            if "=" not in item:
+                continue
+            prefix, level_name = (part.strip() for part in item.split("=", 1))
+            level = logging.getLevelName(level_name.upper())
+            if not prefix or not isinstance(level, int):
+                logger.warning(f"⚠️  LOG_ROUTE_LEVELS: item inválido ignorado: {item!r}")
+                continue
+            routes.append((prefix.rstrip("/") or "/", level))
+        return sorted(routes, key=lambda route: len(route[0]), reverse=True)
+
+    def route_level(self, path: str) -> int:
+        for prefix, level in self.route_levels:
+            if prefix == "/" or path == prefix or path.startswith(prefix + "/"):
+                return level
+        return logging.NOTSET
+
+    def install(self):
+        """Troca os handlers do root e do uvicorn pela fila e inicia a thread do listener."""
+        if not self.enabled or self.listener is not None:
+            return
+        output = logging.StreamHandler(sys.stderr)
+        output.setFormatter(JsonFormatter() if self.log_format == "json" else logging.Formatter(logging.BASIC_FORMAT))
+        self.listener = _AccessAwareListener(self.queue, output, respect_handler_level=True)
+        self.listener.start()
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(self.handler)
+        root.setLevel(self.level)
+        # uvicorn configura handlers próprios antes de importar a app: passam a ir para o root (fila)
+        for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+            uvicorn_logger = logging.getLogger(name)
+            uvicorn_logger.handlers = []
+            uvicorn_logger.propagate = True
+        # O AccessLogMiddleware substitui o log de acesso do uvicorn (LOG_ACCESS liga/desliga só o dele)
+        logging.getLogger("uvicorn.access").disabled = True
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Grava o que ainda está na fila e encerra o listener."""
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+    def log_access(self, method: str, path: str, status: int, duration_ms: float, client: str):
+        level = logging.ERROR if status >= 500 else logging.WARNING if status >= 400 else logging.INFO
+        if level < self.route_level(path) or not self.access_logger.isEnabledFor(level):
+            return
+        # Amostragem só para o tráfego normal: 4xx/5xx são sempre registrados
+        if level < logging.WARNING and self.access_sample_rate < 1.0 and random.random() >= self.access_sample_rate:
+            self.access_sampled_out += 1
+            return
+        self.access_logged += 1
+        self.handler.enqueue((time.time(), level, method, path, status, duration_ms, client))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'enabled': self.enabled,
+            'format': self.log_format,
+            'queued': self.queue.qsize(),
+            'queue_size': self.queue_size,
+            'dropped': self.handler.dropped,
+            'access_log': self.access_log,
+            'access_sample_rate': self.access_sample_rate,
+            'access_logged': self.access_logged,
+            'access_sampled_out': self.access_sampled_out
+        }
+
+
+class AccessLogMiddleware:
+    """Middleware ASGI: define o nível mínimo da rota para a requisição e registra o acesso ao final."""
+
+    def __init__(self, app, logging_setup: StructuredLogging):
+        self.app = app
+        self.logging_setup = logging_setup
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        setup = self.logging_setup
+        path = scope["path"]
+        token = _route_level.set(setup.route_level(path))
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            if setup.access_log:
+                client = scope.get("client")
+                setup.log_access(scope["method"], path, status, (time.perf_counter() - started) * 1000,
+                                 client[0] if client else "-")
+            _route_level.reset(token)
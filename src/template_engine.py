@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Templates de resposta compilados uma única vez por mock
+
+Sintaxe: {{fonte.caminho|filtro|...}}
+- fontes: path, query, body, headers (ex.: {{path.id}}, {{body.user.name}}, {{body.items.0}})
+- filtros: int, float, bool, str, default:VALOR (VALOR é lido como JSON, senão string)
+- uma string que é apenas um placeholder mantém o tipo do valor ("{{body.qtd|int}}" -> 10)
+- placeholders dentro de texto são interpolados ("user-{{path.id}}" -> "user-42")
+
+Respostas geradas: {"$generate": {"count": N, "item": {...}}} vira um array de N itens
+renderizados sob demanda (streaming), com {{item.index}}, {{item.seq}} e {{item.random}}
+disponíveis no template do item. Opcionais: seed, start, step e random_range [min, max].
+
+Respostas {"$stream": {...}} (SSE/WebSocket) são compiladas por src.stream_mocks.StreamTemplate.
+"""
+
+import os
+import re
+import json
+import random
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src import json_codec
+
+logger = logging.getLogger(__name__)
+
+# Compatibilidade (opt-in): strings iguais ao nome de uma variável são substituídas ("id" -> valor de :id)
+LEGACY_VARS = os.getenv("TEMPLATE_LEGACY_VARS", "false").lower() == "true"
+
+SOURCES = ("path", "query", "body", "headers")
+
+GENERATE_KEY = "$generate"
+STREAM_KEY = "$stream"
+SEQUENCE_KEY = "$sequence"
+ECHO_KEY = "$echo"
+SINK_KEY = "$sink"
+# Limite de itens de uma resposta gerada (protege contra count vindo da query sem limite)
+GENERATOR_MAX_ITEMS = int(os.getenv("GENERATOR_MAX_ITEMS", "50000000"))
+
+_PLACEHOLDER_RE = re.compile(r"\{\{\s*([^{}]+?)\s*\}\}")
+_MISSING = object()
+
+
+class RenderContext:
+    """Valores da requisição disponíveis para os templates."""
+
+    __slots__ = ("path", "query", "body", "headers", "item", "_legacy")
+
+    def __init__(self, path: Optional[Dict[str, Any]] = None, query: Optional[Dict[str, Any]] = None,
+                 body: Any = None, headers: Optional[Dict[str, Any]] = None):
+        self.path = path or {}
+        self.query = query or {}
+        self.body = body
+        self.headers = headers or {}
+        # Variáveis do item atual de uma resposta gerada ({{item.index}}, ...)
+        self.item: Dict[str, Any] = {}
+        self._legacy = None
+
+    def derive(self) -> "RenderContext":
+        """Cópia rasa para renderizar itens gerados sem alterar o contexto da requisição."""
+        child = RenderContext(self.path, self.query, self.body, self.headers)
+        child._legacy = self._legacy
+        return child
+
+    @property
+    def legacy(self) -> Dict[str, Any]:
+        """Variáveis no formato antigo: path, depois query, depois body (se for objeto)."""
+        if self._legacy is None:
+            variables = dict(self.path)
+            variables.update(self.query)
+            if isinstance(self.body, dict):
+                variables.update(self.body)
+            self._legacy = variables
+        return self._legacy
+
+
+def _parse_default(raw: str) -> Any:
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return raw
+
+
+def _to_bool(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "sim", "on")
+    return bool(value)
+
+
+_CASTS: Dict[str, Callable[[Any], Any]] = {
+    "int": int,
+    "float": float,
+    "bool": _to_bool,
+    "str": lambda v: v if isinstance(v, str) else json_codec.dumps(v),
+}
+
+
+class Placeholder:
+    """Placeholder já analisado: fonte, caminho e filtros."""
+
+    __slots__ = ("source", "keys", "filters", "expression")
+
+    def __init__(self, expression: str):
+        parts = [p.strip() for p in expression.split("|")]
+        path = parts[0].split(".")
+        if path[0] not in SOURCES and path[0] != "item":
+            raise ValueError(f"Fonte inválida no template '{{{{{expression}}}}}': use {', '.join(SOURCES)}")
+        self.expression = expression
+        self.source = path[0]
+        self.keys: Tuple[Any, ...] = tuple(int(k) if k.isdigit() else k for k in path[1:] if k)
+        if self.source == "headers":
+            self.keys = tuple(k.lower() if isinstance(k, str) else k for k in self.keys)
+        filters: List[Tuple[str, Any]] = []
+        for flt in parts[1:]:
+            name, _, arg = flt.partition(":")
+            name = name.strip()
+            if name == "default":
+                filters.append((name, _parse_default(arg.strip())))
+            elif name in _CASTS:
+                filters.append((name, None))
+            else:
+                raise ValueError(f"Filtro desconhecido '{name}' no template '{{{{{expression}}}}}'")
+        self.filters = tuple(filters)
+
+    def resolve(self, ctx: RenderContext) -> Any:
+        value = getattr(ctx, self.source)
+        for key in self.keys:
+            if isinstance(value, dict):
+                value = value.get(key, _MISSING)
+            elif isinstance(value, list) and isinstance(key, int) and key < len(value):
+                value = value[key]
+            else:
+                value = _MISSING
+            if value is _MISSING:
+                break
+        for name, arg in self.filters:
+            if name == "default":
+                if value is _MISSING or value is None:
+                    value = arg
+            elif value is not _MISSING and value is not None:
+                try:
+                    value = _CASTS[name](value)
+                except (TypeError, ValueError):
+                    logger.debug(f"Falha ao converter '{value}' com filtro {name} em {{{{{self.expression}}}}}")
+        return None if value is _MISSING else value
+
+
+def _format(value: Any) -> str:
+    if isinstance(value, str):
+        return value
+    if value is None:
+        return ""
+    return json_codec.dumps(value)
+
+
+def parse_string(text: str) -> Optional[List[Any]]:
+    """Divide a string em segmentos (str literal ou Placeholder). None se não houver placeholders."""
+    segments: List[Any] = []
+    pos = 0
+    for match in _PLACEHOLDER_RE.finditer(text):
+        if match.start() > pos:
+            segments.append(text[pos:match.start()])
+        segments.append(Placeholder(match.group(1)))
+        pos = match.end()
+    if not segments:
+        return None
+    if pos < len(text):
+        segments.append(text[pos:])
+    return segments
+
+
+class GeneratedArray(json_codec.LazyArray):
+    """Array de uma resposta gerada: os itens só são renderizados ao serializar (iter_json)."""
+
+    __slots__ = ("generator", "ctx", "count")
+
+    def __init__(self, generator: "_Generator", ctx: RenderContext, count: int):
+        self.generator = generator
+        self.ctx = ctx
+        self.count = count
+
+    @property
+    def nested(self) -> bool:
+        return self.generator.item.streaming
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self):
+        gen = self.generator
+        rng = random.Random(gen.seed)
+        low, high = gen.random_range
+        span = high - low + 1
+        item_ctx = self.ctx.derive()
+        render = gen.item.render
+        start, step, draw = gen.start, gen.step, rng.random
+        for index in range(self.count):
+            item_ctx.item = {"index": index, "seq": start + index * step, "random": low + int(draw() * span)}
+            yield render(item_ctx)
+
+
+class _Generator:
+    """Especificação compilada de um {"$generate": {...}}."""
+
+    __slots__ = ("item", "seed", "start", "step", "random_range", "_count_dynamic", "_count")
+
+    def __init__(self, spec: Any, legacy: bool):
+        if not isinstance(spec, dict) or "count" not in spec or "item" not in spec:
+            raise ValueError(f"'{GENERATE_KEY}' espera um objeto com 'count' e 'item'")
+        self.item = CompiledTemplate(spec["item"], legacy)
+        self._count_dynamic, self._count = _compile(spec["count"], legacy)
+        if not self._count_dynamic:
+            self._check_count(self._count)
+        try:
+            self.seed = spec.get("seed", 0)
+            if not isinstance(self.seed, (int, float, str)):
+                raise TypeError(self.seed)
+            self.start = int(spec.get("start", 1))
+            self.step = int(spec.get("step", 1))
+            low, high = spec.get("random_range", [0, 1000000])
+            self.random_range = (int(low), int(high))
+        except (TypeError, ValueError):
+            raise ValueError(f"'{GENERATE_KEY}': seed deve ser simples; start, step e random_range [min, max] devem ser inteiros")
+        if self.random_range[0] > self.random_range[1]:
+            raise ValueError(f"'{GENERATE_KEY}': random_range com mínimo maior que o máximo")
+
+    @staticmethod
+    def _check_count(count: Any) -> int:
+        try:
+            count = int(count)
+        except (TypeError, ValueError):
+            raise ValueError(f"'{GENERATE_KEY}': count deve ser um inteiro (ou placeholder), recebido {count!r}")
+        if count < 0 or count > GENERATOR_MAX_ITEMS:
+            raise ValueError(f"'{GENERATE_KEY}': count deve estar entre 0 e {GENERATOR_MAX_ITEMS}")
+        return count
+
+    def render(self, ctx: RenderContext) -> GeneratedArray:
+        count = self._count(ctx) if self._count_dynamic else self._count
+        try:
+            count = self._check_count(count)
+        except ValueError as e:
+            # count vindo da requisição (ex.: {{query.size|int}}) inválido: gera um array vazio
+            logger.warning(f"⚠️  {e}")
+            count = 0
+        return GeneratedArray(self, ctx, count)
+
+
+def _compile(obj: Any, legacy: bool) -> Tuple[bool, Any]:
+    """Retorna (dinâmico, valor). Se dinâmico, valor é uma função ctx -> valor renderizado."""
+    if isinstance(obj, str):
+        segments = parse_string(obj) if "{{" in obj else None
+        if segments is not None:
+            if len(segments) == 1:
+                return True, segments[0].resolve
+            segs = tuple(segments)
+            return True, lambda ctx: "".join(s if s.__class__ is str else _format(s.resolve(ctx)) for s in segs)
+        if legacy:
+            return True, lambda ctx: ctx.legacy.get(obj, obj)
+        return False, obj
+    if isinstance(obj, dict):
+        if GENERATE_KEY in obj:
+            if len(obj) != 1:
+                raise ValueError(f"'{GENERATE_KEY}' deve ser a única chave do objeto")
+            return True, _Generator(obj[GENERATE_KEY], legacy).render
+        items = [(k,) + _compile(v, legacy) for k, v in obj.items()]
+        if not any(dyn for _, dyn, _ in items):
+            return False, obj
+        frozen = tuple(items)
+        return True, lambda ctx: {k: (v(ctx) if dyn else v) for k, dyn, v in frozen}
+    if isinstance(obj, list):
+        items = [_compile(v, legacy) for v in obj]
+        if not any(dyn for dyn, _ in items):
+            return False, obj
+        frozen = tuple(items)
+        return True, lambda ctx: [v(ctx) if dyn else v for dyn, v in frozen]
+    return False, obj
+
+
+# Conjuntos de fontes compartilhados entre templates (são poucas combinações possíveis)
+_SOURCE_SETS: Dict[frozenset, frozenset] = {}
+
+
+class CompiledTemplate:
+    """Resposta pré-compilada; render faz uma única passada pelos segmentos dinâmicos."""
+
+    __slots__ = ("source", "dynamic", "sources", "uses_legacy", "streaming", "_value")
+
+    # Tipo de stream ("sse"/"websocket") só em StreamTemplate; modo ("sequence"/"cycle"/"weighted") só em SequenceTemplate;
+    # "echo"/"sink" só em PipeTemplate
+    stream = None
+    sequence = None
+    pipe = None
+
+    def __init__(self, source: Any, legacy: Optional[bool] = None):
+        legacy = LEGACY_VARS if legacy is None else legacy
+        self.source = source
+        self.dynamic, self._value = _compile(source, legacy)
+        placeholders = _collect_placeholders(source)
+        self.uses_legacy = self.dynamic and legacy and _has_plain_strings(source)
+        # Com arrays gerados a resposta é enviada em streaming (json_codec.iter_json)
+        self.streaming = _has_generator(source)
+        # Fontes que o template realmente lê; o catch_all só extrai essas da requisição
+        sources = {p.source for p in placeholders if p.source != "item"}
+        if self.uses_legacy:
+            sources.update(("path", "query", "body"))
+        sources = frozenset(sources)
+        self.sources = _SOURCE_SETS.setdefault(sources, sources)
+
+    def render(self, ctx: RenderContext) -> Any:
+        if self.dynamic:
+            return self._value(ctx)
+        return self._value
+
+
+def _iter_strings(obj: Any):
+    if isinstance(obj, str):
+        yield obj
+    elif isinstance(obj, dict):
+        for v in obj.values():
+            yield from _iter_strings(v)
+    elif isinstance(obj, list):
+        for v in obj:
+            yield from _iter_strings(v)
+
+
+def _collect_placeholders(obj: Any) -> List[Placeholder]:
+    found: List[Placeholder] = []
+    for text in _iter_strings(obj):
+        if "{{" in text:
+            found.extend(s for s in (parse_string(text) or []) if isinstance(s, Placeholder))
+    return found
+
+
+def _has_generator(obj: Any) -> bool:
+    if isinstance(obj, dict):
+        return GENERATE_KEY in obj or any(_has_generator(v) for v in obj.values())
+    if isinstance(obj, list):
+        return any(_has_generator(v) for v in obj)
+    return False
+
+
+def _has_plain_strings(obj: Any) -> bool:
+    return any("{{" not in text for text in _iter_strings(obj))
+
+
+def compile_template(response: Any, legacy: Optional[bool] = None) -> CompiledTemplate:
+    """Compila a resposta de um mock. Lança ValueError para templates inválidos."""
+    if isinstance(response, dict) and STREAM_KEY in response:
+        from src.stream_mocks import StreamTemplate  # evita import circular
+        return StreamTemplate(response)
+    if isinstance(response, dict) and SEQUENCE_KEY in response:
+        from src.sequences import SequenceTemplate  # evita import circular
+        return SequenceTemplate(response)
+    if isinstance(response, dict) and (ECHO_KEY in response or SINK_KEY in response):
+        from src.throughput_mocks import PipeTemplate  # evita import circular
+        return PipeTemplate(response)
+    return CompiledTemplate(response, legacy)
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Mocks de vazão: eco do corpo da requisição e sumidouro com resposta de N bytes
+
+A resposta do mock é uma destas (única chave):
+    {"$echo": {}}                      # devolve o corpo da requisição, pedaço a pedaço, enquanto chega
+    {"$sink": {"response_bytes": 10485760, "query_param": "bytes", "chunk_size": 65536}}
+                                       # descarta o corpo enviado e responde N bytes (0 = resumo JSON)
+
+Nenhum corpo é montado em memória nem interpretado como JSON: o eco repassa os próprios pedaços
+recebidos do servidor ASGI (sem cópia) e o sumidouro responde reenviando sempre o mesmo buffer de
+chunk_size bytes. A memória por requisição fica limitada a um pedaço. query_param deixa o cliente
+escolher N (?bytes=1048576), até PIPE_MAX_RESPONSE_BYTES (padrão 1 GB).
+
+Cada requisição registra bytes recebidos/enviados, duração e bytes/s no log (campos extras do
+logger src.throughput_mocks) e no acumulado de GET /status (throughput).
+"""
+
+import os
+import time
+import logging
+from typing import Any, AsyncIterator, Dict, Mapping
+
+from starlette.requests import ClientDisconnect, Request
+from starlette.responses import Response
+
+from src.json_codec import FastJSONResponse
+from src.template_engine import ECHO_KEY, SINK_KEY
+
+logger = logging.getLogger(__name__)
+
+PIPE_TYPES = {ECHO_KEY: "echo", SINK_KEY: "sink"}
+MAX_RESPONSE_BYTES = int(os.getenv("PIPE_MAX_RESPONSE_BYTES", str(1 << 30)))
+MAX_CHUNK_SIZE = 16 << 20
+# Pedaços enviados entre as verificações de desconexão do cliente no sumidouro
+_DISCONNECT_CHECK_EVERY = 64
+
+
+def _int_option(spec: Dict[str, Any], key: str, default: int, minimum: int, maximum: int) -> int:
+    value = spec.get(key, default)
+    if isinstance(value, bool) or not isinstance(value, int) or not minimum <= value <= maximum:
+        raise ValueError(f"{key} deve ser um inteiro entre {minimum} e {maximum}")
+    return value
+
+
+class PipeTemplate:
+    """Resposta {"$echo": ...} ou {"$sink": ...} compilada; o catch_all a serve com ThroughputMeter.response."""
+
+    __slots__ = ("source", "pipe", "response_bytes", "query_param", "chunk", "content_type")
+
+    stream = None
+    sequence = None
+    # Nunca é renderizada nem serializada: o corpo sai em streaming
+    streaming = True
+    dynamic = True
+    uses_legacy = False
+    sources = frozenset()
+
+    def __init__(self, source: Dict[str, Any]):
+        if len(source) != 1:
+            raise ValueError(f"'{next(k for k in source if k in PIPE_TYPES)}' deve ser a única chave da resposta")
+        key, spec = next(iter(source.items()))
+        if not isinstance(spec, dict):
+            raise ValueError(f"'{key}' espera um objeto de opções ({{}} para o padrão)")
+        self.source = source
+        self.pipe = PIPE_TYPES[key]
+        content_type = spec.get("content_type")
+        if content_type is not None and not isinstance(content_type, str):
+            raise ValueError(f"'{key}': content_type deve ser uma string")
+        self.content_type = content_type
+        try:
+            self.response_bytes = _int_option(spec, "response_bytes", 0, 0, MAX_RESPONSE_BYTES)
+            # Buffer único, reenviado em todos os pedaços de todas as respostas do mock
+            self.chunk = bytes(_int_option(spec, "chunk_size", 65536, 1, MAX_CHUNK_SIZE))
+        except ValueError as e:
+            raise ValueError(f"'{key}': {e}")
+        query_param = spec.get("query_param")
+        if query_param is not None and (not isinstance(query_param, str) or not query_param):
+            raise ValueError(f"'{key}': query_param deve ser o nome de um parâmetro da query")
+        self.query_param = query_param
+
+    def size(self, query: Mapping[str, str]) -> int:
+        """Bytes da resposta do sumidouro: ?query_param= (se informado) ou response_bytes; ValueError se inválido."""
+        raw = query.get(self.query_param) if self.query_param else None
+        if raw is None:
+            return self.response_bytes
+        if not raw.isdigit() or int(raw) > MAX_RESPONSE_BYTES:
+            raise ValueError(f"{self.query_param} deve ser um inteiro entre 0 e {MAX_RESPONSE_BYTES}")
+        return int(raw)
+
+    def render(self, ctx: Any) -> Any:
+        """As próprias opções (usado só pela explicação do match)."""
+        return self.source
+
+
+class PipeResponse(Response):
+    """Resposta em streaming sem o listener de desconexão do StreamingResponse.
+
+    O eco lê o corpo da requisição enquanto responde; o listener do Starlette também chama receive()
+    e descartaria pedaços do corpo.
+    """
+
+    def __init__(self, chunks: AsyncIterator[bytes], status_code: int, headers: Dict[str, str], media_type: str):
+        self.body_iterator = chunks
+        self.status_code = status_code
+        self.media_type = None
+        self.background = None
+        # Content-Type exatamente como informado (media_type do Starlette acrescentaria charset em text/*)
+        if not any(name.lower() == "content-type" for name in headers):
+            headers["content-type"] = media_type
+        self.init_headers(headers)
+
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        async for chunk in self.body_iterator:
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+class ThroughputMeter:
+    """Serve os mocks de vazão e acumula bytes e tempo por tipo (tudo no event loop da API, sem lock)."""
+
+    def __init__(self):
+        self.totals = {kind: {'requests': 0, 'bytes_in': 0, 'bytes_out': 0, 'seconds': 0.0}
+                       for kind in PIPE_TYPES.values()}
+
+    def _record(self, kind: str, mock_id: str, bytes_in: int, bytes_out: int, seconds: float):
+        totals = self.totals[kind]
+        totals['requests'] += 1
+        totals['bytes_in'] += bytes_in
+        totals['bytes_out'] += bytes_out
+        totals['seconds'] += seconds
+        rate = (bytes_in + bytes_out) / seconds if seconds > 0 else 0.0
+        logger.info(
+            f"Vazão {kind} (mock {mock_id}): {bytes_in} B recebidos, {bytes_out} B enviados em {seconds:.3f} s "
+            f"({rate / 1e6:.1f} MB/s)",
+            extra={'mock_id': mock_id, 'pipe': kind, 'bytes_in': bytes_in, 'bytes_out': bytes_out,
+                   'duration_ms': round(seconds * 1000, 3), 'bytes_per_second': round(rate)}
+        )
+
+    async def response(self, mock_id: str, template: PipeTemplate, request: Request, status_code: int,
+                       headers: Dict[str, str]) -> Response:
+        started = time.perf_counter()
+        headers = dict(headers or {})
+        if template.pipe == "echo":
+            length = request.headers.get("content-length")
+            if length is not None:
+                headers["content-length"] = length
+            media_type = template.content_type or request.headers.get("content-type") or "application/octet-stream"
+            return PipeResponse(self._echo(mock_id, request, started), status_code, headers, media_type)
+
+        try:
+            size = template.size(request.query_params)
+        except ValueError as ve:
+            return FastJSONResponse(status_code=400, content={"erro": str(ve)})
+        received = await self._drain(request)
+        if not size:
+            seconds = time.perf_counter() - started
+            self._record("sink", mock_id, received, 0, seconds)
+            return FastJSONResponse(status_code=status_code, headers=headers, content={
+                "bytes_recebidos": received,
+                "segundos": round(seconds, 6),
+                "bytes_por_segundo": round(received / seconds) if seconds > 0 else None
+            })
+        headers["content-length"] = str(size)
+        return PipeResponse(self._sink(mock_id, template.chunk, size, received, request, started), status_code, headers,
+                            template.content_type or "application/octet-stream")
+
+    @staticmethod
+    async def _drain(request: Request) -> int:
+        received = 0
+        try:
+            async for chunk in request.stream():
+                received += len(chunk)
+        except ClientDisconnect:
+            pass
+        return received
+
+    async def _echo(self, mock_id: str, request: Request, started: float) -> AsyncIterator[bytes]:
+        received = 0
+        try:
+            async for chunk in request.stream():
+                if chunk:
+                    received += len(chunk)
+                    yield chunk
+        except ClientDisconnect:
+            pass
+        finally:
+            self._record("echo", mock_id, received, received, time.perf_counter() - started)
+
+    async def _sink(self, mock_id: str, chunk: bytes, size: int, received: int, request: Request,
+                    started: float) -> AsyncIterator[bytes]:
+        sent = 0
+        try:
+            full, rest = divmod(size, len(chunk))
+            for n in range(full):
+                # Cliente que desistiu: para de gerar (o servidor descartaria os bytes)
+                if n % _DISCONNECT_CHECK_EVERY == _DISCONNECT_CHECK_EVERY - 1 and await request.is_disconnected():
+                    return
+                yield chunk
+                sent += len(chunk)
+            if rest:
+                yield chunk[:rest]
+                sent += rest
+        finally:
+            self._record("sink", mock_id, received, sent, time.perf_counter() - started)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = {}
+        for kind, totals in self.totals.items():
+            seconds = totals['seconds']
+            stats[kind] = dict(
+                totals,
+                seconds=round(seconds, 3),
+                in_bytes_per_second=round(totals['bytes_in'] / seconds) if seconds > 0 else None,
+                out_bytes_per_second=round(totals['bytes_out'] / seconds) if seconds > 0 else None
+            )
+        return stats
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Variantes condicionais de resposta com predicados compilados e indexados
+
+Formato de cada variante (avaliadas em ordem, a primeira que casar vence):
+    {"when": {"path.id": "999", "query.page": {"gt": 3}, "headers.x-env": {"in": ["hml", "dev"]}},
+     "status_code_response": 404, "response": {...}, "headers": {...}}
+
+Operadores: eq (valor simples), ne, in, not_in, regex, exists, gt, gte, lt, lte.
+Predicados de igualdade (eq/in) são indexados em dicts: a escolha entre centenas de variantes
+consulta só as candidatas do índice, sem varrer a lista inteira.
+"""
+
+import re
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from src import json_codec
+from src.template_engine import CompiledTemplate, Placeholder, RenderContext, compile_template
+
+logger = logging.getLogger(__name__)
+
+_OPERATORS = ("eq", "ne", "in", "not_in", "regex", "exists", "gt", "gte", "lt", "lte")
+
+
+def _norm(value: Any) -> str:
+    """Forma canônica para comparação: "999" e 999 são iguais (path e query sempre chegam como texto)."""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if value is None:
+        return "null"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, (int, float)):
+        return str(value)
+    return json_codec.dumps(value)
+
+
+def _to_number(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class Predicate:
+    __slots__ = ("field", "placeholder", "op", "arg")
+
+    def __init__(self, field: str, op: str, arg: Any):
+        if op not in _OPERATORS:
+            raise ValueError(f"Operador desconhecido '{op}' na variante (campo {field})")
+        self.field = field
+        try:
+            self.placeholder = Placeholder(field)
+        except ValueError:
+            raise ValueError(f"Campo inválido na variante: '{field}' (use path.*, query.*, body.* ou headers.*)")
+        self.op = op
+        if op in ("eq", "ne"):
+            self.arg = _norm(arg)
+        elif op in ("in", "not_in"):
+            if not isinstance(arg, list):
+                raise ValueError(f"Operador '{op}' espera uma lista (campo {field})")
+            self.arg = frozenset(_norm(v) for v in arg)
+        elif op == "regex":
+            try:
+                self.arg = re.compile(arg)
+            except (re.error, TypeError) as e:
+                raise ValueError(f"Regex inválida na variante (campo {field}): {e}")
+        elif op == "exists":
+            self.arg = bool(arg)
+        else:
+            self.arg = _to_number(arg)
+            if self.arg is None:
+                raise ValueError(f"Operador '{op}' espera um número (campo {field})")
+
+    def matches(self, ctx: RenderContext) -> bool:
+        value = self.placeholder.resolve(ctx)
+        op = self.op
+        if op == "exists":
+            return (value is not None) == self.arg
+        if value is None:
+            return op in ("ne", "not_in")
+        if op == "eq":
+            return _norm(value) == self.arg
+        if op == "ne":
+            return _norm(value) != self.arg
+        if op == "in":
+            return _norm(value) in self.arg
+        if op == "not_in":
+            return _norm(value) not in self.arg
+        if op == "regex":
+            return self.arg.search(_norm(value)) is not None
+        number = _to_number(value)
+        if number is None:
+            return False
+        if op == "gt":
+            return number > self.arg
+        if op == "gte":
+            return number >= self.arg
+        if op == "lt":
+            return number < self.arg
+        return number <= self.arg
+
+
+class Variant:
+    """Variante compilada: predicados + resposta (template) própria."""
+
+    __slots__ = ("order", "predicates", "status_code", "template", "headers")
+
+    def __init__(self, order: int, spec: Dict[str, Any]):
+        if not isinstance(spec, dict):
+            raise ValueError(f"Variante {order} deve ser um objeto")
+        when = spec.get("when") or {}
+        if not isinstance(when, dict):
+            raise ValueError(f"Variante {order}: 'when' deve ser um objeto")
+        self.order = order
+        self.predicates: List[Predicate] = []
+        for field, condition in when.items():
+            if isinstance(condition, dict):
+                for op, arg in condition.items():
+                    self.predicates.append(Predicate(field, op, arg))
+            else:
+                self.predicates.append(Predicate(field, "eq", condition))
+        self.status_code = spec.get("status_code_response")
+        self.template: Optional[CompiledTemplate] = compile_template(spec["response"]) if "response" in spec else None
+        if self.template is not None and self.template.sequence is not None:
+            raise ValueError(f"Variante {order}: '$sequence' só vale na resposta principal do mock")
+        self.headers = spec.get("headers")
+
+    def matches(self, ctx: RenderContext) -> bool:
+        for predicate in self.predicates:
+            if not predicate.matches(ctx):
+                return False
+        return True
+
+
+class VariantSet:
+    """Conjunto ordenado de variantes de um mock com índice hash dos predicados de igualdade."""
+
+    __slots__ = ("variants", "sources", "_index", "_unindexed")
+
+    def __init__(self, specs: List[Dict[str, Any]]):
+        if not isinstance(specs, list):
+            raise ValueError("'variants' deve ser uma lista")
+        self.variants = [Variant(order, spec) for order, spec in enumerate(specs)]
+        # campo -> (placeholder, valor normalizado -> ordens das variantes)
+        self._index: Dict[str, Tuple[Placeholder, Dict[str, List[int]]]] = {}
+        self._unindexed: List[int] = []
+        sources = set()
+        for variant in self.variants:
+            sources.update(p.placeholder.source for p in variant.predicates)
+            if variant.template is not None:
+                sources.update(variant.template.sources)
+            key_predicate = next((p for p in variant.predicates if p.op in ("eq", "in")), None)
+            if key_predicate is None:
+                self._unindexed.append(variant.order)
+                continue
+            placeholder, table = self._index.setdefault(key_predicate.field, (key_predicate.placeholder, {}))
+            values = [key_predicate.arg] if key_predicate.op == "eq" else key_predicate.arg
+            for value in values:
+                table.setdefault(value, []).append(variant.order)
+        self.sources = frozenset(sources)
+
+    def candidates(self, ctx: RenderContext) -> List[int]:
+        """Ordens das variantes que podem casar, segundo o índice (mais as não indexadas)."""
+        found = list(self._unindexed)
+        for placeholder, table in self._index.values():
+            value = placeholder.resolve(ctx)
+            if value is None:
+                continue
+            hit = table.get(_norm(value))
+            if hit:
+                found.extend(hit)
+        found.sort()
+        return found
+
+    def select(self, ctx: RenderContext) -> Optional[Variant]:
+        """Primeira variante (na ordem definida) cujos predicados casam; None usa a resposta padrão."""
+        for order in self.candidates(ctx):
+            variant = self.variants[order]
+            if variant.matches(ctx):
+                return variant
+        return None
+
+
+def compile_variants(specs: Optional[List[Dict[str, Any]]]) -> Optional[VariantSet]:
+    """Compila as variantes de um mock (None/lista vazia = sem variantes). Lança ValueError se inválidas."""
+    if not specs:
+        return None
+    return VariantSet(specs)
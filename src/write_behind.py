@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Persistência write-behind: a memória é a fonte da verdade e as mutações são gravadas no banco em lotes
+"""
+
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindQueue:
+    """Fila de mutações coalescidas por ID, descarregada no banco por uma thread em segundo plano.
+
+    Só o ID do mock é enfileirado; no flush o estado atual é lido via `snapshot`:
+    se o mock existe vira upsert, se não existe vira delete. Várias edições do mesmo
+    mock entre dois flushes resultam em uma única escrita.
+    """
+
+    def __init__(self, db_manager, snapshot: Callable[[str], Optional[Dict[str, Any]]],
+                 flush_interval: float = 1.0, max_pending: int = 1000):
+        self.db_manager = db_manager
+        self.snapshot = snapshot
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        self._dirty: Set[str] = set()
+        self._in_flight: Set[str] = set()
+        self._clear_pending = False
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.flushed_total = 0
+        self.failed_flushes = 0
+        self.last_flush_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def start(self):
+        """Inicia a thread de flush periódico."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="write-behind-flusher", daemon=True)
+        self._thread.start()
+        logger.info(f"Write-behind ativo - intervalo {self.flush_interval}s, máximo pendente {self.max_pending}")
+
+    def stop(self, flush: bool = True):
+        """Para a thread e, por padrão, grava o que estiver pendente."""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=max(self.flush_interval * 2, 5))
+            self._thread = None
+        if flush:
+            self.flush()
+
+    def _run(self):
+        while not self._stop_event.wait(self.flush_interval):
+            self.flush()
+
+    @property
+    def pending(self) -> int:
+        return len(self._dirty) + (1 if self._clear_pending else 0)
+
+    def mark_dirty(self, mock_id: str):
+        """Registra que o mock mudou (criação, edição ou remoção)."""
+        with self._lock:
+            self._dirty.add(mock_id)
+            over_limit = len(self._dirty) >= self.max_pending
+        if over_limit:
+            # Backpressure: quem ultrapassa o limite grava o lote na própria thread
+            self.flush()
+
+    def is_pending(self, mock_id: str) -> bool:
+        """True se o mock tem mutação local ainda não gravada (inclusive no lote sendo gravado)."""
+        with self._lock:
+            return self._clear_pending or mock_id in self._dirty or mock_id in self._in_flight
+
+    def mark_clear(self):
+        """Registra a remoção de todos os mocks; descarta mutações anteriores ainda pendentes."""
+        with self._lock:
+            self._clear_pending = True
+            self._dirty.clear()
+
+    def flush(self) -> bool:
+        """Grava as mutações pendentes em uma única transação."""
+        with self._flush_lock:
+            with self._lock:
+                dirty, self._dirty = self._dirty, set()
+                clear, self._clear_pending = self._clear_pending, False
+                self._in_flight = dirty
+            if not dirty and not clear:
+                return True
+            try:
+                return self._write(dirty, clear)
+            finally:
+                with self._lock:
+                    self._in_flight = set()
+
+    def _write(self, dirty: Set[str], clear: bool) -> bool:
+        upserts = []
+        deletes = []
+        for mock_id in dirty:
+            row = self.snapshot(mock_id)
+            if row is None:
+                deletes.append(mock_id)
+            else:
+                upserts.append(row)
+
+        if self.db_manager.apply_batch(upserts, deletes, clear=clear):
+            self.flushed_total += len(dirty)
+            self.last_flush_at = time.time()
+            self.last_error = None
+            logger.debug(f"Write-behind: {len(upserts)} upserts, {len(deletes)} deletes, clear={clear}")
+            return True
+
+        # Falhou: devolve para a fila (mutações novas já registradas têm precedência)
+        with self._lock:
+            if clear and not self._clear_pending:
+                self._clear_pending = True
+            self._dirty.update(dirty)
+        self.failed_flushes += 1
+        self.last_error = "Falha ao gravar lote no banco"
+        logger.error(f"Write-behind: falha ao gravar lote ({len(dirty)} mocks) - {self.pending} pendentes")
+        return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Profundidade da fila e estatísticas de flush."""
+        return {
+            'pending': self.pending,
+            'flush_interval': self.flush_interval,
+            'max_pending': self.max_pending,
+            'flushed_total': self.flushed_total,
+            'failed_flushes': self.failed_flushes,
+            'last_flush_at': self.last_flush_at,
+            'last_error': self.last_error
+        }
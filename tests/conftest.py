@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+"""
+Fixtures compartilhadas pelos testes em processo
+"""
+
+import pytest
+
+from src.mocks_manager import MocksManager
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    """MocksManager só em memória (USE_DATABASE=false), encerrado ao fim do teste"""
+    monkeypatch.setenv("USE_DATABASE", "false")
+    manager = MocksManager()
+    yield manager
+    manager.shutdown()
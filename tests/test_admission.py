@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Testes do controle de admissão por cliente (executam em processo, sem servidor)
+"""
+
+import asyncio
+
+from src.admission import AdmissionController
+from src.postman_import import _ADMIN_SEGMENTS
+
+
+def test_token_bucket_rejeita_com_429_e_retry_after():
+    controller = AdmissionController(enabled=True, rate=1.0, burst=2)
+
+    async def run():
+        results = [await controller.admit("a") for _ in range(3)]
+        for result in results:
+            if result is None:
+                controller.release("a")
+        return results, await controller.admit("b")
+
+    results, other_client = asyncio.run(run())
+    assert results[:2] == [None, None]
+    status, retry_after = results[2]
+    assert status == 429 and 0 < retry_after <= 1.0
+    assert other_client is None
+    assert controller.get_stats()['clients']['a']['shed_429'] == 1
+
+
+def test_limite_simultaneo_com_fila_limitada():
+    controller = AdmissionController(enabled=True, max_inflight=1, queue_size=1, queue_timeout=0.05)
+
+    async def run():
+        assert await controller.admit("a") is None
+        queued = asyncio.ensure_future(controller.admit("a"))
+        await asyncio.sleep(0)
+        overflow = await controller.admit("a")  # fila cheia: rejeita na hora
+        timed_out = await queued  # ninguém liberou: estoura o tempo de espera
+        controller.release("a")
+        after_release = await controller.admit("a")
+        return overflow, timed_out, after_release
+
+    overflow, timed_out, after_release = asyncio.run(run())
+    assert overflow[0] == 503
+    assert timed_out[0] == 503
+    assert after_release is None
+    stats = controller.get_stats()
+    assert stats['inflight_total'] == 1 and stats['shed_total'] == 2
+
+
+def test_cliente_por_header_ou_ip_e_rotas_isentas():
+    controller = AdmissionController(enabled=True, client_header="X-Client-Id")
+    scope = {"headers": [(b"x-client-id", b"time-a")], "client": ("10.0.0.1", 1234)}
+    assert controller.client_key(scope) == "time-a"
+    assert controller.client_key({"headers": [], "client": ("10.0.0.1", 1234)}) == "10.0.0.1"
+    assert controller.is_exempt("/mocks/123") and controller.is_exempt("/status")
+    # Administração de namespaces e conjuntos continua disponível sob sobrecarga
+    assert controller.is_exempt("/namespaces/loja") and controller.is_exempt("/conjuntos/feliz/ativar")
+    assert all(controller.is_exempt("/" + segment) for segment in _ADMIN_SEGMENTS)
+    assert not controller.is_exempt("/mocksx") and not controller.is_exempt("/users/1")
+
+
+def test_poda_mantem_clientes_ainda_limitados():
+    controller = AdmissionController(enabled=True, rate=1.0, burst=1, max_clients=3)
+
+    async def run():
+        for key in ("a", "b", "c"):
+            assert await controller.admit(key) is None
+            controller.release(key)
+        # "c" ficou ocioso tempo bastante para o bucket voltar ao burst; "a" e "b" seguem sem tokens
+        controller._clients["c"].updated -= 10
+        assert await controller.admit("d") is None
+        return await controller.admit("a"), await controller.admit("b")
+
+    throttled = asyncio.run(run())
+    assert [status for status, _ in throttled] == [429, 429]
+    assert set(controller.get_stats()['clients']) == {"a", "b", "d"}
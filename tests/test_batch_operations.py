@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Testes das operações em lote (editar/remover por filtro) em memória (executam em processo, sem servidor)
+"""
+
+import pytest
+
+from src.mocks_manager import MocksManager
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    monkeypatch.setenv("USE_DATABASE", "false")
+    manager = MocksManager()
+    manager.create_mock("/api/users/:id", "GET", 200, {"id": "{{path.id}}"})
+    manager.create_mock("/api/users", "POST", 201, {"ok": True})
+    manager.create_mock("/api/orders", "GET", 200, {"ok": True})
+    manager.create_mock("/health", "GET", 200, {"ok": True})
+    yield manager
+    manager.shutdown()
+
+
+def _ids(manager, uri_prefix):
+    return {mock_id for mock_id, record in manager.memory_mocks.items() if record.uri.startswith(uri_prefix)}
+
+
+def test_editar_por_prefixo_e_metodo(manager):
+    users_get = manager.find_matching_mock("/api/users/7", "GET")["mock_id"]
+    updated = manager.update_mocks(uri_prefix="/api/", http_method="GET", status_code=503,
+                                   response={"erro": "fora do ar"}, max_hits=5)
+    assert set(updated) == _ids(manager, "/api/") - {manager.find_matching_mock("/api/users", "POST")["mock_id"]}
+    assert users_get in updated
+    match = manager.find_matching_mock("/api/users/7", "GET")
+    assert match["status_code"] == 503 and manager.get_mock(users_get)["max_hits"] == 5
+    # Template compilado uma vez para o lote
+    assert match["template"] is manager.find_matching_mock("/api/orders", "GET")["template"]
+    assert manager.find_matching_mock("/health", "GET")["status_code"] == 200
+
+    with pytest.raises(ValueError):
+        manager.update_mocks(ids=updated, variants=[{"when": {"query.x": {"regex": "("}}}])
+
+
+def test_remover_por_ids(manager):
+    health = next(iter(_ids(manager, "/health")))
+    deleted = manager.delete_mocks(ids=[health, health, "inexistente"])
+    assert deleted == [health] and not manager.mock_exists(health)
+    assert manager.delete_mocks(ids=list(_ids(manager, "/api/")), http_method="POST") != []
+    assert manager.find_matching_mock("/api/users", "POST") is None
+    assert manager.find_matching_mock("/api/users/1", "GET") is not None
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Garante que a suíte de benchmarks continua rodando (cada benchmark executado uma vez)
+"""
+
+import importlib.util
+import logging
+import os
+
+import pytest
+
+_SUITE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "suite.py")
+_spec = importlib.util.spec_from_file_location("benchmark_suite", _SUITE_PATH)
+suite = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(suite)
+# A suíte desliga os logs INFO do processo inteiro; os outros testes precisam deles
+logging.disable(logging.NOTSET)
+
+
+@pytest.mark.parametrize("name", [name for name in suite.BENCHMARKS if "10000" not in name])
+def test_benchmark_executa(name):
+    operation, ops_per_call = suite.BENCHMARKS[name]()
+    operation()
+    assert ops_per_call >= 1
+
+
+def test_compare_aponta_regressao():
+    baseline = {"a": {"ns_per_op": 100.0}, "b": {"ns_per_op": 100.0}}
+    results = {"a": {"ns_per_op": 124.0}, "b": {"ns_per_op": 130.0}, "c": {"ns_per_op": 1.0}}
+    assert suite.compare(results, baseline, threshold=0.25) == ["b"]
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Testes da compressão de corpos grandes (executam em processo, sem servidor)
+"""
+
+import pytest
+
+from src import body_compression, json_codec, template_engine
+from src.body_compression import CompressedTemplate
+from src.mock_record import MockRecord
+from src.mocks_manager import MocksManager
+from src.template_engine import RenderContext
+
+BIG = {"itens": [{"id": i, "nome": f"produto {i}", "ativo": True} for i in range(2000)]}
+
+
+@pytest.fixture(autouse=True)
+def small_threshold(monkeypatch):
+    monkeypatch.setattr(body_compression, "MIN_BYTES", 4096)
+    monkeypatch.setattr(body_compression, "CODEC", "zlib")
+
+
+def test_limite_e_ida_e_volta():
+    data = json_codec.dumps_bytes(BIG)
+    compressed = body_compression.compress(data)
+    assert compressed is not None and len(compressed) < len(data) // 4
+    assert body_compression.decompress(compressed) == data
+    assert body_compression.compress(b'{"ok":true}') is None
+
+
+def test_registro_guarda_corpo_estatico_comprimido():
+    record = MockRecord("/catalogo", "GET", 200, BIG)
+    assert isinstance(record.template, CompressedTemplate)
+    assert record["response"] == BIG
+    rendered = record.template.render(RenderContext())
+    assert json_codec.dumps_bytes(rendered) == json_codec.dumps_bytes(BIG)
+
+    # Templates dinâmicos e corpos pequenos continuam compilados normalmente
+    dynamic = MockRecord("/catalogo/:id", "GET", 200, {"id": "{{path.id}}", **BIG})
+    assert not isinstance(dynamic.template, CompressedTemplate)
+    record.set_response({"ok": True})
+    assert not isinstance(record.template, CompressedTemplate)
+
+
+def test_variaveis_legadas_so_renderizam_quando_aparecem_como_valor(monkeypatch):
+    monkeypatch.setattr(template_engine, "LEGACY_VARS", True)
+    body = {"id": "fixo", "itens": BIG["itens"], "dono": "user"}
+    record = MockRecord("/users/:user", "GET", 200, body)
+    template = record.template
+    assert isinstance(template, CompressedTemplate) and template.uses_legacy
+    # "id" só aparece como chave: resposta servida direto do JSON comprimido
+    served = template.render(RenderContext(path={"id": "7"}))
+    assert isinstance(served, json_codec.RawJSON)
+    rendered = template.render(RenderContext(path={"user": "ana"}))
+    assert rendered["dono"] == "ana" and rendered["id"] == "fixo"
+
+
+def test_flush_envia_corpo_ja_comprimido(monkeypatch):
+    monkeypatch.setenv("USE_DATABASE", "false")
+    manager = MocksManager()
+    mock_id = manager.create_mock("/catalogo", "GET", 200, BIG)
+    snapshot = manager._snapshot_for_flush(mock_id)
+    assert "response" not in snapshot
+    assert body_compression.decompress(snapshot["response_compressed"]) == json_codec.dumps_bytes(BIG)
+    assert manager.get_mock(mock_id)["response"] == BIG
+    manager.shutdown()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Teste do feed de mudanças entre instâncias: dois processos da API no mesmo PostgreSQL
+
+Usa as variáveis DB_* do ambiente; é ignorado se o banco não estiver acessível.
+"""
+
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+psycopg2 = pytest.importorskip("psycopg2")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _database_available() -> bool:
+    try:
+        psycopg2.connect(
+            host=os.getenv("DB_SERVER", "localhost"), port=os.getenv("DB_PORT", "5432"),
+            dbname=os.getenv("DB_NAME", "qa_api"), user=os.getenv("DB_USER", "acloman"),
+            password=os.getenv("DB_PASSWORD", ""), connect_timeout=2
+        ).close()
+        return True
+    except Exception:
+        return False
+
+
+pytestmark = pytest.mark.skipif(not _database_available(), reason="PostgreSQL não acessível (DB_*)")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _request(port, method, path, body=None):
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(f"http://127.0.0.1:{port}{path}", data=data, method=method,
+                                 headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=5) as resp:
+            return resp.status, json.loads(resp.read() or b"null")
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read() or b"null")
+    except urllib.error.URLError:
+        return 0, None
+
+
+def _eventually(check, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if check():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+@pytest.fixture
+def two_instances():
+    env = dict(os.environ, USE_DATABASE="true", PERSISTENCE_MODE="write_behind",
+               WRITE_BEHIND_FLUSH_INTERVAL="0.1", CHANGE_FEED_POLL_INTERVAL="30")
+    ports = [_free_port(), _free_port()]
+    procs = [
+        subprocess.Popen([sys.executable, "-m", "uvicorn", "src.qa_api:app", "--port", str(port), "--log-level", "warning"],
+                         cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        for port in ports
+    ]
+    try:
+        for port in ports:
+            assert _eventually(lambda: _request(port, "GET", "/status")[0] == 200, 30)
+        yield ports
+    finally:
+        for proc in procs:
+            proc.terminate()
+            proc.wait(timeout=10)
+
+
+def test_edicao_em_uma_instancia_chega_na_outra(two_instances):
+    a, b = two_instances
+    uri = f"/feed-test-{os.getpid()}/:id"
+    status, body = _request(a, "POST", "/mocks/configurar/endpoint", {"uri": uri, "response": {"v": 1}})
+    mock_id = body["criadas"][0]["id"]
+    path = uri.replace(":id", "7")
+
+    # Polling a cada 30s: só o LISTEN/NOTIFY explica a propagação em poucos segundos
+    assert _eventually(lambda: _request(b, "GET", path) == (200, {"v": 1}))
+    _request(a, "PUT", f"/mocks/{mock_id}", {"response": {"v": 2}, "status_code_response": 202})
+    assert _eventually(lambda: _request(b, "GET", path) == (202, {"v": 2}))
+
+    _request(b, "DELETE", f"/mocks/{mock_id}")
+    assert _eventually(lambda: _request(a, "GET", path)[0] == 404)
+
+    feed = _request(b, "GET", "/status")[1]["change_feed"]
+    assert feed["mode"] == "listen" and feed["applied_total"] >= 2
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Testes de mocks efêmeros: validade, limite de chamadas e agendador (executam em processo, sem servidor)
+"""
+
+import threading
+
+import pytest
+
+from src.expiry import ExpiryScheduler, MockLimits, format_timestamp, parse_lifetime
+from src.mock_record import MockRecord
+
+
+def test_parse_lifetime():
+    assert parse_lifetime(ttl_seconds=30, now=1000.0) == (1030.0, None)
+    assert parse_lifetime(expires_at="2030-01-31T12:00:00Z", max_hits=2) == (1896091200.0, 2)
+    assert parse_lifetime(expires_at="2030-01-31T12:00:00") == (1896091200.0, None)
+    assert format_timestamp(1896091200.0) == "2030-01-31T12:00:00Z"
+    # 0 remove o limite na edição
+    assert parse_lifetime(ttl_seconds=0, max_hits=0) == (0.0, 0)
+    for kwargs in ({"ttl_seconds": -1}, {"ttl_seconds": "10"}, {"max_hits": 1.5}, {"max_hits": True},
+                   {"expires_at": "amanhã"}, {"ttl_seconds": 10, "expires_at": 0}):
+        with pytest.raises(ValueError):
+            parse_lifetime(**kwargs)
+
+
+def test_limites_e_agendador():
+    assert MockLimits.create(None, None) is None and MockLimits.create(0, 0) is None
+    limits = MockLimits.create(100.0, 2)
+    assert not limits.expired(99.0) and limits.expired(100.0)
+    limits.hits = 2
+    assert MockLimits.create(None, 2, hits=2).expired(0.0)
+
+    scheduler = ExpiryScheduler(lambda due: None)
+    scheduler.schedule("b", 20.0)
+    scheduler.schedule("a", 10.0)
+    scheduler.schedule("c", 30.0)
+    assert scheduler.pop_due(5.0) == []
+    assert scheduler.pop_due(20.0) == ["a", "b"]
+    assert scheduler.scheduled == 1
+
+
+def test_max_hits_remove_mock_na_ultima_chamada(manager):
+    mock_id = manager.create_mock("/uma-vez/:id", "GET", 200, {"ok": True}, max_hits=2)
+    assert manager.find_matching_mock("/uma-vez/1", "GET") is not None
+    assert manager.get_mock(mock_id)["hits"] == 1
+    assert manager.find_matching_mock("/uma-vez/2", "GET") is not None
+    assert manager.find_matching_mock("/uma-vez/3", "GET") is None
+    assert not manager.mock_exists(mock_id)
+    assert manager.get_status()["expiry"]["expired_total"] == 1
+
+
+def test_validade_ignora_no_match_e_remove_na_varredura(manager, monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr("src.mocks_manager.time.time", lambda: now)
+    mock_id = manager.create_mock("/ttl", "GET", 200, {"ok": True}, expires_at=now + 10)
+    permanente = manager.create_mock("/permanente", "GET", 200, {"ok": True})
+    assert manager.find_matching_mock("/ttl", "GET") is not None
+
+    now += 10
+    assert manager.find_matching_mock("/ttl", "GET") is None
+    assert manager.mock_exists(mock_id)
+    manager._expire_tick(manager.expiry.pop_due(now))
+    assert not manager.mock_exists(mock_id) and manager.mock_exists(permanente)
+
+    # Recriar a rota sem validade remove o limite
+    mock_id = manager.create_mock("/ttl", "GET", 200, {"ok": True}, expires_at=now + 10)
+    assert manager.create_mock("/ttl", "GET", 200, {"ok": True}) == mock_id
+    now += 60
+    manager._expire_tick(manager.expiry.pop_due(now))
+    assert manager.find_matching_mock("/ttl", "GET") is not None
+
+
+def test_expiracao_em_outra_thread_durante_o_match(manager, monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr("src.mocks_manager.time.time", lambda: now)
+    vencidos = [manager.create_mock(f"/ttl/{i}", "GET", 200, {}, expires_at=now + 1) for i in range(3)]
+    manager.create_mock("/permanente", "GET", 200, {"ok": True})
+    now += 1
+    original = MockRecord.match
+
+    def match_with_expiry(record, path):
+        # A thread do ExpiryScheduler remove os vencidos enquanto o match percorre as rotas
+        if record.uri == "/permanente" and manager.mock_exists(vencidos[0]):
+            thread = threading.Thread(target=manager._expire_tick, args=(manager.expiry.pop_due(now),))
+            thread.start()
+            thread.join()
+        return original(record, path)
+
+    monkeypatch.setattr(MockRecord, "match", match_with_expiry)
+    assert manager.find_matching_mock("/outra", "GET") is None
+    assert not any(manager.mock_exists(mock_id) for mock_id in vencidos)
+    assert manager.find_matching_mock("/permanente", "GET")["status_code"] == 200
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Testes da explicação do match de rota em memória (executam em processo, sem servidor)
+"""
+
+import time
+
+from src.match_explain import MatchTrace
+
+
+def test_candidatos_na_ordem_do_matcher(manager):
+    generic = manager.create_mock("/users/:id", "GET", 200, {"id": "{{path.id}}"})
+    me = manager.create_mock("/users/me", "GET", 200, {"me": True})
+    manager.create_mock("/users/:id", "POST", 201, {})
+    other = manager.create_mock("/orders", "GET", 200, {})
+    once = manager.create_mock("/users/(?P<n>\\d+)", "GET", 200, {}, max_hits=1)
+
+    trace = MatchTrace()
+    match = manager.find_matching_mock("/users/me", "GET", trace=trace)
+    # Prefixo literal mais longo primeiro; empates de precedência pelo id, como no banco
+    assert match["mock_id"] == me and match["variables"] == {}
+    assert [(c["id"], c["resultado"]) for c in trace.candidates] == [(me, "vencedor")] + [
+        (mock_id, "sombreado" if mock_id == generic else "rejeitado") for mock_id in sorted([generic, other])
+    ] + [(once, "rejeitado")]
+    assert trace.skipped == {"metodo": 1}
+
+    # Explicar não consome chamadas de mocks com max_hits
+    for _ in range(2):
+        manager.find_matching_mock("/users/7", "GET", trace=MatchTrace())
+    assert manager.get_mock(once)["hits"] == 0
+    manager.delete_mock(generic)
+    assert manager.find_matching_mock("/users/7", "GET")["mock_id"] == once
+    assert not manager.mock_exists(once)
+
+    # Vencido e ainda não removido pela varredura
+    expired = manager.create_mock("/tmp", "GET", 200, {}, expires_at=time.time() - 1)
+    trace = MatchTrace()
+    assert manager.find_matching_mock("/tmp", "GET", trace=trace) is None
+    assert trace.candidates[-1] == {"id": expired, "uri": "/tmp", "resultado": "rejeitado", "motivo": "vencido (expires_at)"}
+
+
+def test_etapas_aninhadas_nao_somam_na_de_fora():
+    trace = MatchTrace()
+    with trace.stage("fora"):
+        with trace.stage("dentro"):
+            time.sleep(0.02)
+    assert trace.timings["dentro"] >= 20 and trace.timings["fora"] < 10
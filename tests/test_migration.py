@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Testes da migração online (migration_db.py)
+
+O plano de índices roda sem banco; a migração de uma tabela antiga, interrompida e retomada, usa as
+variáveis DB_* do ambiente e um banco descartável (ignorada se o PostgreSQL não estiver acessível).
+"""
+
+import os
+
+import pytest
+
+import migration_db
+from src.mock_record import route_key, uri_regex
+
+psycopg2 = pytest.importorskip("psycopg2")
+
+TEST_DB = "qa_api_migration_test"
+ROUTE = ("namespace", "http_method", "static_prefix", "segment_count")
+
+
+def test_plano_de_indices():
+    valid = {name: (True, columns) for name, (columns, _) in migration_db.INDEXES.items()}
+    assert migration_db._index_steps(valid) == []
+
+    # Índice antigo sem namespace: construído com outro nome e trocado sem ficar sem índice
+    old = dict(valid, ix_qa_api_route=(True, ROUTE[1:]))
+    [(_, statements)] = migration_db._index_steps(old)
+    assert statements[1].startswith("CREATE INDEX CONCURRENTLY ix_qa_api_route_new ON qa_api(namespace,")
+    assert statements[-1] == "ALTER INDEX ix_qa_api_route_new RENAME TO ix_qa_api_route"
+
+    # Sobra inválida de um CREATE INDEX CONCURRENTLY e troca interrompida depois do DROP
+    invalid = dict(valid, ix_qa_api_ephemeral=(False, ("expires_at",)))
+    [(_, statements)] = migration_db._index_steps(invalid)
+    assert statements[0] == "DROP INDEX CONCURRENTLY IF EXISTS ix_qa_api_ephemeral"
+    assert statements[1].endswith("WHERE expires_at IS NOT NULL OR max_hits IS NOT NULL")
+    swapped = {k: v for k, v in valid.items() if k != "ix_qa_api_route"}
+    swapped["ix_qa_api_route_new"] = (True, ROUTE)
+    assert migration_db._index_steps(swapped) == [
+        ("Concluindo a troca do índice ix_qa_api_route", ["ALTER INDEX ix_qa_api_route_new RENAME TO ix_qa_api_route"])]
+
+
+def _connect(dbname: str):
+    return psycopg2.connect(
+        host=os.getenv("DB_SERVER", "localhost"), port=os.getenv("DB_PORT", "5432"), dbname=dbname,
+        user=os.getenv("DB_USER", "acloman"), password=os.getenv("DB_PASSWORD", ""), connect_timeout=2
+    )
+
+
+@pytest.fixture
+def old_database(monkeypatch):
+    try:
+        admin = _connect("postgres")
+    except psycopg2.Error:
+        pytest.skip("PostgreSQL não acessível (configure DB_*)")
+    admin.autocommit = True
+    with admin.cursor() as cur:
+        cur.execute(f"DROP DATABASE IF EXISTS {TEST_DB}")
+        cur.execute(f"CREATE DATABASE {TEST_DB}")
+    conn = _connect(TEST_DB)
+    with conn, conn.cursor() as cur:
+        # Esquema anterior às colunas de rota e ao namespace, com nulos e índice sem namespace
+        cur.execute("""CREATE TABLE qa_api (id VARCHAR(10) PRIMARY KEY, uri VARCHAR(500) NOT NULL,
+                       http_method VARCHAR(10) NOT NULL, status_code INT NOT NULL, response_body TEXT NOT NULL,
+                       uri_pattern VARCHAR(500) NOT NULL, headers JSONB)""")
+        cur.execute("""INSERT INTO qa_api SELECT lpad(g::text, 5, '0'), '/users/:id/pedidos/' || g, 'GET', 200, '{}',
+                       'antigo', CASE WHEN g % 2 = 0 THEN NULL ELSE '{}'::jsonb END FROM generate_series(1, 2000) g""")
+        cur.execute("CREATE INDEX ix_qa_api_method_uri ON qa_api(http_method, uri)")
+    monkeypatch.setenv("DB_NAME", TEST_DB)
+    yield conn
+    conn.close()
+    with admin.cursor() as cur:
+        cur.execute(f"DROP DATABASE IF EXISTS {TEST_DB}")
+    admin.close()
+
+
+def test_migracao_interrompida_continua_de_onde_parou(old_database, monkeypatch):
+    options = migration_db.parse_args(["--batch-size", "300", "--progress-every", "0"])
+    description, batch, needed = migration_db.BACKFILLS["derivadas"]
+    calls = []
+
+    def failing_batch(conn, last_id, batch_size):
+        calls.append(last_id)
+        if len(calls) == 3:
+            raise RuntimeError("conexão perdida")
+        return batch(conn, last_id, batch_size)
+
+    monkeypatch.setitem(migration_db.BACKFILLS, "derivadas", (description, failing_batch, needed))
+    assert migration_db.migrate_all(options) is False
+    with old_database, old_database.cursor() as cur:
+        cur.execute("SELECT last_id, rows_done, finished_at FROM qa_api_migrations WHERE name = 'derivadas'")
+        assert cur.fetchone() == ("00600", 600, None)
+
+    monkeypatch.setitem(migration_db.BACKFILLS, "derivadas", (description, batch, needed))
+    assert migration_db.migrate_all(options) is True
+    with old_database, old_database.cursor() as cur:
+        cur.execute("SELECT rows_done, finished_at IS NOT NULL FROM qa_api_migrations ORDER BY name")
+        assert cur.fetchall() == [(2000, True), (2000, True)]
+        cur.execute("SELECT uri, uri_pattern, static_prefix, segment_count FROM qa_api WHERE id IN ('00001', '01999')")
+        for uri, pattern, prefix, count in cur.fetchall():
+            assert (pattern, (prefix, count)) == (uri_regex(uri), route_key(uri))
+        cur.execute("SELECT count(*) FROM qa_api WHERE headers IS NULL OR namespace <> 'default'")
+        assert cur.fetchone() == (0,)
+        cur.execute("SELECT indexname FROM pg_indexes WHERE tablename = 'qa_api' AND indexname LIKE 'ix_%' ORDER BY 1")
+        assert [row[0] for row in cur.fetchall()] == sorted(migration_db.INDEXES)
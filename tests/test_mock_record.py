@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Testes do registro compacto de mock em memória (executam em processo, sem servidor)
+"""
+
+import os
+import sys
+
+import pytest
+
+from src.mock_record import MockRecord, path_prefixes, route_key
+from src.mocks_manager import MocksManager
+
+
+def test_padroes_compartilhados_e_uri_literal():
+    get = MockRecord("/api/users/:id", "GET", 200, {"id": "{{path.id}}"})
+    post = MockRecord("/api/users/:id", "POST", 201, {"ok": True})
+    static = MockRecord("/api/static", "GET", 200, {"ok": True})
+    dotted = MockRecord("/api/v1.0/ping", "GET", 200, {})
+    assert get.uri_pattern is post.uri_pattern
+    assert get.match("/api/users/7") == {"id": "7"} and get.match("/api/users/7/x") is None
+    assert static.uri_pattern is None
+    assert static.match("/api/static") == {} and static.match("/api/static/") is None
+    # Metacaracteres continuam sendo regex, como antes
+    assert dotted.match("/api/v1x0/ping") == {}
+
+
+def test_visao_somente_leitura_sem_copia():
+    record = MockRecord("/api/a", "".join("GET"), 201, {"a": 1})
+    assert record.http_method is sys.intern("GET")
+    assert dict(record) == {
+        "uri": "/api/a", "http_method": "GET", "status_code": 201,
+        "response": {"a": 1}, "headers": {}, "variants": []
+    }
+    assert "template" not in record and record.get("uri_pattern") is None
+    record.set_response({"a": 2})
+    record.set_variants([{"when": {"query.x": "1"}, "status_code_response": 404}])
+    assert record["response"] == {"a": 2} and record.variant_set is not None
+    record.set_variants([])
+    assert record["variants"] == [] and record.variant_set is None
+
+
+def test_chave_de_rota_para_o_match_no_banco():
+    assert route_key("/api/users/:id") == ("/api/users/", 3)
+    assert route_key("/api/static") == ("/api/static", 2)
+    # Regex pode casar barras: prefixo até o segmento com metacaractere e sem nº de segmentos
+    assert route_key("/api/v1.0/ping") == ("/api/", None)
+    prefixes = path_prefixes("/api/users/7")
+    assert prefixes == ["/", "/api/", "/api/users/", "/api/users/7"]
+    for uri, path in [("/api/users/:id", "/api/users/7"), ("/:x", "/api"), ("/api/v1.0/ping", "/api/v1x0/ping")]:
+        assert route_key(uri)[0] in path_prefixes(path) and MockRecord(uri, "GET", 200, {}).match(path) is not None
+
+
+@pytest.fixture(params=["memoria", "banco"])
+def manager(request, monkeypatch):
+    monkeypatch.setenv("USE_DATABASE", "true" if request.param == "banco" else "false")
+    monkeypatch.setenv("PERSISTENCE_MODE", "sync")
+    monkeypatch.setenv("CHANGE_FEED_ENABLED", "false")
+    monkeypatch.setenv("DB_RECONNECT_ENABLED", "false")
+    manager = MocksManager()
+    if request.param == "banco" and not manager.db_manager.is_connected():
+        manager.shutdown()
+        pytest.skip("PostgreSQL não acessível (DB_*)")
+    yield manager
+    manager.shutdown()
+
+
+def test_precedencia_igual_em_memoria_e_no_banco(manager):
+    namespace = f"precedencia{os.getpid()}"
+    # Criados do menos para o mais específico: a ordem de criação não decide
+    ids = {uri: manager.create_mock(uri, "GET", 200, {"uri": uri}, namespace=namespace)
+           for uri in ("/files/.*", "/files/.*x", "/files/:nome", "/files/relatorio")}
+    try:
+        def winner(path):
+            return manager.find_matching_mock(path, "GET", namespace=namespace)["mock_id"]
+
+        assert winner("/files/relatorio") == ids["/files/relatorio"]
+        assert winner("/files/ax") == ids["/files/:nome"]
+        assert winner("/files/a/b") == ids["/files/.*"]
+        # Mesmo prefixo e segmentos livres nos dois: vence o menor id
+        assert winner("/files/a/x") == min(ids["/files/.*"], ids["/files/.*x"])
+    finally:
+        manager.delete_all_mocks(namespace=namespace)
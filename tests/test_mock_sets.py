@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Testes dos conjuntos de mocks salvos e da ativação por troca da tabela de rotas (em processo, sem servidor)
+"""
+
+import pytest
+
+import src.mock_record
+import src.mocks_manager
+from src.mock_record import MockRecord
+from src.mock_sets import MockSetRegistry, validate_set_name
+
+
+def _status(manager, path, namespace="loja"):
+    match = manager.find_matching_mock(path, "GET", namespace=namespace)
+    return match["status_code"] if match else None
+
+
+def test_salvar_e_ativar_cenarios(manager):
+    users = manager.create_mock("/users/:id", "GET", 200, {"id": "{{path.id}}"}, namespace="loja")
+    manager.create_mock("/health", "GET", 200, {"ok": True}, namespace="loja")
+    manager.create_mock("/outro", "GET", 200, {}, namespace="outro")
+    feliz = manager.save_mock_set("feliz", namespace="loja")
+    assert (feliz["version"], feliz["mocks"]) == (1, 2)
+
+    manager.update_mock(users, status_code=503)
+    manager.create_mock("/pagamentos", "GET", 500, {"erro": "fora"}, namespace="loja")
+    assert manager.save_mock_set("fora", namespace="loja")["mocks"] == 3
+    assert manager.save_mock_set("fora", namespace="loja")["version"] == 2
+
+    summary = manager.activate_mock_set("feliz", namespace="loja")
+    assert summary["removidos"] == 3
+    assert (_status(manager, "/users/7"), _status(manager, "/pagamentos")) == (200, None)
+    # Mesmos IDs do momento em que o conjunto foi salvo; o outro namespace não muda
+    assert manager.find_matching_mock("/users/7", "GET", namespace="loja")["mock_id"] == users
+    assert _status(manager, "/outro", namespace="outro") == 200
+
+    # Editar um mock ativo não altera o conjunto salvo
+    manager.update_mock(users, status_code=418)
+    manager.activate_mock_set("fora", version=1, namespace="loja")
+    assert (_status(manager, "/users/7"), _status(manager, "/pagamentos")) == (503, 500)
+    manager.activate_mock_set("feliz", namespace="loja")
+    assert _status(manager, "/users/7") == 200
+    assert manager.mock_sets.get_active("loja")["name"] == "feliz"
+
+    assert [(s["name"], s["version"]) for s in manager.list_mock_sets("loja")] == [("feliz", 1), ("fora", 1), ("fora", 2)]
+    assert manager.activate_mock_set("inexistente", namespace="loja") is None
+    assert manager.delete_mock_set("fora", namespace="loja") == 2 and not manager.mock_set_exists("fora", namespace="loja")
+
+
+def test_ativacao_troca_a_tabela_sem_compilar(manager, monkeypatch):
+    manager.create_mock("/a", "GET", 200, {"a": "{{query.x}}"}, namespace="loja")
+    manager.save_mock_set("cenario", namespace="loja")
+    manager.delete_all_mocks(namespace="loja")
+    manager.create_mock("/b", "GET", 200, {}, namespace="loja")
+    in_flight = manager.memory_mocks.routes("loja", "GET")
+    ready = manager.mock_sets.get("loja", "cenario")._ready
+
+    def no_compile(*args, **kwargs):
+        raise AssertionError("ativação não deve compilar templates")
+
+    monkeypatch.setattr(src.mocks_manager, "compile_template", no_compile)
+    monkeypatch.setattr(src.mock_record, "compile_template", no_compile)
+    manager.activate_mock_set("cenario", namespace="loja")
+
+    # A tabela montada na gravação virou a tabela do namespace; a próxima já está pronta (outros registros)
+    assert manager.memory_mocks.namespaces["loja"] is ready
+    assert manager.mock_sets.get("loja", "cenario")._ready is not ready
+    # Requisição que já lia a tabela antiga continua vendo a tabela antiga inteira
+    assert [record.uri for record in in_flight.values()] == ["/b"]
+    assert _status(manager, "/a") == 200 and _status(manager, "/b") is None
+    assert sorted(manager.memory_mocks) == sorted(mock_id for mock_id, _ in ready.items())
+
+
+def test_id_em_outro_namespace_nao_ativa(manager):
+    mock_id = manager.create_mock("/a", "GET", 200, {}, namespace="loja")
+    manager.save_mock_set("cenario", namespace="loja")
+    manager.delete_mock(mock_id)
+    current = manager.create_mock("/b", "GET", 200, {}, namespace="loja")
+    # Novos mocks não recebem IDs dos conjuntos salvos; aqui a colisão é forçada
+    assert manager.mock_sets.reserved(mock_id) and current != mock_id
+    manager.memory_mocks[mock_id] = MockRecord("/c", "GET", 200, {}, namespace="outro")
+
+    with pytest.raises(ValueError):
+        manager.activate_mock_set("cenario", namespace="loja")
+    assert _status(manager, "/b") == 200 and _status(manager, "/c", namespace="outro") == 200
+    assert manager.mock_sets.get("loja", "cenario")._ready is not None
+
+
+def test_nomes_e_registro():
+    assert validate_set_name("fora-do-ar.v2") == "fora-do-ar.v2"
+    for name in ("", "../x", "a" * 65, None):
+        with pytest.raises(ValueError):
+            validate_set_name(name)
+    registry = MockSetRegistry()
+    assert registry.get("loja", "x") is None and registry.next_version("loja", "x") == 1
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Testes dos namespaces em memória (executam em processo, sem servidor)
+"""
+
+import pytest
+
+from src.match_explain import MatchTrace
+from src.namespaces import DEFAULT_NAMESPACE, NamespaceResolver
+
+
+def test_resolver_por_path_header_e_host():
+    resolver = NamespaceResolver(host_suffix=".mocks.local")
+    assert resolver.resolve("/ns/pagamentos/api/pix", {}) == ("pagamentos", "/api/pix")
+    assert resolver.resolve("/api/pix", {"x-mock-namespace": "cartoes"}) == ("cartoes", "/api/pix")
+    assert resolver.resolve("/api/pix", {"host": "cartoes.mocks.local:8090"}) == ("cartoes", "/api/pix")
+    assert resolver.resolve("/api/pix", {"host": "localhost:8090"}) == (DEFAULT_NAMESPACE, "/api/pix")
+    with pytest.raises(ValueError):
+        resolver.resolve("/api/pix", {"x-mock-namespace": "../outro"})
+
+
+def test_mesma_rota_em_namespaces_diferentes(manager):
+    a = manager.create_mock("/users/:id", "GET", 200, {"time": "a"}, namespace="time-a")
+    b = manager.create_mock("/users/:id", "GET", 200, {"time": "b"}, namespace="time-b")
+    assert a != b
+    # Recriar a mesma rota no namespace atualiza o mock existente
+    assert manager.create_mock("/users/:id", "GET", 201, {"time": "a"}, namespace="time-a") == a
+
+    assert manager.find_matching_mock("/users/7", "GET", namespace="time-a")["mock_id"] == a
+    assert manager.find_matching_mock("/users/7", "GET", namespace="time-b")["mock_id"] == b
+    assert manager.find_matching_mock("/users/7", "GET") is None
+    assert [m["id"] for m in manager.get_all_mocks("time-b")] == [b]
+    assert manager.get_mock(a)["namespace"] == "time-a"
+
+    # A explicação só testa os mocks do namespace
+    manager.create_mock("/users", "POST", 201, {}, namespace="time-a")
+    trace = MatchTrace()
+    manager.find_matching_mock("/users/7", "GET", trace=trace, namespace="time-a")
+    assert [c["id"] for c in trace.candidates] == [a] and trace.skipped == {"metodo": 1}
+
+
+def test_limpar_namespace_e_contadores(manager):
+    a = manager.create_mock("/ping", "GET", 200, {}, namespace="time-a")
+    b = manager.create_mock("/ping", "GET", 200, {}, namespace="time-b")
+    manager.create_mock("/pong", "POST", 200, {}, namespace="time-a")
+    for path in ("/ping", "/ping", "/nada"):
+        manager.find_matching_mock(path, "GET", namespace="time-a")
+    stats = {s["namespace"]: s for s in manager.get_namespaces()}
+    assert stats["time-a"] == {"namespace": "time-a", "mocks": 2, "requests": 3, "matched": 2, "not_found": 1}
+    assert stats["time-b"]["mocks"] == 1 and stats["time-b"]["requests"] == 0
+
+    assert manager.delete_all_mocks("time-a")
+    assert not manager.mock_exists(a) and manager.mock_exists(b)
+    assert [s["namespace"] for s in manager.get_namespaces()] == ["time-b"]
+    assert manager.find_matching_mock("/ping", "GET", namespace="time-b")["mock_id"] == b
+    # Tabelas de rotas acompanham remoções por ID e por lote
+    manager.delete_mock(b)
+    assert manager.memory_mocks.namespaces == {}
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Testes da importação de coleções do Postman (executam em processo, sem servidor)
+"""
+
+import json
+import os
+
+import pytest
+
+from src.postman_import import mock_uri, parse_collection, strip_json_comments, url_parts
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCHEMA = "https://schema.getpostman.com/json/collection/v2.1.0/collection.json"
+
+
+def _example(name, raw, code, body, **extra):
+    return {"name": name, "originalRequest": {"method": "GET", "url": raw}, "code": code, "body": body, **extra}
+
+
+COLLECTION = {
+    "info": {"name": "Loja", "schema": SCHEMA},
+    "item": [
+        {"name": "Usuários", "item": [{
+            "name": "Consultar",
+            "request": {"method": "GET", "url": {"raw": "{{baseUrl}}/users/:id?fields=all",
+                                                 "variable": [{"key": "id", "value": "1"}]}},
+            "response": [
+                _example("ok", {"raw": "{{baseUrl}}/users/:id?fields=all", "variable": [{"key": "id", "value": "1"}]},
+                         200, '{"id": 1}', header=[{"key": "Content-Type", "value": "application/json"},
+                                                   {"key": "X-Trace", "value": "abc"}]),
+                _example("inexistente", "{{baseUrl}}/users/999?fields=all", 404, '{"erro": "não encontrado"}'),
+                _example("resumo", "{{baseUrl}}/users/:id?fields=basic", 200, '{"id": 1, "resumo": true}'),
+                _example("igual ao padrão", "{{baseUrl}}/users/:id?fields=all", 500, ""),
+            ]}]},
+        {"name": "Pedido", "request": {"method": "post", "url": "https://api.loja.com/v1/pedidos/{{pedido-id}}/itens"},
+         "response": [{"name": "criado", "code": 201, "body": "texto"}]},
+        {"name": "Configurar", "request": {
+            "method": "POST", "url": {"raw": "http://localhost:8090/mocks/configurar/endpoint?namespace=outro"},
+            "body": {"mode": "raw", "raw": '// lista de mocks\n[{"uri": "http://x//y", "response": {"url": "http://a"}},'
+                                           ' {"uri": "/sem-resposta"}]'}}},
+        {"name": "Status", "request": {"method": "GET", "url": "http://localhost:8090/status"}},
+        {"name": "Sem exemplo", "request": {"method": "GET", "url": "{{baseUrl}}/health"}},
+    ]
+}
+
+
+def test_urls_e_comentarios():
+    assert url_parts("{{baseUrl}}/users/:id?x=1") == (["users", ":id"], {"x": "1"}, {})
+    assert url_parts({"raw": "https://h:8080/a/{{b}}", "query": [{"key": "q", "value": "1", "disabled": True}]}) == (
+        ["a", "{{b}}"], {}, {})
+    assert url_parts({"path": ["a", {"value": ":id"}]})[0] == ["a", ":id"]
+    assert mock_uri(["v{{ver}}", "{{user id}}", ":x"]) == "/v:ver/:user_id/:x"
+    assert json.loads(strip_json_comments('// c\n{"u": "http://a//b", /* bloco */ "n": 1} // fim')) == {
+        "u": "http://a//b", "n": 1}
+
+
+def test_exemplos_viram_mock_com_variantes():
+    plan = parse_collection(COLLECTION, "loja")
+    users, pedido, config = plan["mocks"]
+    assert (users["uri"], users["status_code"], users["response"], users["headers"]) == (
+        "/users/:id", 200, {"id": 1}, {"X-Trace": "abc"})
+    assert [(v["when"], v["status_code_response"]) for v in users["variants"]] == [
+        ({"path.id": "999"}, 404), ({"query.fields": "basic"}, 200)]
+    assert (pedido["uri"], pedido["http_method"], pedido["response"]) == ("/v1/pedidos/:pedido_id/itens", "POST", "texto")
+    # Corpo de /mocks/configurar/endpoint é importado como configuração, no namespace da URL
+    assert (config["uri"], config["namespace"], config["response"]) == ("http://x//y", "outro", {"url": "http://a"})
+    assert [item["motivo"] for item in plan["ignorados"]] == [
+        "exemplo 'igual ao padrão' sem diferença de path ou query para o padrão",
+        "item 1: campos obrigatórios faltando",
+        "rota de administração da API (GET /status)",
+        "sem exemplo de resposta salvo",
+    ]
+
+    with pytest.raises(ValueError):
+        parse_collection({"info": {"schema": "https://schema.getpostman.com/json/collection/v1.0.0/"}, "item": []})
+
+
+def test_colecoes_do_repositorio():
+    for name in ("QA_MOCK_DINAMICO.postman_collection.json", "QA_MOCK_DINAMICO TUNELADO.postman_collection.json"):
+        with open(os.path.join(ROOT, name), encoding="utf-8") as f:
+            plan = parse_collection(json.load(f))
+        assert all(mock["uri"].endswith("/:endToEndId/cancelar") for mock in plan["mocks"])
+        assert plan["mocks"] and all(mock["status_code"] == 200 for mock in plan["mocks"])
+
+
+def test_importacao_com_diff_e_tudo_ou_nada(manager):
+    mocks = parse_collection(COLLECTION, "loja")["mocks"]
+    existing = manager.create_mock("/users/:id", "GET", 200, {"id": 0}, namespace="loja")
+
+    dry = manager.import_mocks(mocks, dry_run=True)
+    assert len(manager.memory_mocks) == 1
+    assert [m["id"] for m in dry["novos"]] == [None, None]
+    assert dry["alterados"] == [{"id": existing, "namespace": "loja", "http_method": "GET", "uri": "/users/:id",
+                                 "campos": ["response", "headers", "variants"]}]
+
+    diff = manager.import_mocks(mocks)
+    assert len(manager.memory_mocks) == 3 and all(m["id"] for m in diff["novos"])
+    assert manager.find_matching_mock("/users/999", "GET", namespace="loja")["mock_id"] == existing
+    assert manager.find_matching_mock("/v1/pedidos/7/itens", "POST", namespace="loja")["status_code"] == 201
+    assert len(manager.import_mocks(mocks)["iguais"]) == 3
+
+    # Um mock inválido: nada do lote é gravado
+    broken = [dict(mocks[1], status_code=418), dict(mocks[0], variants=[{"when": {"query.x": {"regex": "("}}}])]
+    with pytest.raises(ValueError):
+        manager.import_mocks(broken)
+    assert manager.find_matching_mock("/v1/pedidos/7/itens", "POST", namespace="loja")["status_code"] == 201
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Testes do cache LRU de respostas renderizadas (executam em processo, sem servidor)
+"""
+
+from src.mock_record import MockRecord
+from src.response_cache import CachedResponse, ResponseCache
+
+
+def _match(record, mock_id="000001", **variables):
+    return {'mock_id': mock_id, 'template': record.template, 'variant_set': record.variant_set,
+            'status_code': record.status_code, 'headers': record['headers'], 'variables': variables}
+
+
+def _entry(mock_id, size):
+    return CachedResponse(mock_id, 200, {}, b"x" * size)
+
+
+def test_chave_muda_com_variaveis_e_versao_do_mock():
+    record = MockRecord("/users/:id", "GET", 200, {"id": "{{path.id}}"})
+    key = ResponseCache.key(_match(record, id="1"), None, None)
+    assert key == ResponseCache.key(_match(record, id="1"), None, None)
+    assert key != ResponseCache.key(_match(record, id="2"), None, None)
+    assert key != ResponseCache.key(_match(record, id="1"), {"page": "2"}, None)
+    record.set_response({"id": "{{path.id}}", "v": 2})
+    assert key != ResponseCache.key(_match(record, id="1"), None, None)
+    record.headers = {"X-Multi": ["a", "b"]}
+    assert ResponseCache.key(_match(record, id="1"), None, None) is None
+
+
+def test_limites_de_entradas_e_bytes_com_lru():
+    cache = ResponseCache(enabled=True, max_entries=3, max_bytes=100, max_item_bytes=60)
+    for name in ("a", "b", "c"):
+        cache.put(name, _entry(name, 10))
+    assert cache.get("a") is not None
+    cache.put("d", _entry("d", 10))
+    assert cache.get("b") is None and cache.get("a") is not None
+    cache.put("e", _entry("e", 60))
+    assert cache.get_stats()['bytes'] <= 100 and cache.get("c") is None
+    # Limite de bytes: a, d e e saem para caber g
+    cache.put("g", _entry("g", 50))
+    assert cache.get_stats()['entries'] == 1 and cache.get_stats()['bytes'] == 50
+    cache.put("f", _entry("f", 61))
+    stats = cache.get_stats()
+    assert stats['too_large'] == 1 and stats['evictions'] == 5
+    assert stats['hits'] == 2 and stats['misses'] == 2 and stats['hit_ratio'] == 0.5
+
+
+def test_invalidacao_por_mock():
+    cache = ResponseCache(enabled=True)
+    cache.put(("m1", 1), _entry("m1", 5))
+    cache.put(("m1", 2), _entry("m1", 5))
+    cache.put(("m2", 1), _entry("m2", 5))
+    cache.invalidate("m1")
+    assert cache.get(("m1", 1)) is None and cache.get(("m2", 1)) is not None
+    assert cache.get_stats()['bytes'] == 5
+    cache.clear()
+    assert cache.get_stats()['entries'] == 0 and cache.get_stats()['invalidations'] == 3
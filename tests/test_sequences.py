@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Testes das respostas sequenciais/ponderadas ($sequence) e dos contadores de chamadas (em processo, sem servidor)
+"""
+
+import os
+import threading
+from collections import Counter
+
+import pytest
+
+from src.match_explain import MatchTrace
+from src.mocks_manager import MocksManager
+from src.sequences import SequenceTemplate, weighted_schedule
+from src.template_engine import RenderContext, compile_template
+from src.variants import compile_variants
+
+
+def _sequence(responses, mode="sequence"):
+    return {"$sequence": {"mode": mode, "responses": responses}}
+
+
+def _served(manager, path, calls):
+    served = []
+    for _ in range(calls):
+        match = manager.find_matching_mock(path, "GET")
+        template, status, headers = match["template"].step(match["call"], match["status_code"], match["headers"])
+        served.append((status, template.render(RenderContext(path=match["variables"]))))
+    return served
+
+
+def test_roteiro_compilado():
+    template = compile_template(_sequence([
+        {"status_code_response": 202, "response": {"status": "pendente", "id": "{{path.id}}"}, "times": 2},
+        {"response": {"status": "concluido"}, "headers": {"X-Fim": "1"}},
+    ]))
+    assert isinstance(template, SequenceTemplate) and template.sequence == "sequence"
+    assert "path" in template.sources
+    assert [template.select(n).status_code for n in range(5)] == [202, 202, None, None, None]
+    assert template.step(2, 200, {}) == (template.steps[1].template, 200, {"X-Fim": "1"})
+
+    cycle = compile_template(_sequence([{"response": 1, "times": 2}, {"response": 2}], mode="cycle"))
+    assert [cycle.select(n).template.render(RenderContext()) for n in range(6)] == [1, 1, 2, 1, 1, 2]
+    # Pesos 3 e 1: intercalado, não A, A, A, B
+    assert weighted_schedule([3, 1]) == [0, 0, 1, 0]
+    assert Counter(weighted_schedule([5, 3, 2])) == {0: 5, 1: 3, 2: 2}
+
+
+@pytest.mark.parametrize("response", [
+    _sequence([]),
+    _sequence([{"response": 1}], mode="random"),
+    _sequence([{"status_code_response": 500}]),
+    _sequence([{"response": 1, "times": 0}]),
+    _sequence([{"response": 1, "weight": 10001}], mode="weighted"),
+    _sequence([{"response": _sequence([{"response": 1}])}]),
+    {"$sequence": {"responses": [{"response": 1}]}, "extra": 1},
+])
+def test_roteiros_invalidos(response):
+    with pytest.raises(ValueError):
+        compile_template(response)
+
+
+def test_sequence_nao_vale_em_variante():
+    with pytest.raises(ValueError):
+        compile_variants([{"when": {"query.x": "1"}, "response": _sequence([{"response": 1}])}])
+
+
+def test_sequencia_por_mock_e_reinicio(manager):
+    job = manager.create_mock("/jobs/:id", "GET", 200, _sequence([
+        {"status_code_response": 202, "response": {"status": "pendente"}, "times": 2},
+        {"response": {"status": "concluido", "id": "{{path.id}}"}},
+    ]))
+    manager.create_mock("/simples", "GET", 200, {"ok": True})
+    assert "call" not in manager.find_matching_mock("/simples", "GET")
+
+    assert _served(manager, "/jobs/7", 4) == [
+        (202, {"status": "pendente"}), (202, {"status": "pendente"}),
+        (200, {"status": "concluido", "id": "7"}), (200, {"status": "concluido", "id": "7"})]
+    # Explicação do match consulta o contador sem consumir
+    assert manager.find_matching_mock("/jobs/7", "GET", trace=MatchTrace())["call"] == 4
+    assert manager.find_matching_mock("/jobs/7", "GET")["call"] == 4
+
+    assert manager.reset_calls(job) and not manager.reset_calls("inexistente")
+    assert _served(manager, "/jobs/8", 1) == [(202, {"status": "pendente"})]
+
+
+def test_contador_concorrente_sem_repeticao(manager):
+    manager.create_mock("/lb", "GET", 200, _sequence([{"response": "a", "weight": 3}, {"response": "b"}], mode="weighted"))
+    calls = []
+
+    def worker():
+        calls.extend(manager.find_matching_mock("/lb", "GET")["call"] for _ in range(500))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(calls) == list(range(4000))
+    served = Counter(manager.find_matching_mock("/lb", "GET")["template"].select(n).template.render(RenderContext())
+                     for n in calls)
+    assert served == {"a": 3000, "b": 1000}
+
+
+@pytest.fixture
+def write_behind_manager(monkeypatch):
+    monkeypatch.setenv("USE_DATABASE", "true")
+    monkeypatch.setenv("PERSISTENCE_MODE", "write_behind")
+    monkeypatch.setenv("WRITE_BEHIND_FLUSH_INTERVAL", "3600")
+    monkeypatch.setenv("CHANGE_FEED_ENABLED", "false")
+    monkeypatch.setenv("DB_RECONNECT_ENABLED", "false")
+    manager = MocksManager()
+    if not manager.write_behind:
+        manager.shutdown()
+        pytest.skip("PostgreSQL não acessível (DB_*)")
+    yield manager
+    manager.shutdown()
+
+
+def test_contador_compartilhado_sobrevive_ao_flush(write_behind_manager):
+    manager = write_behind_manager
+    path = f"/flush-seq-{os.getpid()}"
+    mock_id = manager.create_mock(path, "GET", 200, _sequence([{"response": n} for n in "abcde"]))
+    try:
+        # Antes do primeiro flush o mock não está no banco: conta no processo e o flush leva a contagem
+        served = [_served(manager, path, 1)[0][1]]
+        for n in range(4):
+            # Edição entre as chamadas: o flush regrava a linha inteira, menos o contador
+            manager.update_mock(mock_id, headers={"X-Edicao": str(n)})
+            assert manager.write_behind.flush()
+            served.append(_served(manager, path, 1)[0][1])
+        assert served == ["a", "b", "c", "d", "e"]
+        assert manager.db_manager.get_mock(mock_id)["hits"] == 5
+
+        # Zerar continua explícito: reset_calls e um novo max_hits chegam ao banco
+        assert manager.reset_calls(mock_id) and manager.write_behind.flush()
+        assert _served(manager, path, 1)[0][1] == "a"
+        manager.update_mock(mock_id, max_hits=100)
+        assert manager.write_behind.flush() and manager.db_manager.get_mock(mock_id)["hits"] == 0
+    finally:
+        manager.delete_mock(mock_id)
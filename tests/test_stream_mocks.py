@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Testes dos mocks SSE/WebSocket e do broadcast (executam em processo, sem servidor)
+"""
+
+import asyncio
+
+import pytest
+
+from src.stream_mocks import StreamHub, StreamTemplate
+from src.template_engine import RenderContext, compile_template
+
+
+def _sse(messages, **spec):
+    return compile_template({"$stream": {"type": "sse", "messages": messages, **spec}})
+
+
+def test_roteiro_compilado_e_codificado_uma_vez():
+    template = _sse([{"data": {"ok": True}, "event": "status", "id": 1},
+                     {"data": "user-{{path.id}}", "delay_ms": 250}], repeat=2, keep_open=False)
+    assert isinstance(template, StreamTemplate) and template.stream == "sse" and template.streaming
+    assert template.sources == frozenset({"path"})
+    static = template.messages[0].frame
+    assert static == b'event: status\nid: 1\ndata: {"ok":true}\n\n'
+
+    script = list(template.render(RenderContext(path={"id": "7"})))
+    assert script == [(0, static), (0.25, b"data: user-7\n\n")] * 2
+    # Mensagem sem placeholders: o mesmo frame para todas as conexões e repetições
+    assert script[0][1] is script[2][1] is static
+
+    ws = compile_template({"$stream": {"type": "websocket", "messages": [{"data": {"a": 1}}]}})
+    assert [frame for _, frame in ws.render(RenderContext())] == ['{"a":1}']
+
+
+@pytest.mark.parametrize("spec", [
+    {"type": "http"},
+    {"type": "sse", "messages": [{"event": "sem data"}]},
+    {"type": "websocket", "messages": [{"data": 1, "event": "x"}]},
+    {"type": "sse", "messages": [{"data": 1}], "repeat": 0},
+    {"type": "sse", "messages": [{"data": 1, "delay_ms": -1}]},
+])
+def test_roteiros_invalidos(spec):
+    with pytest.raises(ValueError):
+        compile_template({"$stream": spec})
+
+
+def test_broadcast_para_todas_as_conexoes():
+    async def scenario():
+        hub = StreamHub(buffer_size=4)
+        template = _sse([{"data": "oi"}])
+        received = [[] for _ in range(50)]
+
+        async def subscriber(out):
+            async for frame in hub.stream("m1", "sse", template.render(RenderContext()), True):
+                out.append(frame)
+
+        tasks = [asyncio.ensure_future(subscriber(out)) for out in received]
+        await asyncio.sleep(0)
+        assert hub.get_stats()['connections'] == 50
+        assert hub.publish("m1", "sse", {"data": {"preco": 10}, "event": "preco"}) == 50
+        assert hub.publish("outro", "sse", {"data": 1}) == 0
+        await asyncio.sleep(0)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return hub, received
+
+    hub, received = asyncio.run(scenario())
+    pushed = b'event: preco\ndata: {"preco":10}\n\n'
+    assert all(out == [b"data: oi\n\n", pushed] for out in received)
+    # Um único frame codificado, compartilhado por todas as conexões
+    assert len({id(out[1]) for out in received}) == 1
+    assert hub.get_stats()['connections'] == 0 and hub.channels == {}
+
+
+def test_broadcast_durante_espera_e_conexao_atrasada():
+    async def scenario():
+        hub = StreamHub(buffer_size=2)
+        # Push chega durante o delay da mensagem roteirizada e sai antes dela
+        template = _sse([{"data": "roteiro", "delay_ms": 50}], keep_open=False)
+        frames = hub.stream("m1", "sse", template.render(RenderContext()), False)
+        first = asyncio.ensure_future(frames.__anext__())
+        await asyncio.sleep(0.01)
+        hub.publish("m1", "sse", {"data": "push"})
+        assert await first == b"data: push\n\n"
+        assert [f async for f in frames] == [b"data: roteiro\n\n"]
+
+        # Conexão que não lê: perde as mensagens que saíram do buffer circular
+        slow = hub.stream("m2", "sse", iter(()), True)
+        reading = asyncio.ensure_future(slow.__anext__())
+        await asyncio.sleep(0)
+        for n in range(5):
+            hub.publish("m2", "sse", {"data": n})
+        assert await reading == b"data: 3\n\n"
+        assert await slow.__anext__() == b"data: 4\n\n"
+        await slow.aclose()
+        return hub
+
+    hub = asyncio.run(scenario())
+    assert hub.dropped == 3 and hub.get_stats()['connections'] == 0
+
+
+def test_admit_reserva_a_vaga_ate_o_fim_da_conexao():
+    async def scenario():
+        hub = StreamHub(max_connections=2)
+        template = _sse([{"data": "oi"}], keep_open=False)
+        # Duas admissões antes de qualquer stream começar já ocupam o limite
+        first, second = hub.admit(), hub.admit()
+        assert first and second and hub.admit() is None
+
+        assert [f async for f in hub.stream("m1", "sse", template.render(RenderContext()), False, first)] == [
+            b"data: oi\n\n"]
+        # Resposta que nunca começou: a vaga volta por release(), uma única vez
+        second.release()
+        second.release()
+        return hub
+
+    hub = asyncio.run(scenario())
+    assert hub.get_stats()['connections'] == 0 and hub.rejected == 1
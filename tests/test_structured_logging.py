@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Testes do logging estruturado via fila e do log de acesso amostrado (executam em processo, sem servidor)
+"""
+
+import asyncio
+import json
+import logging
+import sys
+
+from src.structured_logging import AccessLogMiddleware, JsonFormatter, StructuredLogging, _AccessAwareListener
+
+
+def _record(level=logging.INFO, msg="ok %s", args=("x",), **extra):
+    record = logging.LogRecord("qa_api.teste", level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_com_campos_extra():
+    entry = json.loads(JsonFormatter().format(_record(status=200, path="/a")))
+    assert entry['msg'] == "ok x" and entry['level'] == "INFO" and entry['logger'] == "qa_api.teste"
+    assert entry['status'] == 200 and entry['path'] == "/a" and "args" not in entry
+
+
+def test_mensagem_montada_ao_logar():
+    setup = StructuredLogging(queue_size=10)
+    itens = [1]
+    setup.handler.handle(_record(msg="itens %s", args=(itens,)))
+    itens.append(2)
+    try:
+        raise ValueError("falhou")
+    except ValueError:
+        record = _record(level=logging.ERROR, msg="erro %d", args=(1,))
+        record.exc_info = sys.exc_info()
+        setup.handler.handle(record)
+    queued = [setup.queue.get_nowait() for _ in range(2)]
+    # O argumento alterado depois de logar não muda a linha escrita pelo listener
+    assert queued[0].getMessage() == "itens [1]" and queued[0].args is None
+    assert queued[1].exc_info is None and "ValueError: falhou" in json.loads(JsonFormatter().format(queued[1]))['exc']
+    assert "ValueError: falhou" in logging.Formatter().format(queued[1])
+    assert record.args == (1,) and record.exc_info is not None
+
+
+def test_fila_cheia_descarta_sem_bloquear():
+    setup = StructuredLogging(queue_size=2)
+    for _ in range(5):
+        setup.handler.handle(_record())
+    assert setup.queue.qsize() == 2 and setup.get_stats()['dropped'] == 3
+
+
+def test_nivel_por_rota_e_amostragem_do_acesso():
+    setup = StructuredLogging(queue_size=100, access_sample_rate=0.0, route_levels="/status=WARNING, /mocks=ERROR, x")
+    setup.access_logger.setLevel(logging.INFO)
+    assert setup.route_level("/mocks/123") == logging.ERROR and setup.route_level("/mocksx") == logging.NOTSET
+
+    async def app(scope, receive, send):
+        logging.getLogger("qa_api.teste").warning("durante a requisição")
+        await send({"type": "http.response.start", "status": int(scope["path"][1:4]), "headers": []})
+
+    async def send(message):
+        pass
+
+    middleware = AccessLogMiddleware(app, setup)
+    logging.getLogger("qa_api.teste").addHandler(setup.handler)
+    try:
+        for path in ("/200", "/200", "/404", "/500"):
+            asyncio.run(middleware({"type": "http", "method": "GET", "path": path, "client": ("1.2.3.4", 1)}, None, send))
+        setup.route_levels = setup._parse_route_levels("/500=CRITICAL")
+        asyncio.run(middleware({"type": "http", "method": "GET", "path": "/500", "client": None}, None, send))
+    finally:
+        logging.getLogger("qa_api.teste").removeHandler(setup.handler)
+
+    # Acessos vão para a fila como tupla; o listener monta o LogRecord
+    listener = _AccessAwareListener(setup.queue)
+    records = [listener.prepare(setup.queue.get_nowait()) for _ in range(setup.queue.qsize())]
+    assert json.loads(JsonFormatter().format(records[-1]))['status'] == 500
+    access = [r for r in records if r.name == "qa_api.access"]
+    # 200 amostrados fora; 404/500 sempre registrados; nível da rota filtra também o log da aplicação
+    assert [(r.status, r.levelname) for r in access] == [(404, "WARNING"), (500, "ERROR")]
+    assert setup.access_sampled_out == 2
+    assert sum(r.name == "qa_api.teste" for r in records) == 4
+
+
+def test_sem_log_de_acesso_o_do_uvicorn_tambem_fica_desligado(monkeypatch):
+    monkeypatch.setenv("LOG_ACCESS", "false")
+    setup = StructuredLogging.from_env()
+    root = logging.getLogger()
+    uvicorn_loggers = [logging.getLogger(name) for name in ("uvicorn", "uvicorn.error", "uvicorn.access")]
+    saved = (list(root.handlers), root.level,
+             [(list(log.handlers), log.propagate, log.disabled) for log in uvicorn_loggers])
+    emitted = []
+    monkeypatch.setattr(setup.handler, "enqueue", emitted.append)
+    try:
+        setup.install()
+        logging.getLogger("uvicorn.access").info('%s - "%s %s HTTP/%s" %d', "1.2.3.4", "GET", "/x", "1.1", 200)
+        logging.getLogger("qa_api.teste").info("outro log continua")
+    finally:
+        setup.stop()
+        root.handlers[:] = saved[0]
+        root.setLevel(saved[1])
+        for log, (handlers, propagate, disabled) in zip(uvicorn_loggers, saved[2]):
+            log.handlers[:], log.propagate, log.disabled = handlers, propagate, disabled
+    assert not setup.access_log and [record.name for record in emitted] == ["qa_api.teste"]
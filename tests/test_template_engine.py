@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Testes do motor de templates (executam em processo, sem servidor)
+"""
+
+import pytest
+
+from src.json_codec import LazyArray, iter_json, loads
+from src.template_engine import RenderContext, compile_template
+
+
+def _ctx(**kwargs):
+    return RenderContext(**kwargs)
+
+
+def test_interpolacao_e_tipos():
+    template = compile_template({
+        "id": "{{path.id|int}}",
+        "label": "user-{{path.id}}",
+        "page": "{{query.page|int|default:1}}",
+        "name": "{{body.user.name}}",
+        "first": "{{body.items.0}}",
+        "agent": "{{headers.User-Agent}}",
+        "fixo": {"a": [1, 2]},
+    }, legacy=False)
+    ctx = _ctx(path={"id": "42"}, query={}, body={"user": {"name": "Ana"}, "items": ["x"]},
+               headers={"user-agent": "pytest"})
+    assert template.render(ctx) == {
+        "id": 42, "label": "user-42", "page": 1, "name": "Ana", "first": "x", "agent": "pytest",
+        "fixo": {"a": [1, 2]},
+    }
+    assert template.sources == {"path", "query", "body", "headers"}
+
+
+def test_resposta_sem_placeholders_e_constante():
+    response = {"a": "id", "b": [1, {"c": "texto"}]}
+    template = compile_template(response, legacy=False)
+    assert not template.dynamic
+    assert template.render(_ctx(path={"id": "1"})) is response
+
+
+def test_compatibilidade_com_variaveis_antigas():
+    template = compile_template({"id": "id", "nome": "fixo", "novo": "{{path.id}}"}, legacy=True)
+    ctx = _ctx(path={"id": "7"}, query={"fixo": "q"})
+    assert template.render(ctx) == {"id": "7", "nome": "q", "novo": "7"}
+
+
+def test_template_invalido_falha_na_compilacao():
+    with pytest.raises(ValueError):
+        compile_template({"x": "{{cookies.id}}"})
+    with pytest.raises(ValueError):
+        compile_template({"x": "{{path.id|upper}}"})
+
+
+def test_resposta_gerada_em_streaming():
+    template = compile_template({"page": "{{query.page|int}}", "items": {"$generate": {
+        "count": "{{query.size|int|default:2}}", "seed": 3, "start": 10, "step": 5,
+        "item": {"id": "{{item.seq}}", "name": "user-{{item.index}}", "score": "{{item.random}}"}
+    }}}, legacy=False)
+    assert template.streaming and template.sources == frozenset({"query"})
+    ctx = _ctx(query={"page": "2", "size": "2500"})
+    chunks = list(iter_json(template.render(ctx), chunk_size=4096))
+    data = loads(b"".join(chunks))
+    assert len(chunks) > 1 and data["page"] == 2 and len(data["items"]) == 2500
+    assert data["items"][1]["id"] == 15 and data["items"][1]["name"] == "user-1"
+    # Mesma seed, mesmos valores aleatórios
+    assert loads(b"".join(iter_json(template.render(ctx)))) == data
+    # O array gerado também itera direto, com os mesmos itens
+    items = template.render(ctx)["items"]
+    assert isinstance(items, LazyArray) and list(items)[1] == data["items"][1]
+    with pytest.raises(TypeError):
+        LazyArray()
+
+
+def test_resposta_gerada_invalida():
+    with pytest.raises(ValueError):
+        compile_template({"$generate": {"count": 1}})
+    with pytest.raises(ValueError):
+        compile_template({"$generate": {"count": -1, "item": 1}})
+    with pytest.raises(ValueError):
+        compile_template({"$generate": {"count": 1, "item": 1}, "extra": True})
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Testes dos mocks de vazão $echo/$sink (executam em processo, sem servidor: chamadas ASGI diretas)
+"""
+
+import asyncio
+
+import pytest
+from starlette.requests import Request
+
+from src.template_engine import compile_template
+from src.throughput_mocks import PipeTemplate, ThroughputMeter
+
+
+def _call(meter, template, chunks, query=b"", headers=()):
+    """Executa a resposta do mock com o corpo chegando em pedaços; devolve (status, headers, pedaços enviados, lidos)."""
+    scope = {"type": "http", "method": "POST", "path": "/vazao", "query_string": query,
+             "headers": [(k.encode(), v.encode()) for k, v in headers]}
+    pending = list(chunks)
+    received = []
+
+    async def receive():
+        if not pending:
+            return {"type": "http.disconnect"}
+        chunk = pending.pop(0)
+        received.append(chunk)
+        return {"type": "http.request", "body": chunk, "more_body": bool(pending)}
+
+    sent = []
+
+    async def send(message):
+        # Registra quantos pedaços do corpo já tinham sido lidos quando cada pedaço saiu
+        sent.append((message, len(received)))
+
+    async def run():
+        response = await meter.response("m1", template, Request(scope, receive), 200, {"X-Mock": "1"})
+        await response(scope, receive, send)
+
+    asyncio.run(run())
+    start = sent[0][0]
+    body = [(m["body"], lidos) for m, lidos in sent[1:] if m["body"]]
+    assert not sent[-1][0].get("more_body")
+    return start["status"], dict((k.decode(), v.decode()) for k, v in start["headers"]), body
+
+
+def test_opcoes_compiladas():
+    sink = compile_template({"$sink": {"response_bytes": 10, "chunk_size": 4, "query_param": "bytes"}})
+    assert isinstance(sink, PipeTemplate) and sink.pipe == "sink" and sink.streaming
+    # Nenhuma fonte: o catch_all não lê nem interpreta o corpo
+    assert sink.sources == frozenset() and sink.stream is None and sink.sequence is None
+    assert sink.size({}) == 10 and sink.size({"bytes": "3"}) == 3
+    with pytest.raises(ValueError):
+        sink.size({"bytes": "-1"})
+    assert compile_template({"$echo": {}}).pipe == "echo"
+    assert compile_template({"ok": True}).pipe is None
+
+
+@pytest.mark.parametrize("response", [
+    {"$echo": {}, "extra": 1},
+    {"$echo": None},
+    {"$sink": {"response_bytes": -1}},
+    {"$sink": {"chunk_size": 0}},
+    {"$sink": {"query_param": ""}},
+    {"$sequence": {"responses": [{"response": {"$echo": {}}}]}},
+])
+def test_opcoes_invalidas(response):
+    with pytest.raises(ValueError):
+        compile_template(response)
+
+
+def test_eco_repassa_os_pedacos_enquanto_chegam():
+    meter = ThroughputMeter()
+    chunks = [b"a" * 1000, b"", b"b" * 10, b"c"]
+    status, headers, body = _call(meter, compile_template({"$echo": {}}), chunks,
+                                  headers=[("content-type", "text/csv"), ("content-length", "1011")])
+    assert (status, headers["content-type"], headers["content-length"], headers["x-mock"]) == (200, "text/csv", "1011", "1")
+    # Cada pedaço sai logo depois de lido (o mesmo objeto, sem cópia) e nada fica acumulado
+    assert body == [(b"a" * 1000, 1), (b"b" * 10, 3), (b"c", 4)]
+    assert body[0][0] is chunks[0]
+    stats = meter.get_stats()["echo"]
+    assert (stats["requests"], stats["bytes_in"], stats["bytes_out"]) == (1, 1011, 1011)
+
+
+def test_sumidouro_responde_n_bytes_com_buffer_unico():
+    meter = ThroughputMeter()
+    template = compile_template({"$sink": {"response_bytes": 10, "chunk_size": 4, "query_param": "bytes"}})
+    status, headers, body = _call(meter, template, [b"x" * 100, b"y" * 50])
+    assert headers["content-length"] == "10" and headers["content-type"] == "application/octet-stream"
+    assert [chunk for chunk, _ in body] == [bytes(4), bytes(4), bytes(2)]
+    assert body[0][0] is body[1][0] is template.chunk
+
+    _, _, body = _call(meter, template, [b""], query=b"bytes=5")
+    assert b"".join(chunk for chunk, _ in body) == bytes(5)
+    stats = meter.get_stats()["sink"]
+    assert (stats["requests"], stats["bytes_in"], stats["bytes_out"]) == (2, 150, 15)
+
+    # response_bytes 0: só o resumo do que foi recebido
+    status, headers, body = _call(meter, compile_template({"$sink": {}}), [b"z" * 64])
+    assert status == 200 and b'"bytes_recebidos":64' in body[0][0]
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Testes das variantes condicionais de resposta (executam em processo, sem servidor)
+"""
+
+import pytest
+
+from src.template_engine import RenderContext
+from src.variants import compile_variants
+
+
+def _ctx(**kwargs):
+    return RenderContext(**kwargs)
+
+
+def test_primeira_variante_na_ordem_vence():
+    variants = compile_variants([
+        {"when": {"path.id": 999}, "status_code_response": 404},
+        {"when": {"query.page": {"gte": 2}}, "status_code_response": 206},
+        {"when": {"path.id": "999", "query.page": "1"}, "status_code_response": 410},
+    ])
+    assert variants.select(_ctx(path={"id": "999"}, query={"page": "1"})).status_code == 404
+    assert variants.select(_ctx(path={"id": "1"}, query={"page": "5"})).status_code == 206
+    assert variants.select(_ctx(path={"id": "1"}, query={"page": "1"})) is None
+
+
+def test_operadores():
+    variants = compile_variants([
+        {"when": {"headers.X-Env": {"in": ["hml", "dev"]}, "body.user.name": {"regex": "^A"}}, "status_code_response": 1},
+        {"when": {"body.flag": {"exists": False}, "query.q": {"ne": "x"}}, "status_code_response": 2},
+    ])
+    ctx = _ctx(headers={"x-env": "hml"}, body={"user": {"name": "Ana"}, "flag": True})
+    assert variants.select(ctx).status_code == 1
+    assert variants.select(_ctx(query={"q": "y"}, body={})).status_code == 2
+    assert variants.select(_ctx(query={"q": "x"}, body={})) is None
+
+
+def test_indice_limita_candidatas():
+    variants = compile_variants(
+        [{"when": {"path.id": i}, "status_code_response": 200 + i} for i in range(300)]
+        + [{"when": {"query.debug": {"exists": True}}, "status_code_response": 599}]
+    )
+    assert variants.candidates(_ctx(path={"id": "250"})) == [250, 300]
+    assert variants.select(_ctx(path={"id": "250"})).status_code == 450
+
+
+def test_variantes_invalidas():
+    assert compile_variants([]) is None
+    with pytest.raises(ValueError):
+        compile_variants([{"when": {"cookie.id": 1}}])
+    with pytest.raises(ValueError):
+        compile_variants([{"when": {"path.id": {"gt": "abc"}}}])
+    with pytest.raises(ValueError):
+        compile_variants({"when": {}})
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Testes da fila write-behind com um banco falso (executam em processo, sem servidor)
+"""
+
+import threading
+
+from src.mock_record import MockRecord
+from src.write_behind import WriteBehindQueue
+
+
+class FakeDatabase:
+    use_database = True
+    change_feed_enabled = False
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.batches = []
+        self.rows = {}
+
+    def apply_batch(self, upserts, deletes, clear=False):
+        if self.fail:
+            return False
+        self.batches.append(({u['id'] for u in upserts}, set(deletes), clear))
+        if clear:
+            self.rows.clear()
+        for mock_id in deletes:
+            self.rows.pop(mock_id, None)
+        self.rows.update((u['id'], u) for u in upserts)
+        return True
+
+    def is_connected(self):
+        return not self.fail
+
+    def mark_connected(self):
+        pass
+
+    def stop_reconnect(self):
+        pass
+
+
+def _queue(db, state, **kwargs):
+    return WriteBehindQueue(db, lambda mock_id: ({'id': mock_id} if mock_id in state else None), **kwargs)
+
+
+def test_coalesce_mutacoes_do_mesmo_mock():
+    db, state = FakeDatabase(), {"a", "b"}
+    queue = _queue(db, state)
+    for mock_id in ("a", "a", "b", "c"):
+        queue.mark_dirty(mock_id)
+    assert queue.pending == 3
+    assert queue.flush()
+    assert db.batches == [({"a", "b"}, {"c"}, False)]
+    assert queue.pending == 0
+
+
+def test_clear_descarta_pendentes_anteriores():
+    db, state = FakeDatabase(), {"novo"}
+    queue = _queue(db, state)
+    queue.mark_dirty("antigo")
+    queue.mark_clear()
+    queue.mark_dirty("novo")
+    queue.flush()
+    assert db.batches == [({"novo"}, set(), True)]
+
+
+def test_falha_devolve_para_fila_e_limite_forca_flush():
+    db, state = FakeDatabase(fail=True), {"a"}
+    queue = _queue(db, state, max_pending=2)
+    queue.mark_dirty("a")
+    assert not queue.flush()
+    assert queue.pending == 1 and queue.failed_flushes == 1
+
+    db.fail = False
+    queue.mark_dirty("b")  # atinge max_pending: flush síncrono
+    assert queue.pending == 0
+    assert db.batches == [({"a"}, {"b"}, False)]
+
+
+def _row(mock_id, uri):
+    return {"id": mock_id, "namespace": "default", "uri": uri, "http_method": "GET", "status_code": 201,
+            "response": {"remoto": True}, "response_body": '{"remoto": true}', "response_compressed": None,
+            "headers": {}, "variants": None, "expires_at": None, "max_hits": None, "hits": 0}
+
+
+def test_feed_de_mudancas_durante_o_match(manager, monkeypatch):
+    # Write-behind com banco falso: o feed relê do banco os mocks alterados por outra instância
+    manager.write_behind = WriteBehindQueue(FakeDatabase(), manager._snapshot_for_flush)
+    removido = manager.create_mock("/removido", "GET", 200, {})
+    manager.create_mock("/local", "GET", 200, {"ok": True})
+    manager.write_behind.flush()
+    monkeypatch.setattr(manager.db_manager, "get_mocks_by_ids",
+                        lambda ids: [_row(mock_id, "/remoto") for mock_id in ids if mock_id == "999999"])
+    original = MockRecord.match
+
+    def match_with_feed(record, path):
+        # A thread do feed aplica uma remoção e uma criação enquanto o match percorre as rotas
+        if record.uri == "/local" and manager.mock_exists(removido):
+            thread = threading.Thread(target=manager._apply_remote_changes,
+                                      args=([(1, removido, "D"), (2, "999999", "I")],))
+            thread.start()
+            thread.join()
+        return original(record, path)
+
+    monkeypatch.setattr(MockRecord, "match", match_with_feed)
+    assert manager.find_matching_mock("/outra", "GET") is None
+    assert not manager.mock_exists(removido)
+    assert manager.find_matching_mock("/remoto", "GET")["status_code"] == 201
+
+
+def test_queda_e_reconexao_no_write_behind(manager):
+    db = FakeDatabase()
+    manager.db_manager = db
+    manager.write_behind = queue = WriteBehindQueue(db, manager._snapshot_for_flush)
+    antes = manager.create_mock("/antes", "GET", 200, {})
+    assert queue.flush() and set(db.rows) == {antes}
+
+    # Queda: as mutações continuam na memória e o flush devolve para a fila
+    db.fail = True
+    durante = manager.create_mock("/durante", "GET", 200, {"ok": True})
+    manager.update_mock(antes, status_code=503)
+    assert not queue.flush() and queue.pending == 2
+
+    db.fail = False
+    assert manager._reconcile_after_reconnect()
+    # Mesma fila, nada recarregado: o que mudou na queda está na memória e no banco
+    assert manager.write_behind is queue and queue.pending == 0
+    assert manager.find_matching_mock("/durante", "GET")["status_code"] == 200
+    assert manager.find_matching_mock("/antes", "GET")["status_code"] == 503
+    assert set(db.rows) == {antes, durante} and db.rows[antes]["status_code"] == 503
+    assert manager.last_reconcile["written"] == 2